@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregados Diários Persistidos - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Tabela local (SQLite) com os totais de cada item por dia:
+- 🗄️ (item, grupo, dia, entradas, saídas, nº de movimentações, saldo de fechamento)
+- ➕ Atualização incremental a cada movimentação registrada
+- 📥 Back-fill a partir da aba ESTOQUE (ou do DataFrame já carregado pelo
+  app), só das linhas que ainda não entraram
+- 🔎 Consultas por faixa de datas usando os índices (item, dia) e (dia, item)
+
+Relatórios, gráficos e dashboard deixam de recalcular os totais a partir
+das linhas brutas (ou dos últimos 500 registros em memória).
+
+Linhas da planilha já incorporadas ficam marcadas (marca d'água + linhas
+avulsas acima dela), então back-fill e registro ao vivo nunca somam a
+mesma linha duas vezes. Linha com data que não deu para ler segura a marca
+d'água (é tentada de novo no próximo back-fill), e uma assinatura das
+linhas já vistas detecta edição ou exclusão de linhas antigas (refaz tudo).
+
+O arquivo SQLite só é aberto (e criado) no primeiro uso.
+
+Uso:
+    from agregados_diarios import agregados_diarios
+
+    agregados_diarios.sincronizar_dataframe(df_hist)     # back-fill incremental
+    agregados_diarios.registrar('AMARELO 1234', 'FIOS', '13/02/2026', saida=30, saldo=120, linha=4521)
+    agregados_diarios.totais_por_dia('01/02/2026', '13/02/2026')
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from config import ABA_ESTOQUE, converter_para_numero
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Dia = Union[str, date, datetime, None]
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigAgregados:
+    """Configurações do armazém de agregados diários"""
+    ARQUIVO_DB = os.getenv('MARFIM_AGREGADOS_DB', 'agregados_diarios.db')
+    SINCRONIZAR_AO_INICIAR = True  # Back-fill da ESTOQUE em background ao registrar as rotas
+    BLOCO_LINHAS = 2000            # Linhas da ESTOQUE por leitura no back-fill
+    DIAS_GRAFICO = 14              # Dias no gráfico de movimentações
+
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS agregados_diarios (
+    item        TEXT    NOT NULL,             -- chave normalizada (maiúsculas, sem espaços nas pontas)
+    dia         TEXT    NOT NULL,             -- YYYY-MM-DD (ordena como data)
+    grupo       TEXT    NOT NULL DEFAULT '',
+    entradas    REAL    NOT NULL DEFAULT 0,
+    saidas      REAL    NOT NULL DEFAULT 0,
+    n_movs      INTEGER NOT NULL DEFAULT 0,
+    saldo_final REAL,                         -- saldo após a última movimentação do dia
+    seq_final   INTEGER NOT NULL DEFAULT -1,  -- linha da planilha dessa movimentação
+    PRIMARY KEY (item, dia)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_agregados_dia ON agregados_diarios (dia, item);
+CREATE INDEX IF NOT EXISTS idx_agregados_grupo_dia ON agregados_diarios (grupo, dia);
+CREATE TABLE IF NOT EXISTS agregados_linhas (
+    linha INTEGER PRIMARY KEY                 -- linhas acima da marca d'água já somadas
+);
+CREATE TABLE IF NOT EXISTS agregados_meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+_UPSERT = """
+INSERT INTO agregados_diarios (item, dia, grupo, entradas, saidas, n_movs, saldo_final, seq_final)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (item, dia) DO UPDATE SET
+    grupo = CASE WHEN excluded.grupo != '' THEN excluded.grupo ELSE grupo END,
+    entradas = entradas + excluded.entradas,
+    saidas = saidas + excluded.saidas,
+    n_movs = n_movs + excluded.n_movs,
+    saldo_final = CASE WHEN excluded.seq_final >= seq_final THEN excluded.saldo_final ELSE saldo_final END,
+    seq_final = MAX(seq_final, excluded.seq_final)
+"""
+
+
+_FORMATOS_DIA = ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y')
+
+
+def _dia_iso(valor: Dia) -> Optional[str]:
+    """Data (DD/MM/YYYY, ISO, date ou datetime) → 'YYYY-MM-DD'"""
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime('%Y-%m-%d')
+    texto = str(valor).strip().split(' ')[0]
+    for formato in _FORMATOS_DIA:
+        try:
+            return datetime.strptime(texto, formato).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _dias_iso(datas: pd.Series) -> pd.Series:
+    """_dia_iso para uma coluna inteira ('YYYY-MM-DD' ou NaN), mesmos formatos"""
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return datas.dt.strftime('%Y-%m-%d')
+    texto = datas.astype(str).str.strip().str.split(' ').str[0].where(datas.notna(), '')
+    dias = pd.Series(pd.NaT, index=datas.index, dtype='datetime64[ns]')
+    for formato in _FORMATOS_DIA:
+        faltando = dias.isna() & (texto != '')
+        if not faltando.any():
+            break
+        dias[faltando] = pd.to_datetime(texto[faltando], format=formato, errors='coerce')
+    return dias.dt.strftime('%Y-%m-%d')
+
+
+def _assinatura(hashes) -> str:
+    """Assinatura de uma sequência de linhas: soma dos hashes ponderada pela posição"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    posicoes = np.arange(1, len(hashes) + 1, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        return format(int((hashes * posicoes).sum(dtype=np.uint64)), '016x')
+
+
+def normalizar_item(nome: Any) -> str:
+    """Mesma chave do cubo_consumo (sem espaços nas pontas, maiúsculas)"""
+    return str(nome).strip().upper()
+
+
+# ========================================
+# ARMAZÉM
+# ========================================
+
+class ArmazemAgregados:
+    """
+    Agregados item × dia num arquivo SQLite local
+
+    Uma conexão compartilhada (check_same_thread=False) protegida por lock,
+    aberta no primeiro uso; WAL deixa leituras de relatório rodarem durante
+    um back-fill.
+    """
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or ConfigAgregados.ARQUIVO_DB
+        self._lock = threading.RLock()
+        self._conexao_db: Optional[sqlite3.Connection] = None
+
+        self._sync_thread: Optional[threading.Thread] = None
+        self.stats = {'registrados': 0, 'duplicados_ignorados': 0, 'linhas_backfill': 0,
+                      'sem_data': 0, 'datas_invalidas': 0, 'reconstrucoes': 0}
+
+    @property
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão SQLite (abre o arquivo e cria o esquema na primeira chamada)"""
+        if self._conexao_db is None:
+            with self._lock:
+                if self._conexao_db is None:
+                    conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+                    conexao.execute('PRAGMA journal_mode=WAL')
+                    conexao.execute('PRAGMA synchronous=NORMAL')
+                    conexao.executescript(_ESQUEMA)
+                    conexao.commit()
+                    self._conexao_db = conexao
+                    logger.info(f"✅ ArmazemAgregados inicializado ({self.caminho})")
+        return self._conexao_db
+
+    # ========================================
+    # CONTROLE DE LINHAS JÁ INCORPORADAS
+    # ========================================
+
+    def _meta(self, chave: str, padrao: Optional[str] = None) -> Optional[str]:
+        linha = self._conexao.execute('SELECT valor FROM agregados_meta WHERE chave = ?', (chave,)).fetchone()
+        return linha[0] if linha else padrao
+
+    def _definir_meta(self, chave: str, valor: Any):
+        self._conexao.execute(
+            'INSERT INTO agregados_meta (chave, valor) VALUES (?, ?) '
+            'ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor',
+            (chave, str(valor))
+        )
+
+    @property
+    def marca_dagua(self) -> int:
+        """Última linha da ESTOQUE até onde tudo já foi incorporado"""
+        with self._lock:
+            return int(self._meta('marca_dagua', '1'))
+
+    @property
+    def versao(self) -> str:
+        """Marca d'água + linhas avulsas + assinatura: muda a cada linha incorporada ou editada"""
+        with self._lock:
+            avulsas = self._conexao.execute('SELECT COUNT(*) FROM agregados_linhas').fetchone()[0]
+            return f"{self._meta('marca_dagua', '1')}+{avulsas}:{self._meta('assinatura', '')}"
+
+    def _linhas_novas(self, linhas: Iterable[int]) -> List[int]:
+        """Filtra as linhas ainda não somadas (acima da marca e fora de agregados_linhas)"""
+        marca = int(self._meta('marca_dagua', '1'))
+        candidatas = [l for l in linhas if l > marca]
+        if not candidatas:
+            return []
+        ja = set()
+        for i in range(0, len(candidatas), 900):
+            parte = candidatas[i:i + 900]
+            ja.update(r[0] for r in self._conexao.execute(
+                f"SELECT linha FROM agregados_linhas WHERE linha IN ({','.join('?' * len(parte))})", parte
+            ))
+        return [l for l in candidatas if l not in ja]
+
+    # ========================================
+    # ESCRITA
+    # ========================================
+
+    def registrar(
+        self,
+        item: str,
+        grupo: str = '',
+        data: Dia = None,
+        entrada: float = 0.0,
+        saida: float = 0.0,
+        saldo: Optional[float] = None,
+        linha: Optional[int] = None
+    ) -> bool:
+        """
+        Soma uma movimentação no dia dela
+
+        Args:
+            item, grupo: Item e grupo
+            data: Dia da movimentação (padrão: hoje)
+            entrada, saida: Quantidades (negativas são ignoradas, como no cubo)
+            saldo: Saldo após a movimentação (vira o saldo de fechamento do dia)
+            linha: Linha na ESTOQUE (evita somar de novo no back-fill)
+
+        Returns:
+            True se somou, False se a linha já estava incorporada ou sem data
+        """
+        dia = _dia_iso(data or datetime.now())
+        if not dia or not str(item).strip():
+            self.stats['sem_data'] += 1
+            return False
+
+        with self._lock:
+            if linha is not None:
+                if not self._linhas_novas([int(linha)]):
+                    self.stats['duplicados_ignorados'] += 1
+                    return False
+                self._conexao.execute('INSERT OR IGNORE INTO agregados_linhas (linha) VALUES (?)', (int(linha),))
+
+            self._conexao.execute(_UPSERT, (
+                normalizar_item(item), dia, (grupo or '').strip(),
+                max(float(entrada or 0), 0.0), max(float(saida or 0), 0.0), 1,
+                None if saldo is None else float(saldo),
+                int(linha) if linha is not None else 2 ** 62
+            ))
+            self._conexao.commit()
+            self.stats['registrados'] += 1
+        return True
+
+    def sincronizar_dataframe(self, df: pd.DataFrame, primeira_linha: int = 2,
+                              col_item: str = 'Item', col_data: str = 'Data', col_grupo: str = 'Grupo',
+                              col_entrada: str = 'Entrada', col_saida: str = 'Saída',
+                              col_saldo: str = 'Saldo') -> int:
+        """
+        Back-fill a partir da ESTOQUE já carregada (ex.: carregar_dados_completos)
+
+        A posição i do DataFrame é a linha primeira_linha + i da planilha;
+        só as linhas ainda não incorporadas entram. Se a planilha encolheu ou
+        alguma linha já vista mudou (assinatura diferente), a tabela é refeita
+        do zero.
+
+        Returns:
+            Nº de linhas novas incorporadas
+        """
+        ultima_linha = primeira_linha + len(df) - 1
+        colunas = (col_item, col_data, col_grupo, col_entrada, col_saida, col_saldo)
+        base = self._normalizar(df, list(range(primeira_linha, ultima_linha + 1)), *colunas)
+        hashes = pd.util.hash_pandas_object(
+            base[['item', 'texto_data', 'grupo', 'entradas', 'saidas', 'saldo']], index=False
+        ).to_numpy(dtype=np.uint64)
+
+        with self._lock:
+            assinada = int(self._meta('assinatura_ate', '0'))
+            if ultima_linha < self.marca_dagua or ultima_linha < assinada:
+                logger.warning("⚠️ ESTOQUE tem menos linhas que os agregados: reconstruindo")
+                self._reconstruir()
+            elif assinada >= primeira_linha and \
+                    _assinatura(hashes[:assinada - primeira_linha + 1]) != self._meta('assinatura'):
+                logger.warning("⚠️ Linhas antigas da ESTOQUE foram alteradas: reconstruindo agregados")
+                self._reconstruir()
+
+            marca = self.marca_dagua
+            if ultima_linha <= marca and not self._conexao.execute('SELECT 1 FROM agregados_linhas LIMIT 1').fetchone():
+                self._assinar(hashes, ultima_linha)
+                self._conexao.commit()
+                return 0
+
+            inicio = max(0, marca + 1 - primeira_linha)
+            parte = base.iloc[inicio:]
+            novas = set(self._linhas_novas(parte['linha'].tolist()))
+            incorporadas, pendentes = self._incorporar(parte[parte['linha'].isin(novas)])
+
+            self._fechar_ate(ultima_linha, pendentes, novas)
+            self._assinar(hashes, ultima_linha)
+            self._conexao.commit()
+
+        if incorporadas:
+            logger.info(f"🗄️ Agregados diários: +{incorporadas} linhas (marca d'água {self.marca_dagua})")
+        return incorporadas
+
+    def _reconstruir(self):
+        self.limpar()
+        self.stats['reconstrucoes'] += 1
+
+    def _assinar(self, hashes: np.ndarray, ultima_linha: int):
+        """Guarda a assinatura de todas as linhas vistas (para detectar edições)"""
+        self._definir_meta('assinatura', _assinatura(hashes))
+        self._definir_meta('assinatura_ate', ultima_linha)
+
+    @staticmethod
+    def _normalizar(df: pd.DataFrame, linhas: List[int], col_item, col_data, col_grupo,
+                    col_entrada, col_saida, col_saldo) -> pd.DataFrame:
+        """Linhas da ESTOQUE → item, dia ISO, grupo, entradas, saídas, saldo e linha"""
+        def numeros(coluna):
+            if coluna not in df.columns:
+                return pd.Series(0.0, index=df.index)
+            serie = df[coluna]
+            if pd.api.types.is_numeric_dtype(serie):
+                return serie.fillna(0).astype(float)
+            return serie.map(converter_para_numero).astype(float)
+
+        if col_data in df.columns:
+            datas = df[col_data]
+            texto_data = datas.astype(str).str.strip().where(datas.notna(), '')
+        else:
+            datas = pd.Series(pd.NaT, index=df.index)
+            texto_data = pd.Series('', index=df.index)
+
+        return pd.DataFrame({
+            'item': df[col_item].astype(str).str.strip().str.upper(),
+            'dia': _dias_iso(datas),
+            'texto_data': texto_data,
+            'grupo': df[col_grupo].astype(str).str.strip() if col_grupo in df.columns else '',
+            'entradas': numeros(col_entrada).clip(lower=0),
+            'saidas': numeros(col_saida).clip(lower=0),
+            'saldo': numeros(col_saldo) if col_saldo in df.columns else float('nan'),
+            'linha': linhas
+        })
+
+    def _incorporar(self, base: pd.DataFrame):
+        """
+        Pré-agrega as linhas normalizadas por (item, dia) e grava num único executemany
+
+        Returns:
+            (nº de linhas somadas, linhas com data preenchida mas ilegível)
+        """
+        if base.empty:
+            return 0, []
+
+        com_item = base['item'] != ''
+        invalidas = com_item & base['dia'].isna() & (base['texto_data'] != '')
+        pendentes = base.loc[invalidas, 'linha'].tolist()
+        self.stats['datas_invalidas'] += len(pendentes)
+        self.stats['sem_data'] += int((base['dia'].isna() & ~invalidas).sum())
+        base = base[base['dia'].notna() & com_item]
+
+        if not base.empty:
+            # Linhas em ordem de planilha: 'last' é a movimentação mais recente do dia
+            base = base.sort_values('linha', kind='stable')
+            base = base.assign(grupo_valido=base['grupo'].where(base['grupo'] != ''))
+            agregado = base.groupby(['item', 'dia'], sort=False).agg(
+                grupo=('grupo_valido', 'last'),
+                entradas=('entradas', 'sum'),
+                saidas=('saidas', 'sum'),
+                n_movs=('linha', 'size'),
+                saldo_final=('saldo', 'last'),
+                seq_final=('linha', 'last')
+            ).reset_index()
+            agregado['grupo'] = agregado['grupo'].fillna('')
+            saldo_final = agregado['saldo_final'].astype(object).where(agregado['saldo_final'].notna(), None)
+
+            self._conexao.executemany(_UPSERT, zip(
+                agregado['item'], agregado['dia'], agregado['grupo'],
+                agregado['entradas'].astype(float), agregado['saidas'].astype(float),
+                agregado['n_movs'].astype(int).tolist(), saldo_final, agregado['seq_final'].astype(int).tolist()
+            ))
+
+        self.stats['linhas_backfill'] += len(base)
+        return len(base), pendentes
+
+    def _fechar_ate(self, linha: int, pendentes: List[int] = (), processadas: Iterable[int] = ()):
+        """
+        Avança a marca d'água e descarta as marcas avulsas abaixo dela
+
+        Com linhas pendentes (data ilegível), a marca para logo antes da
+        primeira delas; as linhas processadas acima ficam como avulsas.
+        """
+        if pendentes:
+            limite = min(pendentes) - 1
+            pendentes = set(pendentes)
+            acima = [(l,) for l in processadas if l > limite and l not in pendentes]
+            self._conexao.executemany('INSERT OR IGNORE INTO agregados_linhas (linha) VALUES (?)', acima)
+            linha = limite
+        if linha > int(self._meta('marca_dagua', '1')):
+            self._definir_meta('marca_dagua', linha)
+        self._conexao.execute('DELETE FROM agregados_linhas WHERE linha <= ?', (linha,))
+        self._definir_meta('sincronizado_em', datetime.now().isoformat())
+
+    def sincronizar_planilha(self, planilha=None) -> Dict[str, Any]:
+        """
+        Back-fill direto da aba ESTOQUE (lê só as linhas após a marca d'água)
+
+        Args:
+            planilha: Planilha gspread já aberta (padrão: get_conexao_sheets())
+        """
+        from historico_otimizado import _letra_coluna, _mapear_colunas_estoque
+
+        if planilha is None:
+            from config import get_conexao_sheets
+            planilha = get_conexao_sheets()
+
+        aba = planilha.worksheet(ABA_ESTOQUE)
+        cabecalho = aba.row_values(1)
+        colunas = _mapear_colunas_estoque(cabecalho)
+        ultima_linha = len(aba.col_values(colunas['item'] + 1))
+        letra_final = _letra_coluna(max(len(cabecalho), max(colunas.values()) + 1))
+
+        if ultima_linha < self.marca_dagua or ultima_linha < int(self._meta('assinatura_ate', '0')):
+            logger.warning("⚠️ ESTOQUE tem menos linhas que os agregados: reconstruindo")
+            self._reconstruir()
+
+        incorporadas = 0
+        inicio = self.marca_dagua + 1
+        for ini in range(max(2, inicio), ultima_linha + 1, ConfigAgregados.BLOCO_LINHAS):
+            fim = min(ini + ConfigAgregados.BLOCO_LINHAS - 1, ultima_linha)
+            valores = aba.get(f"A{ini}:{letra_final}{fim}")
+            bloco = pd.DataFrame({
+                chave: [linha[idx] if idx < len(linha) else '' for linha in valores]
+                for chave, idx in colunas.items()
+            })
+            linhas = list(range(ini, ini + len(bloco)))
+
+            with self._lock:
+                novas = set(self._linhas_novas(linhas))
+                base = self._normalizar(bloco, linhas, 'item', 'data', 'grupo', 'entrada', 'saida', 'saldo')
+                somadas, pendentes = self._incorporar(base[base['linha'].isin(novas)])
+                incorporadas += somadas
+                self._fechar_ate(fim, pendentes, novas)
+                self._conexao.commit()
+
+        logger.info(f"✅ Agregados diários sincronizados com a {ABA_ESTOQUE}: +{incorporadas} linhas")
+        return {'linhas_incorporadas': incorporadas, 'marca_dagua': self.marca_dagua}
+
+    def iniciar_sincronizacao(self, planilha=None) -> bool:
+        """Dispara sincronizar_planilha em background (False se já estiver rodando)"""
+        with self._lock:
+            if self._sync_thread and self._sync_thread.is_alive():
+                return False
+
+            def executar():
+                try:
+                    self.sincronizar_planilha(planilha)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao sincronizar agregados diários: {e}")
+
+            self._sync_thread = threading.Thread(target=executar, name='agregados-backfill', daemon=True)
+            self._sync_thread.start()
+        return True
+
+    def limpar(self):
+        """Apaga todos os agregados (o próximo back-fill refaz tudo)"""
+        with self._lock:
+            self._conexao.execute('DELETE FROM agregados_diarios')
+            self._conexao.execute('DELETE FROM agregados_linhas')
+            self._conexao.execute('DELETE FROM agregados_meta')
+            self._conexao.commit()
+
+    # ========================================
+    # CONSULTAS (faixas de datas indexadas)
+    # ========================================
+
+    def _consultar(self, sql: str, parametros: tuple) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(sql, self._conexao, params=parametros)
+
+    @property
+    def vazio(self) -> bool:
+        with self._lock:
+            return self._conexao.execute('SELECT 1 FROM agregados_diarios LIMIT 1').fetchone() is None
+
+    def totais_por_item(self, inicio: Dia = None, fim: Dia = None, grupo: Optional[str] = None) -> pd.DataFrame:
+        """Entradas, saídas e nº de movimentações por item no período"""
+        filtro, parametros = self._filtro_periodo(inicio, fim)
+        if grupo:
+            filtro += ' AND grupo = ?'
+            parametros += (grupo,)
+        return self._consultar(
+            f"""SELECT item, MAX(grupo) AS grupo, SUM(entradas) AS entradas, SUM(saidas) AS saidas,
+                       SUM(n_movs) AS n_movs, MIN(dia) AS primeiro_dia, MAX(dia) AS ultimo_dia
+                FROM agregados_diarios WHERE {filtro} GROUP BY item""",
+            parametros
+        )
+
+    def totais_por_dia(self, inicio: Dia = None, fim: Dia = None, item: Optional[str] = None) -> pd.DataFrame:
+        """Entradas, saídas e nº de movimentações por dia (de um item ou de todos)"""
+        filtro, parametros = self._filtro_periodo(inicio, fim)
+        if item:
+            filtro = 'item = ? AND ' + filtro
+            parametros = (normalizar_item(item),) + parametros
+        return self._consultar(
+            f"""SELECT dia, SUM(entradas) AS entradas, SUM(saidas) AS saidas, SUM(n_movs) AS n_movs
+                FROM agregados_diarios WHERE {filtro} GROUP BY dia ORDER BY dia""",
+            parametros
+        )
+
+    def serie_item(self, item: str, inicio: Dia = None, fim: Dia = None) -> pd.DataFrame:
+        """Linhas diárias de um item, com o saldo de fechamento"""
+        filtro, parametros = self._filtro_periodo(inicio, fim)
+        return self._consultar(
+            f"""SELECT dia, entradas, saidas, n_movs, saldo_final FROM agregados_diarios
+                WHERE item = ? AND {filtro} ORDER BY dia""",
+            (normalizar_item(item),) + parametros
+        )
+
+    def saldo_em(self, item: str, dia: Dia = None) -> Optional[float]:
+        """Saldo de fechamento do item no último dia com movimentação até `dia`"""
+        with self._lock:
+            linha = self._conexao.execute(
+                """SELECT saldo_final FROM agregados_diarios
+                   WHERE item = ? AND dia <= ? AND saldo_final IS NOT NULL
+                   ORDER BY dia DESC LIMIT 1""",
+                (normalizar_item(item), _dia_iso(dia or datetime.now()))
+            ).fetchone()
+        return linha[0] if linha else None
+
+    @staticmethod
+    def _filtro_periodo(inicio: Dia, fim: Dia):
+        return 'dia BETWEEN ? AND ?', (_dia_iso(inicio) or '0000-01-01', _dia_iso(fim) or '9999-12-31')
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do armazém"""
+        with self._lock:
+            linhas, itens, primeiro, ultimo = self._conexao.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT item), MIN(dia), MAX(dia) FROM agregados_diarios'
+            ).fetchone()
+            return {
+                'arquivo': self.caminho,
+                'linhas_item_dia': linhas,
+                'itens': itens,
+                'primeiro_dia': primeiro,
+                'ultimo_dia': ultimo,
+                'marca_dagua': int(self._meta('marca_dagua', '1')),
+                'sincronizado_em': self._meta('sincronizado_em'),
+                'sincronizando': bool(self._sync_thread and self._sync_thread.is_alive()),
+                **self.stats
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+agregados_diarios = ArmazemAgregados()
+
+
+# ========================================
+# EVENTOS
+# ========================================
+
+def _ao_registrar_movimentacao(evento: MovimentacaoRegistrada):
+    """Soma no dia (só com a linha: o back-fill não soma de novo)"""
+    if evento.linha is not None:
+        agregados_diarios.registrar(
+            evento.item, evento.grupo, evento.data,
+            entrada=evento.entrada, saida=evento.saida,
+            saldo=evento.saldo_novo, linha=evento.linha
+        )
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_movimentacao,
+                             nome='agregados_diarios', assincrono=True)
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    print("🧪 Testando ArmazemAgregados...")
+
+    caminho = os.path.join(tempfile.mkdtemp(), 'teste_agregados.db')
+    armazem = ArmazemAgregados(caminho)
+
+    df = pd.DataFrame({
+        'Grupo': ['FIOS', 'FIOS', 'MALHAS', 'FIOS'],
+        'Item': ['AMARELO 1234', 'amarelo 1234 ', 'MALHA AZUL', 'AMARELO 1234'],
+        'Data': ['10/02/2026', '10/02/2026 14:00:00', '11/02/2026', '12/02/2026'],
+        'Entrada': ['500', '', '50', ''],
+        'Saída': ['', '30', '', '12,5'],
+        'Saldo': ['500', '470', '50', '457,5']
+    })
+    print(f"   Back-fill: {armazem.sincronizar_dataframe(df)} linhas")
+    print(f"   De novo: {armazem.sincronizar_dataframe(df)} linhas (nada novo)")
+
+    armazem.registrar('AMARELO 1234', 'FIOS', '13/02/2026', saida=7.5, saldo=450, linha=6)
+    df.loc[len(df)] = ['FIOS', 'AMARELO 1234', '13/02/2026', '', '7,5', '450']
+    print(f"   Back-fill após registro ao vivo: {armazem.sincronizar_dataframe(df)} linhas (linha 6 já somada)")
+
+    print(armazem.totais_por_dia('10/02/2026', '13/02/2026').to_string(index=False))
+    print(f"   Saldo em 11/02: {armazem.saldo_em('AMARELO 1234', '11/02/2026')}")
+
+    # Data ISO entra; data ilegível segura a marca d'água até ser corrigida
+    df.loc[len(df)] = ['FIOS', 'AMARELO 1234', '2026-02-14', '', '2', '448']
+    df.loc[len(df)] = ['FIOS', 'AMARELO 1234', '15/02/2O26', '', '3', '445']
+    df.loc[len(df)] = ['FIOS', 'AMARELO 1234', '16/02/2026', '', '4', '441']
+    print(f"   ISO + data ilegível: {armazem.sincronizar_dataframe(df)} linhas, marca {armazem.marca_dagua}")
+    assert armazem.marca_dagua == 7
+    df.loc[6, 'Data'] = '15/02/2026'
+    print(f"   Data corrigida: {armazem.sincronizar_dataframe(df)} linhas, marca {armazem.marca_dagua}")
+    assert armazem.marca_dagua == 9 and armazem.serie_item('AMARELO 1234', '15/02/2026', '15/02/2026')['saidas'].tolist() == [3.0]
+
+    # Linha antiga editada: refaz a partir da planilha
+    df.loc[1, 'Saída'] = '40'
+    armazem.sincronizar_dataframe(df)
+    assert armazem.serie_item('AMARELO 1234', '10/02/2026', '10/02/2026')['saidas'].tolist() == [40.0]
+    print(f"   Linha antiga editada: reconstruído ({armazem.stats['reconstrucoes']}x)")
+    print(f"   Resumo: {armazem.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
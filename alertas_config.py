@@ -14,20 +14,28 @@ Sistema de monitoramento inteligente que detecta automaticamente:
 Funcionalidades:
 - Classificação automática de movimentações
 - Dashboard com contadores por cor
-- Cache otimizado (TTL: 5 minutos)
+- Reavaliação incremental: só os itens movimentados são recalculados
+- Agenda de transições: a passagem dos dias só promove quem cruzou um limite
+- Lista ordenada por severidade e contadores por tipo sempre prontos
 - Detecção de padrões anormais
 - Sugestões de ações
 """
 
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple, Iterable
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 from config import obter_planilha
 from cache_config import cache_marfim
 from indice_otimizado import indice_otimizado
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada, NivelAlertaAlterado
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -116,9 +124,92 @@ class ConfigAlerta:
         TipoAlerta.INFO: '⚪'
     }
 
-    # Cache TTL
+    # Cache TTL (intervalo para conferir o índice por itens alterados fora do app)
     CACHE_TTL = 300  # 5 minutos
 
+    # Severidade de cada tipo (ordem da lista de alertas)
+    SEVERIDADES = {
+        TipoAlerta.CRITICO: SeveridadeAlerta.ALTA,
+        TipoAlerta.ATENCAO: SeveridadeAlerta.MEDIA,
+        TipoAlerta.NORMAL: SeveridadeAlerta.BAIXA,
+        TipoAlerta.INFO: SeveridadeAlerta.BAIXA
+    }
+
+    # Top N do dashboard
+    TOP_DASHBOARD = 10
+
+    # Limite do memo de datas já interpretadas
+    MAX_DATAS_MEMO = 20000
+
+    # Relógio das transições por dia (espera máxima entre verificações)
+    INTERVALO_RELOGIO = 60  # segundos
+    RELOGIO_AO_INICIAR = True
+
+
+# ========================================
+# AGENDA DE TRANSIÇÕES
+# ========================================
+
+class AgendaTransicoes:
+    """
+    Min-heap de (instante, chave) com remoção preguiçosa
+
+    Cada chave tem no máximo um instante válido; reagendar só empilha a
+    entrada nova e a antiga vira lixo, descartado quando chega ao topo
+    (ou numa compactação, quando o lixo passa do dobro das chaves vivas).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._atual: Dict[str, Tuple[float, int]] = {}
+        self._versao = 0
+
+    def __len__(self) -> int:
+        return len(self._atual)
+
+    def limpar(self):
+        self._heap = []
+        self._atual = {}
+
+    def agendar(self, chave: str, instante: Optional[datetime]):
+        """Define o próximo instante da chave (None cancela)"""
+        if instante is None:
+            self._atual.pop(chave, None)
+        else:
+            self._versao += 1
+            entrada = (instante.timestamp(), self._versao)
+            self._atual[chave] = entrada
+            heapq.heappush(self._heap, entrada + (chave,))
+
+        if len(self._heap) > 2 * len(self._atual) + 64:
+            self._heap = [(ts, v, c) for c, (ts, v) in self._atual.items()]
+            heapq.heapify(self._heap)
+
+    def _descartar_lixo(self):
+        while self._heap:
+            ts, v, chave = self._heap[0]
+            if self._atual.get(chave) == (ts, v):
+                return
+            heapq.heappop(self._heap)
+
+    def proximo(self) -> Optional[datetime]:
+        """Instante do próximo vencimento (None se a agenda está vazia)"""
+        self._descartar_lixo()
+        return datetime.fromtimestamp(self._heap[0][0]) if self._heap else None
+
+    def vencidos(self, agora: datetime) -> List[str]:
+        """Retira e retorna as chaves com instante <= agora (O(vencidos · log n))"""
+        limite = agora.timestamp()
+        chaves = []
+        self._descartar_lixo()
+        while self._heap and self._heap[0][0] <= limite:
+            ts, v, chave = heapq.heappop(self._heap)
+            if self._atual.get(chave) == (ts, v):
+                del self._atual[chave]
+                chaves.append(chave)
+            self._descartar_lixo()
+        return chaves
+
 
 # ========================================
 # CLASSE PRINCIPAL
@@ -128,12 +219,27 @@ class GerenciadorAlertas:
     """
     Gerenciador de alertas automáticos
 
+    Mantém um alerta por item (chave = nome em maiúsculas), a lista
+    ordenada por (severidade desc, posição no índice) e os contadores por
+    tipo. Uma movimentação só reavalia o próprio item; o índice completo só
+    é relido na primeira consulta, ao forçar a recarga, ou na conferência
+    periódica (CACHE_TTL), que reavalia apenas os itens cujos dados mudaram.
+
+    Como o nível depende só dos dias desde a última movimentação, cada item
+    fica agendado para o dia em que cruza o próximo limite (AgendaTransicoes);
+    com a passagem do tempo, só os itens vencidos são reavaliados. Os campos
+    que mudam todo dia (dias parado, mensagem) são renovados na leitura, e
+    média/máximo de dias saem de um histograma de datas.
+
     Uso:
         gerenciador = GerenciadorAlertas()
 
         # Analisa todos os itens
         alertas = gerenciador.analisar_todos_itens()
 
+        # Após uma movimentação: reavalia só o item
+        gerenciador.registrar_movimentacao('AMARELO', saldo=80, data='13/02/2026')
+
         # Obtém dashboard
         dashboard = gerenciador.obter_dashboard()
 
@@ -144,8 +250,54 @@ class GerenciadorAlertas:
     def __init__(self):
         """Inicializa o gerenciador"""
         self.planilha = obter_planilha()
+        self._lock = threading.RLock()
+        self._datas: Dict[str, Optional[datetime]] = {}
+        self._relogio: Optional[threading.Thread] = None
+        self._limpar_estado()
         logger.info("✅ GerenciadorAlertas inicializado")
 
+    def _limpar_estado(self):
+        """Zera o mapa de alertas e as estruturas derivadas"""
+        self._alertas: Dict[str, Alerta] = {}
+        self._entradas: Dict[str, Dict[str, Any]] = {}    # dados que geraram cada alerta
+        self._fontes: Dict[str, Tuple] = {}               # último registro visto no índice
+        self._posicoes: Dict[str, int] = {}
+        self._proxima_posicao = 0
+        self._ordem: List[Tuple[int, int, str]] = []      # (-severidade, posição, chave)
+        self._contadores: Counter = Counter()
+        self._datas_itens: Counter = Counter()            # ordinal da última data → nº de itens
+        self._ordinais: Dict[str, Optional[int]] = {}
+        self._soma_ordinais = 0
+        self._sem_data = 0                                # itens sem data válida (0 dias)
+        self._avaliados_em: Dict[str, date] = {}
+        self._agenda = AgendaTransicoes()
+        self._dia_avaliacao: Optional[date] = None
+        self._mudancas: List[Tuple[str, Optional[str], Optional[str], int]] = []
+        self._ultima_sincronizacao = 0.0
+        self._sincronizar = True
+        self._lista: Optional[List[Alerta]] = None
+        self._dashboard: Optional[Dict[str, Any]] = None
+
+    def _interpretar_data(self, ultima_data: str) -> Optional[datetime]:
+        """Converte DD/MM/YYYY ou YYYY-MM-DD (com ou sem hora), com memo por texto"""
+        if ultima_data in self._datas:
+            return self._datas[ultima_data]
+
+        data_obj = None
+        try:
+            texto = ultima_data.strip().split(' ')[0].split('T')[0]
+            if '/' in texto:
+                data_obj = datetime.strptime(texto, '%d/%m/%Y')
+            elif '-' in texto:
+                data_obj = datetime.strptime(texto, '%Y-%m-%d')
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Erro ao calcular dias parado: {e}")
+
+        if len(self._datas) >= ConfigAlerta.MAX_DATAS_MEMO:
+            self._datas.clear()
+        self._datas[ultima_data] = data_obj
+        return data_obj
+
     def calcular_dias_parado(self, ultima_data: str) -> int:
         """
         Calcula quantos dias desde a última movimentação
@@ -156,24 +308,36 @@ class GerenciadorAlertas:
         Returns:
             Número de dias desde a última movimentação
         """
-        try:
-            # Parse da data
-            if '/' in ultima_data:
-                data_obj = datetime.strptime(ultima_data, '%d/%m/%Y')
-            elif '-' in ultima_data:
-                data_obj = datetime.strptime(ultima_data, '%Y-%m-%d')
-            else:
-                return 0
+        # Parse da data (memo: o mesmo texto não passa de novo pelo strptime)
+        data_obj = self._interpretar_data(ultima_data)
+        if data_obj is None:
+            return 0
 
-            # Calcula diferença
-            hoje = datetime.now()
-            diferenca = hoje - data_obj
+        # Calcula diferença
+        diferenca = datetime.now() - data_obj
 
-            return diferenca.days
+        return diferenca.days
 
-        except (ValueError, AttributeError) as e:
-            logger.warning(f"Erro ao calcular dias parado: {e}")
-            return 0
+    def proxima_transicao(self, ultima_data: str) -> Optional[datetime]:
+        """
+        Instante em que o nível do item muda só pela passagem do tempo
+
+        Args:
+            ultima_data: Data da última movimentação
+
+        Returns:
+            Meia-noite do dia em que cruza o próximo limite (None se não muda mais)
+        """
+        data_obj = self._interpretar_data(ultima_data)
+        if data_obj is None:
+            return None
+
+        dias_parado = (datetime.now() - data_obj).days
+        for limite in sorted((ConfigAlerta.DIAS_NORMAL, ConfigAlerta.DIAS_ATENCAO, ConfigAlerta.DIAS_CRITICO)):
+            if dias_parado <= limite:
+                return data_obj + timedelta(days=limite + 1)
+
+        return None
 
     def classificar_por_dias(self, dias_parado: int) -> TipoAlerta:
         """
@@ -328,14 +492,7 @@ class GerenciadorAlertas:
             severidade = SeveridadeAlerta.MEDIA
         else:
             tipo_alerta = self.classificar_por_dias(dias_parado)
-
-            # Define severidade
-            if tipo_alerta == TipoAlerta.CRITICO:
-                severidade = SeveridadeAlerta.ALTA
-            elif tipo_alerta == TipoAlerta.ATENCAO:
-                severidade = SeveridadeAlerta.MEDIA
-            else:
-                severidade = SeveridadeAlerta.BAIXA
+            severidade = ConfigAlerta.SEVERIDADES[tipo_alerta]
 
         # Gera mensagem e sugestão
         mensagem = self.gerar_mensagem_alerta(tipo_alerta, item, dias_parado, saldo, eh_entrada)
@@ -359,60 +516,287 @@ class GerenciadorAlertas:
 
         return alerta
 
-    def analisar_todos_itens(self, forcar_recarga: bool = False) -> List[Alerta]:
+    # ========================================
+    # MAPA INCREMENTAL DE ALERTAS
+    # ========================================
+
+    def _retirar(self, chave: str):
+        """Tira o alerta atual do item da ordem e dos contadores (com o lock)"""
+        alerta = self._alertas.pop(chave, None)
+        if alerta is None:
+            return
+
+        entrada = (-alerta.severidade.value, self._posicoes[chave], chave)
+        i = bisect_left(self._ordem, entrada)
+        if i < len(self._ordem) and self._ordem[i] == entrada:
+            del self._ordem[i]
+
+        self._contadores[alerta.tipo.value] -= 1
+        ordinal = self._ordinais.pop(chave, None)
+        if ordinal is None:
+            self._sem_data -= 1
+        else:
+            self._datas_itens[ordinal] -= 1
+            if self._datas_itens[ordinal] <= 0:
+                del self._datas_itens[ordinal]
+            self._soma_ordinais -= ordinal
+        self._agenda.agendar(chave, None)
+
+    def _avaliar(self, chave: str, dados: Dict[str, Any]):
+        """Recalcula o alerta de um item e o encaixa na ordem (com o lock)"""
+        anterior = self._alertas.get(chave)
+        self._retirar(chave)
+        self._entradas[chave] = dados
+        self._lista = None
+        self._dashboard = None
+
+        try:
+            alerta = self.criar_alerta(
+                item=dados['item_original'],
+                grupo=dados.get('grupo', ''),
+                ultima_data=dados.get('data', ''),
+                saldo=float(dados.get('saldo', 0))
+            )
+        except Exception as e:
+            logger.warning(f"Erro ao criar alerta para {chave}: {e}")
+            return
+
+        if chave not in self._posicoes:
+            self._posicoes[chave] = self._proxima_posicao
+            self._proxima_posicao += 1
+
+        self._alertas[chave] = alerta
+        self._avaliados_em[chave] = date.today()
+        insort(self._ordem, (-alerta.severidade.value, self._posicoes[chave], chave))
+        self._contadores[alerta.tipo.value] += 1
+
+        data_obj = self._interpretar_data(alerta.ultima_data)
+        if data_obj is None:
+            self._ordinais[chave] = None
+            self._sem_data += 1
+        else:
+            ordinal = data_obj.toordinal()
+            self._ordinais[chave] = ordinal
+            self._datas_itens[ordinal] += 1
+            self._soma_ordinais += ordinal
+        self._agenda.agendar(chave, self.proxima_transicao(alerta.ultima_data))
+
+        if anterior is not None and anterior.tipo != alerta.tipo:
+            self._mudancas.append((alerta.item, anterior.tipo.value, alerta.tipo.value, alerta.dias_parado))
+
+    def _remover(self, chave: str):
+        """Tira o item do mapa (saiu do índice)"""
+        anterior = self._alertas.get(chave)
+        if anterior is not None:
+            self._mudancas.append((anterior.item, anterior.tipo.value, None, anterior.dias_parado))
+        self._retirar(chave)
+        self._entradas.pop(chave, None)
+        self._fontes.pop(chave, None)
+        self._avaliados_em.pop(chave, None)
+        self._lista = None
+        self._dashboard = None
+
+    def _sincronizar_indice(self):
+        """Confere o índice e reavalia só os itens novos ou com dados diferentes"""
+        indice = indice_otimizado.obter_indice()
+        reavaliados = 0
+
+        for chave, dados in indice.items():
+            fonte = (
+                dados.get('item_original'), dados.get('grupo', ''),
+                dados.get('data', ''), dados.get('saldo', 0)
+            )
+            anterior = self._fontes.get(chave)
+            if anterior == fonte:
+                continue
+
+            self._fontes[chave] = fonte
+            if anterior is None and chave in self._entradas:
+                # Item já atualizado por movimentação antes de o índice ser lido
+                continue
+
+            self._avaliar(chave, dados)
+            reavaliados += 1
+
+        for chave in [c for c in self._fontes if c not in indice]:
+            self._remover(chave)
+            reavaliados += 1
+
+        self._sincronizar = False
+        self._ultima_sincronizacao = time.time()
+        if reavaliados:
+            logger.info(f"🔍 Alertas sincronizados com o índice: {reavaliados} itens reavaliados")
+
+    def _processar_transicoes(self, agora: Optional[datetime] = None) -> List[Alerta]:
+        """Reavalia só os itens cujo limite de dias venceu (com o lock)"""
+        promovidos = []
+        for chave in self._agenda.vencidos(agora or datetime.now()):
+            if chave in self._entradas:
+                self._avaliar(chave, self._entradas[chave])
+                if chave in self._alertas:
+                    promovidos.append(self._alertas[chave])
+
+        if promovidos:
+            logger.info(f"⏰ {len(promovidos)} alertas mudaram de nível pela passagem dos dias")
+        return promovidos
+
+    def _renovar(self, chaves: List[str]):
+        """Atualiza dias parado/mensagem de alertas gerados em dias anteriores (com o lock)"""
+        hoje = date.today()
+        for chave in chaves:
+            if self._avaliados_em.get(chave) != hoje and chave in self._entradas:
+                self._avaliar(chave, self._entradas[chave])
+
+    def _publicar_mudancas(self):
+        """Publica as mudanças de nível acumuladas (fora do lock)"""
+        with self._lock:
+            mudancas, self._mudancas = self._mudancas, []
+
+        for item, anterior, novo, dias in mudancas:
+            barramento_eventos.publicar(NivelAlertaAlterado(
+                item=item, nivel_anterior=anterior, nivel_novo=novo, dias_parado=dias
+            ))
+
+    def _garantir_atualizado(self, forcar_recarga: bool = False):
+        """Deixa o mapa pronto para leitura (com o lock)"""
+        if forcar_recarga:
+            self._limpar_estado()
+
+        hoje = date.today()
+        if self._dia_avaliacao != hoje:
+            self._lista = None
+            self._dashboard = None
+
+        self._processar_transicoes()
+
+        if self._sincronizar or time.time() - self._ultima_sincronizacao > ConfigAlerta.CACHE_TTL:
+            self._sincronizar_indice()
+
+        self._dia_avaliacao = hoje
+
+    def _faixa_severidade(self, severidade: SeveridadeAlerta) -> range:
+        """Posições da ordem com uma severidade (busca binária nos limites)"""
+        inicio = bisect_left(self._ordem, (-severidade.value,))
+        fim = bisect_left(self._ordem, (-severidade.value + 1,))
+        return range(inicio, fim)
+
+    def registrar_movimentacao(
+        self,
+        item: str,
+        saldo: float,
+        data: str,
+        grupo: str = ''
+    ) -> Optional[Alerta]:
         """
-        Analisa todos os itens e retorna lista de alertas
+        Reavalia só o item movimentado
 
         Args:
-            forcar_recarga: Se True, ignora cache
+            item: Nome do item
+            saldo: Saldo após a movimentação
+            data: Data da movimentação
+            grupo: Grupo do item (mantém o conhecido se vazio)
 
         Returns:
-            Lista de alertas ordenada por severidade
+            Alerta atualizado do item (ou None se não foi possível criar)
         """
-        # Tenta cache primeiro
-        if not forcar_recarga:
-            alertas_cached = cache_marfim.get('alertas_todos', 'alertas')
-            if alertas_cached:
-                logger.debug("⚡ Alertas retornados do cache")
-                # Converte dicionários de volta para objetos Alerta
-                return [
-                    Alerta(**a) if isinstance(a, dict) else a
-                    for a in alertas_cached
-                ]
-
-        logger.info("🔍 Analisando todos os itens...")
+        chave = item.strip().upper()
+
+        with self._lock:
+            anterior = self._entradas.get(chave, {})
+            self._avaliar(chave, {
+                'item_original': anterior.get('item_original', item),
+                'grupo': grupo or anterior.get('grupo', ''),
+                'data': data,
+                'saldo': saldo
+            })
+            alerta = self._alertas.get(chave)
+
+        self._publicar_mudancas()
+        return alerta
 
-        # Obtém índice completo
-        indice = indice_otimizado.obter_indice()
+    def reavaliar_itens(self, itens: Iterable[str]) -> int:
+        """
+        Reavalia itens pelos dados atuais do índice
 
-        alertas = []
+        Args:
+            itens: Nomes dos itens
 
-        for item_key, dados in indice.items():
-            try:
-                alerta = self.criar_alerta(
-                    item=dados['item_original'],
-                    grupo=dados.get('grupo', ''),
-                    ultima_data=dados.get('data', ''),
-                    saldo=float(dados.get('saldo', 0))
-                )
+        Returns:
+            Quantidade de itens reavaliados
+        """
+        total = 0
+        with self._lock:
+            for item in itens:
+                chave = item.strip().upper()
+                dados = indice_otimizado.buscar_item(item)
+                if dados:
+                    self._fontes[chave] = (
+                        dados.get('item_original'), dados.get('grupo', ''),
+                        dados.get('data', ''), dados.get('saldo', 0)
+                    )
+                    self._avaliar(chave, dados)
+                else:
+                    self._remover(chave)
+                total += 1
+
+        self._publicar_mudancas()
+        return total
 
-                alertas.append(alerta)
+    def analisar_todos_itens(self, forcar_recarga: bool = False) -> List[Alerta]:
+        """
+        Analisa todos os itens e retorna lista de alertas
 
-            except Exception as e:
-                logger.warning(f"Erro ao criar alerta para {item_key}: {e}")
-                continue
+        Args:
+            forcar_recarga: Se True, reconstrói o mapa inteiro a partir do índice
 
-        # Ordena por severidade (ALTA -> BAIXA)
-        alertas.sort(key=lambda a: a.severidade.value, reverse=True)
+        Returns:
+            Lista de alertas ordenada por severidade
+        """
+        with self._lock:
+            self._garantir_atualizado(forcar_recarga)
 
-        # Salva em cache (converte para dict para serialização)
-        alertas_dict = [a.to_dict() for a in alertas]
-        cache_marfim.set('alertas_todos', alertas_dict, 'alertas')
+            if self._lista is None:
+                self._renovar([chave for _, _, chave in self._ordem])
+                self._lista = [self._alertas[chave] for _, _, chave in self._ordem]
 
-        logger.info(f"✅ Análise concluída: {len(alertas)} alertas gerados")
+            alertas = list(self._lista)
 
+        self._publicar_mudancas()
         return alertas
 
+    def obter_alertas_por_tipo(self, tipo: TipoAlerta, limite: Optional[int] = None) -> List[Alerta]:
+        """
+        Retorna alertas de um tipo, na ordem da lista completa
+
+        Args:
+            tipo: Tipo do alerta
+            limite: Máximo de alertas (None = todos)
+
+        Returns:
+            Lista de alertas do tipo
+        """
+        with self._lock:
+            self._garantir_atualizado()
+
+            chaves = []
+            for i in self._faixa_severidade(ConfigAlerta.SEVERIDADES[tipo]):
+                chave = self._ordem[i][2]
+                if self._alertas[chave].tipo == tipo:
+                    chaves.append(chave)
+                    if limite is not None and len(chaves) >= limite:
+                        break
+
+            self._renovar(chaves)
+            return [self._alertas[chave] for chave in chaves if chave in self._alertas]
+
+    def obter_alerta_item(self, item: str) -> Optional[Alerta]:
+        """Alerta atual de um item (busca O(1) no mapa)"""
+        with self._lock:
+            self._garantir_atualizado()
+            chave = item.strip().upper()
+            self._renovar([chave])
+            return self._alertas.get(chave)
+
     def obter_alertas_criticos(self) -> List[Alerta]:
         """
         Retorna apenas alertas críticos
@@ -420,8 +804,7 @@ class GerenciadorAlertas:
         Returns:
             Lista de alertas críticos
         """
-        todos_alertas = self.analisar_todos_itens()
-        return [a for a in todos_alertas if a.tipo == TipoAlerta.CRITICO]
+        return self.obter_alertas_por_tipo(TipoAlerta.CRITICO)
 
     def obter_alertas_atencao(self) -> List[Alerta]:
         """
@@ -430,8 +813,7 @@ class GerenciadorAlertas:
         Returns:
             Lista de alertas de atenção
         """
-        todos_alertas = self.analisar_todos_itens()
-        return [a for a in todos_alertas if a.tipo == TipoAlerta.ATENCAO]
+        return self.obter_alertas_por_tipo(TipoAlerta.ATENCAO)
 
     def obter_dashboard(self) -> Dict[str, Any]:
         """
@@ -440,59 +822,49 @@ class GerenciadorAlertas:
         Returns:
             Dicionário com contadores e estatísticas
         """
-        # Tenta cache
-        dashboard_cached = cache_marfim.get('dashboard_alertas', 'dashboard')
-        if dashboard_cached:
-            logger.debug("⚡ Dashboard de alertas do cache")
-            return dashboard_cached
-
-        # Analisa todos
-        alertas = self.analisar_todos_itens()
-
-        # Contadores por tipo
-        contadores = {
-            'critico': 0,
-            'atencao': 0,
-            'normal': 0,
-            'info': 0,
-            'total': len(alertas)
-        }
-
-        for alerta in alertas:
-            contadores[alerta.tipo.value] += 1
-
-        # Top 10 críticos
-        criticos = [a for a in alertas if a.tipo == TipoAlerta.CRITICO][:10]
-
-        # Top 10 atenção
-        atencao = [a for a in alertas if a.tipo == TipoAlerta.ATENCAO][:10]
-
-        # Estatísticas
-        if alertas:
-            media_dias = sum(a.dias_parado for a in alertas) / len(alertas)
-            max_dias = max(a.dias_parado for a in alertas)
-        else:
-            media_dias = 0
-            max_dias = 0
-
-        dashboard = {
-            'contadores': contadores,
-            'top_criticos': [a.to_dict() for a in criticos],
-            'top_atencao': [a.to_dict() for a in atencao],
-            'estatisticas': {
-                'total_itens': len(alertas),
-                'media_dias_parado': round(media_dias, 1),
-                'max_dias_parado': max_dias,
-                'porcentagem_critico': round((contadores['critico'] / len(alertas) * 100) if alertas else 0, 1),
-                'porcentagem_atencao': round((contadores['atencao'] / len(alertas) * 100) if alertas else 0, 1)
-            },
-            'timestamp': datetime.now().isoformat()
-        }
-
-        # Salva em cache
-        cache_marfim.set('dashboard_alertas', dashboard, 'dashboard')
-
-        return dashboard
+        with self._lock:
+            self._garantir_atualizado()
+            if self._dashboard is not None:
+                logger.debug("⚡ Dashboard de alertas pronto")
+                return self._dashboard
+
+            total = len(self._alertas)
+
+            # Contadores por tipo (mantidos a cada reavaliação)
+            contadores = {
+                'critico': self._contadores['critico'],
+                'atencao': self._contadores['atencao'],
+                'normal': self._contadores['normal'],
+                'info': self._contadores['info'],
+                'total': total
+            }
+
+            # Top 10 críticos e atenção (início de cada faixa de severidade)
+            criticos = self.obter_alertas_por_tipo(TipoAlerta.CRITICO, ConfigAlerta.TOP_DASHBOARD)
+            atencao = self.obter_alertas_por_tipo(TipoAlerta.ATENCAO, ConfigAlerta.TOP_DASHBOARD)
+
+            # Estatísticas pelo histograma de datas: dias = hoje - data (sem data = 0)
+            hoje = date.today().toordinal()
+            soma_dias = (total - self._sem_data) * hoje - self._soma_ordinais
+            media_dias = soma_dias / total if total else 0
+            candidatos = ([hoje - min(self._datas_itens)] if self._datas_itens else []) + ([0] if self._sem_data else [])
+            max_dias = max(candidatos) if candidatos else 0
+
+            self._dashboard = {
+                'contadores': contadores,
+                'top_criticos': [a.to_dict() for a in criticos],
+                'top_atencao': [a.to_dict() for a in atencao],
+                'estatisticas': {
+                    'total_itens': total,
+                    'media_dias_parado': round(media_dias, 1),
+                    'max_dias_parado': max_dias,
+                    'porcentagem_critico': round((contadores['critico'] / total * 100) if total else 0, 1),
+                    'porcentagem_atencao': round((contadores['atencao'] / total * 100) if total else 0, 1)
+                },
+                'timestamp': datetime.now().isoformat()
+            }
+
+            return self._dashboard
 
     def classificar_movimentacao(
         self,
@@ -535,12 +907,78 @@ class GerenciadorAlertas:
             quantidade=quantidade
         )
 
-    def invalidar_cache(self):
-        """Invalida cache de alertas"""
+    def invalidar_cache(self, itens: Optional[Iterable[str]] = None):
+        """
+        Invalida cache de alertas
+
+        Com itens, reavalia só esses itens; sem itens, a próxima consulta
+        confere o índice e reavalia apenas o que mudou.
+        """
+        if itens:
+            self.reavaliar_itens(itens)
+        else:
+            with self._lock:
+                self._sincronizar = True
+
         cache_marfim.invalidate('alertas*')
         cache_marfim.invalidate('dashboard_alertas')
         logger.info("🗑️ Cache de alertas invalidado")
 
+    def processar_transicoes(self) -> List[Alerta]:
+        """
+        Promove os itens que cruzaram um limite de dias desde a última verificação
+
+        Returns:
+            Alertas que mudaram de nível
+        """
+        with self._lock:
+            promovidos = self._processar_transicoes()
+            if promovidos:
+                self._dashboard = None
+
+        self._publicar_mudancas()
+        return promovidos
+
+    def iniciar_relogio(self) -> threading.Thread:
+        """Verifica a agenda em background, acordando no próximo vencimento"""
+        if self._relogio is not None and self._relogio.is_alive():
+            return self._relogio
+
+        def _ciclo():
+            while True:
+                with self._lock:
+                    proximo = self._agenda.proximo()
+                espera = ConfigAlerta.INTERVALO_RELOGIO
+                if proximo is not None:
+                    espera = min(espera, max(0.0, (proximo - datetime.now()).total_seconds()))
+                time.sleep(espera)
+                try:
+                    self.processar_transicoes()
+                except Exception as e:
+                    logger.warning(f"Erro no relógio de alertas: {e}")
+
+        self._relogio = threading.Thread(target=_ciclo, name='relogio-alertas', daemon=True)
+        self._relogio.start()
+        logger.info("⏰ Relógio de transições de alertas iniciado")
+        return self._relogio
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do mapa incremental (para monitoramento)"""
+        with self._lock:
+            proximo = self._agenda.proximo()
+            return {
+                'itens': len(self._alertas),
+                'contadores': dict(self._contadores),
+                'transicoes_agendadas': len(self._agenda),
+                'proxima_transicao': proximo.isoformat() if proximo else None,
+                'dia_avaliacao': self._dia_avaliacao.isoformat() if self._dia_avaliacao else None,
+                'ultima_sincronizacao': (
+                    datetime.fromtimestamp(self._ultima_sincronizacao).isoformat()
+                    if self._ultima_sincronizacao else None
+                ),
+                'datas_memo': len(self._datas)
+            }
+
 
 # ========================================
 # SINGLETON GLOBAL
@@ -548,6 +986,18 @@ class GerenciadorAlertas:
 gerenciador_alertas = GerenciadorAlertas()
 
 
+# ========================================
+# EVENTOS
+# ========================================
+
+def _ao_registrar_movimentacao(evento: MovimentacaoRegistrada):
+    """Reavalia só o item movimentado"""
+    gerenciador_alertas.registrar_movimentacao(evento.item, evento.saldo_novo, evento.data, evento.grupo)
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_movimentacao, nome='alertas')
+
+
 # ========================================
 # FUNÇÕES AUXILIARES
 # ========================================
@@ -598,4 +1048,13 @@ if __name__ == '__main__':
     print(f"   Tipo: {alerta.tipo.value}")
     print(f"   Mensagem: {alerta.mensagem}")
 
+    # Teste 4: Reavaliação incremental
+    print("\n4. Registrando movimentação (reavalia só o item)...")
+    if criticos:
+        item = criticos[0].item
+        alerta = gerenciador_alertas.registrar_movimentacao(item, criticos[0].saldo_atual, datetime.now().strftime('%d/%m/%Y'))
+        print(f"   {item}: {criticos[0].tipo.value} → {alerta.tipo.value}")
+        print(f"   Críticos agora: {gerenciador_alertas.obter_dashboard()['contadores']['critico']}")
+    print(f"   Estado: {gerenciador_alertas.obter_resumo()}")
+
     print("\n✅ Todos os testes concluídos!")
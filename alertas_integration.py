@@ -209,9 +209,8 @@ def register_alertas_routes(app):
                     'error': f'Tipo inválido. Use: {", ".join(tipos_validos)}'
                 }), 400
 
-            # Obtém todos e filtra
-            todos_alertas = gerenciador_alertas.analisar_todos_itens()
-            alertas_filtrados = [a for a in todos_alertas if a.tipo.value == tipo]
+            # Só a faixa do tipo na lista ordenada
+            alertas_filtrados = gerenciador_alertas.obter_alertas_por_tipo(TipoAlerta(tipo))
 
             return jsonify({
                 'alertas': [a.to_dict() for a in alertas_filtrados],
@@ -287,17 +286,8 @@ def register_alertas_routes(app):
         }
         """
         try:
-            # Obtém todos os alertas
-            todos_alertas = gerenciador_alertas.analisar_todos_itens()
-
-            # Busca por item (case-insensitive)
-            item_upper = item_nome.upper().strip()
-            alerta_item = None
-
-            for alerta in todos_alertas:
-                if alerta.item.upper() == item_upper:
-                    alerta_item = alerta
-                    break
+            # Busca O(1) no mapa de alertas (case-insensitive)
+            alerta_item = gerenciador_alertas.obter_alerta_item(item_nome)
 
             if alerta_item:
                 return jsonify({
@@ -374,6 +364,7 @@ def register_alertas_routes(app):
         🗑️ Invalida cache de alertas
 
         POST /api/alertas/invalidar-cache
+        Body (opcional): {"itens": ["AMARELO 1234"]}  → reavalia só esses itens
 
         Response:
         {
@@ -382,7 +373,8 @@ def register_alertas_routes(app):
         }
         """
         try:
-            gerenciador_alertas.invalidar_cache()
+            itens = (request.get_json(silent=True) or {}).get('itens')
+            gerenciador_alertas.invalidar_cache(itens)
 
             return jsonify({
                 'success': True,
@@ -439,6 +431,10 @@ def register_alertas_routes(app):
             logger.error(f"Erro ao obter configurações: {e}")
             return jsonify({'error': str(e)}), 500
 
+    # Mudanças de nível pela passagem dos dias: só os itens agendados
+    if ConfigAlerta.RELOGIO_AO_INICIAR:
+        gerenciador_alertas.iniciar_relogio()
+
     logger.info("✅ Endpoints de alertas registrados")
 
 
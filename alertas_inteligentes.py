@@ -11,6 +11,8 @@ from config import (
     NOME_PLANILHA, ARQUIVO_CREDENTIALS, CHAVE_GROQ,
     MODELO_GROQ, NIVEIS_ALERTA, converter_para_numero
 )
+from cache_ia import cache_ia
+from gateway_ia import IAIndisponivel
 
 class SistemaAlertas:
     """Sistema inteligente de alertas de estoque"""
@@ -184,15 +186,18 @@ Seja direto, use português brasileiro e foque em ações concretas.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            return cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você é um gestor de supply chain experiente em indústria têxtil."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperatura=0.3
             )
-            return completion.choices[0].message.content
+        except IAIndisponivel as e:
+            # Sem IA: devolve a própria lista local de alertas
+            return f"⚠️ {e}. Alertas locais:\n{contexto}"
         except Exception as e:
             return f"Erro ao gerar resumo: {e}"
 
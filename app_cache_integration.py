@@ -16,6 +16,7 @@ INSTRUÇÃO: Copie os endpoints desejados para app_final.py
 from flask import jsonify, request
 from cache_config import cache_marfim, cached, obter_estatisticas_cache
 from indice_otimizado import indice_otimizado
+from cache_ia import cache_ia
 import logging
 
 logger = logging.getLogger(__name__)
@@ -118,6 +119,48 @@ def register_cache_routes(app):
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/cache/ia', methods=['GET'])
+    def cache_ia_stats():
+        """
+        🤖 Estatísticas do cache de respostas da IA
+
+        GET /api/cache/ia
+
+        Response:
+        {
+          "hits": 42,
+          "misses": 10,
+          "taxa_acerto": "80.8%",
+          "chamadas_api": 10,
+          "tokens_economizados": 51234,
+          "redis": false,
+          "disco": "/app/.cache_ia"
+        }
+        """
+        try:
+            return jsonify(cache_ia.obter_resumo()), 200
+        except Exception as e:
+            logger.error(f"Erro ao obter estatísticas do cache da IA: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/cache/ia/limpar', methods=['POST'])
+    def cache_ia_limpar():
+        """
+        🗑️ Remove todas as respostas da IA em cache
+
+        POST /api/cache/ia/limpar
+        """
+        try:
+            removidos = cache_ia.limpar()
+            return jsonify({
+                'success': True,
+                'removed_count': removidos,
+                'message': f'Cache da IA limpo: {removidos} respostas'
+            }), 200
+        except Exception as e:
+            logger.error(f"Erro ao limpar cache da IA: {e}")
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/api/indice/reconstruir', methods=['POST'])
     def reconstruir_indice():
         """
@@ -534,6 +577,8 @@ if __name__ == '__main__':
     print("  - /api/cache/stats - Estatísticas de cache")
     print("  - /api/cache/invalidate - Invalidar cache")
     print("  - /api/cache/health - Health check")
+    print("  - /api/cache/ia - Estatísticas do cache da IA")
+    print("  - /api/cache/ia/limpar - Limpar cache da IA")
     print("  - /api/indice/reconstruir - Reconstruir índice")
     print("  - /api/indice/item/<nome> - Buscar item")
     print("  - /api/indice/saldo/<nome> - Obter saldo")
@@ -2,7 +2,7 @@
 Marfim IA - Sistema Inteligente de Estoque
 API Flask completa com todas as funcionalidades
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
@@ -10,6 +10,18 @@ import numpy as np
 from datetime import datetime, timedelta
 from groq import Groq
 import os
+import json
+
+from cubo_consumo import cubo_consumo, converter_datas
+from suavizacao_exponencial import motor_suavizacao
+from cache_ia import cache_ia
+from gateway_ia import IAIndisponivel
+from contexto_chat import contexto_chat
+from curva_abc import motor_abc
+from agregados_diarios import agregados_diarios, ConfigAgregados
+from kpis_dashboard import kpis_dashboard
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada, ItemCriado, ConferenciaRegistrada
+from canal_eventos import canal_eventos
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 
@@ -32,6 +44,11 @@ client_groq = None
 if CHAVE_GROQ:
     client_groq = Groq(api_key=CHAVE_GROQ)
 
+# Prazos (s) das chamadas à IA nas rotas interativas (gateway_ia)
+PRAZO_IA_VALIDACAO = 8
+PRAZO_IA_SUGESTAO = 5
+PRAZO_IA_CHAT = 15
+
 # ============================================================
 # FUNÇÕES AUXILIARES
 # ============================================================
@@ -118,31 +135,10 @@ def carregar_dados_completos():
         elif col_nome not in df_hist.columns:
             df_hist[col_nome] = 0
 
-    # Converter Data - usar método mais flexível
+    # Converter Data - mesma conversão (célula a célula, vários formatos) de todos os módulos do cubo
     if col_data and col_data in df_hist.columns:
         df_hist['Data_Original'] = df_hist[col_data]
-
-        # Primeiro: tentar inferência automática com dayfirst=True (mais flexível)
-        df_hist['Data'] = pd.to_datetime(df_hist[col_data], dayfirst=True, errors='coerce')
-        datas_inferidas = df_hist['Data'].notna().sum()
-
-        if datas_inferidas > 0:
-            print(f"[DEBUG] Datas parseadas automaticamente: {datas_inferidas}")
-        else:
-            # Fallback: tentar formatos específicos
-            formatos = [
-                '%d/%m/%Y %H:%M:%S',  # 03/01/2022 00:00:00
-                '%d/%m/%Y',           # 03/01/2022
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d',
-                '%d-%m-%Y %H:%M:%S',
-                '%d-%m-%Y',
-            ]
-            for fmt in formatos:
-                df_hist['Data'] = pd.to_datetime(df_hist[col_data], format=fmt, errors='coerce')
-                if df_hist['Data'].notna().sum() > 0:
-                    print(f"[DEBUG] Formato de data detectado: {fmt}")
-                    break
+        df_hist['Data'] = converter_datas(df_hist[col_data])
 
         # Debug: mostrar exemplo de data original vs parseada
         amostra = df_hist[df_hist['Data'].notna()].head(1)
@@ -158,8 +154,6 @@ def carregar_dados_completos():
     # Calcular métricas
     hoje = datetime.now()
     data_30d = hoje - timedelta(days=30)
-    data_60d = hoje - timedelta(days=60)
-    data_90d = hoje - timedelta(days=90)
 
     # Normalizar nomes de itens para matching (remover espaços extras, uppercase)
     df_idx['Item_Norm'] = df_idx['Item'].str.strip().str.upper()
@@ -171,16 +165,29 @@ def carregar_dados_completos():
     itens_comuns = itens_idx.intersection(itens_hist)
     print(f"[DEBUG] Itens únicos ÍNDICE: {len(itens_idx)}, ESTOQUE: {len(itens_hist)}, Comuns: {len(itens_comuns)}")
 
-    # Consumo por período (apenas se houver datas válidas)
+    # Consumo por período: fatias do cubo item × dia (estendido só com as linhas novas)
+    cubo = cubo_consumo.sincronizar(df_hist)
+
+    # Agregados diários persistidos (SQLite): só as linhas novas da ESTOQUE entram
+    try:
+        agregados_diarios.sincronizar_dataframe(
+            df_hist,
+            col_data='Data_Original' if 'Data_Original' in df_hist.columns else 'Data',
+            col_grupo=encontrar_coluna(df_hist, ['Grupo', 'GRUPO', 'grupo']) or 'Grupo',
+            col_saldo=encontrar_coluna(df_hist, ['Saldo', 'SALDO', 'Saldo Atual', 'SALDO ATUAL']) or 'Saldo'
+        )
+    except Exception as e:
+        print(f"[AVISO] Agregados diários não atualizados: {e}")
+
     if datas_validas > 0:
-        consumo_30d = df_hist[df_hist['Data'] >= data_30d].groupby('Item_Norm')['Saída'].sum()
-        consumo_60d = df_hist[df_hist['Data'] >= data_60d].groupby('Item_Norm')['Saída'].sum()
-        consumo_90d = df_hist[df_hist['Data'] >= data_90d].groupby('Item_Norm')['Saída'].sum()
+        consumo_30d = cubo.serie_janela(30, hoje=hoje)
+        consumo_60d = cubo.serie_janela(60, hoje=hoje)
+        consumo_90d = cubo.serie_janela(90, hoje=hoje)
         print(f"[DEBUG] Registros últimos 30d: {(df_hist['Data'] >= data_30d).sum()}")
     else:
         # Se não há datas, usar todo o histórico
         print("[AVISO] Usando todo histórico (sem filtro de data)")
-        consumo_30d = df_hist.groupby('Item_Norm')['Saída'].sum()
+        consumo_30d = pd.Series(cubo.total('saidas'), index=cubo.itens)
         consumo_60d = consumo_30d
         consumo_90d = consumo_30d
 
@@ -188,34 +195,158 @@ def carregar_dados_completos():
     df_idx['Consumo_60d'] = df_idx['Item_Norm'].map(consumo_60d).fillna(0)
     df_idx['Consumo_90d'] = df_idx['Item_Norm'].map(consumo_90d).fillna(0)
     df_idx['Media_Diaria'] = df_idx['Consumo_30d'] / 30
-    df_idx['Dias_Cobertura'] = df_idx.apply(
-        lambda r: round(r['Saldo'] / r['Media_Diaria'], 1) if r['Media_Diaria'] > 0 else 999,
-        axis=1
-    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df_idx['Dias_Cobertura'] = np.where(
+            df_idx['Media_Diaria'] > 0, (df_idx['Saldo'] / df_idx['Media_Diaria']).round(1), 999
+        )
 
     print(f"[DEBUG] Consumo total 30d: {df_idx['Consumo_30d'].sum():.0f}")
     print(f"[DEBUG] Itens com consumo: {(df_idx['Consumo_30d'] > 0).sum()}")
 
+    # Contexto do chat acompanha o snapshot (só recalcula se os dados mudaram)
+    contexto_chat.atualizar(df_idx)
+
+    # KPIs do dashboard: recálculo completo só quando o snapshot muda
+    kpis_dashboard.atualizar(df_idx)
+
     return df_idx, df_hist
 
-def consultar_ia(prompt, sistema="Você é um analista de estoque da Marfim Indústria Têxtil."):
-    """Consulta a IA"""
+def consultar_ia(prompt, sistema="Você é um analista de estoque da Marfim Indústria Têxtil.",
+                 prazo=None, alternativa=None):
+    """
+    Consulta a IA
+
+    prazo: deadline em segundos (gateway_ia); alternativa: texto ou função
+    com a resposta por regras usada se a IA estiver lenta/fora do ar.
+    """
     if not client_groq:
         return "⚠️ IA não configurada. Adicione CHAVE_GROQ no app_final.py"
 
     try:
-        chat = client_groq.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
+        # Mesmo prompt contra o mesmo snapshot → resposta do cache, sem tokens
+        return cache_ia.completar(
+            client_groq,
+            modelo="llama-3.3-70b-versatile",
+            mensagens=[
                 {"role": "system", "content": sistema},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.3
+            temperatura=0.3,
+            prazo=prazo
         )
-        return chat.choices[0].message.content
+    except IAIndisponivel as e:
+        print(f"[IA] {e}")
+        if alternativa is not None:
+            return alternativa() if callable(alternativa) else alternativa
+        return f"⚠️ IA indisponível no momento ({e.motivo}). Tente novamente em instantes."
     except Exception as e:
         return f"Erro IA: {str(e)}"
 
+def consultar_ia_stream(prompt, sistema="Você é um analista de estoque da Marfim Indústria Têxtil.",
+                        prazo=None, alternativa=None):
+    """
+    Consulta a IA em streaming: gera pedaços do texto conforme chegam do Groq
+
+    Mesmo tratamento de consultar_ia; se a IA cair no meio da resposta,
+    o texto já enviado fica e vai um aviso no final.
+    """
+    if not client_groq:
+        yield "⚠️ IA não configurada. Adicione CHAVE_GROQ no app_final.py"
+        return
+
+    emitiu = False
+    try:
+        for pedaco in cache_ia.completar_stream(
+            client_groq,
+            modelo="llama-3.3-70b-versatile",
+            mensagens=[
+                {"role": "system", "content": sistema},
+                {"role": "user", "content": prompt}
+            ],
+            temperatura=0.3,
+            prazo=prazo
+        ):
+            emitiu = True
+            yield pedaco
+    except IAIndisponivel as e:
+        print(f"[IA] {e}")
+        if emitiu:
+            yield f"\n\n⚠️ Resposta interrompida ({e.motivo})."
+        elif alternativa is not None:
+            yield alternativa() if callable(alternativa) else alternativa
+        else:
+            yield f"⚠️ IA indisponível no momento ({e.motivo}). Tente novamente em instantes."
+    except Exception as e:
+        yield f"Erro IA: {str(e)}"
+
+def quer_stream():
+    """Cliente pediu SSE (?stream=1 ou Accept: text/event-stream)"""
+    return (request.args.get('stream') == '1'
+            or 'text/event-stream' in request.headers.get('Accept', ''))
+
+def evento_sse(evento, dados):
+    """Formata um evento Server-Sent Events com payload JSON"""
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+def responder_ia(preparar):
+    """
+    Responde uma rota de IA em JSON ou, se quer_stream(), em SSE
+
+    preparar() monta a consulta e devolve dict com prompt, sistema, campo
+    (chave do texto no payload) e, opcionalmente, prazo, alternativa e
+    extras; exceções viram {'success': False, 'error': ...}.
+
+    SSE: evento 'token' ({'texto': ...}) a cada pedaço e 'fim' com o mesmo
+    payload da resposta JSON. O primeiro byte sai antes de carregar dados.
+    """
+    if not quer_stream():
+        try:
+            consulta = preparar()
+            resposta = consultar_ia(
+                consulta['prompt'], consulta['sistema'],
+                prazo=consulta.get('prazo'), alternativa=consulta.get('alternativa')
+            )
+            return jsonify({'success': True, consulta['campo']: resposta, **consulta.get('extras', {})})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)})
+
+    def gerar():
+        yield ": inicio\n\n"
+        try:
+            consulta = preparar()
+            partes = []
+            for pedaco in consultar_ia_stream(
+                consulta['prompt'], consulta['sistema'],
+                prazo=consulta.get('prazo'), alternativa=consulta.get('alternativa')
+            ):
+                partes.append(pedaco)
+                yield evento_sse('token', {'texto': pedaco})
+            yield evento_sse('fim', {'success': True, consulta['campo']: ''.join(partes), **consulta.get('extras', {})})
+        except Exception as e:
+            yield evento_sse('fim', {'success': False, 'error': str(e)})
+
+    return Response(
+        stream_with_context(gerar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _validacao_por_regras(alertas):
+    """Resposta da validação sem IA, montada só com os alertas automáticos"""
+    if alertas:
+        return (
+            "⚠️ IA indisponível - validação por regras:\n"
+            "1. NÃO (há alertas)\n"
+            f"2. {alertas[0]}\n"
+            "3. Recomendação: REVISAR"
+        )
+    return (
+        "⚠️ IA indisponível - validação por regras:\n"
+        "1. SIM\n"
+        "2. Nenhum alerta automático\n"
+        "3. Recomendação: APROVAR"
+    )
+
 # ============================================================
 # ROTAS
 # ============================================================
@@ -229,46 +360,60 @@ def index():
 def api_dashboard():
     """Retorna dados do dashboard"""
     try:
-        df_idx, df_hist = carregar_dados_completos()
-
-        total_itens = len(df_idx)
-        itens_criticos = len(df_idx[df_idx['Dias_Cobertura'] < 15])
-        itens_zerados = len(df_idx[df_idx['Saldo'] == 0])
-        itens_negativos = len(df_idx[df_idx['Saldo'] < 0])
-        consumo_total = df_idx['Consumo_30d'].sum()
-        estoque_total = df_idx['Saldo'].sum()
-
-        # Top consumo
-        top_consumo = df_idx.nlargest(10, 'Consumo_30d')[['Item', 'Saldo', 'Consumo_30d', 'Dias_Cobertura']].to_dict('records')
-
-        # Mais críticos
-        criticos = df_idx[df_idx['Dias_Cobertura'] < 999].nsmallest(10, 'Dias_Cobertura')[['Item', 'Saldo', 'Consumo_30d', 'Dias_Cobertura']].to_dict('records')
-
-        # Distribuição cobertura
-        dist_cobertura = {
-            'critico': len(df_idx[df_idx['Dias_Cobertura'] < 7]),
-            'urgente': len(df_idx[(df_idx['Dias_Cobertura'] >= 7) & (df_idx['Dias_Cobertura'] < 15)]),
-            'atencao': len(df_idx[(df_idx['Dias_Cobertura'] >= 15) & (df_idx['Dias_Cobertura'] < 30)]),
-            'normal': len(df_idx[(df_idx['Dias_Cobertura'] >= 30) & (df_idx['Dias_Cobertura'] < 999)]),
-        }
+        # KPIs mantidos a cada lançamento; só recarrega a planilha se o snapshot estiver velho
+        if not kpis_dashboard.snapshot_recente():
+            carregar_dados_completos()
+        painel = kpis_dashboard.obter_dashboard()
+
+        # Movimentações por dia (consulta por faixa no SQLite de agregados)
+        inicio = (datetime.now() - timedelta(days=ConfigAgregados.DIAS_GRAFICO - 1)).date()
+        movimentacoes_diarias = [
+            {
+                'dia': datetime.strptime(linha['dia'], '%Y-%m-%d').strftime('%d/%m/%Y'),
+                'entradas': round(linha['entradas'], 2),
+                'saidas': round(linha['saidas'], 2),
+                'movimentacoes': int(linha['n_movs'])
+            }
+            for linha in agregados_diarios.totais_por_dia(inicio).to_dict('records')
+        ]
 
         return jsonify({
             'success': True,
-            'kpis': {
-                'total_itens': total_itens,
-                'itens_criticos': itens_criticos,
-                'itens_zerados': itens_zerados,
-                'itens_negativos': itens_negativos,
-                'consumo_30d': round(consumo_total, 0),
-                'estoque_total': round(estoque_total, 0)
-            },
-            'top_consumo': top_consumo,
-            'criticos': criticos,
-            'distribuicao': dist_cobertura
+            'kpis': painel['kpis'],
+            'top_consumo': painel['top_consumo'],
+            'criticos': painel['criticos'],
+            'distribuicao': painel['distribuicao'],
+            'movimentacoes_diarias': movimentacoes_diarias
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/stream', methods=['GET'])
+def api_stream():
+    """
+    Canal SSE com deltas (movimentacao, item_criado, conferencia, alerta, kpis)
+
+    O navegador reconecta sozinho mandando o header Last-Event-ID e recebe só
+    o que perdeu; 'reset' avisa que é preciso recarregar a tela uma vez.
+    """
+    # Vaga ocupada aqui (verificar e ocupar de uma vez); call_on_close devolve
+    # quando a resposta fecha, mesmo que o stream nunca comece
+    if not canal_eventos.reservar():
+        return jsonify({'success': False, 'error': 'Limite de conexões do canal atingido'}), 503
+
+    try:
+        ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo_id')
+        resposta = Response(
+            stream_with_context(canal_eventos.gerar(ultimo_id, reservado=True)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception:
+        canal_eventos.liberar()
+        raise
+    resposta.call_on_close(canal_eventos.liberar)
+    return resposta
+
 @app.route('/api/buscar', methods=['POST'])
 def api_buscar():
     """Busca itens por nome"""
@@ -312,15 +457,17 @@ def api_item_detalhe(item_nome):
 
 @app.route('/api/analisar', methods=['POST'])
 def api_analisar():
-    """Análise IA de um item"""
-    try:
-        item_nome = request.json.get('item', '').upper()
+    """Análise IA de um item (?stream=1 para SSE)"""
+    dados = request.json or {}
+
+    def preparar():
+        item_nome = dados.get('item', '').upper()
         df_idx, df_hist = carregar_dados_completos()
 
         # Dados do item
         item_data = df_idx[df_idx['Item'].str.upper() == item_nome]
         if item_data.empty:
-            return jsonify({'success': False, 'error': 'Item não encontrado'})
+            raise ValueError('Item não encontrado')
 
         item = item_data.iloc[0]
 
@@ -348,12 +495,13 @@ Forneça:
 
 Use português brasileiro e seja direto.
 """
+        return {
+            'prompt': prompt,
+            'sistema': "Você é um analista de estoque da Marfim Indústria Têxtil.",
+            'campo': 'analise'
+        }
 
-        resposta = consultar_ia(prompt)
-
-        return jsonify({'success': True, 'analise': resposta})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return responder_ia(preparar)
 
 @app.route('/api/alertas', methods=['GET'])
 def api_alertas():
@@ -442,27 +590,19 @@ def api_lista_compras():
 
 @app.route('/api/chat', methods=['POST'])
 def api_chat():
-    """Chatbot de estoque"""
-    try:
-        pergunta = request.json.get('pergunta', '')
+    """Chatbot de estoque (?stream=1 para SSE)"""
+    dados = request.json or {}
 
-        if not pergunta:
-            return jsonify({'success': False, 'error': 'Pergunta vazia'})
+    def preparar():
+        pergunta = dados.get('pergunta', '')
 
-        df_idx, _ = carregar_dados_completos()
+        if not pergunta:
+            raise ValueError('Pergunta vazia')
 
-        # Contexto
-        stats = f"""
-Dados do estoque Marfim:
-- Total itens: {len(df_idx)}
-- Críticos (<15 dias): {len(df_idx[df_idx['Dias_Cobertura'] < 15])}
-- Zerados: {len(df_idx[df_idx['Saldo'] == 0])}
-- Negativos: {len(df_idx[df_idx['Saldo'] < 0])}
-- Consumo 30d: {df_idx['Consumo_30d'].sum():,.0f} unidades
-
-Top 5 maior consumo: {', '.join(df_idx.nlargest(5, 'Consumo_30d')['Item'].tolist())}
-Top 5 mais críticos: {', '.join(df_idx[df_idx['Dias_Cobertura'] < 999].nsmallest(5, 'Dias_Cobertura')['Item'].tolist())}
-"""
+        # Contexto pré-calculado por snapshot; só recarrega a planilha se estiver velho
+        if not contexto_chat.snapshot_recente():
+            carregar_dados_completos()
+        stats = contexto_chat.resumo_app()
 
         prompt = f"""
 {stats}
@@ -471,12 +611,15 @@ Pergunta do usuário: {pergunta}
 
 Responda de forma direta e útil em português brasileiro.
 """
+        return {
+            'prompt': prompt,
+            'sistema': "Você é o assistente de estoque da Marfim Têxtil. Responda de forma clara e direta.",
+            'campo': 'resposta',
+            'prazo': PRAZO_IA_CHAT,
+            'alternativa': f"⚠️ IA indisponível no momento. Resumo local do estoque:\n{stats}"
+        }
 
-        resposta = consultar_ia(prompt, "Você é o assistente de estoque da Marfim Têxtil. Responda de forma clara e direta.")
-
-        return jsonify({'success': True, 'resposta': resposta})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return responder_ia(preparar)
 
 @app.route('/api/previsao/<item_nome>', methods=['GET'])
 def api_previsao(item_nome):
@@ -492,14 +635,21 @@ def api_previsao(item_nome):
         media_diaria = item['Media_Diaria']
         saldo = item['Saldo']
 
+        # Suavização exponencial ajustada no snapshot atual (fallback: média 30d)
+        horizontes = [15, 30, 45, 60, 90]
+        modelo = motor_suavizacao.prever(item_nome, max(horizontes))
+        if modelo:
+            acumulado = np.cumsum(modelo['previsao_diaria'])
+            media_diaria = acumulado[29] / 30
+
         previsoes = []
-        for dias in [15, 30, 45, 60, 90]:
-            consumo_prev = media_diaria * dias
+        for dias in horizontes:
+            consumo_prev = acumulado[dias - 1] if modelo else media_diaria * dias
             saldo_prev = saldo - consumo_prev
             previsoes.append({
                 'dias': dias,
-                'consumo_previsto': round(consumo_prev, 0),
-                'saldo_previsto': round(saldo_prev, 0),
+                'consumo_previsto': round(float(consumo_prev), 0),
+                'saldo_previsto': round(float(saldo_prev), 0),
                 'status': 'CRITICO' if saldo_prev < 0 else ('ATENCAO' if saldo_prev < media_diaria * 15 else 'OK')
             })
 
@@ -507,40 +657,54 @@ def api_previsao(item_nome):
             'success': True,
             'item': item_nome,
             'saldo_atual': saldo,
-            'media_diaria': round(media_diaria, 2),
-            'previsoes': previsoes
+            'media_diaria': round(float(media_diaria), 2),
+            'previsoes': previsoes,
+            'modelo': {
+                'tipo': modelo['modelo'],
+                'parametros': modelo['parametros'],
+                'metricas': modelo['metricas'],
+                'tendencia': modelo['tendencia']
+            } if modelo else {'tipo': 'media_30d'}
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/relatorio/curva-abc', methods=['GET'])
 def api_curva_abc():
-    """Retorna dados da curva ABC"""
+    """
+    Retorna dados da curva ABC (motor único do curva_abc sobre o cubo)
+
+    Query: dias (janela de consumo, padrão 30; 0 = histórico inteiro), xyz=1 (inclui variabilidade)
+    """
     try:
-        df_idx, _ = carregar_dados_completos()
+        dias = request.args.get('dias', 30, type=int)
+        com_xyz = request.args.get('xyz', '').lower() in ('1', 'true', 'sim')
 
-        df_abc = df_idx[df_idx['Consumo_30d'] > 0].sort_values('Consumo_30d', ascending=False).copy()
-        total = df_abc['Consumo_30d'].sum()
-        if total > 0:
-            df_abc['Percentual'] = df_abc['Consumo_30d'] / total * 100
-            df_abc['Acumulado'] = df_abc['Percentual'].cumsum()
-            df_abc['Classe'] = df_abc['Acumulado'].apply(
-                lambda x: 'A' if x <= 80 else ('B' if x <= 95 else 'C')
-            )
-        else:
-            df_abc['Percentual'] = 0
-            df_abc['Acumulado'] = 0
-            df_abc['Classe'] = 'C'
+        # Cubo sincronizado junto com o snapshot; só recarrega a planilha se estiver velho
+        # (a curva só recalcula se o cubo mudou)
+        if not kpis_dashboard.snapshot_recente():
+            carregar_dados_completos()
+        curva = motor_abc.calcular(dias=dias or None, metrica='saidas', xyz=com_xyz)
 
         resumo = {
-            'A': {'itens': len(df_abc[df_abc['Classe'] == 'A']), 'percentual': 80},
-            'B': {'itens': len(df_abc[df_abc['Classe'] == 'B']), 'percentual': 15},
-            'C': {'itens': len(df_abc[df_abc['Classe'] == 'C']), 'percentual': 5}
+            'A': {'itens': int((curva['Classe'] == 'A').sum()), 'percentual': 80},
+            'B': {'itens': int((curva['Classe'] == 'B').sum()), 'percentual': 15},
+            'C': {'itens': int((curva['Classe'] == 'C').sum()), 'percentual': 5}
         }
 
-        dados = df_abc[['Item', 'Consumo_30d', 'Percentual', 'Acumulado', 'Classe']].head(50).to_dict('records')
-
-        return jsonify({'success': True, 'dados': dados, 'resumo': resumo})
+        # Nome como está no ÍNDICE (o cubo guarda a chave normalizada)
+        top = curva.head(50)
+        nomes = kpis_dashboard.nomes_itens(top['Item'])
+        colunas = ['Item', 'Valor', 'Percentual', 'Acumulado', 'Classe'] + (['CV', 'Classe_XYZ'] if com_xyz else [])
+        top = top[colunas].rename(columns={'Valor': 'Consumo'})
+        top['Item'] = top['Item'].map(nomes).fillna(top['Item'])
+        # Consumo_30d: nome antigo da mesma coluna, mantido para quem já consome a API
+        top.insert(top.columns.get_loc('Consumo') + 1, 'Consumo_30d', top['Consumo'])
+        if com_xyz:
+            top['CV'] = top['CV'].round(3).replace([np.inf, -np.inf], np.nan).astype(object)
+            top.loc[top['CV'].isna(), 'CV'] = None
+
+        return jsonify({'success': True, 'dias': dias or None, 'dados': top.to_dict('records'), 'resumo': resumo})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -931,7 +1095,11 @@ Responda de forma MUITO CURTA e DIRETA:
 Use português brasileiro.
 """
 
-        resposta = consultar_ia(prompt, "Você é um validador de estoque. Seja direto e objetivo.")
+        resposta = consultar_ia(
+            prompt, "Você é um validador de estoque. Seja direto e objetivo.",
+            prazo=PRAZO_IA_VALIDACAO,
+            alternativa=lambda: _validacao_por_regras(alertas)
+        )
 
         return jsonify({
             'success': True,
@@ -946,15 +1114,17 @@ Use português brasileiro.
 
 @app.route('/api/analisar-parados', methods=['POST'])
 def api_analisar_parados():
-    """IA analisa itens parados e sugere ações"""
-    try:
-        itens = request.json.get('itens', [])
+    """IA analisa itens parados e sugere ações (?stream=1 para SSE)"""
+    dados = request.json or {}
+
+    def preparar():
+        itens = dados.get('itens', [])
 
         if not client_groq:
-            return jsonify({'success': False, 'error': 'IA não configurada'})
+            raise ValueError('IA não configurada')
 
         if not itens:
-            return jsonify({'success': False, 'error': 'Nenhum item para analisar'})
+            raise ValueError('Nenhum item para analisar')
 
         # Limitar a 20 itens para não sobrecarregar
         itens = itens[:20]
@@ -974,17 +1144,14 @@ Forneça:
 
 Use português brasileiro. Seja direto.
 """
+        return {
+            'prompt': prompt,
+            'sistema': "Você é um analista de estoque especializado em gestão de inventário parado.",
+            'campo': 'analise',
+            'extras': {'total_analisados': len(itens)}
+        }
 
-        resposta = consultar_ia(prompt, "Você é um analista de estoque especializado em gestão de inventário parado.")
-
-        return jsonify({
-            'success': True,
-            'analise': resposta,
-            'total_analisados': len(itens)
-        })
-
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return responder_ia(preparar)
 
 
 @app.route('/api/sugerir-item', methods=['GET'])
@@ -1026,7 +1193,11 @@ Itens similares encontrados no estoque:
 
 Qual item o usuário provavelmente quis digitar? Responda APENAS com o nome exato do item mais provável, sem explicações.
 """
-            sugestao_ia = consultar_ia(prompt, "Responda apenas com o nome do item, sem explicações.")
+            sugestao_ia = consultar_ia(
+                prompt, "Responda apenas com o nome do item, sem explicações.",
+                prazo=PRAZO_IA_SUGESTAO,
+                alternativa=similares[0]
+            )
             sugestao_ia = sugestao_ia.strip().strip('"').strip("'")
         else:
             sugestao_ia = similares[0] if similares else None
@@ -1151,9 +1322,25 @@ def api_movimentacao():
             # Inserir linha na planilha ESTOQUE
             sheet_hist.append_row(nova_linha, value_input_option='USER_ENTERED')
 
-            # Atualizar ÍNDICE_ITENS com novo saldo e linha
+            # Linha gravada (os agregados diários não somam de novo no back-fill)
             try:
                 nova_linha_num = len(sheet_hist.get_all_values())
+            except Exception as e:
+                nova_linha_num = None
+                print(f"Erro ao descobrir linha gravada: {e}")
+
+            # Um evento: KPIs, alertas, índice em memória, histórico, agregados e auditoria
+            # aplicam só este item (cada um que estiver carregado)
+            barramento_eventos.publicar(MovimentacaoRegistrada(
+                item=item_nome, tipo=tipo, quantidade=quantidade,
+                saldo_anterior=saldo_atual, saldo_novo=novo_saldo, data=data_atual,
+                grupo=grupo, linha=nova_linha_num, obs=obs, origem='Sistema_Web'
+            ))
+
+            # Atualizar ÍNDICE_ITENS com novo saldo e linha
+            try:
+                if nova_linha_num is None:
+                    raise ValueError('linha gravada na ESTOQUE desconhecida')
 
                 # Buscar linha do item no índice
                 dados_idx = sheet_idx.get_all_values()
@@ -1171,6 +1358,10 @@ def api_movimentacao():
                     if item_novo or item_existe.empty:
                         nova_linha_idx = [item_nome, str(novo_saldo).replace('.', ','), data_atual, grupo, nova_linha_num]
                         sheet_idx.append_row(nova_linha_idx, value_input_option='USER_ENTERED')
+                        barramento_eventos.publicar(ItemCriado(
+                            item=item_nome, grupo=grupo, saldo=novo_saldo,
+                            data=data_atual, linha=nova_linha_num
+                        ))
             except Exception as e:
                 print(f"Erro ao atualizar índice: {e}")
 
@@ -1392,6 +1583,12 @@ def api_registrar_conferencia():
             resultado['ajuste_registrado'] = True
             resultado['tipo_ajuste'] = tipo_ajuste
 
+        barramento_eventos.publicar(ConferenciaRegistrada(
+            item=item_nome, saldo_sistema=saldo_sistema, saldo_fisico=saldo_fisico,
+            divergencia=divergencia, data=datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+            obs=obs, ajuste_registrado=resultado['ajuste_registrado']
+        ))
+
         return jsonify({
             'success': True,
             'resultado': resultado
@@ -1404,15 +1601,17 @@ def api_registrar_conferencia():
 
 @app.route('/api/analisar-divergencias', methods=['POST'])
 def api_analisar_divergencias():
-    """IA analisa padrões de divergência e sugere ações"""
-    try:
-        conferencias = request.json.get('conferencias', [])
+    """IA analisa padrões de divergência e sugere ações (?stream=1 para SSE)"""
+    dados = request.json or {}
+
+    def preparar():
+        conferencias = dados.get('conferencias', [])
 
         if not client_groq:
-            return jsonify({'success': False, 'error': 'IA não configurada'})
+            raise ValueError('IA não configurada')
 
         if not conferencias:
-            return jsonify({'success': False, 'error': 'Nenhuma conferência para analisar'})
+            raise ValueError('Nenhuma conferência para analisar')
 
         # Limitar análise
         conferencias = conferencias[:15]
@@ -1444,22 +1643,21 @@ Responda:
 
 Seja direto e prático. Use português brasileiro.
 """
-
-        resposta = consultar_ia(prompt, "Você é um especialista em gestão de estoque têxtil.")
-
-        return jsonify({
-            'success': True,
-            'analise': resposta,
-            'estatisticas': {
-                'total_conferencias': len(conferencias),
-                'com_divergencia': total_divergencias,
-                'sobras_kg': round(soma_positiva, 2),
-                'faltas_kg': round(abs(soma_negativa), 2)
+        return {
+            'prompt': prompt,
+            'sistema': "Você é um especialista em gestão de estoque têxtil.",
+            'campo': 'analise',
+            'extras': {
+                'estatisticas': {
+                    'total_conferencias': len(conferencias),
+                    'com_divergencia': total_divergencias,
+                    'sobras_kg': round(soma_positiva, 2),
+                    'faltas_kg': round(abs(soma_negativa), 2)
+                }
             }
-        })
+        }
 
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return responder_ia(preparar)
 
 
 @app.route('/api/sugerir-conferencia-ia', methods=['GET'])
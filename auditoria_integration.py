@@ -81,15 +81,11 @@ def requer_auditoria_valida(fn):
             result = fn(*args, **kwargs)
 
             # Após execução bem-sucedida, notifica o gerenciador
-            # para que ele invalide o cache se a OBS tiver ATUALIZAÇÃO
+            # para que ele invalide o cache se a OBS tiver ATUALIZAÇÃO.
+            # Lançamentos com 'itens' (/api/movimentacao) chegam pelo evento
+            # MovimentacaoRegistrada (eventos_estoque); aqui só a OBS direta.
             try:
                 dados = request.get_json(silent=True) or {}
-                itens = dados.get('itens', [])
-                for item in itens:
-                    obs = item.get('obs', '')
-                    if obs:
-                        gerenciador.notificar_novo_lancamento(obs)
-                # Também verifica OBS direto (em endpoints simples)
                 obs_direto = dados.get('obs', '')
                 if obs_direto:
                     gerenciador.notificar_novo_lancamento(obs_direto)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark - Validação em Lote (FASE 5)
+Autor: Johnny
+Data: 2026-02-13
+
+Compara, para lotes de 10k movimentações:
+- 🧵 validar_movimentacao em ThreadPoolExecutor (caminho antigo)
+- 🔁 validar_movimentacao em laço simples
+- ⚡ sistema_ia.validar_lote (regras como máscaras NumPy)
+
+Também confere que os três produzem os mesmos ResultadoValidacao
+(exceto timestamp). Não precisa de planilha: as estatísticas por item
+são geradas sinteticamente.
+
+Uso:
+    python benchmark_validacao.py [n_movimentacoes] [n_itens]
+"""
+
+import sys
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Any
+
+from estatisticas_itens import estatisticas_itens
+from ia_avancada import sistema_ia
+
+
+def gerar_dados(n_movimentacoes: int, n_itens: int, semente: int = 42) -> Tuple[List, ...]:
+    """Alimenta estatisticas_itens e gera um lote aleatório de movimentações"""
+    rnd = random.Random(semente)
+    nomes = [f'ITEM {i:05d}' for i in range(n_itens)]
+
+    estatisticas_itens.reconstruir(
+        (nome, rnd.choice(['ENTRADA', 'SAIDA', 'SAIDA']), rnd.uniform(1, 200), f'{dia:02d}/01/2026')
+        for nome in nomes
+        for dia in range(1, rnd.randint(2, 28))
+    )
+
+    itens, tipos, quantidades, saldos = [], [], [], []
+    for _ in range(n_movimentacoes):
+        # Inclui itens sem estatísticas, quantidades zero/altas e saídas sem saldo
+        itens.append(rnd.choice(nomes) if rnd.random() < 0.95 else f'NOVO {rnd.randint(0, 99)}')
+        tipos.append(rnd.choice(['ENTRADA', 'SAIDA', 'SAÍDA']))
+        quantidades.append(rnd.choice([0, rnd.uniform(1, 300), rnd.uniform(1, 300), 15000]))
+        saldos.append(rnd.choice([0, rnd.uniform(0, 2000), rnd.uniform(0, 2000)]))
+
+    return itens, tipos, quantidades, saldos
+
+
+def medir(funcao: Callable, nome: str, repeticoes: int = 3) -> Tuple[float, Any]:
+    """Menor tempo (ms) entre N execuções"""
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, (time.perf_counter() - inicio) * 1000)
+    print(f"   {nome:<28} {melhor:>10.1f}ms")
+    return melhor, resultado
+
+
+def comparar(a, b) -> bool:
+    """Compara dois ResultadoValidacao ignorando timestamp"""
+    da, db = a.to_dict(), b.to_dict()
+    da.pop('timestamp')
+    db.pop('timestamp')
+    return da == db
+
+
+def executar(n_movimentacoes: int = 10000, n_itens: int = 2000):
+    print(f"\n📦 Lote de {n_movimentacoes} movimentações / {n_itens} itens")
+    itens, tipos, quantidades, saldos = gerar_dados(n_movimentacoes, n_itens)
+    lote = list(zip(itens, tipos, quantidades, saldos))
+
+    def _um(args):
+        item, tipo, qtd, saldo = args
+        return sistema_ia.validar_movimentacao(item, tipo, qtd, saldo)
+
+    def threads():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return list(executor.map(_um, lote))
+
+    def laco():
+        return [_um(args) for args in lote]
+
+    def vetorizado():
+        return sistema_ia.validar_lote(itens, tipos, quantidades, saldos)
+
+    t_threads, r_threads = medir(threads, '🧵 Threads (4 workers)')
+    t_laco, r_laco = medir(laco, '🔁 Laço simples')
+    t_vetor, r_vetor = medir(vetorizado, '⚡ Vetorizado (validar_lote)')
+
+    iguais = all(comparar(a, b) for a, b in zip(r_threads, r_vetor)) and len(r_threads) == len(r_vetor)
+    iguais = iguais and all(comparar(a, b) for a, b in zip(r_laco, r_vetor))
+
+    print(f"\n   Ganho vs threads: {t_threads / t_vetor:.1f}×")
+    print(f"   Ganho vs laço:    {t_laco / t_vetor:.1f}×")
+    print(f"   Válidos: {sum(r.valido for r in r_vetor)}/{len(r_vetor)}")
+    print(f"   {'✅' if iguais else '❌'} Resultados idênticos: {iguais}")
+    return iguais
+
+
+if __name__ == '__main__':
+    print("🧪 Benchmark de validação em lote...")
+
+    n_mov = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_itens = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    ok = executar(n_mov, n_itens)
+
+    print("\n✅ Benchmark concluído!" if ok else "\n❌ Divergência entre os caminhos!")
+    sys.exit(0 if ok else 1)
@@ -19,6 +19,7 @@ Ganhos esperados:
 import os
 import pickle
 import logging
+import threading
 from datetime import datetime, timedelta
 from functools import lru_cache
 from typing import Any, Optional, Dict
@@ -65,6 +66,7 @@ class CacheMarfim:
         # Camada 2: Cache em memória (LRU) - sempre disponível
         self.memory_cache: Dict[str, tuple] = {}
         self.cache_timestamps: Dict[str, datetime] = {}
+        self._lock_entradas = threading.Lock()   # update_entry: copia e troca sem perder alteração
 
         # Estatísticas
         self.stats = {
@@ -119,11 +121,14 @@ class CacheMarfim:
         # 1. Tenta Redis primeiro (mais rápido)
         if self.redis_available:
             try:
-                data = self.redis.get(f"marfim:{key}")
+                pipe = self.redis.pipeline()
+                pipe.get(f"marfim:{key}")
+                pipe.hgetall(f"marfim:{key}:entradas")
+                data, entradas = pipe.execute()
                 if data:
                     self.stats['hits_redis'] += 1
                     logger.debug(f"✅ Cache HIT (Redis): {key}")
-                    return pickle.loads(data)
+                    return self._mesclar_entradas(pickle.loads(data), entradas)
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao ler Redis: {e}")
 
@@ -168,11 +173,14 @@ class CacheMarfim:
             if self.redis_available:
                 try:
                     pickled_data = pickle.dumps(data)
-                    self.redis.setex(
+                    pipe = self.redis.pipeline()
+                    pipe.setex(
                         f"marfim:{key}",
                         ttl,
                         pickled_data
                     )
+                    pipe.delete(f"marfim:{key}:entradas")  # valor novo já traz tudo
+                    pipe.execute()
                     logger.debug(f"💾 Salvo em Redis: {key} (TTL: {ttl}s)")
                 except Exception as e:
                     logger.warning(f"⚠️ Erro ao salvar em Redis: {e}")
@@ -190,6 +198,71 @@ class CacheMarfim:
             logger.error(f"❌ Erro ao salvar em cache: {e}")
             return False
 
+    def update_entry(self, key: str, field: str, changes: Dict[str, Any],
+                     cache_type: str = 'default', defaults: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Atualiza UMA entrada de um dicionário em cache (ex.: um item do índice)
+
+        Não regrava o dicionário inteiro nem renova o TTL: em memória o dict
+        é copiado e trocado (quem já leu o valor e está iterando não vê a
+        alteração no meio); no Redis a mudança vai para um hash auxiliar
+        (marfim:<key>:entradas) mesclado na leitura e que expira junto com
+        o valor principal.
+
+        Args:
+            key: Chave do cache (o valor precisa ser um dict)
+            field: Chave da entrada dentro do dict
+            changes: Campos a sobrescrever na entrada
+            cache_type: Tipo de cache para determinar TTL
+            defaults: Campos usados só se a entrada ainda não os tiver
+
+        Returns:
+            True se alguma camada tinha o valor em cache e foi atualizada
+        """
+        defaults = defaults or {}
+        atualizado = False
+
+        # 1. Redis: só a entrada, no hash auxiliar
+        if self.redis_available:
+            try:
+                chave = f"marfim:{key}"
+                restante_ms = self.redis.pttl(chave)
+                if restante_ms and restante_ms > 0:
+                    anterior = self.redis.hget(f"{chave}:entradas", field)
+                    padrao, mudancas = pickle.loads(anterior) if anterior else ({}, {})
+                    pipe = self.redis.pipeline()
+                    pipe.hset(f"{chave}:entradas", field,
+                              pickle.dumps(({**defaults, **padrao}, {**mudancas, **changes})))
+                    pipe.pexpire(f"{chave}:entradas", restante_ms)
+                    pipe.execute()
+                    atualizado = True
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao atualizar entrada no Redis: {e}")
+
+        # 2. Memória: cópia rasa trocada de uma vez, mantendo o timestamp original
+        with self._lock_entradas:
+            if key in self.memory_cache:
+                timestamp, data = self.memory_cache[key]
+                ttl = self.TTL.get(cache_type, self.TTL['default'])
+                if isinstance(data, dict) and datetime.now() - timestamp < timedelta(seconds=ttl):
+                    novo = dict(data)
+                    novo[field] = {**defaults, **data.get(field, {}), **changes}
+                    self.memory_cache[key] = (timestamp, novo)
+                    atualizado = True
+
+        return atualizado
+
+    @staticmethod
+    def _mesclar_entradas(data: Any, entradas: Dict[bytes, bytes]) -> Any:
+        """Aplica as entradas do hash auxiliar (update_entry) ao valor lido do Redis"""
+        if not entradas or not isinstance(data, dict):
+            return data
+        for campo, valor in entradas.items():
+            campo = campo.decode() if isinstance(campo, bytes) else campo
+            padrao, mudancas = pickle.loads(valor)
+            data[campo] = {**padrao, **data.get(campo, {}), **mudancas}
+        return data
+
     def invalidate(self, pattern: str = '*') -> int:
         """
         Invalida caches que correspondem ao padrão
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de Respostas da IA (Groq) - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Cache endereçado por conteúdo para chamadas de chat completion:
+- 🔑 Chave = SHA-256 de (modelo, mensagens, temperatura, max_tokens)
+- ⏰ TTL por entrada (padrão 6h)
+- 🧠 Memória (LRU) → Redis (opcional) → disco (um JSON por chave)
+
+Prompt idêntico contra o mesmo snapshot → resposta instantânea, zero tokens.
+Só respostas bem-sucedidas são guardadas. Em cache miss a chamada passa
+pelo gateway_ia (semáforo, prazo e circuit breaker); IAIndisponivel e
+demais erros seguem para o tratamento de cada chamador.
+
+Uso:
+    from cache_ia import cache_ia
+
+    texto = cache_ia.completar(
+        client_groq,
+        modelo=MODELO_GROQ,
+        mensagens=[{"role": "system", "content": "..."}, {"role": "user", "content": prompt}],
+        temperatura=0.3
+    )
+
+    # Streaming (SSE): pedaços do texto conforme chegam do Groq
+    for pedaco in cache_ia.completar_stream(client_groq, modelo=..., mensagens=[...]):
+        ...
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from gateway_ia import gateway_ia
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigCacheIA:
+    """Configurações do cache de respostas da IA"""
+    TTL_PADRAO_S = int(os.getenv('CACHE_IA_TTL', 6 * 3600))
+    MAX_ENTRADAS_MEMORIA = 500
+    PREFIXO_REDIS = 'marfim:ia:'
+    DIRETORIO_DISCO = os.getenv(
+        'CACHE_IA_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache_ia')
+    )
+    USAR_DISCO = os.getenv('CACHE_IA_DISCO', '1') != '0'
+
+
+# ========================================
+# CACHE
+# ========================================
+
+class CacheRespostasIA:
+    """
+    Cache multinível de respostas de chat completion
+
+    Cada entrada guarda {'resposta', 'tokens', 'criado_em', 'expira_em'}.
+    """
+
+    def __init__(self, ttl_padrao: int = None, diretorio: str = None, usar_disco: bool = None):
+        self.ttl_padrao = ttl_padrao or ConfigCacheIA.TTL_PADRAO_S
+        self.diretorio = diretorio or ConfigCacheIA.DIRETORIO_DISCO
+        self.usar_disco = ConfigCacheIA.USAR_DISCO if usar_disco is None else usar_disco
+
+        self._memoria: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.redis = None
+        self.redis_available = False
+        self._init_redis()
+
+        self.stats = {
+            'hits_memoria': 0,
+            'hits_redis': 0,
+            'hits_disco': 0,
+            'misses': 0,
+            'chamadas_api': 0,
+            'tokens_economizados': 0
+        }
+
+        logger.info(f"✅ CacheRespostasIA inicializado - Redis: {self.redis_available} | Disco: {self.usar_disco}")
+
+    def _init_redis(self):
+        """Conecta ao Redis (opcional), como o CacheMarfim"""
+        try:
+            import redis
+
+            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+            self.redis = redis.from_url(
+                redis_url,
+                decode_responses=True,
+                socket_connect_timeout=2,
+                socket_timeout=2
+            )
+            self.redis.ping()
+            self.redis_available = True
+
+        except ImportError:
+            logger.info("💡 Cache da IA sem Redis (biblioteca não instalada)")
+        except Exception as e:
+            logger.info(f"💡 Cache da IA sem Redis: {e}")
+            self.redis = None
+            self.redis_available = False
+
+    # ========================================
+    # CHAVE
+    # ========================================
+
+    @staticmethod
+    def gerar_chave(
+        modelo: str,
+        mensagens: List[Dict[str, str]],
+        temperatura: float,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """SHA-256 do conteúdo da chamada (mensagens incluem system prompt e prompt)"""
+        conteudo = json.dumps(
+            {
+                'modelo': modelo,
+                'mensagens': [[m.get('role'), m.get('content')] for m in mensagens],
+                'temperatura': temperatura,
+                'max_tokens': max_tokens
+            },
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    # ========================================
+    # LEITURA / ESCRITA
+    # ========================================
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, chave[:2], f"{chave}.json")
+
+    def get(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Busca entrada válida (memória → Redis → disco)"""
+        agora = time.time()
+
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                if entrada['expira_em'] > agora:
+                    self._memoria.move_to_end(chave)
+                    self.stats['hits_memoria'] += 1
+                    return entrada
+                del self._memoria[chave]
+
+        entrada = None
+        origem = None
+
+        if self.redis_available:
+            try:
+                bruto = self.redis.get(ConfigCacheIA.PREFIXO_REDIS + chave)
+                if bruto:
+                    entrada, origem = json.loads(bruto), 'hits_redis'
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao ler cache da IA no Redis: {e}")
+
+        if entrada is None and self.usar_disco:
+            caminho = self._caminho(chave)
+            try:
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    entrada, origem = json.load(f), 'hits_disco'
+                if entrada['expira_em'] <= agora:
+                    os.remove(caminho)
+                    entrada = None
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao ler cache da IA em disco: {e}")
+                entrada = None
+
+        if entrada is None:
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self.stats[origem] += 1
+            self._guardar_memoria(chave, entrada)
+        return entrada
+
+    def set(self, chave: str, resposta: str, tokens: int = 0, ttl: int = None) -> Dict[str, Any]:
+        """Salva resposta em todas as camadas"""
+        ttl = ttl or self.ttl_padrao
+        agora = time.time()
+        entrada = {
+            'resposta': resposta,
+            'tokens': int(tokens or 0),
+            'criado_em': agora,
+            'expira_em': agora + ttl
+        }
+
+        with self._lock:
+            self._guardar_memoria(chave, entrada)
+
+        if self.redis_available:
+            try:
+                self.redis.setex(ConfigCacheIA.PREFIXO_REDIS + chave, ttl, json.dumps(entrada, ensure_ascii=False))
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao salvar cache da IA no Redis: {e}")
+
+        if self.usar_disco:
+            caminho = self._caminho(chave)
+            try:
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                temporario = f"{caminho}.{threading.get_ident()}.tmp"
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    json.dump(entrada, f, ensure_ascii=False)
+                os.replace(temporario, caminho)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao salvar cache da IA em disco: {e}")
+
+        return entrada
+
+    def _guardar_memoria(self, chave: str, entrada: Dict[str, Any]):
+        self._memoria[chave] = entrada
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > ConfigCacheIA.MAX_ENTRADAS_MEMORIA:
+            self._memoria.popitem(last=False)
+
+    # ========================================
+    # CHAMADA COM CACHE
+    # ========================================
+
+    def completar(
+        self,
+        client,
+        modelo: str,
+        mensagens: List[Dict[str, str]],
+        temperatura: float = 0.3,
+        max_tokens: Optional[int] = None,
+        ttl: int = None,
+        prazo: float = None
+    ) -> str:
+        """
+        Chat completion com cache
+
+        Args:
+            client: Cliente Groq
+            modelo, mensagens, temperatura, max_tokens: Parâmetros da chamada
+            ttl: Validade da resposta em segundos (padrão: ConfigCacheIA.TTL_PADRAO_S)
+            prazo: Deadline da chamada à API (padrão: ConfigGatewayIA.PRAZO_PADRAO_S)
+
+        Returns:
+            Texto da resposta
+
+        Raises:
+            IAIndisponivel: gateway recusou, prazo estourou ou a API falhou
+        """
+        chave = self.gerar_chave(modelo, mensagens, temperatura, max_tokens)
+
+        entrada = self.get(chave)
+        if entrada is not None:
+            with self._lock:
+                self.stats['tokens_economizados'] += entrada.get('tokens', 0)
+            return entrada['resposta']
+
+        parametros = {'model': modelo, 'messages': mensagens, 'temperature': temperatura}
+        if max_tokens is not None:
+            parametros['max_tokens'] = max_tokens
+
+        completion = gateway_ia.chamar(
+            lambda timeout: client.chat.completions.create(**parametros, timeout=timeout),
+            prazo=prazo
+        )
+        with self._lock:
+            self.stats['chamadas_api'] += 1
+
+        resposta = completion.choices[0].message.content
+        usage = getattr(completion, 'usage', None)
+        self.set(chave, resposta, getattr(usage, 'total_tokens', 0) if usage else 0, ttl)
+        return resposta
+
+    def completar_stream(
+        self,
+        client,
+        modelo: str,
+        mensagens: List[Dict[str, str]],
+        temperatura: float = 0.3,
+        max_tokens: Optional[int] = None,
+        ttl: int = None,
+        prazo: float = None
+    ) -> Iterator[str]:
+        """
+        Como completar(), mas gera o texto em pedaços (stream=True do Groq)
+
+        Cache hit devolve a resposta inteira num pedaço só. A resposta só é
+        gravada no cache se a transmissão chegar ao fim. prazo vale até o
+        primeiro pedaço (ver gateway_ia.transmitir).
+
+        Raises:
+            IAIndisponivel: gateway recusou, prazo estourou ou a API falhou
+        """
+        chave = self.gerar_chave(modelo, mensagens, temperatura, max_tokens)
+
+        entrada = self.get(chave)
+        if entrada is not None:
+            with self._lock:
+                self.stats['tokens_economizados'] += entrada.get('tokens', 0)
+            yield entrada['resposta']
+            return
+
+        parametros = {'model': modelo, 'messages': mensagens, 'temperature': temperatura, 'stream': True}
+        if max_tokens is not None:
+            parametros['max_tokens'] = max_tokens
+
+        partes = []
+        tokens = 0
+        for chunk in gateway_ia.transmitir(
+            lambda timeout: client.chat.completions.create(**parametros, timeout=timeout),
+            prazo=prazo
+        ):
+            if chunk.choices:
+                texto = chunk.choices[0].delta.content
+                if texto:
+                    partes.append(texto)
+                    yield texto
+            # Groq manda o uso de tokens no último chunk (x_groq.usage)
+            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+            if usage:
+                tokens = getattr(usage, 'total_tokens', 0)
+
+        with self._lock:
+            self.stats['chamadas_api'] += 1
+        self.set(chave, ''.join(partes), tokens, ttl)
+
+    # ========================================
+    # MANUTENÇÃO
+    # ========================================
+
+    def limpar(self) -> int:
+        """Remove todas as entradas (memória, Redis e disco)"""
+        with self._lock:
+            removidos = len(self._memoria)
+            self._memoria.clear()
+
+        if self.redis_available:
+            try:
+                chaves = list(self.redis.scan_iter(f"{ConfigCacheIA.PREFIXO_REDIS}*"))
+                if chaves:
+                    removidos = max(removidos, self.redis.delete(*chaves))
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao limpar cache da IA no Redis: {e}")
+
+        if self.usar_disco and os.path.isdir(self.diretorio):
+            # Só as respostas (<2 primeiros caracteres>/<chave>.json): arquivos na
+            # raiz do diretório, como categorias_itens.json do classificador, ficam
+            arquivos = 0
+            for raiz, _, nomes in os.walk(self.diretorio):
+                if os.path.dirname(os.path.abspath(raiz)) != os.path.abspath(self.diretorio):
+                    continue
+                for nome in nomes:
+                    if nome.endswith('.json'):
+                        try:
+                            os.remove(os.path.join(raiz, nome))
+                            arquivos += 1
+                        except OSError:
+                            pass
+            removidos = max(removidos, arquivos)
+
+        logger.info(f"🗑️ Cache da IA limpo: {removidos} entradas")
+        return removidos
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        with self._lock:
+            stats = dict(self.stats)
+            em_memoria = len(self._memoria)
+
+        hits = stats['hits_memoria'] + stats['hits_redis'] + stats['hits_disco']
+        total = hits + stats['misses']
+        return {
+            **stats,
+            'hits': hits,
+            'taxa_acerto': f"{hits / total * 100:.1f}%" if total else "0.0%",
+            'entradas_memoria': em_memoria,
+            'ttl_padrao_s': self.ttl_padrao,
+            'redis': self.redis_available,
+            'disco': self.diretorio if self.usar_disco else None
+        }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+cache_ia = CacheRespostasIA()
+
+
+if __name__ == '__main__':
+    import tempfile
+    from types import SimpleNamespace
+
+    print("🧪 Testando CacheRespostasIA...")
+
+    class ClienteFalso:
+        """Simula client.chat.completions.create contando chamadas"""
+        def __init__(self):
+            self.chamadas = 0
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+        def _create(self, **kwargs):
+            self.chamadas += 1
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=f"resposta {self.chamadas}"))],
+                usage=SimpleNamespace(total_tokens=120)
+            )
+
+    cache = CacheRespostasIA(diretorio=tempfile.mkdtemp())
+    cliente = ClienteFalso()
+    msgs = [{"role": "system", "content": "analista"}, {"role": "user", "content": "analise X"}]
+
+    r1 = cache.completar(cliente, 'modelo', msgs, 0.3)
+    r2 = cache.completar(cliente, 'modelo', msgs, 0.3)
+    print(f"   {r1} | {r2} | chamadas à API: {cliente.chamadas}")
+
+    # Nova instância lê do disco
+    cache2 = CacheRespostasIA(diretorio=cache.diretorio)
+    print(f"   Do disco: {cache2.completar(cliente, 'modelo', msgs, 0.3)} | chamadas: {cliente.chamadas}")
+    print(f"   Resumo: {cache.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
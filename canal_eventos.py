@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Canal de Eventos em Tempo Real (SSE) - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Empurra para as telas deltas compactos em vez de cada uma ficar
+consultando endpoints pesados de tempos em tempos:
+- 📦 movimentacao: item, tipo, quantidade, saldo anterior e novo
+- 🆕 item_criado / 📋 conferencia
+- 🚦 alerta: item que mudou de nível (movimentação ou passagem dos dias)
+- 📊 kpis: números do dashboard, só quando mudam
+
+Os deltas saem do barramento de eventos (eventos_estoque) e ficam num
+buffer circular com id sequencial. Um cliente que reconecta manda o
+Last-Event-ID e recebe só o que perdeu; se o id já saiu do buffer (ou é
+de outra execução do servidor) recebe um 'reset' e recarrega uma vez.
+
+Uso:
+    from canal_eventos import canal_eventos
+
+    @app.route('/api/stream')
+    def api_stream():
+        if not canal_eventos.reservar():
+            return 'lotado', 503
+        resposta = Response(canal_eventos.gerar(request.headers.get('Last-Event-ID'), reservado=True),
+                            mimetype='text/event-stream')
+        resposta.call_on_close(canal_eventos.liberar)
+        return resposta
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from eventos_estoque import (
+    barramento_eventos, MovimentacaoRegistrada, ItemCriado,
+    ConferenciaRegistrada, NivelAlertaAlterado
+)
+from kpis_dashboard import kpis_dashboard
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigCanal:
+    """Configurações do canal SSE"""
+    TAMANHO_BUFFER = 1000      # deltas guardados para replay (Last-Event-ID)
+    HEARTBEAT_S = 15           # comentário ': ping' quando não há eventos
+    RETRY_MS = 3000            # espera do navegador antes de reconectar
+    MAX_CLIENTES = 50          # conexões simultâneas (cada uma ocupa uma thread)
+
+
+# ========================================
+# DELTAS
+# ========================================
+
+@dataclass
+class DeltaCanal:
+    """Um delta no buffer do canal"""
+    seq: int
+    tipo: str
+    dados: Dict[str, Any]
+
+    def to_sse(self, epoca: str) -> str:
+        """Formata como evento SSE (id = época-seq)"""
+        return (f"id: {epoca}-{self.seq}\nevent: {self.tipo}\n"
+                f"data: {json.dumps(self.dados, ensure_ascii=False)}\n\n")
+
+
+class CanalEventos:
+    """
+    Buffer circular de deltas com espera por novidades
+
+    Publicar é O(1); um cliente acordado lê só os deltas depois do seu
+    cursor. A época (instante em que o canal foi criado) entra no id para
+    que um id de antes de reiniciar o servidor não seja confundido.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._buffer: deque = deque(maxlen=ConfigCanal.TAMANHO_BUFFER)
+        self._seq = 0
+        self._clientes = 0
+        self._ultimos_kpis: Optional[Dict[str, Any]] = None
+        self.epoca = format(int(time.time() * 1000), 'x')
+        self.stats = {'publicados': 0, 'conexoes': 0, 'retomadas': 0, 'resets': 0}
+
+    # ----------------------------------------
+    # Publicação
+    # ----------------------------------------
+
+    def publicar(self, tipo: str, dados: Dict[str, Any]) -> int:
+        """Acrescenta um delta e acorda os clientes; retorna o seq"""
+        with self._cond:
+            self._seq += 1
+            self._buffer.append(DeltaCanal(self._seq, tipo, dados))
+            self.stats['publicados'] += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def publicar_kpis(self):
+        """Delta 'kpis' só se os números mudaram (e se já há snapshot carregado)"""
+        kpis = kpis_dashboard.obter_kpis()
+        if kpis is None:
+            return
+        with self._cond:
+            if kpis != self._ultimos_kpis:
+                self._ultimos_kpis = kpis
+                self.publicar('kpis', kpis)
+
+    # ----------------------------------------
+    # Leitura
+    # ----------------------------------------
+
+    def _cursor(self, ultimo_id: Optional[str]) -> Optional[int]:
+        """Seq a partir do Last-Event-ID (None = desconhecido, cliente precisa de reset)"""
+        if not ultimo_id:
+            return self._seq
+        epoca, _, seq = ultimo_id.strip().rpartition('-')
+        if epoca != self.epoca or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        return int(seq)
+
+    def _desde(self, seq: int) -> Optional[List[DeltaCanal]]:
+        """Deltas depois de seq (None se parte deles já saiu do buffer)"""
+        if seq >= self._seq:
+            return []
+        if not self._buffer or self._buffer[0].seq > seq + 1:
+            return None
+        inicio = len(self._buffer) - (self._seq - seq)
+        return [self._buffer[i] for i in range(inicio, len(self._buffer))]
+
+    def eventos_desde(self, ultimo_id: Optional[str]) -> Optional[List[DeltaCanal]]:
+        """Deltas que o cliente perdeu (None = precisa recarregar tudo)"""
+        with self._cond:
+            cursor = self._cursor(ultimo_id)
+            return None if cursor is None else self._desde(cursor)
+
+    def reservar(self) -> bool:
+        """Ocupa uma vaga de cliente (False se já há MAX_CLIENTES conectados)"""
+        with self._cond:
+            if self._clientes >= ConfigCanal.MAX_CLIENTES:
+                return False
+            self._clientes += 1
+            return True
+
+    def liberar(self):
+        """Devolve a vaga ocupada por reservar()"""
+        with self._cond:
+            self._clientes = max(self._clientes - 1, 0)
+
+    def gerar(self, ultimo_id: Optional[str] = None, reservado: bool = False) -> Iterator[str]:
+        """
+        Stream SSE de um cliente
+
+        Começa com 'conectado' (ou 'reset', se o Last-Event-ID não pode ser
+        atendido), manda o que o cliente perdeu e depois espera deltas novos,
+        com ': ping' a cada HEARTBEAT_S.
+
+        reservado=True: a vaga já foi ocupada com reservar() e quem reservou
+        chama liberar() (a rota usa call_on_close, que roda mesmo se o stream
+        nunca chegar a começar); senão o próprio stream ocupa e devolve.
+        """
+        with self._cond:
+            if not reservado:
+                self._clientes += 1
+            self.stats['conexoes'] += 1
+            cursor = self._cursor(ultimo_id)
+            perdidos = None if cursor is None else self._desde(cursor)
+            if perdidos is None:
+                self.stats['resets'] += 1
+                cursor = self._seq
+            elif ultimo_id:
+                self.stats['retomadas'] += 1
+            # id do cursor (e não o último): se a conexão cair no meio do
+            # replay, a próxima retoma de onde parou
+            atual = f"{self.epoca}-{cursor}"
+
+        try:
+            yield f"retry: {ConfigCanal.RETRY_MS}\n\n"
+            tipo_inicial = 'reset' if perdidos is None else 'conectado'
+            yield (f"id: {atual}\nevent: {tipo_inicial}\n"
+                   f"data: {json.dumps({'perdidos': len(perdidos or [])})}\n\n")
+
+            for delta in perdidos or []:
+                yield delta.to_sse(self.epoca)
+                cursor = delta.seq
+
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq > cursor, timeout=ConfigCanal.HEARTBEAT_S)
+                    novos = self._desde(cursor)
+                    atual_seq = self._seq
+
+                if novos is None:
+                    # Cliente lento: o buffer deu a volta antes de ele ler
+                    with self._cond:
+                        self.stats['resets'] += 1
+                    yield f"id: {self.epoca}-{atual_seq}\nevent: reset\ndata: {{}}\n\n"
+                    cursor = atual_seq
+                elif not novos:
+                    yield ": ping\n\n"
+                else:
+                    for delta in novos:
+                        yield delta.to_sse(self.epoca)
+                    cursor = novos[-1].seq
+        finally:
+            if not reservado:
+                self.liberar()
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do canal (para monitoramento)"""
+        with self._cond:
+            return {
+                'epoca': self.epoca,
+                'ultimo_id': f"{self.epoca}-{self._seq}",
+                'no_buffer': len(self._buffer),
+                'clientes': self._clientes,
+                **self.stats,
+                'timestamp': datetime.now().isoformat()
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+canal_eventos = CanalEventos()
+
+
+# ========================================
+# EVENTOS
+# ========================================
+
+def _ao_registrar_movimentacao(evento: MovimentacaoRegistrada):
+    canal_eventos.publicar('movimentacao', {
+        'item': evento.item,
+        'grupo': evento.grupo,
+        'tipo': evento.tipo,
+        'quantidade': evento.quantidade,
+        'saldo_anterior': evento.saldo_anterior,
+        'saldo': evento.saldo_novo,
+        'data': evento.data
+    })
+    canal_eventos.publicar_kpis()
+
+
+def _ao_criar_item(evento: ItemCriado):
+    canal_eventos.publicar('item_criado', {
+        'item': evento.item, 'grupo': evento.grupo, 'saldo': evento.saldo, 'data': evento.data
+    })
+
+
+def _ao_registrar_conferencia(evento: ConferenciaRegistrada):
+    canal_eventos.publicar('conferencia', {
+        'item': evento.item,
+        'saldo_sistema': evento.saldo_sistema,
+        'saldo_fisico': evento.saldo_fisico,
+        'divergencia': evento.divergencia,
+        'ajuste_registrado': evento.ajuste_registrado
+    })
+
+
+def _ao_alterar_nivel(evento: NivelAlertaAlterado):
+    canal_eventos.publicar('alerta', {
+        'item': evento.item,
+        'de': evento.nivel_anterior,
+        'para': evento.nivel_novo,
+        'dias_parado': evento.dias_parado
+    })
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_movimentacao, nome='canal_sse')
+barramento_eventos.inscrever(ItemCriado, _ao_criar_item, nome='canal_sse')
+barramento_eventos.inscrever(ConferenciaRegistrada, _ao_registrar_conferencia, nome='canal_sse')
+barramento_eventos.inscrever(NivelAlertaAlterado, _ao_alterar_nivel, nome='canal_sse')
+
+
+if __name__ == '__main__':
+    print("🧪 Testando CanalEventos...")
+
+    ConfigCanal.HEARTBEAT_S = 0.05
+    canal = CanalEventos()
+
+    # 1. Cliente novo só recebe o que vier depois de conectar
+    canal.publicar('movimentacao', {'item': 'ANTIGO'})
+    stream = canal.gerar()
+    inicio = [next(stream), next(stream)]
+    canal.publicar('movimentacao', {'item': 'AMARELO 1234', 'saldo': 120})
+    recebido = next(stream)
+    print(f"\n1. {inicio[1].splitlines()[1]} → {recebido.splitlines()[1]}")
+    assert 'conectado' in inicio[1] and 'AMARELO 1234' in recebido
+    ultimo_id = recebido.splitlines()[0][4:]
+    stream.close()
+
+    # 2. Reconexão com Last-Event-ID: só os perdidos
+    for i in range(3):
+        canal.publicar('alerta', {'item': f'ITEM {i}', 'de': 'normal', 'para': 'info'})
+    perdidos = canal.eventos_desde(ultimo_id)
+    print(f"2. Perdidos desde {ultimo_id}: {[d.dados['item'] for d in perdidos]}")
+    assert [d.dados['item'] for d in perdidos] == ['ITEM 0', 'ITEM 1', 'ITEM 2']
+
+    # 3. Id fora do buffer ou de outra execução → reset
+    for i in range(ConfigCanal.TAMANHO_BUFFER + 5):
+        canal.publicar('movimentacao', {'item': f'X{i}'})
+    assert canal.eventos_desde(ultimo_id) is None
+    assert canal.eventos_desde('outraepoca-1') is None
+    stream = canal.gerar(ultimo_id)
+    next(stream)
+    print(f"3. Id antigo → {next(stream).splitlines()[1]}")
+    print(f"   ping sem eventos: {next(stream).strip()}")
+    stream.close()
+
+    # 4. Vaga reservada antes do stream começar; liberar() devolve mesmo sem iterar
+    ConfigCanal.MAX_CLIENTES = 1
+    assert canal.reservar() and not canal.reservar()
+    canal.gerar(reservado=True)   # Response criada mas nunca iterada
+    canal.liberar()
+    assert canal.reservar()
+    canal.liberar()
+    print(f"4. Reserva atômica: {canal.obter_resumo()['clientes']} clientes após liberar")
+
+    print(f"\n   Resumo: {canal.obter_resumo()}")
+    print("\n✅ Todos os testes concluídos!")
@@ -11,6 +11,8 @@ from config import (
     NOME_PLANILHA, ARQUIVO_CREDENTIALS, CHAVE_GROQ,
     MODELO_GROQ, TEMPERATURA_CHAT, converter_para_numero
 )
+from cache_ia import cache_ia
+from contexto_chat import ServicoContextoChat
 
 class ChatbotEstoque:
     """Chatbot para consultas de estoque em linguagem natural"""
@@ -19,6 +21,7 @@ class ChatbotEstoque:
         self.df_estoque = None
         self.df_historico = None
         self.contexto_conversa = []
+        self.contexto_dados = ServicoContextoChat()
         self.client_groq = Groq(api_key=CHAVE_GROQ) if CHAVE_GROQ else None
 
     def conectar(self):
@@ -74,6 +77,8 @@ class ChatbotEstoque:
             axis=1
         )
 
+        self.contexto_dados.atualizar(self.df_estoque)
+
         print(f"✅ {len(self.df_estoque)} itens disponíveis para consulta")
 
     def buscar_item(self, termo):
@@ -135,59 +140,10 @@ class ChatbotEstoque:
 
     def construir_contexto_dados(self, pergunta):
         """Constrói contexto de dados relevante para a pergunta"""
-        contexto = f"""
-DADOS DO ESTOQUE MARFIM - {datetime.now().strftime('%d/%m/%Y %H:%M')}
-
-"""
-        # Estatísticas gerais
-        stats = self.obter_estatisticas_gerais()
-        contexto += f"""VISÃO GERAL:
-- Total de itens cadastrados: {stats['total_itens']}
-- Itens com saldo zero: {stats['itens_zerados']}
-- Itens com saldo negativo: {stats['itens_negativos']}
-- Itens críticos (< 15 dias cobertura): {stats['itens_criticos']}
-- Total em estoque: {stats['total_unidades']:,.0f} unidades
-- Consumo total últimos 30 dias: {stats['consumo_30d_total']:,.0f} unidades
-
-"""
-
-        # Se menciona item específico, buscar
-        palavras = pergunta.upper().split()
-        itens_mencionados = []
-        for palavra in palavras:
-            if len(palavra) > 3:
-                encontrados = self.buscar_item(palavra)
-                if not encontrados.empty and len(encontrados) <= 5:
-                    itens_mencionados.extend(encontrados['Item'].tolist())
-
-        if itens_mencionados:
-            contexto += "ITENS MENCIONADOS NA PERGUNTA:\n"
-            for item_nome in set(itens_mencionados[:5]):
-                item_data = self.df_estoque[self.df_estoque['Item'] == item_nome].iloc[0]
-                unidade = item_data.get('Unidade', 'UN')
-                contexto += f"""
-{item_nome}:
-  - Saldo atual: {item_data['Saldo']:.0f} {unidade}
-  - Unidade de medida: {unidade}
-  - Consumo 30d: {item_data['Consumo_30d']:.0f} {unidade}
-  - Cobertura: {item_data['Dias_Cobertura']:.0f} dias
-"""
-
-        # Top consumo
-        contexto += "\nTOP 5 MAIOR CONSUMO (30 dias):\n"
-        top_consumo = self.obter_top_consumo(5)
-        for _, row in top_consumo.iterrows():
-            unidade = row.get('Unidade', 'UN')
-            contexto += f"- {row['Item']}: consumo {row['Consumo_30d']:.0f} {unidade}, saldo {row['Saldo']:.0f} {unidade}\n"
-
-        # Críticos
-        contexto += "\nITENS MAIS CRÍTICOS:\n"
-        criticos = self.obter_itens_criticos(5)
-        for _, row in criticos.iterrows():
-            unidade = row.get('Unidade', 'UN')
-            contexto += f"- {row['Item']}: {row['Dias_Cobertura']:.0f} dias de cobertura, saldo {row['Saldo']:.0f} {unidade}\n"
-
-        return contexto
+        # Blocos fixos pré-calculados por snapshot; itens citados via índice de busca
+        if self.contexto_dados.versao is None:
+            self.contexto_dados.atualizar(self.df_estoque)
+        return self.contexto_dados.contexto_chatbot(pergunta)
 
     def processar_pergunta(self, pergunta):
         """Processa pergunta do usuário usando IA"""
@@ -231,15 +187,14 @@ Exemplos de unidades: KG (quilograma), MT (metro), UN (unidade), PC (peça), CX
         ]
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=mensagens,
-                temperature=TEMPERATURA_CHAT,
+            resposta = cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=mensagens,
+                temperatura=TEMPERATURA_CHAT,
                 max_tokens=1000
             )
 
-            resposta = completion.choices[0].message.content
-
             # Guardar no histórico
             self.contexto_conversa.append({"role": "user", "content": pergunta})
             self.contexto_conversa.append({"role": "assistant", "content": resposta})
@@ -5,12 +5,73 @@ Usa IA para categorizar itens automaticamente
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
+import numpy as np
+import os
+import re
+import json
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from groq import Groq
 from config import (
     NOME_PLANILHA, ARQUIVO_CREDENTIALS, CHAVE_GROQ,
     MODELO_GROQ, CATEGORIAS_ITEM, converter_para_numero
 )
+from cache_ia import cache_ia, ConfigCacheIA
+from gateway_ia import LimitadorTaxa, ConfigGatewayIA
+
+# Classificação em lote com IA
+ITENS_POR_LOTE_IA = 40          # Itens por prompt
+LOTES_PARALELOS_IA = 2          # Lotes simultâneos (sempre abaixo das vagas do gateway_ia)
+LOTES_POR_MINUTO_IA = 30        # Limite de requisições da API
+ARQUIVO_CATEGORIAS_IA = os.path.join(ConfigCacheIA.DIRETORIO_DISCO, 'categorias_itens.json')
+
+# Palavras-chave por categoria, em ordem de prioridade (primeira categoria encontrada vence)
+REGRAS_CATEGORIA = {
+    'TECIDO': ['TECIDO', 'MALHA', 'JEANS', 'SARJA', 'TRICOLINE', 'VISCOSE', 'ALGODAO', 'POLIESTER', 'LINHO'],
+    'LINHA': ['LINHA', 'FIO', 'COSTURA'],
+    'BOTAO': ['BOTAO', 'BOTÕES', 'BOTOES'],
+    'ZIPER': ['ZIPER', 'ZIPPER', 'ZÍPER'],
+    'ELASTICO': ['ELASTICO', 'ELÁSTICO', 'LASTEX'],
+    'FITA': ['FITA', 'VIÉS', 'VIES', 'CADARÇO', 'CADARCO'],
+    'ETIQUETA': ['ETIQUETA', 'TAG', 'LABEL'],
+    'ENTRETELA': ['ENTRETELA', 'INTERLINING'],
+    'QUIMICO': ['CORANTE', 'TINTA', 'SOLVENTE', 'AMACIANTE', 'BRANQUEADOR', 'QUIMICO'],
+    'EMBALAGEM': ['SACO', 'CAIXA', 'SACOLA', 'EMBALAGEM', 'PLASTICO', 'PAPEL'],
+    'AVIAMENTO': ['REBITE', 'ILHOS', 'COLCHETE', 'VELCRO', 'FIVELA', 'REGULADOR'],
+    'AGULHA': ['AGULHA', 'ALFINETE'],
+    'FORRO': ['FORRO', 'ENTREFORRO']
+}
+
+
+def _compilar_regras(regras):
+    """
+    Achata REGRAS_CATEGORIA numa lista única (palavra, categoria) em ordem de prioridade
+
+    A primeira palavra da lista presente no nome é a mesma que o laço
+    categoria → palavra encontraria; palavras repetidas ficam só na 1ª posição.
+    """
+    vistas = set()
+    palavras = []
+    for categoria, lista in regras.items():
+        for palavra in lista:
+            if palavra not in vistas:
+                vistas.add(palavra)
+                palavras.append((palavra, categoria))
+    return palavras
+
+
+_PALAVRAS_REGRAS = _compilar_regras(REGRAS_CATEGORIA)
+_CATEGORIAS_REGRAS = [categoria for _, categoria in _PALAVRAS_REGRAS] + ['OUTROS']
+
+
+def normalizar_nome_item(nome):
+    """Chave do cache de categorias: maiúsculas, sem acento, espaços simples"""
+    nome = unicodedata.normalize('NFKD', str(nome).upper())
+    nome = ''.join(c for c in nome if not unicodedata.combining(c))
+    return ' '.join(nome.split())
+
 
 class ClassificadorItens:
     """Classifica itens automaticamente usando IA"""
@@ -20,6 +81,11 @@ class ClassificadorItens:
         self.classificacoes = {}
         self.client_groq = Groq(api_key=CHAVE_GROQ) if CHAVE_GROQ else None
 
+        # Categorias já devolvidas pela IA, por nome normalizado (persistidas em disco)
+        self.categorias_ia = self._carregar_categorias_ia()
+        self._lock_categorias = threading.Lock()
+        self._limitador = LimitadorTaxa(LOTES_POR_MINUTO_IA)
+
     def conectar(self):
         """Conecta ao Google Sheets"""
         scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -46,34 +112,50 @@ class ClassificadorItens:
         """Classifica item baseado em regras simples (palavras-chave)"""
         nome = nome_item.upper()
 
-        regras = {
-            'TECIDO': ['TECIDO', 'MALHA', 'JEANS', 'SARJA', 'TRICOLINE', 'VISCOSE', 'ALGODAO', 'POLIESTER', 'LINHO'],
-            'LINHA': ['LINHA', 'FIO', 'COSTURA'],
-            'BOTAO': ['BOTAO', 'BOTÕES', 'BOTOES'],
-            'ZIPER': ['ZIPER', 'ZIPPER', 'ZÍPER'],
-            'ELASTICO': ['ELASTICO', 'ELÁSTICO', 'LASTEX'],
-            'FITA': ['FITA', 'VIÉS', 'VIES', 'CADARÇO', 'CADARCO'],
-            'ETIQUETA': ['ETIQUETA', 'TAG', 'LABEL'],
-            'ENTRETELA': ['ENTRETELA', 'INTERLINING'],
-            'QUIMICO': ['CORANTE', 'TINTA', 'SOLVENTE', 'AMACIANTE', 'BRANQUEADOR', 'QUIMICO'],
-            'EMBALAGEM': ['SACO', 'CAIXA', 'SACOLA', 'EMBALAGEM', 'PLASTICO', 'PAPEL'],
-            'AVIAMENTO': ['REBITE', 'ILHOS', 'COLCHETE', 'VELCRO', 'FIVELA', 'REGULADOR'],
-            'AGULHA': ['AGULHA', 'ALFINETE'],
-            'FORRO': ['FORRO', 'ENTREFORRO']
-        }
-
-        for categoria, palavras in regras.items():
-            for palavra in palavras:
-                if palavra in nome:
-                    return categoria
+        for palavra, categoria in _PALAVRAS_REGRAS:
+            if palavra in nome:
+                return categoria
 
         return 'OUTROS'
 
+    def classificar_serie_por_regras(self, nomes):
+        """
+        Classifica o catálogo inteiro de uma vez (mesmo resultado de classificar_por_regras)
+
+        Junta os nomes num único texto e procura cada palavra-chave uma vez
+        nele (busca de substring em C); as posições encontradas viram índices
+        de item via searchsorted. Percorrendo as palavras da menor para a
+        maior prioridade, a última atribuição é a de maior prioridade.
+
+        Returns:
+            Series de categorias com o mesmo índice de nomes
+        """
+        nomes = pd.Series(nomes)
+        maiusculas = [str(n).upper() for n in nomes]
+        texto = '\n'.join(maiusculas)
+
+        tamanhos = np.fromiter(map(len, maiusculas), dtype=np.int64, count=len(maiusculas)) + 1
+        inicios = np.cumsum(tamanhos) - tamanhos
+        prioridade = np.full(len(maiusculas), len(_PALAVRAS_REGRAS))
+
+        for k in range(len(_PALAVRAS_REGRAS) - 1, -1, -1):
+            palavra = _PALAVRAS_REGRAS[k][0]
+            if palavra not in texto:
+                continue
+            posicoes = np.fromiter((m.start() for m in re.finditer(re.escape(palavra), texto)), dtype=np.int64)
+            prioridade[np.searchsorted(inicios, posicoes, side='right') - 1] = k
+
+        return pd.Series([_CATEGORIAS_REGRAS[p] for p in prioridade], index=nomes.index, dtype=object)
+
     def classificar_com_ia(self, nome_item):
         """Classifica item usando IA para casos mais complexos"""
         if not self.client_groq:
             return self.classificar_por_regras(nome_item)
 
+        chave = normalizar_nome_item(nome_item)
+        if chave in self.categorias_ia:
+            return self.categorias_ia[chave]
+
         categorias_str = ", ".join(CATEGORIAS_ITEM)
 
         prompt = f"""
@@ -86,31 +168,147 @@ Responda APENAS com o nome da categoria, sem explicação.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            resposta = cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você classifica itens de estoque têxtil. Responda apenas com a categoria."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.1,
+                temperatura=0.1,
                 max_tokens=20
             )
 
-            categoria = completion.choices[0].message.content.strip().upper()
+            return self._validar_categoria(resposta)
 
-            # Validar se é categoria válida
-            if categoria in CATEGORIAS_ITEM:
-                return categoria
+        except Exception:
+            return self.classificar_por_regras(nome_item)
 
-            # Tentar encontrar categoria mais próxima
-            for cat in CATEGORIAS_ITEM:
-                if cat in categoria or categoria in cat:
-                    return cat
+    def _validar_categoria(self, resposta):
+        """Converte a resposta da IA em uma categoria de CATEGORIAS_ITEM"""
+        categoria = str(resposta).strip().upper()
 
-            return 'OUTROS'
+        # Validar se é categoria válida
+        if categoria in CATEGORIAS_ITEM:
+            return categoria
 
-        except Exception:
-            return self.classificar_por_regras(nome_item)
+        # Tentar encontrar categoria mais próxima
+        for cat in CATEGORIAS_ITEM:
+            if cat in categoria or categoria in cat:
+                return cat
+
+        return 'OUTROS'
+
+    def _carregar_categorias_ia(self):
+        """Lê o cache de categorias da IA (nome normalizado → categoria)"""
+        try:
+            with open(ARQUIVO_CATEGORIAS_IA, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ Cache de categorias ignorado: {e}")
+            return {}
+
+    def _salvar_categorias_ia(self):
+        """Grava o cache de categorias da IA"""
+        try:
+            os.makedirs(os.path.dirname(ARQUIVO_CATEGORIAS_IA), exist_ok=True)
+            temporario = ARQUIVO_CATEGORIAS_IA + '.tmp'
+            with self._lock_categorias:
+                dados = dict(self.categorias_ia)
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, ARQUIVO_CATEGORIAS_IA)
+        except Exception as e:
+            print(f"⚠️ Não foi possível salvar cache de categorias: {e}")
+
+    def classificar_lote_ia(self, nomes):
+        """
+        Classifica vários itens em uma única chamada (resposta em JSON)
+
+        Returns:
+            Dict nome → categoria só com os itens que a IA respondeu
+        """
+        categorias_str = ", ".join(CATEGORIAS_ITEM)
+        linhas = "\n".join(f"{i}. {nome}" for i, nome in enumerate(nomes, 1))
+
+        prompt = f"""
+Classifique cada item de indústria têxtil em UMA das categorias abaixo:
+Categorias: {categorias_str}
+
+Itens:
+{linhas}
+
+Responda APENAS com um JSON no formato {{"1": "CATEGORIA", "2": "CATEGORIA", ...}}, sem explicação.
+"""
+
+        self._limitador.aguardar()
+        resposta = cache_ia.completar(
+            self.client_groq,
+            modelo=MODELO_GROQ,
+            mensagens=[
+                {"role": "system", "content": "Você classifica itens de estoque têxtil. Responda apenas com JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperatura=0.1,
+            max_tokens=16 * len(nomes) + 50
+        )
+
+        bloco = re.search(r'\{.*\}', resposta, re.S)
+        dados = json.loads(bloco.group(0)) if bloco else {}
+
+        resultado = {}
+        for i, nome in enumerate(nomes, 1):
+            categoria = dados.get(str(i))
+            if categoria:
+                resultado[nome] = self._validar_categoria(categoria)
+        return resultado
+
+    def classificar_itens_ia(self, itens):
+        """
+        Classifica uma lista de itens com IA em lotes paralelos
+
+        No máximo LOTES_PARALELOS_IA lotes ao mesmo tempo, e sempre deixando
+        ao menos uma vaga do gateway_ia livre para o chat e as análises.
+
+        Só vão para a IA os nomes (normalizados) ainda sem categoria no cache;
+        itens renomeados têm nome novo e por isso são reenviados. Lotes que
+        falham caem em classificar_por_regras e não entram no cache.
+
+        Returns:
+            Dict item → categoria
+        """
+        if not self.client_groq:
+            return {item: self.classificar_por_regras(item) for item in itens}
+
+        chaves = {item: normalizar_nome_item(item) for item in itens}
+        unicos = {c for c in chaves.values() if c}
+        pendentes = sorted(c for c in unicos if c not in self.categorias_ia)
+        lotes = [pendentes[i:i + ITENS_POR_LOTE_IA] for i in range(0, len(pendentes), ITENS_POR_LOTE_IA)]
+
+        print(f"   🤖 {len(pendentes)} itens novos para a IA em {len(lotes)} lotes "
+              f"({len(unicos) - len(pendentes)} já no cache)")
+
+        def _processar(lote):
+            try:
+                return self.classificar_lote_ia(lote)
+            except Exception as e:
+                print(f"   ⚠️ Lote de {len(lote)} itens sem IA ({e}) - usando regras")
+                return {}
+
+        if lotes:
+            paralelos = max(1, min(LOTES_PARALELOS_IA, ConfigGatewayIA.MAX_CONCORRENTES - 1, len(lotes)))
+            with ThreadPoolExecutor(max_workers=paralelos) as executor:
+                for respondidos in executor.map(_processar, lotes):
+                    with self._lock_categorias:
+                        self.categorias_ia.update(respondidos)
+            self._salvar_categorias_ia()
+
+        return {
+            item: self.categorias_ia.get(chave) or self.classificar_por_regras(item)
+            for item, chave in chaves.items()
+        }
 
     def classificar_todos(self, usar_ia=False):
         """Classifica todos os itens"""
@@ -119,14 +317,16 @@ Responda APENAS com o nome da categoria, sem explicação.
 
         print(f"\n🏷️ Classificando itens (IA: {'Sim' if usar_ia else 'Não'})...")
 
-        for _, row in self.df_itens.iterrows():
+        if usar_ia:
+            categorias = self.classificar_itens_ia(self.df_itens['Item'].tolist())
+        else:
+            categorias = self.classificar_serie_por_regras(self.df_itens['Item'])
+
+        for idx, row in self.df_itens.iterrows():
             item = row['Item']
             grupo_atual = row.get('Grupo', '')
 
-            if usar_ia:
-                categoria = self.classificar_com_ia(item)
-            else:
-                categoria = self.classificar_por_regras(item)
+            categoria = categorias[item] if usar_ia else categorias[idx]
 
             self.classificacoes[item] = {
                 'item': item,
@@ -197,15 +397,15 @@ Use português brasileiro.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            return cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você é especialista em organização de estoques industriais."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperatura=0.3
             )
-            return completion.choices[0].message.content
         except Exception as e:
             return f"Erro: {e}"
 
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Contexto Pré-calculado do Chat - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Monta o contexto de dados do chat (/api/chat e ChatbotEstoque) uma vez
+por versão do snapshot do ÍNDICE:
+- 📊 Bloco de visão geral (totais, zerados, negativos, críticos)
+- 🔝 Top consumo e itens mais críticos
+- 🔎 Índice de busca: itens citados na pergunta viram busca de substring
+  num texto único com todos os nomes (sem str.contains no DataFrame)
+
+Montar o prompt de uma pergunta passa a custar milissegundos.
+
+Uso:
+    from contexto_chat import contexto_chat
+
+    contexto_chat.atualizar(df_idx)            # no-op se o snapshot não mudou
+    texto = contexto_chat.resumo_app()
+    texto = contexto_chat.contexto_chatbot("quanto tem de malha azul?")
+"""
+
+import re
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigContextoChat:
+    """Configurações do contexto do chat"""
+    VALIDADE_SNAPSHOT_S = 60      # /api/chat reaproveita o snapshot por até N segundos
+    MIN_LETRAS_PALAVRA = 4        # Palavras da pergunta usadas na busca de itens
+    MAX_ITENS_POR_PALAVRA = 5     # Palavra que acha mais itens que isso é genérica demais
+    MAX_ITENS_MENCIONADOS = 5
+    TOP_N = 5
+    COLUNAS_VERSAO = ['Item', 'Saldo', 'Consumo_30d', 'Dias_Cobertura']
+
+
+# ========================================
+# SERVIÇO
+# ========================================
+
+class ServicoContextoChat:
+    """
+    Guarda os blocos de contexto do snapshot atual do ÍNDICE
+
+    O snapshot é identificado pelo hash das colunas usadas no contexto;
+    enquanto ele não muda, atualizar() não recalcula nada.
+    """
+
+    def __init__(self):
+        self.versao: Optional[int] = None
+        self.atualizado_em: float = 0.0
+        self._lock = threading.RLock()
+
+        self._resumo_app = ''
+        self._bloco_geral = ''
+        self._bloco_top = ''
+        self._bloco_criticos = ''
+
+        # Índice de busca de itens
+        self._nomes: List[str] = []
+        self._texto_busca = ''
+        self._inicios = np.zeros(0, dtype=np.int64)
+        self._detalhe_item: Dict[str, str] = {}
+        self._memo_busca: Dict[str, List[str]] = {}
+
+        self.stats = {'recalculos': 0, 'reaproveitados': 0}
+
+    # ========================================
+    # SNAPSHOT
+    # ========================================
+
+    def atualizar(self, df_idx: pd.DataFrame) -> bool:
+        """
+        Sincroniza com o DataFrame do ÍNDICE (com Saldo, Consumo_30d e Dias_Cobertura)
+
+        Returns:
+            True se recalculou, False se o snapshot era o mesmo
+        """
+        colunas = [c for c in ConfigContextoChat.COLUNAS_VERSAO + ['Unidade'] if c in df_idx.columns]
+        versao = int(pd.util.hash_pandas_object(df_idx[colunas], index=False).sum()) ^ len(df_idx)
+
+        with self._lock:
+            self.atualizado_em = time.time()
+            if versao == self.versao:
+                self.stats['reaproveitados'] += 1
+                return False
+
+            t0 = time.time()
+            self._calcular(df_idx)
+            self.versao = versao
+            self.stats['recalculos'] += 1
+
+        logger.info(f"💬 Contexto do chat recalculado: {len(df_idx)} itens em {(time.time() - t0) * 1000:.0f}ms")
+        return True
+
+    def snapshot_recente(self) -> bool:
+        """True se há snapshot carregado há menos de VALIDADE_SNAPSHOT_S"""
+        return (self.versao is not None
+                and time.time() - self.atualizado_em < ConfigContextoChat.VALIDADE_SNAPSHOT_S)
+
+    def _calcular(self, df: pd.DataFrame):
+        """Pré-calcula todos os blocos de texto e o índice de busca"""
+        n = ConfigContextoChat.TOP_N
+        tem_unidade = 'Unidade' in df.columns
+        cobertura = df['Dias_Cobertura']
+
+        # /api/chat (app_final)
+        top_consumo = df.nlargest(n, 'Consumo_30d')
+        mais_criticos = df[cobertura < 999].nsmallest(n, 'Dias_Cobertura')
+        self._resumo_app = f"""
+Dados do estoque Marfim:
+- Total itens: {len(df)}
+- Críticos (<15 dias): {int((cobertura < 15).sum())}
+- Zerados: {int((df['Saldo'] == 0).sum())}
+- Negativos: {int((df['Saldo'] < 0).sum())}
+- Consumo 30d: {df['Consumo_30d'].sum():,.0f} unidades
+
+Top 5 maior consumo: {', '.join(top_consumo['Item'].tolist())}
+Top 5 mais críticos: {', '.join(mais_criticos['Item'].tolist())}
+"""
+
+        # ChatbotEstoque
+        self._bloco_geral = f"""VISÃO GERAL:
+- Total de itens cadastrados: {len(df)}
+- Itens com saldo zero: {int((df['Saldo'] == 0).sum())}
+- Itens com saldo negativo: {int((df['Saldo'] < 0).sum())}
+- Itens críticos (< 15 dias cobertura): {int(((cobertura < 15) & (cobertura < 999)).sum())}
+- Total em estoque: {df['Saldo'].sum():,.0f} unidades
+- Consumo total últimos 30 dias: {df['Consumo_30d'].sum():,.0f} unidades
+
+"""
+
+        unidades = df['Unidade'] if tem_unidade else pd.Series('UN', index=df.index)
+
+        linhas = ["\nTOP 5 MAIOR CONSUMO (30 dias):\n"]
+        for idx, row in top_consumo.iterrows():
+            unidade = unidades.loc[idx]
+            linhas.append(f"- {row['Item']}: consumo {row['Consumo_30d']:.0f} {unidade}, saldo {row['Saldo']:.0f} {unidade}\n")
+        self._bloco_top = ''.join(linhas)
+
+        criticos = df[(cobertura < 30) & (cobertura < 999)].nsmallest(n, 'Dias_Cobertura')
+        linhas = ["\nITENS MAIS CRÍTICOS:\n"]
+        for idx, row in criticos.iterrows():
+            unidade = unidades.loc[idx]
+            linhas.append(f"- {row['Item']}: {row['Dias_Cobertura']:.0f} dias de cobertura, saldo {row['Saldo']:.0f} {unidade}\n")
+        self._bloco_criticos = ''.join(linhas)
+
+        # Índice de busca: um texto com todos os nomes, separados por \n
+        nomes = df['Item'].tolist()
+        maiusculas = [n.upper() if isinstance(n, str) else '' for n in nomes]
+        tamanhos = np.fromiter(map(len, maiusculas), dtype=np.int64, count=len(maiusculas)) + 1
+        self._nomes = nomes
+        self._texto_busca = '\n'.join(maiusculas)
+        self._inicios = np.cumsum(tamanhos) - tamanhos
+        self._memo_busca = {}
+
+        # Detalhe de cada item (primeira linha com o nome)
+        detalhes = {}
+        for nome, saldo, consumo, dias, unidade in zip(
+            nomes, df['Saldo'], df['Consumo_30d'], cobertura, unidades
+        ):
+            if nome in detalhes:
+                continue
+            detalhes[nome] = f"""
+{nome}:
+  - Saldo atual: {saldo:.0f} {unidade}
+  - Unidade de medida: {unidade}
+  - Consumo 30d: {consumo:.0f} {unidade}
+  - Cobertura: {dias:.0f} dias
+"""
+        self._detalhe_item = detalhes
+
+    # ========================================
+    # BUSCA DE ITENS
+    # ========================================
+
+    def buscar_itens(self, termo: str) -> List[str]:
+        """Itens (uma entrada por linha do ÍNDICE) cujo nome contém o termo"""
+        termo = termo.upper()
+        with self._lock:
+            achados = self._memo_busca.get(termo)
+            if achados is not None:
+                return achados
+
+            if '\n' in termo or termo not in self._texto_busca:
+                achados = []
+            else:
+                posicoes = np.fromiter(
+                    (m.start() for m in re.finditer(re.escape(termo), self._texto_busca)),
+                    dtype=np.int64
+                )
+                linhas = np.unique(np.searchsorted(self._inicios, posicoes, side='right') - 1)
+                achados = [self._nomes[i] for i in linhas]
+
+            self._memo_busca[termo] = achados
+            return achados
+
+    def itens_mencionados(self, pergunta: str) -> List[str]:
+        """Itens citados na pergunta (palavras com 4+ letras que acham até 5 itens)"""
+        mencionados = []
+        for palavra in pergunta.upper().split():
+            if len(palavra) >= ConfigContextoChat.MIN_LETRAS_PALAVRA:
+                encontrados = self.buscar_itens(palavra)
+                if encontrados and len(encontrados) <= ConfigContextoChat.MAX_ITENS_POR_PALAVRA:
+                    mencionados.extend(encontrados)
+        return list(dict.fromkeys(mencionados[:ConfigContextoChat.MAX_ITENS_MENCIONADOS]))
+
+    # ========================================
+    # CONTEXTOS
+    # ========================================
+
+    def resumo_app(self) -> str:
+        """Bloco de dados usado por /api/chat"""
+        return self._resumo_app
+
+    def contexto_chatbot(self, pergunta: str) -> str:
+        """Contexto completo do ChatbotEstoque para a pergunta"""
+        contexto = f"""
+DADOS DO ESTOQUE MARFIM - {datetime.now().strftime('%d/%m/%Y %H:%M')}
+
+""" + self._bloco_geral
+
+        mencionados = self.itens_mencionados(pergunta)
+        if mencionados:
+            contexto += "ITENS MENCIONADOS NA PERGUNTA:\n"
+            contexto += ''.join(self._detalhe_item[nome] for nome in mencionados)
+
+        return contexto + self._bloco_top + self._bloco_criticos
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do serviço"""
+        return {
+            'versao': self.versao,
+            'itens': len(self._nomes),
+            'atualizado_ha_s': round(time.time() - self.atualizado_em, 1) if self.versao is not None else None,
+            'buscas_em_memoria': len(self._memo_busca),
+            **self.stats
+        }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+contexto_chat = ServicoContextoChat()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando ServicoContextoChat...")
+
+    df = pd.DataFrame({
+        'Item': ['MALHA AZUL 30/1', 'MALHA PRETA', 'LINHA 120 BRANCA', 'BOTAO 4 FUROS'],
+        'Saldo': [120.0, 0.0, -5.0, 900.0],
+        'Consumo_30d': [300.0, 45.0, 10.0, 0.0],
+        'Unidade': ['KG', 'KG', 'UN', 'UN']
+    })
+    df['Dias_Cobertura'] = np.where(df['Consumo_30d'] > 0, df['Saldo'] / (df['Consumo_30d'] / 30), 999)
+
+    print(f"   Recalculou: {contexto_chat.atualizar(df)} | de novo: {contexto_chat.atualizar(df)}")
+    print(f"   Busca 'MALHA': {contexto_chat.buscar_itens('malha')}")
+    print(contexto_chat.contexto_chatbot("Quanto temos de malha azul?"))
+    print(f"   Resumo: {contexto_chat.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
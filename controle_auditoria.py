@@ -30,6 +30,8 @@ from datetime import datetime, timedelta
 from enum import Enum
 from typing import Optional, Tuple, List, Dict, Any
 
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada, ConferenciaRegistrada
+
 logger = logging.getLogger(__name__)
 
 # ──────────────────────────────────────────────────────────────
@@ -476,3 +478,15 @@ def get_gerenciador_auditoria() -> GerenciadorAuditoria:
             if _gerenciador is None:
                 _gerenciador = GerenciadorAuditoria()
     return _gerenciador
+
+
+# ──────────────────────────────────────────────────────────────
+# Eventos: lançamento ou conferência com ATUALIZAÇÃO na OBS
+# ──────────────────────────────────────────────────────────────
+def _ao_registrar_lancamento(evento):
+    if evento.obs:
+        get_gerenciador_auditoria().notificar_novo_lancamento(evento.obs)
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_lancamento, nome='auditoria')
+barramento_eventos.inscrever(ConferenciaRegistrada, _ao_registrar_lancamento, nome='auditoria')
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cubo de Consumo - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Agregação diária única de entradas e saídas por item (item × dia):
+- 🧊 Matrizes NumPy densas de saídas, entradas e nº de movimentações
+- 🔄 Sincronização por snapshot: linhas novas da ESTOQUE estendem o cubo
+- 📅 Janelas (30/60/90 dias), séries diárias e pivôs mensais viram fatias
+
+Quem usa:
+- app_final.carregar_dados_completos (consumo 30/60/90 dias)
+- lista_compras_ia._calcular_metricas (consumo, última entrada, média de compra)
+- previsao_demanda (consumo por período e sazonalidade)
+- estoque_minimo (consumo diário e lead time)
+- detector_anomalias (sazonalidade quebrada)
+
+Quantidades negativas são ignoradas (só somam entradas/saídas positivas).
+Linhas sem data válida entram apenas nos totais por item.
+
+Todos os módulos convertem as datas da ESTOQUE com converter_datas (daqui),
+para que o mesmo snapshot gere sempre o mesmo cubo, venha de onde vier.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigCubo:
+    """Configurações do cubo de consumo"""
+    FOLGA_DIAS = 60              # Colunas extras alocadas ao crescer no tempo
+    FOLGA_ITENS = 64             # Linhas extras alocadas ao surgir item novo
+
+    # Formatos aceitos na coluna Data da ESTOQUE (na ordem de tentativa)
+    FORMATOS_DATA = (
+        '%d/%m/%Y %H:%M:%S',
+        '%d/%m/%Y',
+        '%d/%m/%Y %H:%M',
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d',
+        '%d-%m-%Y %H:%M:%S',
+        '%d-%m-%Y',
+    )
+
+
+def normalizar_item(nome: Any) -> str:
+    """Chave canônica do item (sem espaços nas pontas, maiúsculas)"""
+    return str(nome).strip().upper()
+
+
+def converter_datas(datas: pd.Series) -> pd.Series:
+    """
+    Coluna de datas da planilha → datetime (NaT para vazias/inválidas)
+
+    Cada célula é tentada nos ConfigCubo.FORMATOS_DATA, então uma coluna com
+    formatos misturados (com e sem hora, ISO) converte por inteiro. Coluna que
+    já é datetime volta como está.
+    """
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return datas
+    texto = datas.astype(str).str.strip()
+    resultado = pd.Series(pd.NaT, index=datas.index, dtype='datetime64[ns]')
+    for fmt in ConfigCubo.FORMATOS_DATA:
+        faltando = resultado.isna() & (texto != '')
+        if not faltando.any():
+            break
+        resultado[faltando] = pd.to_datetime(texto[faltando], format=fmt, errors='coerce')
+    return resultado
+
+
+# ========================================
+# CUBO ITEM × DIA
+# ========================================
+
+class CuboConsumo:
+    """
+    Matrizes item × dia montadas uma vez por snapshot da ESTOQUE
+
+    Uso:
+        cubo_consumo.sincronizar(df_historico)           # constrói ou estende
+        consumo_30d = cubo_consumo.serie_janela(30)       # Series por item
+        meses, soma = cubo_consumo.agregar_mensal()       # item × (ano, mês)
+        serie = cubo_consumo.serie_diaria('AMARELO 1234')
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.versao = 0
+        self.limpar()
+        logger.info("✅ CuboConsumo inicializado")
+
+    def limpar(self):
+        """
+        Descarta o cubo (a próxima sincronização reconstrói tudo)
+
+        A versão só cresce: quem guarda resultados por versão do cubo
+        (previsões, curva ABC) nunca confunde o cubo novo com um antigo.
+        """
+        with self._lock:
+            self._ids: Dict[str, int] = {}
+            self._itens: List[str] = []
+            self._dia0: Optional[np.datetime64] = None
+            self.n_dias = 0
+
+            # Matrizes com capacidade reservada; usar sempre [:n_itens, :n_dias]
+            self._saidas = np.zeros((0, 0))
+            self._entradas = np.zeros((0, 0))
+            self._movimentos = np.zeros((0, 0), dtype=np.int32)
+
+            # Totais por item (inclui linhas sem data)
+            self._linhas_item = np.zeros(0, dtype=np.int64)
+            self._linhas_saida_item = np.zeros(0, dtype=np.int64)
+            self._linhas_entrada_item = np.zeros(0, dtype=np.int64)
+            self._saidas_sem_data = np.zeros(0)
+            self._entradas_sem_data = np.zeros(0)
+
+            # Snapshot: hash de cada linha incorporada (item, dia, entrada, saída)
+            self.n_linhas = 0
+            self._hashes = np.zeros(0, dtype=np.uint64)
+            self.assinatura = 0
+            self.versao += 1
+            self.linhas_sem_data = 0
+            self.atualizado_em: Optional[str] = None
+
+            # Agregações derivadas, válidas só para a versão corrente
+            self._memo: Dict[Tuple, Any] = {}
+
+    # ========================================
+    # PROPRIEDADES
+    # ========================================
+
+    @property
+    def n_itens(self) -> int:
+        return len(self._itens)
+
+    @property
+    def itens(self) -> List[str]:
+        """Itens na ordem de primeira aparição"""
+        return list(self._itens)
+
+    @property
+    def vazio(self) -> bool:
+        return self.n_linhas == 0
+
+    @property
+    def saidas(self) -> np.ndarray:
+        """Matriz item × dia de saídas (visão, não copiar à toa)"""
+        return self._saidas[:self.n_itens, :self.n_dias]
+
+    @property
+    def entradas(self) -> np.ndarray:
+        """Matriz item × dia de entradas"""
+        return self._entradas[:self.n_itens, :self.n_dias]
+
+    @property
+    def movimentos(self) -> np.ndarray:
+        """Matriz item × dia com o nº de linhas (qualquer tipo)"""
+        return self._movimentos[:self.n_itens, :self.n_dias]
+
+    def _matriz(self, nome: str) -> np.ndarray:
+        if nome == 'saidas':
+            return self.saidas
+        if nome == 'entradas':
+            return self.entradas
+        if nome == 'movimentos':
+            return self.movimentos
+        raise ValueError(f"Matriz desconhecida: {nome}")
+
+    # ========================================
+    # CONSTRUÇÃO E EXTENSÃO
+    # ========================================
+
+    def sincronizar(self, df: pd.DataFrame, col_item: str = 'Item', col_data: str = 'Data',
+                    col_entrada: str = 'Entrada', col_saida: str = 'Saída') -> 'CuboConsumo':
+        """
+        Garante que o cubo reflete o DataFrame da ESTOQUE
+
+        Cada linha vira (item, dia, entrada, saída) normalizados e ganha um
+        hash. Hashes das linhas já incorporadas iguais → nada a fazer, ou só
+        estende com as linhas novas do fim (a planilha cresce por append).
+        Qualquer linha antiga editada, removida ou reordenada → reconstrói.
+
+        Args:
+            df: Histórico com Entrada/Saída e Data (datetime ou texto da planilha)
+        """
+        colunas = (col_item, col_data, col_entrada, col_saida)
+        with self._lock:
+            n = len(df)
+            if n == 0:
+                if not self.vazio:
+                    self.limpar()
+                return self
+
+            linhas = self._normalizar(df, colunas)
+            hashes = self._hash_linhas(linhas)
+
+            if self.n_linhas and n >= self.n_linhas and \
+                    np.array_equal(hashes[:self.n_linhas], self._hashes):
+                if n > self.n_linhas:
+                    self._incorporar(linhas.iloc[self.n_linhas:], hashes[self.n_linhas:])
+                return self
+
+            self.limpar()
+            self._incorporar(linhas, hashes)
+            logger.info(f"🧊 Cubo construído: {self.n_itens} itens × {self.n_dias} dias "
+                        f"({self.n_linhas} linhas, versão {self.versao})")
+            return self
+
+    def estender(self, df_novas: pd.DataFrame, col_item: str = 'Item', col_data: str = 'Data',
+                 col_entrada: str = 'Entrada', col_saida: str = 'Saída') -> 'CuboConsumo':
+        """Incorpora linhas novas (ex.: movimentação recém-gravada)"""
+        with self._lock:
+            if len(df_novas):
+                linhas = self._normalizar(df_novas, (col_item, col_data, col_entrada, col_saida))
+                self._incorporar(linhas, self._hash_linhas(linhas))
+            return self
+
+    @staticmethod
+    def _normalizar(df: pd.DataFrame, colunas) -> pd.DataFrame:
+        """Linhas da ESTOQUE no formato do cubo: item canônico, dia, entrada e saída"""
+        col_item, col_data, col_entrada, col_saida = colunas
+        n = len(df)
+
+        def numero(coluna):
+            if coluna not in df.columns:
+                return np.zeros(n)
+            return pd.to_numeric(df[coluna], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        if col_data in df.columns:
+            dias = converter_datas(df[col_data]).dt.normalize().to_numpy(dtype='datetime64[D]')
+        else:
+            dias = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+
+        return pd.DataFrame({
+            'item': df[col_item].astype(str).str.strip().str.upper().to_numpy(),
+            'dia': dias,
+            'entrada': numero(col_entrada),
+            'saida': numero(col_saida)
+        })
+
+    @staticmethod
+    def _hash_linhas(linhas: pd.DataFrame) -> np.ndarray:
+        """Hash por linha normalizada (detecta edição de qualquer linha antiga)"""
+        return pd.util.hash_pandas_object(linhas, index=False).to_numpy(dtype=np.uint64)
+
+    def _incorporar(self, linhas: pd.DataFrame, hashes: np.ndarray):
+        """Soma as linhas normalizadas nas matrizes (crescendo itens/dias se preciso)"""
+        chaves = linhas['item'].to_numpy()
+        saida = linhas['saida'].to_numpy()
+        entrada = linhas['entrada'].to_numpy()
+        dias = linhas['dia'].to_numpy(dtype='datetime64[D]')
+
+        # Ids dos itens (novos itens ganham linhas no fim, na ordem de aparição)
+        inversos, unicos = pd.factorize(chaves)
+        ids_unicos = np.empty(len(unicos), dtype=np.int64)
+        for i, chave in enumerate(unicos):
+            idx = self._ids.get(chave)
+            if idx is None:
+                idx = self._ids[chave] = len(self._itens)
+                self._itens.append(chave)
+            ids_unicos[i] = idx
+        ids = ids_unicos[inversos]
+        self._garantir_itens(self.n_itens)
+
+        saida_pos = np.where(saida > 0, saida, 0.0)
+        entrada_pos = np.where(entrada > 0, entrada, 0.0)
+
+        # Totais por item (com e sem data); vetores têm o tamanho da capacidade
+        n = self._saidas.shape[0]
+        self._linhas_item += np.bincount(ids, minlength=n)
+        self._linhas_saida_item += np.bincount(ids, weights=(saida > 0), minlength=n).astype(np.int64)
+        self._linhas_entrada_item += np.bincount(ids, weights=(entrada > 0), minlength=n).astype(np.int64)
+
+        com_data = ~np.isnat(dias)
+        sem_data = ~com_data
+        if sem_data.any():
+            self._saidas_sem_data += np.bincount(ids[sem_data], weights=saida_pos[sem_data], minlength=n)
+            self._entradas_sem_data += np.bincount(ids[sem_data], weights=entrada_pos[sem_data], minlength=n)
+            self.linhas_sem_data += int(sem_data.sum())
+
+        if com_data.any():
+            dias_validos = dias[com_data]
+            self._garantir_dias(dias_validos.min(), dias_validos.max())
+            col = (dias_validos - self._dia0).astype(np.int64)
+            lin = ids[com_data]
+
+            # Agrupa por célula (item, dia) e soma de uma vez só nas células tocadas
+            celulas, grupo = np.unique(lin * self._saidas.shape[1] + col, return_inverse=True)
+            self._saidas.reshape(-1)[celulas] += np.bincount(grupo, weights=saida_pos[com_data])
+            self._entradas.reshape(-1)[celulas] += np.bincount(grupo, weights=entrada_pos[com_data])
+            self._movimentos.reshape(-1)[celulas] += np.bincount(grupo).astype(np.int32)
+
+        # Assinatura do conteúdo: soma dos hashes ponderada pela posição
+        posicoes = np.arange(self.n_linhas + 1, self.n_linhas + len(linhas) + 1, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            self.assinatura = int((np.uint64(self.assinatura) + (hashes * posicoes).sum(dtype=np.uint64)))
+        self._hashes = np.concatenate([self._hashes, hashes])
+
+        self.n_linhas += len(linhas)
+        self.versao += 1
+        self.atualizado_em = datetime.now().isoformat()
+        self._memo.clear()
+
+    def _garantir_itens(self, n: int):
+        """Reserva linhas para n itens"""
+        cap = self._saidas.shape[0]
+        if n <= cap:
+            return
+        extra = n - cap + ConfigCubo.FOLGA_ITENS
+        largura = self._saidas.shape[1]
+        self._saidas = np.vstack([self._saidas, np.zeros((extra, largura))])
+        self._entradas = np.vstack([self._entradas, np.zeros((extra, largura))])
+        self._movimentos = np.vstack([self._movimentos, np.zeros((extra, largura), dtype=np.int32)])
+        for nome in ('_linhas_item', '_linhas_saida_item', '_linhas_entrada_item'):
+            setattr(self, nome, np.concatenate([getattr(self, nome), np.zeros(extra, dtype=np.int64)]))
+        self._saidas_sem_data = np.concatenate([self._saidas_sem_data, np.zeros(extra)])
+        self._entradas_sem_data = np.concatenate([self._entradas_sem_data, np.zeros(extra)])
+
+    def _garantir_dias(self, primeiro: np.datetime64, ultimo: np.datetime64):
+        """Reserva colunas para cobrir [primeiro, ultimo]"""
+        if self._dia0 is None:
+            self._dia0 = primeiro
+        antes = int((self._dia0 - primeiro).astype(np.int64)) if primeiro < self._dia0 else 0
+        n_dias = int((ultimo - self._dia0).astype(np.int64)) + 1 + antes
+        n_dias = max(n_dias, self.n_dias + antes)
+
+        cap = self._saidas.shape[1]
+        if antes == 0 and n_dias <= cap:
+            self.n_dias = n_dias
+            return
+
+        # Realoca (com folga no fim) e desloca se chegou data anterior ao início
+        nova_cap = max(n_dias + ConfigCubo.FOLGA_DIAS, cap + antes)
+        linhas = self._saidas.shape[0]
+        for nome, dtype in (('_saidas', float), ('_entradas', float), ('_movimentos', np.int32)):
+            nova = np.zeros((linhas, nova_cap), dtype=dtype)
+            antiga = getattr(self, nome)
+            nova[:, antes:antes + antiga.shape[1]] = antiga
+            setattr(self, nome, nova)
+        self._dia0 = self._dia0 - np.timedelta64(antes, 'D')
+        self.n_dias = n_dias
+
+    # ========================================
+    # CONSULTAS
+    # ========================================
+
+    def indice(self, item: str) -> Optional[int]:
+        """Linha do item no cubo (None se nunca movimentado)"""
+        return self._ids.get(normalizar_item(item))
+
+    def indices(self, itens) -> np.ndarray:
+        """Linhas de vários itens (-1 para desconhecidos)"""
+        chaves = pd.Series(itens, dtype=object).astype(str).str.strip().str.upper()
+        return chaves.map(self._ids).fillna(-1).to_numpy(dtype=np.int64)
+
+    def dia(self, coluna: int) -> datetime:
+        """Data de uma coluna do cubo"""
+        return pd.Timestamp(self._dia0 + np.timedelta64(int(coluna), 'D')).to_pydatetime()
+
+    def datas(self) -> pd.DatetimeIndex:
+        """Datas de todas as colunas"""
+        if self._dia0 is None:
+            return pd.DatetimeIndex([])
+        return pd.DatetimeIndex(self._dia0 + np.arange(self.n_dias).astype('timedelta64[D]'))
+
+    def coluna_inicio(self, dias: int, hoje: Optional[datetime] = None) -> int:
+        """
+        Primeira coluna da janela dos últimos `dias` dias (hoje incluso)
+
+        Equivale ao filtro Data >= agora - dias sobre datas sem hora.
+        """
+        if self._dia0 is None:
+            return 0
+        hoje = np.datetime64((hoje or datetime.now()).date(), 'D')
+        inicio = hoje - np.timedelta64(dias - 1, 'D')
+        return int(np.clip((inicio - self._dia0).astype(np.int64), 0, self.n_dias))
+
+    def soma_janela(self, dias: int, matriz: str = 'saidas', hoje: Optional[datetime] = None) -> np.ndarray:
+        """Soma por item nos últimos `dias` dias (datas futuras também contam)"""
+        with self._lock:
+            inicio = self.coluna_inicio(dias, hoje)
+            return self._matriz(matriz)[:, inicio:].sum(axis=1)
+
+    def serie_janela(self, dias: int, matriz: str = 'saidas', hoje: Optional[datetime] = None) -> pd.Series:
+        """soma_janela indexada pelo nome canônico do item"""
+        with self._lock:
+            return pd.Series(self.soma_janela(dias, matriz, hoje), index=self.itens)
+
+    def total(self, matriz: str = 'saidas') -> np.ndarray:
+        """Total por item, incluindo linhas sem data"""
+        with self._lock:
+            n = self.n_itens
+            if matriz == 'saidas':
+                return self.saidas.sum(axis=1) + self._saidas_sem_data[:n]
+            if matriz == 'entradas':
+                return self.entradas.sum(axis=1) + self._entradas_sem_data[:n]
+            raise ValueError(f"Matriz desconhecida: {matriz}")
+
+    def contagem_linhas(self, tipo: Optional[str] = None) -> np.ndarray:
+        """Nº de linhas por item: todas, só com saída (>0) ou só com entrada (>0)"""
+        n = self.n_itens
+        if tipo == 'saidas':
+            return self._linhas_saida_item[:n].copy()
+        if tipo == 'entradas':
+            return self._linhas_entrada_item[:n].copy()
+        return self._linhas_item[:n].copy()
+
+    def serie_diaria(self, item: str, matriz: str = 'saidas') -> pd.Series:
+        """Série diária completa de um item (vazia se não existe)"""
+        with self._lock:
+            idx = self.indice(item)
+            if idx is None:
+                return pd.Series(dtype=float)
+            return pd.Series(self._matriz(matriz)[idx].copy(), index=self.datas())
+
+    def ultimo_dia(self, matriz: str = 'entradas') -> np.ndarray:
+        """Última coluna com valor > 0 por item (-1 se nenhuma)"""
+        with self._lock:
+            if self.n_dias == 0:
+                return np.full(self.n_itens, -1)
+            positivo = self._matriz(matriz) > 0
+            ultima = self.n_dias - 1 - np.argmax(positivo[:, ::-1], axis=1)
+            return np.where(positivo.any(axis=1), ultima, -1)
+
+    def ultima_data(self, matriz: str = 'entradas') -> np.ndarray:
+        """Data (datetime64) do último dia com valor > 0 por item (NaT se nenhum)"""
+        with self._lock:
+            ultimo = self.ultimo_dia(matriz)
+            datas = np.full(len(ultimo), np.datetime64('NaT'), dtype='datetime64[ns]')
+            tem = ultimo >= 0
+            datas[tem] = (self._dia0 + ultimo[tem].astype('timedelta64[D]')).astype('datetime64[ns]')
+            return datas
+
+    def agregar_mensal(self, matriz: str = 'saidas') -> Tuple[List[Tuple[int, int]], np.ndarray]:
+        """
+        Pivô item × (ano, mês), calculado uma vez por versão do cubo
+
+        Returns:
+            (lista de (ano, mês) em ordem cronológica, matriz item × mês)
+        """
+        with self._lock:
+            chave = ('mensal', matriz)
+            if chave not in self._memo:
+                if self.n_dias == 0:
+                    self._memo[chave] = ([], np.zeros((self.n_itens, 0)))
+                else:
+                    datas = self.datas()
+                    chave_mes = datas.year * 12 + datas.month - 1
+                    inicios = np.flatnonzero(np.r_[True, np.diff(chave_mes) != 0])
+                    meses = [(int(datas.year[i]), int(datas.month[i])) for i in inicios]
+                    self._memo[chave] = (meses, np.add.reduceat(self._matriz(matriz), inicios, axis=1))
+            return self._memo[chave]
+
+    def memo(self, chave: Tuple, calcular) -> Any:
+        """
+        Resultado derivado guardado até a próxima mudança do cubo
+
+        calcular() roda (com o cubo travado) só na primeira chamada de cada
+        chave por versão. Ex.: curva_abc.MotorCurvaABC.
+        """
+        with self._lock:
+            if chave not in self._memo:
+                self._memo[chave] = calcular()
+            return self._memo[chave]
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Resumo do cubo"""
+        with self._lock:
+            datas = self.datas()
+            bytes_usados = self._saidas.nbytes + self._entradas.nbytes + self._movimentos.nbytes
+            return {
+                'versao': self.versao,
+                'itens': self.n_itens,
+                'dias': self.n_dias,
+                'linhas': self.n_linhas,
+                'assinatura': format(self.assinatura, '016x'),
+                'linhas_sem_data': self.linhas_sem_data,
+                'primeiro_dia': datas[0].strftime('%d/%m/%Y') if len(datas) else None,
+                'ultimo_dia': datas[-1].strftime('%d/%m/%Y') if len(datas) else None,
+                'memoria_mb': round(bytes_usados / 1024 / 1024, 2),
+                'atualizado_em': self.atualizado_em
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+cubo_consumo = CuboConsumo()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando CuboConsumo...")
+
+    hoje = datetime.now()
+    df = pd.DataFrame({
+        'Item': ['TESTE', 'TESTE', 'OUTRO', 'TESTE'],
+        'Data': pd.to_datetime([hoje - pd.Timedelta(days=d) for d in (100, 20, 5, 1)]).normalize(),
+        'Entrada': [500, 0, 50, 0],
+        'Saída': [0, 30, 0, 12],
+    })
+    cubo_consumo.sincronizar(df)
+    print(f"   Consumo 30d: {cubo_consumo.serie_janela(30).to_dict()}")
+
+    novas = pd.DataFrame({'Item': ['TESTE'], 'Data': [pd.Timestamp(hoje).normalize()],
+                          'Entrada': [0], 'Saída': [8]})
+    cubo_consumo.sincronizar(pd.concat([df, novas], ignore_index=True))
+    print(f"   Após append: {cubo_consumo.serie_janela(30).to_dict()}")
+
+    # Linha antiga editada (mesmo nº de linhas) e datas em texto com/sem hora
+    editado = pd.concat([df, novas], ignore_index=True)
+    editado.loc[1, 'Saída'] = 10
+    editado['Data'] = editado['Data'].dt.strftime('%d/%m/%Y %H:%M:%S')
+    editado.loc[0, 'Data'] = editado.loc[0, 'Data'][:10]
+    versao = cubo_consumo.versao
+    cubo_consumo.sincronizar(editado)
+    print(f"   Após edição: {cubo_consumo.serie_janela(30).to_dict()}")
+    assert cubo_consumo.serie_janela(30)['TESTE'] == 30 and cubo_consumo.versao > versao
+    versao = cubo_consumo.versao
+    cubo_consumo.sincronizar(editado.rename(columns={'Data': '_data'}), col_data='_data')
+    assert cubo_consumo.versao == versao, "mesmo conteúdo não deve reconstruir"
+    print(f"   Resumo: {cubo_consumo.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
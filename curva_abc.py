@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor Único da Curva ABC/XYZ - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Uma implementação só da Curva ABC para o app e para os relatórios:
+- 🔤 ABC: valores ordenados do maior para o menor + soma acumulada em
+  NumPy → A (até 80%), B (até 95%), C (restante)
+- 📉 XYZ (opcional): variabilidade da demanda pelo coeficiente de variação
+  das somas semanais dentro da janela → X (estável), Y (variável), Z (errática)
+- 🧊 Fonte: cubo item × dia (cubo_consumo), que cobre o histórico inteiro
+  da ESTOQUE - qualquer janela é só uma fatia das colunas
+- ⚡ Cache por (janela, métrica, dia) dentro da versão do cubo: o resultado é
+  reaproveitado até chegar linha nova na ESTOQUE
+
+Quem usa:
+- app_final.api_curva_abc (/api/relatorio/curva-abc, consumo por janela)
+- relatorios.GerenciadorRelatorios.calcular_curva_abc (volume entradas + saídas)
+
+Uso:
+    from curva_abc import motor_abc
+
+    curva = motor_abc.calcular(dias=30, metrica='saidas', xyz=True)
+    curva[curva['Classe'] == 'A'].head(10)
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cubo_consumo import CuboConsumo, cubo_consumo
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigCurvaABC:
+    """Configurações da Curva ABC/XYZ"""
+    LIMITE_CLASSE_A = 80.0       # % acumulado para classe A
+    LIMITE_CLASSE_B = 95.0       # % acumulado para classe B (C = restante)
+
+    LIMITE_CLASSE_X = 0.5        # CV até 0.5 → demanda estável
+    LIMITE_CLASSE_Y = 1.0        # CV até 1.0 → variável (acima → Z, errática)
+    DIAS_POR_BALDE_XYZ = 7       # Variabilidade medida sobre somas semanais
+    MIN_BALDES_XYZ = 4           # Menos semanas que isso → sem classe XYZ
+
+    METRICAS = ('saidas', 'entradas', 'volume')
+
+
+# ========================================
+# NÚCLEO VETORIZADO
+# ========================================
+
+def classificar_abc(
+    valores: np.ndarray,
+    limite_a: float = ConfigCurvaABC.LIMITE_CLASSE_A,
+    limite_b: float = ConfigCurvaABC.LIMITE_CLASSE_B
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Curva ABC de um vetor de valores (um por item)
+
+    Returns:
+        (ordem, percentual, acumulado, classes) - ordem são as posições em
+        valores do maior para o menor; os outros vetores seguem essa ordem
+    """
+    valores = np.asarray(valores, dtype=float)
+    ordem = np.argsort(-valores, kind='stable')
+    ordenados = valores[ordem]
+    total = ordenados.sum()
+
+    if total <= 0:
+        zeros = np.zeros(len(ordem))
+        return ordem, zeros, zeros, np.full(len(ordem), 'C')
+
+    percentual = ordenados / total * 100
+    acumulado = np.cumsum(percentual)
+    classes = np.select([acumulado <= limite_a, acumulado <= limite_b], ['A', 'B'], default='C')
+    return ordem, percentual, acumulado, classes
+
+
+def classificar_xyz(
+    baldes: np.ndarray,
+    limite_x: float = ConfigCurvaABC.LIMITE_CLASSE_X,
+    limite_y: float = ConfigCurvaABC.LIMITE_CLASSE_Y
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Classe XYZ a partir da matriz item × período (ex.: somas semanais)
+
+    Returns:
+        (cv, classes) - CV = desvio padrão / média; itens sem demanda ficam Z
+    """
+    media = baldes.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cv = np.where(media > 0, baldes.std(axis=1) / media, np.inf)
+    classes = np.select([cv <= limite_x, cv <= limite_y], ['X', 'Y'], default='Z')
+    return cv, classes
+
+
+# ========================================
+# MOTOR (CUBO + CACHE)
+# ========================================
+
+class MotorCurvaABC:
+    """
+    Curva ABC/XYZ sobre o histórico inteiro do cubo de consumo
+
+    O resultado de cada (janela, métrica, xyz, dia) fica guardado no próprio
+    cubo e vale até a próxima sincronização que trouxer linhas novas.
+    """
+
+    def __init__(self, cubo: Optional[CuboConsumo] = None):
+        self.cubo = cubo or cubo_consumo
+        self._lock = threading.Lock()
+        self.stats = {'calculos': 0, 'reaproveitados': 0}
+
+    def calcular(
+        self,
+        dias: Optional[int] = None,
+        metrica: str = 'saidas',
+        xyz: bool = False,
+        hoje: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Curva ABC (e XYZ) dos itens com valor > 0 na janela
+
+        Args:
+            dias: Últimos N dias (hoje incluso); None = histórico inteiro
+            metrica: 'saidas' (consumo), 'entradas' ou 'volume' (entradas + saídas)
+            xyz: Calcula também CV e Classe_XYZ
+            hoje: Referência da janela (padrão: agora)
+
+        Returns:
+            DataFrame (somente leitura, é o objeto do cache) ordenado por Valor
+            decrescente: Item, Valor, Percentual, Acumulado, Classe, Entradas,
+            Saidas, Movimentacoes [, CV, Classe_XYZ]
+        """
+        if metrica not in ConfigCurvaABC.METRICAS:
+            raise ValueError(f"Métrica inválida: {metrica}. Use: {', '.join(ConfigCurvaABC.METRICAS)}")
+        if dias is not None and dias <= 0:
+            dias = None
+
+        hoje = hoje or datetime.now()
+        chave = ('curva_abc', dias, metrica, bool(xyz), hoje.date())
+        calculado = []
+
+        def calcular():
+            calculado.append(True)
+            return self._calcular(dias, metrica, xyz, hoje)
+
+        resultado = self.cubo.memo(chave, calcular)
+        with self._lock:
+            self.stats['calculos' if calculado else 'reaproveitados'] += 1
+        return resultado
+
+    def _calcular(self, dias: Optional[int], metrica: str, xyz: bool, hoje: datetime) -> pd.DataFrame:
+        cubo = self.cubo
+        t0 = datetime.now()
+
+        # Sem datas válidas a janela vira o histórico inteiro (mesma regra do app)
+        if dias is None or cubo.n_dias == 0:
+            inicio = 0
+            saidas = cubo.total('saidas')
+            entradas = cubo.total('entradas')
+            movimentacoes = cubo.contagem_linhas()
+        else:
+            inicio = cubo.coluna_inicio(dias, hoje)
+            saidas = cubo.saidas[:, inicio:].sum(axis=1)
+            entradas = cubo.entradas[:, inicio:].sum(axis=1)
+            movimentacoes = cubo.movimentos[:, inicio:].sum(axis=1)
+
+        valores = {'saidas': saidas, 'entradas': entradas, 'volume': entradas + saidas}[metrica]
+        positivos = np.flatnonzero(valores > 0)
+
+        ordem, percentual, acumulado, classes = classificar_abc(valores[positivos])
+        linhas = positivos[ordem]
+        itens = np.array(cubo.itens, dtype=object)
+
+        curva = pd.DataFrame({
+            'Item': itens[linhas],
+            'Valor': valores[linhas],
+            'Percentual': percentual,
+            'Acumulado': acumulado,
+            'Classe': classes,
+            'Entradas': entradas[linhas],
+            'Saidas': saidas[linhas],
+            'Movimentacoes': np.asarray(movimentacoes)[linhas].astype(np.int64)
+        })
+
+        if xyz:
+            curva['CV'], curva['Classe_XYZ'] = self._xyz(linhas, metrica, inicio)
+
+        logger.info(f"🔤 Curva ABC ({metrica}, {dias or 'todo o'} {'dias' if dias else 'histórico'}): "
+                    f"{len(curva)} itens em {(datetime.now() - t0).total_seconds() * 1000:.0f}ms")
+        return curva
+
+    def _xyz(self, linhas: np.ndarray, metrica: str, inicio: int) -> Tuple[np.ndarray, np.ndarray]:
+        """CV e classe XYZ das somas semanais (semanas contadas a partir do fim da janela)"""
+        cubo = self.cubo
+        if metrica == 'volume':
+            matriz = cubo.saidas[linhas, inicio:] + cubo.entradas[linhas, inicio:]
+        else:
+            matriz = (cubo.saidas if metrica == 'saidas' else cubo.entradas)[linhas, inicio:]
+
+        largura = ConfigCurvaABC.DIAS_POR_BALDE_XYZ
+        n_baldes = matriz.shape[1] // largura
+        if n_baldes < ConfigCurvaABC.MIN_BALDES_XYZ:
+            return np.full(len(linhas), np.nan), np.full(len(linhas), None, dtype=object)
+
+        # Descarta os dias mais antigos que não fecham uma semana inteira
+        semanas = matriz[:, matriz.shape[1] - n_baldes * largura:]
+        baldes = semanas.reshape(len(linhas), n_baldes, largura).sum(axis=2)
+        return classificar_xyz(baldes)
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do motor"""
+        return {
+            'versao_cubo': self.cubo.versao,
+            **self.stats
+        }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+motor_abc = MotorCurvaABC()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando MotorCurvaABC...")
+
+    hoje = datetime.now()
+    rnd = np.random.default_rng(3)
+    linhas = []
+    for i in range(40):
+        for d in range(0, 120, 1 + i % 5):
+            linhas.append({
+                'Item': f'ITEM {i:02d}',
+                'Data': pd.Timestamp(hoje).normalize() - pd.Timedelta(days=d),
+                'Entrada': float(rnd.integers(0, 3)) * 10,
+                'Saída': float(rnd.integers(0, 50)) * (i + 1) / 10
+            })
+    cubo = CuboConsumo().sincronizar(pd.DataFrame(linhas))
+    motor = MotorCurvaABC(cubo)
+
+    curva = motor.calcular(dias=30, xyz=True, hoje=hoje)
+    print(curva.head(8).to_string(index=False))
+    print(f"   Classes: {curva['Classe'].value_counts().to_dict()} | XYZ: {curva['Classe_XYZ'].value_counts().to_dict()}")
+
+    # Conferência com a implementação antiga do app (pandas + apply)
+    df = pd.DataFrame(linhas)
+    df = df[df['Data'] >= pd.Timestamp(hoje).normalize() - pd.Timedelta(days=29)]
+    antigo = df.groupby('Item')['Saída'].sum()
+    antigo = antigo[antigo > 0].sort_values(ascending=False)
+    acumulado = (antigo / antigo.sum() * 100).cumsum()
+    classes = acumulado.apply(lambda x: 'A' if x <= 80 else ('B' if x <= 95 else 'C'))
+    novo = curva.set_index('Item')['Classe']
+    print(f"   {'✅' if (classes == novo.reindex(classes.index)).all() else '❌'} Mesmas classes que o cálculo antigo")
+
+    motor.calcular(dias=30, xyz=True, hoje=hoje)
+    print(f"   Resumo: {motor.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
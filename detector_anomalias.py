@@ -12,6 +12,8 @@ from config import (
     NOME_PLANILHA, ARQUIVO_CREDENTIALS, CHAVE_GROQ,
     MODELO_GROQ, converter_para_numero
 )
+from cubo_consumo import cubo_consumo, converter_datas
+from cache_ia import cache_ia
 
 class DetectorAnomalias:
     """Detecta anomalias no padrão de consumo usando estatísticas e IA"""
@@ -41,9 +43,7 @@ class DetectorAnomalias:
         for col in ['Entrada', 'Saída', 'Saldo']:
             self.df_historico[col] = self.df_historico[col].apply(converter_para_numero)
 
-        self.df_historico['Data'] = pd.to_datetime(
-            self.df_historico['Data'], format='%d/%m/%Y', errors='coerce'
-        )
+        self.df_historico['Data'] = converter_datas(self.df_historico['Data'])
 
         print(f"✅ {len(self.df_historico)} movimentações carregadas")
         return self.df_historico
@@ -171,25 +171,37 @@ class DetectorAnomalias:
 
     def detectar_sazonalidade_quebrada(self, item_nome):
         """Detecta quebra no padrão sazonal de consumo"""
-        df_item = self.df_historico[
-            (self.df_historico['Item'].str.upper() == item_nome.upper()) &
-            (self.df_historico['Saída'] > 0)
-        ].copy()
-
-        if len(df_item) < 30:  # Precisa de histórico
+        cubo = self._cubo()
+        idx = cubo.indice(item_nome)
+        if idx is None:
             return []
 
-        df_item['mes'] = df_item['Data'].dt.month
-        df_item['ano'] = df_item['Data'].dt.year
+        return self._sazonalidade_cubo(cubo, [idx], [item_nome])
 
-        # Consumo mensal
-        consumo_mensal = df_item.groupby(['ano', 'mes'])['Saída'].sum().reset_index()
+    def _cubo(self):
+        """Cubo item × dia do snapshot atual (reconstruído/estendido se mudou)"""
+        return cubo_consumo.sincronizar(self.df_historico)
 
-        if len(consumo_mensal) < 6:
+    def _sazonalidade_cubo(self, cubo, linhas, nomes):
+        """
+        Quebra de padrão sazonal dos últimos 3 meses para linhas do cubo
+
+        Só contam meses com saída; a média histórica de cada mês do ano é a
+        média desses meses. Exige 30 saídas e 6 meses com saída por item.
+        """
+        linhas = np.asarray(linhas, dtype=int)
+        meses, soma = cubo.agregar_mensal('saidas')
+        soma = soma[linhas]
+        presentes = soma > 0
+
+        elegiveis = (cubo.contagem_linhas('saidas')[linhas] >= 30) & (presentes.sum(axis=1) >= 6)
+        if not elegiveis.any():
             return []
 
-        # Calcular média histórica por mês
-        media_por_mes = consumo_mensal.groupby('mes')['Saída'].mean()
+        nomes = [nomes[i] for i in np.flatnonzero(elegiveis)]
+        soma, presentes = soma[elegiveis], presentes[elegiveis]
+        posicao = {m: i for i, m in enumerate(meses)}
+        mes_do_ano = np.array([m for _, m in meses], dtype=int)
 
         anomalias = []
         ano_atual = datetime.now().year
@@ -203,58 +215,165 @@ class DetectorAnomalias:
                 mes += 12
                 ano -= 1
 
-            consumo_mes = consumo_mensal[
-                (consumo_mensal['ano'] == ano) &
-                (consumo_mensal['mes'] == mes)
-            ]['Saída'].sum()
-
-            media_historica = media_por_mes.get(mes, 0)
+            if (ano, mes) in posicao:
+                consumo_mes = soma[:, posicao[(ano, mes)]]
+            else:
+                consumo_mes = np.zeros(len(nomes))
 
-            if media_historica > 0:
+            do_mes = presentes & (mes_do_ano == mes)
+            n_meses = do_mes.sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                media_historica = np.where(n_meses > 0, np.where(do_mes, soma, 0.0).sum(axis=1) / n_meses, 0.0)
                 variacao = (consumo_mes - media_historica) / media_historica
 
-                if abs(variacao) > 0.5:  # Variação > 50%
-                    tipo = "CONSUMO_ACIMA_SAZONAL" if variacao > 0 else "CONSUMO_ABAIXO_SAZONAL"
-                    anomalias.append({
-                        'item': item_nome,
-                        'tipo': tipo,
-                        'data': datetime(ano, mes, 1),
-                        'valor': consumo_mes,
-                        'media_historica': media_historica,
-                        'variacao_percentual': variacao * 100,
-                        'descricao': f"Consumo {variacao*100:+.0f}% vs média histórica do mês"
-                    })
+            for j in np.flatnonzero((media_historica > 0) & (np.abs(variacao) > 0.5)):  # Variação > 50%
+                tipo = "CONSUMO_ACIMA_SAZONAL" if variacao[j] > 0 else "CONSUMO_ABAIXO_SAZONAL"
+                anomalias.append({
+                    'item': nomes[j],
+                    'tipo': tipo,
+                    'data': datetime(ano, mes, 1),
+                    'valor': consumo_mes[j],
+                    'media_historica': media_historica[j],
+                    'variacao_percentual': variacao[j] * 100,
+                    'descricao': f"Consumo {variacao[j]*100:+.0f}% vs média histórica do mês"
+                })
 
         return anomalias
 
-    def analisar_todos_itens(self, limite=50):
-        """Analisa todos os itens e retorna anomalias encontradas"""
+    def analisar_todos_itens(self, limite=None):
+        """
+        Analisa todos os itens e retorna anomalias encontradas
+
+        Motor vetorizado: agrupa o histórico uma única vez pelo item
+        canônico (maiúsculas) e aplica as mesmas regras dos detectores
+        por item para o catálogo inteiro, sem refiltrar o DataFrame.
+
+        Args:
+            limite: Restringe aos N primeiros itens (None = todos)
+        """
         if self.df_historico is None:
             self.carregar_historico()
 
         print("\n🔍 Analisando anomalias em todos os itens...")
 
-        itens_unicos = self.df_historico['Item'].unique()
-        todas_anomalias = []
+        df = self.df_historico
+        chave = df['Item'].str.upper()
+
+        if limite:
+            primeiros = chave.drop_duplicates().iloc[:limite]
+            filtro = chave.isin(primeiros)
+            df, chave = df[filtro], chave[filtro]
 
-        for item in itens_unicos[:limite]:
-            # Detectar diferentes tipos de anomalias
-            anomalias_consumo = self.detectar_consumo_atipico(item)
-            anomalias_entrada = self.detectar_picos_entrada(item)
-            anomalias_padrao = self.detectar_padroes_suspeitos(item)
-            anomalias_sazonal = self.detectar_sazonalidade_quebrada(item)
+        # Nome exibido: primeira grafia encontrada do item
+        nomes = df['Item'].groupby(chave, sort=False).first()
 
-            todas_anomalias.extend(anomalias_consumo)
-            todas_anomalias.extend(anomalias_entrada)
-            todas_anomalias.extend(anomalias_padrao)
-            todas_anomalias.extend(anomalias_sazonal)
+        todas_anomalias = []
+        todas_anomalias.extend(self._zscore_vetorizado(
+            df, chave, nomes, 'Saída', 5, 'CONSUMO_ALTO', 'CONSUMO_BAIXO', com_obs=True
+        ))
+        todas_anomalias.extend(self._zscore_vetorizado(
+            df, chave, nomes, 'Entrada', 3, 'ENTRADA_ALTA', 'ENTRADA_BAIXA'
+        ))
+        todas_anomalias.extend(self._padroes_vetorizado(df, chave, nomes))
+        todas_anomalias.extend(self._sazonalidade_vetorizada(nomes))
 
         # Ordenar por data (mais recentes primeiro)
         todas_anomalias.sort(key=lambda x: x.get('data', datetime.min) if pd.notna(x.get('data')) else datetime.min, reverse=True)
 
+        print(f"✅ {len(todas_anomalias)} anomalias em {len(nomes)} itens")
+
         self.anomalias = todas_anomalias
         return todas_anomalias
 
+    def _zscore_vetorizado(self, df, chave, nomes, coluna, minimo, tipo_alto, tipo_baixo,
+                           limiar_zscore=2.5, com_obs=False):
+        """Z-score por item via groupby().transform (equivale a detectar_consumo_atipico/picos_entrada)"""
+        mask = df[coluna] > 0
+        valores = df.loc[mask, coluna]
+        grupos = valores.groupby(chave[mask], sort=False)
+
+        n = grupos.transform('size')
+        media = grupos.transform('mean')
+        desvio = grupos.transform('std', ddof=0)
+
+        zscore = ((valores - media) / desvio.where(desvio > 0)).fillna(0)
+        selecionados = (n >= minimo) & (zscore.abs() > limiar_zscore)
+
+        sub = df.loc[mask][selecionados]
+        anomalias = []
+        for idx, row in zip(sub.index, sub.to_dict('records')):
+            z = zscore[idx]
+            anomalia = {
+                'item': nomes[chave[idx]],
+                'tipo': tipo_alto if z > 0 else tipo_baixo,
+                'data': row['Data'],
+                'valor': row[coluna],
+                'zscore': z,
+                'media_normal': media[idx],
+            }
+            if com_obs:
+                anomalia['desvio'] = abs(row[coluna] - media[idx])
+                anomalia['obs'] = row.get('Obs', '')
+            anomalia['nf'] = row.get('NF', '')
+            anomalias.append(anomalia)
+
+        return anomalias
+
+    def _padroes_vetorizado(self, df, chave, nomes):
+        """Valores repetidos, múltiplas saídas/dia e saldo negativo (equivale a detectar_padroes_suspeitos)"""
+        anomalias = []
+
+        # Só itens com 5+ movimentações
+        elegivel = chave.map(chave.value_counts()) >= 5
+        saidas = elegivel & (df['Saída'] > 0)
+
+        # Mesmo valor de saída 5+ vezes → value_counts em (item, valor)
+        repetidos = df.loc[saidas, 'Saída'].groupby(chave[saidas], sort=False).value_counts()
+        agora = datetime.now()
+        for (item, valor), count in repetidos[repetidos >= 5].items():
+            anomalias.append({
+                'item': nomes[item],
+                'tipo': 'VALOR_REPETIDO',
+                'data': agora,
+                'valor': valor,
+                'ocorrencias': count,
+                'descricao': f"Saída de {valor:.0f} un ocorreu {count}x - possível padrão ou erro"
+            })
+
+        # 3+ saídas no mesmo dia → groupby (item, data)
+        por_dia = df.loc[saidas].groupby([chave[saidas], df.loc[saidas, 'Data'].dt.date], sort=False).size()
+        for (item, dia), count in por_dia[por_dia >= 3].items():
+            anomalias.append({
+                'item': nomes[item],
+                'tipo': 'MULTIPLAS_SAIDAS_DIA',
+                'data': pd.Timestamp(dia),
+                'valor': count,
+                'descricao': f"{count} saídas no mesmo dia - verificar"
+            })
+
+        # Saldo negativo
+        negativos = df[elegivel & (df['Saldo'] < 0)]
+        for item, data, saldo in zip(chave[negativos.index], negativos['Data'], negativos['Saldo']):
+            anomalias.append({
+                'item': nomes[item],
+                'tipo': 'SALDO_NEGATIVO',
+                'data': data,
+                'valor': saldo,
+                'descricao': f"Saldo ficou negativo: {saldo:.0f}"
+            })
+
+        return anomalias
+
+    def _sazonalidade_vetorizada(self, nomes):
+        """Quebra de padrão sazonal dos últimos 3 meses para todos os itens (via cubo)"""
+        cubo = self._cubo()
+        chaves = sorted(nomes.index)
+        linhas = cubo.indices(chaves)
+        validos = linhas >= 0
+        return self._sazonalidade_cubo(
+            cubo, linhas[validos], [nomes[c] for c, v in zip(chaves, validos) if v]
+        )
+
     def gerar_relatorio_anomalias(self, item_nome=None):
         """Gera relatório de anomalias com análise IA"""
         if item_nome:
@@ -305,15 +424,15 @@ Use português brasileiro e seja objetivo.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            return cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você é um auditor de estoque especializado em detectar fraudes e erros operacionais."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperatura=0.3
             )
-            return completion.choices[0].message.content
         except Exception as e:
             return f"Erro IA: {e}\n\n" + self._formatar_anomalias_texto(anomalias)
 
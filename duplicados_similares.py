@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detecção de Itens Similares (Quase Duplicados) - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Substitui a comparação de todos os pares (O(n²), limitada aos primeiros
+500 itens) do gestor.analisar_duplicados_indice por um pipeline que cobre
+o catálogo inteiro:
+
+1. 🧱 Blocking por tamanho: nomes ordenados por tamanho; cada bloco de
+   mesmo tamanho só é comparado com a janela de tamanhos compatíveis com
+   o limite (e com diferença ≤ 5, regra do gestor)
+2. 🔎 Candidatos: cada nome vira um vetor de contagem de caracteres; o
+   teto de similaridade 2·Σmin(contagens)/(len a + len b) - o mesmo do
+   quick_ratio() do SequenceMatcher - é calculado em NumPy para o bloco
+   inteiro contra a janela de uma vez
+3. ✅ Verificação: ratio() do SequenceMatcher só nos candidatos, repartida
+   num pool de processos quando há muitos
+
+O filtro é exato: ratio() nunca passa desse teto, então nenhum par que o
+gestor reportaria é descartado - o resultado é o mesmo da comparação par
+a par, só que sem o limite de 500 itens.
+
+Uso:
+    from duplicados_similares import encontrar_similares
+
+    for i, j, sim in encontrar_similares(nomes_normalizados, limite=0.85):
+        print(nomes_normalizados[i], nomes_normalizados[j], sim)
+"""
+
+import os
+import re
+import math
+import time
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigSimilares:
+    """Configurações da detecção de similares"""
+    LIMITE_PADRAO = 0.85              # Mesmo SIMILARIDADE_DUPLICADO do gestor
+    DIFERENCA_MAX_TAMANHO = 5         # Pares com tamanhos mais distantes são ignorados
+    MIN_PARES_PARALELO = 20000        # Abaixo disso verifica no próprio processo
+    PARES_POR_LOTE = 5000             # Pares por tarefa do pool
+    CELULAS_POR_PASSO = 4_000_000     # Tamanho da matriz temporária do filtro (linhas × janela × caracteres)
+    MAX_PROCESSOS = max(1, min(8, os.cpu_count() or 1))
+
+
+def limpar_nome(texto: str) -> str:
+    """Mesma limpeza de gestor.similaridade (minúsculas, espaços simples)"""
+    return re.sub(r'\s+', ' ', str(texto).lower().strip())
+
+
+# ========================================
+# GERAÇÃO DE CANDIDATOS
+# ========================================
+
+def _contagens(limpos: Sequence[str]) -> np.ndarray:
+    """Matriz nomes × caracteres com a contagem de cada caractere"""
+    alfabeto = {c: k for k, c in enumerate(sorted(set(''.join(limpos))))}
+    tipo = np.uint8 if max(map(len, limpos), default=0) < 256 else np.uint16
+    contagens = np.zeros((len(limpos), max(1, len(alfabeto))), dtype=tipo)
+    for i, texto in enumerate(limpos):
+        for c, n in Counter(texto).items():
+            contagens[i, alfabeto[c]] = n
+    return contagens
+
+
+def gerar_candidatos(
+    nomes: Sequence[str],
+    limite: float = ConfigSimilares.LIMITE_PADRAO,
+    diferenca_max: int = ConfigSimilares.DIFERENCA_MAX_TAMANHO
+) -> Dict[int, List[int]]:
+    """
+    Pares que podem ter ratio ≥ limite, agrupados pelo segundo nome
+
+    Args:
+        nomes: Nomes normalizados (a diferença de tamanho usa estes)
+        limite: Similaridade mínima
+        diferenca_max: Diferença máxima de tamanho entre os nomes
+
+    Returns:
+        {j: [i, ...]} com i < j (índices em nomes)
+    """
+    limpos = [limpar_nome(n) for n in nomes]
+    n = len(limpos)
+    tamanho = np.fromiter(map(len, limpos), dtype=np.int64, count=n)
+    tamanho_bruto = np.fromiter(map(len, nomes), dtype=np.int64, count=n)
+    contagens = _contagens(limpos)
+
+    validos = np.flatnonzero(tamanho > 0)
+    ordem = validos[np.argsort(tamanho[validos], kind='stable')]
+    tamanho_ordem = tamanho[ordem]
+
+    # Com ratio ≥ limite, o nome menor tem ao menos alfa·len do maior
+    alfa = limite / (2 - limite)
+
+    # Blocos de nomes com o mesmo tamanho (na ordem por tamanho)
+    inicios = np.flatnonzero(np.r_[True, tamanho_ordem[1:] != tamanho_ordem[:-1]])
+    fins = np.r_[inicios[1:], len(ordem)]
+
+    candidatos: Dict[int, List[int]] = defaultdict(list)
+    for a, b in zip(inicios.tolist(), fins.tolist()):
+        lx = int(tamanho_ordem[a])
+        w0 = int(np.searchsorted(tamanho_ordem, math.ceil(alfa * lx - 1e-9), side='left'))
+        janela = ordem[w0:b]
+        contagens_janela = contagens[janela].astype(np.int16)
+        exigido = np.ceil(limite * (lx + tamanho[janela]) / 2 - 1e-9)
+        posicao_janela = np.arange(w0, b)
+
+        # Linhas do bloco por vez, limitando a matriz temporária
+        passo = max(1, ConfigSimilares.CELULAS_POR_PASSO // (len(janela) * contagens.shape[1]))
+        for k in range(a, b, passo):
+            xs = ordem[k:min(k + passo, b)]
+            comum = np.minimum(contagens[xs][:, None, :], contagens_janela[None, :, :]).sum(axis=2)
+            ok = comum >= exigido[None, :]
+            ok &= np.abs(tamanho_bruto[xs][:, None] - tamanho_bruto[janela][None, :]) <= diferenca_max
+            # Cada par uma vez só: o outro nome vem antes na ordem por tamanho
+            ok &= posicao_janela[None, :] < np.arange(k, k + len(xs))[:, None]
+
+            li, lj = np.nonzero(ok)
+            for x, y in zip(xs[li].tolist(), janela[lj].tolist()):
+                candidatos[max(x, y)].append(min(x, y))
+
+    return candidatos
+
+
+# ========================================
+# VERIFICAÇÃO
+# ========================================
+
+_LIMPOS: List[str] = []
+_LIMITE: float = ConfigSimilares.LIMITE_PADRAO
+
+
+def _iniciar_worker(limpos: List[str], limite: float):
+    global _LIMPOS, _LIMITE
+    _LIMPOS = limpos
+    _LIMITE = limite
+
+
+def _verificar_lote(grupos: List[Tuple[int, List[int]]]) -> List[Tuple[int, int, float]]:
+    """Calcula o ratio dos pares e devolve os que ficam em [limite, 1.0)"""
+    aprovados = []
+    matcher = SequenceMatcher(None)
+    for j, lista in grupos:
+        matcher.set_seq2(_LIMPOS[j])          # b é a parte cara: indexada uma vez
+        for i in sorted(lista):
+            matcher.set_seq1(_LIMPOS[i])
+            sim = matcher.ratio()
+            if _LIMITE <= sim < 1.0:
+                aprovados.append((i, j, sim))
+    return aprovados
+
+
+def _contexto_processos():
+    # fork evita reimportar o script principal (gestor conecta no Sheets ao importar)
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def encontrar_similares(
+    nomes: Sequence[str],
+    limite: float = ConfigSimilares.LIMITE_PADRAO,
+    diferenca_max: int = ConfigSimilares.DIFERENCA_MAX_TAMANHO,
+    processos: Optional[int] = None
+) -> List[Tuple[int, int, float]]:
+    """
+    Pares de nomes com limite ≤ ratio < 1.0 (mesma regra do gestor)
+
+    Args:
+        nomes: Nomes normalizados e únicos
+        limite: Similaridade mínima (SequenceMatcher.ratio)
+        diferenca_max: Diferença máxima de tamanho
+        processos: Tamanho do pool (padrão: ConfigSimilares.MAX_PROCESSOS; 1 = sem pool)
+
+    Returns:
+        Lista de (i, j, similaridade) com i < j, ordenada por j e i
+    """
+    global _LIMPOS, _LIMITE
+
+    candidatos = gerar_candidatos(nomes, limite, diferenca_max)
+    grupos = sorted(candidatos.items())
+    total_pares = sum(len(lista) for _, lista in grupos)
+    limpos = [limpar_nome(n) for n in nomes]
+    processos = processos or ConfigSimilares.MAX_PROCESSOS
+
+    if processos <= 1 or total_pares < ConfigSimilares.MIN_PARES_PARALELO:
+        _iniciar_worker(limpos, limite)
+        return _verificar_lote(grupos)
+
+    # Lotes de grupos com ~PARES_POR_LOTE pares cada
+    lotes, atual, pares_atual = [], [], 0
+    for grupo in grupos:
+        atual.append(grupo)
+        pares_atual += len(grupo[1])
+        if pares_atual >= ConfigSimilares.PARES_POR_LOTE:
+            lotes.append(atual)
+            atual, pares_atual = [], 0
+    if atual:
+        lotes.append(atual)
+
+    resultado = []
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=_contexto_processos(),
+        initializer=_iniciar_worker,
+        initargs=(limpos, limite)
+    ) as executor:
+        for aprovados in executor.map(_verificar_lote, lotes):
+            resultado.extend(aprovados)
+    return resultado
+
+
+if __name__ == '__main__':
+    import random
+
+    print("🧪 Testando detecção de similares...")
+
+    rnd = random.Random(7)
+    palavras = ['malha', 'linha', 'fio', 'tecido', 'azul', 'preto', 'branco', 'viscose',
+                'algodao', 'poliester', 'elastano', 'ribana', 'moletom', '30/1', '24/1']
+    nomes = set()
+    while len(nomes) < 600:
+        nome = ' '.join(rnd.sample(palavras, rnd.randint(2, 4))) + f' {rnd.randint(1, 300)}'
+        if rnd.random() < 0.2:
+            pos = rnd.randrange(len(nome))
+            nome = nome[:pos] + nome[pos + 1:]
+        nomes.add(nome)
+    nomes = sorted(nomes)
+
+    inicio = time.perf_counter()
+    esperado = set()
+    for i in range(len(nomes)):
+        for j in range(i + 1, len(nomes)):
+            if abs(len(nomes[i]) - len(nomes[j])) > 5:
+                continue
+            sim = SequenceMatcher(None, limpar_nome(nomes[i]), limpar_nome(nomes[j])).ratio()
+            if 0.85 <= sim < 1.0:
+                esperado.add((i, j))
+    t_pares = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    achados = {(i, j) for i, j, _ in encontrar_similares(nomes, 0.85, processos=1)}
+    t_novo = time.perf_counter() - inicio
+
+    print(f"   Todos os pares: {len(esperado)} similares em {t_pares:.2f}s")
+    print(f"   Blocking + verificação: {len(achados)} similares em {t_novo:.2f}s")
+    print(f"   {'✅' if achados == esperado else '❌'} Mesmo resultado: {achados == esperado}")
+
+    print("\n✅ Testes concluídos!")
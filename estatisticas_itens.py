@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estatísticas Incrementais por Item - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Estatísticas de cada item atualizadas a cada movimentação (O(1)):
+- 📐 Média e desvio padrão das quantidades (algoritmo de Welford)
+- 📉 Taxa de consumo diária suavizada (EWMA)
+- 🔁 Buffer circular com as últimas N movimentações
+
+Quem usa:
+- ia_avancada.validar_movimentacao / detectar_anomalias (z-score)
+- ia_avancada.prever_saldo_futuro (média diária e tendência)
+- otimizacoes.BatchValidator (validação em lote sem reler histórico)
+
+Alimentado por historico_otimizado (adicionar_registro e bootstrap).
+"""
+
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigEstatisticas:
+    """Configurações das estatísticas incrementais"""
+    ALFA_EWMA = 0.3              # Peso do dia mais recente na taxa diária
+    TAMANHO_BUFFER = 10          # Últimas N movimentações por item
+    MIN_DIAS_TAXA = 3            # Dias fechados para confiar na EWMA
+
+
+# ========================================
+# ESTATÍSTICAS DE UM ITEM
+# ========================================
+
+@dataclass
+class EstatisticasItem:
+    """Estatísticas acumuladas de um item"""
+    item: str
+
+    # Welford — todas as movimentações (quantidade absoluta)
+    n: int = 0
+    media: float = 0.0
+    m2: float = 0.0
+
+    # Welford — só saídas
+    n_saidas: int = 0
+    media_saidas: float = 0.0
+    m2_saidas: float = 0.0
+
+    # EWMA de consumo diário (saídas agregadas por dia)
+    taxa_diaria_ewma: float = 0.0
+    dias_fechados: int = 0
+    dia_atual: Optional[datetime] = None
+    consumo_dia_atual: float = 0.0
+
+    # Buffer circular: (tipo, quantidade)
+    ultimas: deque = field(
+        default_factory=lambda: deque(maxlen=ConfigEstatisticas.TAMANHO_BUFFER)
+    )
+
+    ultima_movimentacao: Optional[str] = None
+
+    def adicionar(self, tipo: str, quantidade: float, data: Optional[str] = None):
+        """
+        Incorpora uma movimentação
+
+        Args:
+            tipo: ENTRADA ou SAIDA
+            quantidade: Quantidade movimentada
+            data: Data DD/MM/YYYY (padrão: hoje)
+        """
+        quantidade = abs(float(quantidade))
+        tipo = 'SAIDA' if ('SAIDA' in tipo.upper() or 'SAÍDA' in tipo.upper()) else 'ENTRADA'
+
+        # Welford geral
+        self.n += 1
+        delta = quantidade - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (quantidade - self.media)
+
+        if tipo == 'SAIDA':
+            # Welford saídas
+            self.n_saidas += 1
+            delta = quantidade - self.media_saidas
+            self.media_saidas += delta / self.n_saidas
+            self.m2_saidas += delta * (quantidade - self.media_saidas)
+
+            self._acumular_consumo(quantidade, data)
+
+        self.ultimas.append((tipo, quantidade))
+        self.ultima_movimentacao = data or datetime.now().strftime('%d/%m/%Y')
+
+    def _acumular_consumo(self, quantidade: float, data: Optional[str]):
+        """Soma saída ao dia corrente; ao virar o dia, fecha o anterior na EWMA"""
+        try:
+            dia = datetime.strptime(data, '%d/%m/%Y') if data else datetime.now()
+        except ValueError:
+            dia = datetime.now()
+        dia = dia.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        if self.dia_atual is None:
+            self.dia_atual = dia
+        elif dia > self.dia_atual:
+            alfa = ConfigEstatisticas.ALFA_EWMA
+            if self.dias_fechados == 0:
+                self.taxa_diaria_ewma = self.consumo_dia_atual
+            else:
+                self.taxa_diaria_ewma = alfa * self.consumo_dia_atual + (1 - alfa) * self.taxa_diaria_ewma
+
+            # Dias sem saída entre o dia fechado e o novo contam como consumo zero
+            dias_vazios = (dia - self.dia_atual).days - 1
+            if dias_vazios > 0:
+                self.taxa_diaria_ewma *= (1 - alfa) ** dias_vazios
+
+            self.dias_fechados += 1 + max(dias_vazios, 0)
+            self.dia_atual = dia
+            self.consumo_dia_atual = 0.0
+        # Datas antigas (fora de ordem) caem no dia corrente
+
+        self.consumo_dia_atual += quantidade
+
+    @property
+    def desvio(self) -> float:
+        """Desvio padrão amostral das quantidades"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def desvio_saidas(self) -> float:
+        """Desvio padrão amostral das saídas"""
+        return math.sqrt(self.m2_saidas / (self.n_saidas - 1)) if self.n_saidas > 1 else 0.0
+
+    def ultimos_tipos(self, n: int) -> List[str]:
+        """Tipos das últimas N movimentações (mais recente primeiro)"""
+        return [t for t, _ in list(self.ultimas)[-n:]][::-1]
+
+    def saidas_recentes(self) -> List[float]:
+        """Quantidades de saída no buffer (ordem cronológica)"""
+        return [q for t, q in self.ultimas if t == 'SAIDA']
+
+    def taxa_diaria(self, hoje: Optional[datetime] = None) -> Optional[float]:
+        """
+        Taxa de consumo diária (EWMA) projetada até hoje
+
+        Fecha o dia corrente e desconta os dias sem saída até ontem sem
+        alterar o estado. Retorna None se ainda há poucos dias observados.
+        """
+        if self.dia_atual is None:
+            return None
+
+        hoje = (hoje or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        alfa = ConfigEstatisticas.ALFA_EWMA
+        taxa = self.taxa_diaria_ewma
+        dias = self.dias_fechados
+
+        if hoje > self.dia_atual:
+            if dias == 0:
+                taxa = self.consumo_dia_atual
+            else:
+                taxa = alfa * self.consumo_dia_atual + (1 - alfa) * taxa
+            dias_vazios = (hoje - self.dia_atual).days - 1
+            taxa *= (1 - alfa) ** dias_vazios
+            dias += 1 + dias_vazios
+
+        if dias >= ConfigEstatisticas.MIN_DIAS_TAXA:
+            return taxa
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        taxa = self.taxa_diaria()
+        return {
+            'item': self.item,
+            'total_movimentacoes': self.n,
+            'media': round(self.media, 4),
+            'desvio': round(self.desvio, 4),
+            'total_saidas': self.n_saidas,
+            'media_saidas': round(self.media_saidas, 4),
+            'desvio_saidas': round(self.desvio_saidas, 4),
+            'taxa_diaria_ewma': round(taxa, 4) if taxa is not None else None,
+            'dias_observados': self.dias_fechados,
+            'ultimas': [{'tipo': t, 'quantidade': q} for t, q in self.ultimas],
+            'ultima_movimentacao': self.ultima_movimentacao
+        }
+
+
+# ========================================
+# GERENCIADOR
+# ========================================
+
+class GerenciadorEstatisticas:
+    """
+    Armazena EstatisticasItem por item (chave em maiúsculas)
+
+    Uso:
+        estatisticas_itens.registrar('AMARELO 1234', 'SAIDA', 100, '13/02/2026')
+        stats = estatisticas_itens.obter('AMARELO 1234')
+        stats.media, stats.desvio, stats.taxa_diaria()
+    """
+
+    def __init__(self):
+        self._itens: Dict[str, EstatisticasItem] = {}
+        self._lock = threading.RLock()
+        self._total_registrado = 0
+        logger.info("✅ GerenciadorEstatisticas inicializado")
+
+    def registrar(self, item: str, tipo: str, quantidade: float, data: Optional[str] = None):
+        """Atualiza as estatísticas do item com uma movimentação"""
+        chave = item.strip().upper()
+        if not chave:
+            return
+
+        with self._lock:
+            stats = self._itens.get(chave)
+            if stats is None:
+                stats = self._itens[chave] = EstatisticasItem(item=chave)
+            stats.adicionar(tipo, quantidade, data)
+            self._total_registrado += 1
+
+    def reconstruir(self, movimentacoes: Iterable[Tuple[str, str, float, Optional[str]]]) -> int:
+        """
+        Refaz todas as estatísticas a partir de movimentações em ordem cronológica
+
+        Args:
+            movimentacoes: Iterável de (item, tipo, quantidade, data)
+
+        Returns:
+            Número de movimentações processadas
+        """
+        with self._lock:
+            self._itens.clear()
+            self._total_registrado = 0
+            for item, tipo, quantidade, data in movimentacoes:
+                self.registrar(item, tipo, quantidade, data)
+            total = self._total_registrado
+
+        logger.info(f"📐 Estatísticas reconstruídas: {len(self._itens)} itens, {total} movimentações")
+        return total
+
+    def obter(self, item: str) -> Optional[EstatisticasItem]:
+        """Retorna estatísticas do item (ou None se nunca movimentado)"""
+        return self._itens.get(item.strip().upper())
+
+    def limpar(self):
+        """Remove todas as estatísticas"""
+        with self._lock:
+            self._itens.clear()
+            self._total_registrado = 0
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Resumo do armazenamento"""
+        with self._lock:
+            return {
+                'total_itens': len(self._itens),
+                'total_registrado': self._total_registrado,
+                'alfa_ewma': ConfigEstatisticas.ALFA_EWMA,
+                'tamanho_buffer': ConfigEstatisticas.TAMANHO_BUFFER
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+estatisticas_itens = GerenciadorEstatisticas()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando GerenciadorEstatisticas...")
+
+    for dia in range(1, 11):
+        estatisticas_itens.registrar('TESTE', 'SAIDA', 10 + dia, f'{dia:02d}/02/2026')
+    estatisticas_itens.registrar('TESTE', 'ENTRADA', 200, '11/02/2026')
+
+    stats = estatisticas_itens.obter('TESTE')
+    print(f"   Média: {stats.media:.2f} | Desvio: {stats.desvio:.2f}")
+    print(f"   Taxa diária (EWMA): {stats.taxa_diaria():.2f}")
+    print(f"   Últimos tipos: {stats.ultimos_tipos(3)}")
+
+    print("\n✅ Testes concluídos!")
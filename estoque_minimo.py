@@ -12,6 +12,8 @@ from config import (
     NOME_PLANILHA, ARQUIVO_CREDENTIALS, CHAVE_GROQ,
     MODELO_GROQ, converter_para_numero
 )
+from cubo_consumo import cubo_consumo, converter_datas
+from cache_ia import cache_ia
 
 class CalculadorEstoqueMinimo:
     """Calcula estoque mínimo, ponto de pedido e estoque de segurança"""
@@ -41,9 +43,7 @@ class CalculadorEstoqueMinimo:
         for col in ['Entrada', 'Saída', 'Saldo']:
             self.df_historico[col] = self.df_historico[col].apply(converter_para_numero)
 
-        self.df_historico['Data'] = pd.to_datetime(
-            self.df_historico['Data'], format='%d/%m/%Y', errors='coerce'
-        )
+        self.df_historico['Data'] = converter_datas(self.df_historico['Data'])
 
         # Índice para saldo atual
         sheet_idx = ss.worksheet("ÍNDICE_ITENS")
@@ -55,24 +55,61 @@ class CalculadorEstoqueMinimo:
 
         print(f"✅ Dados carregados")
 
-    def calcular_lead_time(self, item_nome):
-        """Calcula lead time médio baseado no histórico de entradas"""
-        df_item = self.df_historico[
-            (self.df_historico['Item'].str.upper() == item_nome.upper()) &
-            (self.df_historico['Entrada'] > 0)
-        ].sort_values('Data')
+    def _cubo(self):
+        """Cubo item × dia do snapshot atual (reconstruído/estendido se mudou)"""
+        return cubo_consumo.sincronizar(self.df_historico)
 
-        if len(df_item) < 2:
-            return 7  # Default: 7 dias
+    def _consumo_diario(self, cubo, linhas, hoje=None):
+        """
+        Média e desvio do consumo diário para as linhas do cubo
+
+        Usa os dias com movimentação dos últimos 90 dias, ou todo o
+        histórico se o item não se movimentou no período.
+
+        Returns:
+            (media, desvio, dias_observados) alinhados a `linhas`
+        """
+        movimentos = cubo.movimentos[linhas] > 0
+        saidas = cubo.saidas[linhas]
+
+        recente = movimentos.copy()
+        recente[:, :cubo.coluna_inicio(90, hoje)] = False
+        usar = np.where(recente.any(axis=1)[:, None], recente, movimentos)
+
+        n = usar.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media = np.where(usar, saidas, 0.0).sum(axis=1) / n
+            variancia = np.where(usar, (saidas - media[:, None]) ** 2, 0.0).sum(axis=1) / (n - 1)
+            desvio = np.sqrt(variancia)
+        desvio = np.where(np.isfinite(desvio) & (desvio != 0), desvio, media * 0.2)
+        return media, desvio, n
+
+    def _lead_time(self, cubo, linhas):
+        """
+        Intervalo médio (> 0 dias) entre entradas, limitado entre 3 e 30 dias
+
+        A soma dos intervalos entre dias de entrada consecutivos é o último
+        menos o primeiro dia, então a média sai direto da linha do cubo.
+        """
+        dias_entrada = cubo.entradas[linhas] > 0
+        n = dias_entrada.sum(axis=1)
+        if cubo.n_dias == 0:
+            return np.full(len(n), 7.0)
 
-        # Intervalo entre entregas
-        intervalos = df_item['Data'].diff().dropna().dt.days
-        intervalos = intervalos[intervalos > 0]
+        primeira = np.argmax(dias_entrada, axis=1)
+        ultima = cubo.n_dias - 1 - np.argmax(dias_entrada[:, ::-1], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media = (ultima - primeira) / (n - 1)
+        return np.where(n >= 2, np.clip(media, 3, 30), 7.0)  # Default: 7 dias
 
-        if len(intervalos) == 0:
-            return 7
+    def calcular_lead_time(self, item_nome):
+        """Calcula lead time médio baseado no histórico de entradas"""
+        cubo = self._cubo()
+        idx = cubo.indice(item_nome)
+        if idx is None:
+            return 7  # Default: 7 dias
 
-        return max(3, min(30, intervalos.mean()))  # Entre 3 e 30 dias
+        return float(self._lead_time(cubo, [idx])[0])
 
     def calcular_parametros_item(self, item_nome, nivel_servico=0.95):
         """
@@ -85,34 +122,24 @@ class CalculadorEstoqueMinimo:
         - Estoque mínimo
         - Estoque máximo
         """
-        df_item = self.df_historico[
-            self.df_historico['Item'].str.upper() == item_nome.upper()
-        ].copy()
+        cubo = self._cubo()
+        idx = cubo.indice(item_nome)
 
-        if df_item.empty:
+        if idx is None:
             return None
 
         # Consumo diário (últimos 90 dias)
-        hoje = datetime.now()
-        df_90d = df_item[df_item['Data'] >= (hoje - timedelta(days=90))]
+        media, desvio, dias_observados = self._consumo_diario(cubo, [idx])
 
-        if df_90d.empty:
-            df_90d = df_item
-
-        # Agrupar consumo por dia
-        consumo_diario = df_90d.groupby(df_90d['Data'].dt.date)['Saída'].sum()
-
-        if len(consumo_diario) == 0:
+        if dias_observados[0] == 0:
             return None
 
         # Estatísticas de consumo
-        media_diaria = consumo_diario.mean()
-        desvio_diario = consumo_diario.std() if len(consumo_diario) > 1 else media_diaria * 0.2
-        if pd.isna(desvio_diario) or desvio_diario == 0:
-            desvio_diario = media_diaria * 0.2
+        media_diaria = float(media[0])
+        desvio_diario = float(desvio[0])
 
         # Lead time
-        lead_time = self.calcular_lead_time(item_nome)
+        lead_time = float(self._lead_time(cubo, [idx])[0])
 
         # Fator Z para nível de serviço (distribuição normal)
         z_scores = {
@@ -178,23 +205,92 @@ class CalculadorEstoqueMinimo:
 
         print(f"\n⚙️ Calculando parâmetros (nível de serviço: {nivel_servico*100:.0f}%)...")
 
-        itens_unicos = self.df_historico['Item'].unique()
-        parametros = []
-
-        for item in itens_unicos:
-            params = self.calcular_parametros_item(item, nivel_servico)
-            if params and params['media_diaria'] > 0:
-                parametros.append(params)
+        df_lote = self._calcular_parametros_lote(nivel_servico)
+        df_lote = df_lote[df_lote['media_diaria'] > 0]
 
-        # Ordenar por status
+        # Ordenar por status (estável: empates mantêm a ordem de aparição do item)
         ordem_status = {'RUPTURA': 0, 'CRITICO': 1, 'COMPRAR': 2, 'NORMAL': 3, 'EXCESSO': 4}
-        parametros.sort(key=lambda x: (ordem_status.get(x['status'], 5), -x['media_diaria']))
+        df_lote = df_lote.assign(
+            _ordem=df_lote['status'].map(ordem_status).fillna(5),
+            _media_neg=-df_lote['media_diaria']
+        ).sort_values(['_ordem', '_media_neg'], kind='mergesort').drop(columns=['_ordem', '_media_neg'])
+
+        parametros = df_lote.to_dict('records')
 
         self.df_parametros = pd.DataFrame(parametros)
         print(f"✅ {len(parametros)} itens calculados")
 
         return parametros
 
+    def _calcular_parametros_lote(self, nivel_servico=0.95):
+        """
+        Mesmo cálculo de calcular_parametros_item para todos os itens de uma vez
+
+        Consumo diário (janela de 90 dias, ou todo o histórico se o item não
+        teve movimento no período) e lead time saem das matrizes do cubo
+        item × dia. Estoque de segurança, ponto de pedido, mín/máx e status
+        são calculados como arrays NumPy.
+
+        Returns:
+            DataFrame com as mesmas colunas de calcular_parametros_item
+        """
+        df = self.df_historico
+        cubo = self._cubo()
+
+        # Consumo diário e lead time de todos os itens direto do cubo
+        media, desvio, dias_observados = self._consumo_diario(cubo, slice(None))
+        linhas = np.flatnonzero(dias_observados > 0)
+        media, desvio = media[linhas], desvio[linhas]
+        lead_time = self._lead_time(cubo, linhas)
+
+        itens = [cubo.itens[i] for i in linhas]
+        nomes = df['Item'].groupby(df['Item'].astype(str).str.strip().str.upper(), sort=False).first()
+
+        z_scores = {
+            0.90: 1.28,
+            0.95: 1.65,
+            0.97: 1.88,
+            0.99: 2.33
+        }
+        z = z_scores.get(nivel_servico, 1.65)
+
+        estoque_seguranca = z * desvio * np.sqrt(lead_time)
+        ponto_pedido = (media * lead_time) + estoque_seguranca
+        lote_economico = media * 30
+        estoque_maximo = ponto_pedido + lote_economico
+
+        # Saldo atual: primeira ocorrência do item no índice
+        saldos = (
+            self.df_saldo.assign(_chave=self.df_saldo['Item'].astype(str).str.strip().str.upper())
+            .drop_duplicates('_chave').set_index('_chave')['Saldo']
+        )
+        saldo = saldos.reindex(itens).fillna(0).to_numpy(dtype=float)
+
+        status = np.select(
+            [saldo <= 0, saldo < estoque_seguranca, saldo < ponto_pedido, saldo < estoque_maximo],
+            ['RUPTURA', 'CRITICO', 'COMPRAR', 'NORMAL'],
+            default='EXCESSO'
+        )
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dias_cobertura = np.where(media > 0, np.round(saldo / media, 0), 999)
+
+        return pd.DataFrame({
+            'item': nomes.reindex(itens).to_numpy(),
+            'saldo_atual': np.round(saldo, 0),
+            'media_diaria': np.round(media, 2),
+            'desvio_diario': np.round(desvio, 2),
+            'lead_time_dias': np.round(lead_time, 0),
+            'nivel_servico': f"{nivel_servico*100:.0f}%",
+            'estoque_seguranca': np.round(estoque_seguranca, 0),
+            'ponto_pedido': np.round(ponto_pedido, 0),
+            'estoque_minimo': np.round(ponto_pedido, 0),
+            'estoque_maximo': np.round(estoque_maximo, 0),
+            'lote_sugerido': np.round(lote_economico, 0),
+            'dias_cobertura': dias_cobertura,
+            'status': status
+        })
+
     def gerar_relatorio_ia(self, item_nome=None):
         """Gera relatório com recomendações da IA"""
         if not self.client_groq:
@@ -263,15 +359,15 @@ Use português brasileiro e seja prático.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            return cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você é um especialista em gestão de estoques e supply chain."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperatura=0.3
             )
-            return completion.choices[0].message.content
         except Exception as e:
             return f"Erro: {e}"
 
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Barramento de Eventos do Estoque - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Depois de gravar na planilha, quem escreve publica UM evento tipado e cada
+subsistema inscrito aplica só a sua atualização incremental:
+- 📦 MovimentacaoRegistrada: entrada/saída lançada (saldo novo, linha na ESTOQUE)
+- 🆕 ItemCriado: item novo adicionado ao ÍNDICE_ITENS
+- 📋 ConferenciaRegistrada: conferência física (com ou sem ajuste)
+- 🚦 NivelAlertaAlterado: item mudou de nível de alerta
+
+Handlers síncronos rodam na hora, na thread de quem publicou (para o que
+precisa estar pronto na próxima leitura: KPIs, alertas, índice em memória).
+Handlers assíncronos vão para um worker único, na ordem de publicação (para
+o que grava em disco). Erro de handler é registrado e nunca volta para quem
+publicou. Evento publicado de dentro de um handler é entregue depois do
+evento atual (a ordem de entrega segue a causa). Cada handler tem métricas
+de chamadas, erros e latência.
+
+Uso:
+    from eventos_estoque import barramento_eventos, MovimentacaoRegistrada
+
+    barramento_eventos.inscrever(MovimentacaoRegistrada, lambda e: print(e.item))
+    barramento_eventos.publicar(MovimentacaoRegistrada(
+        item='AMARELO 1234', tipo='saida', quantidade=30,
+        saldo_anterior=150, saldo_novo=120, data='13/02/2026 10:00:00'
+    ))
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Type
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigEventos:
+    """Configurações do barramento"""
+    WORKERS_ASSINCRONOS = 1        # 1 = handlers assíncronos na ordem de publicação
+    LATENCIA_LENTA_MS = 200        # handler síncrono acima disso gera aviso no log
+
+
+# ========================================
+# EVENTOS
+# ========================================
+
+def _agora() -> str:
+    return datetime.now().isoformat()
+
+
+class Evento:
+    """Base dos eventos (dataclasses imutáveis)"""
+
+    @property
+    def nome(self) -> str:
+        return type(self).__name__
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte para dicionário (com o nome do evento)"""
+        return {'evento': self.nome, **asdict(self)}
+
+
+@dataclass(frozen=True)
+class MovimentacaoRegistrada(Evento):
+    """Entrada ou saída gravada na ESTOQUE"""
+    item: str
+    tipo: str                       # 'entrada' | 'saida'
+    quantidade: float
+    saldo_anterior: float
+    saldo_novo: float
+    data: str
+    grupo: str = ''
+    linha: Optional[int] = None     # linha na ESTOQUE (None se não foi possível descobrir)
+    obs: str = ''
+    origem: str = ''
+    timestamp: str = field(default_factory=_agora)
+
+    @property
+    def entrada(self) -> float:
+        return self.quantidade if self.tipo.lower() == 'entrada' else 0.0
+
+    @property
+    def saida(self) -> float:
+        return self.quantidade if self.tipo.lower() != 'entrada' else 0.0
+
+
+@dataclass(frozen=True)
+class ItemCriado(Evento):
+    """Item novo adicionado ao ÍNDICE_ITENS"""
+    item: str
+    grupo: str
+    saldo: float
+    data: str
+    linha: Optional[int] = None
+    timestamp: str = field(default_factory=_agora)
+
+
+@dataclass(frozen=True)
+class ConferenciaRegistrada(Evento):
+    """Conferência física de um item"""
+    item: str
+    saldo_sistema: float
+    saldo_fisico: float
+    divergencia: float
+    data: str
+    obs: str = ''
+    ajuste_registrado: bool = False
+    timestamp: str = field(default_factory=_agora)
+
+
+@dataclass(frozen=True)
+class NivelAlertaAlterado(Evento):
+    """Item mudou de nível de alerta (movimentação ou passagem dos dias)"""
+    item: str
+    nivel_anterior: Optional[str]   # None = item ainda sem alerta
+    nivel_novo: Optional[str]       # None = item saiu do índice
+    dias_parado: int = 0
+    timestamp: str = field(default_factory=_agora)
+
+
+# ========================================
+# BARRAMENTO
+# ========================================
+
+@dataclass
+class Inscricao:
+    """Um handler inscrito em um tipo de evento, com suas métricas"""
+    tipo_evento: Type[Evento]
+    handler: Callable[[Evento], Any]
+    nome: str
+    assincrono: bool = False
+    chamadas: int = 0
+    erros: int = 0
+    tempo_total_ms: float = 0.0
+    tempo_max_ms: float = 0.0
+    ultimo_erro: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'nome': self.nome,
+            'evento': self.tipo_evento.__name__,
+            'assincrono': self.assincrono,
+            'chamadas': self.chamadas,
+            'erros': self.erros,
+            'latencia_media_ms': round(self.tempo_total_ms / self.chamadas, 3) if self.chamadas else 0.0,
+            'latencia_max_ms': round(self.tempo_max_ms, 3),
+            'ultimo_erro': self.ultimo_erro
+        }
+
+
+class BarramentoEventos:
+    """
+    Publica eventos tipados para os handlers inscritos
+
+    Um handler inscrito em uma classe recebe também as subclasses (inscrever
+    em Evento recebe tudo). Publicar custa O(handlers do tipo).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._inscricoes: List[Inscricao] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pendentes = 0
+        self._local = threading.local()
+        self.stats = {'publicados': 0, 'por_evento': {}}
+
+    def inscrever(
+        self,
+        tipo_evento: Type[Evento],
+        handler: Callable[[Evento], Any],
+        nome: Optional[str] = None,
+        assincrono: bool = False
+    ) -> Inscricao:
+        """
+        Inscreve um handler em um tipo de evento
+
+        Args:
+            tipo_evento: Classe do evento (Evento = todos)
+            handler: Função que recebe o evento
+            nome: Nome nas métricas (padrão: módulo.função do handler)
+            assincrono: True para rodar no worker em background
+
+        Returns:
+            Inscrição (use em cancelar)
+        """
+        nome = nome or f"{getattr(handler, '__module__', '?')}.{getattr(handler, '__qualname__', repr(handler))}"
+        inscricao = Inscricao(tipo_evento, handler, nome, assincrono)
+        with self._lock:
+            self._inscricoes.append(inscricao)
+        logger.debug(f"📮 {nome} inscrito em {tipo_evento.__name__}")
+        return inscricao
+
+    def cancelar(self, inscricao: Inscricao):
+        """Remove uma inscrição"""
+        with self._lock:
+            if inscricao in self._inscricoes:
+                self._inscricoes.remove(inscricao)
+
+    def _executar(self, inscricao: Inscricao, evento: Evento):
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            inscricao.handler(evento)
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+            logger.warning(f"⚠️ Handler {inscricao.nome} falhou em {evento.nome}: {e}")
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            # Handler roda fora do lock; só as métricas são atualizadas dentro
+            with self._lock:
+                inscricao.chamadas += 1
+                inscricao.tempo_total_ms += ms
+                inscricao.tempo_max_ms = max(inscricao.tempo_max_ms, ms)
+                if erro:
+                    inscricao.erros += 1
+                    inscricao.ultimo_erro = erro
+            if not inscricao.assincrono and ms > ConfigEventos.LATENCIA_LENTA_MS:
+                logger.warning(f"🐢 Handler síncrono {inscricao.nome} levou {ms:.0f}ms")
+
+    def _executar_assincrono(self, inscricao: Inscricao, evento: Evento):
+        try:
+            self._executar(inscricao, evento)
+        finally:
+            with self._lock:
+                self._pendentes -= 1
+
+    def publicar(self, evento: Evento) -> int:
+        """
+        Entrega o evento aos handlers inscritos
+
+        Args:
+            evento: Evento publicado
+
+        Returns:
+            Quantidade de handlers inscritos no tipo (síncronos + assíncronos)
+        """
+        fila = getattr(self._local, 'fila', None)
+        if fila is not None:
+            # Publicado por um handler: entra na fila, depois do evento atual
+            fila.append(evento)
+            with self._lock:
+                return sum(1 for i in self._inscricoes if isinstance(evento, i.tipo_evento))
+
+        self._local.fila = fila = deque([evento])
+        try:
+            total = self._despachar(fila.popleft())
+            while fila:
+                self._despachar(fila.popleft())
+        finally:
+            self._local.fila = None
+        return total
+
+    def _despachar(self, evento: Evento) -> int:
+        """Agenda os assíncronos e executa os síncronos de um evento"""
+        with self._lock:
+            alvos = [i for i in self._inscricoes if isinstance(evento, i.tipo_evento)]
+            self.stats['publicados'] += 1
+            por_evento = self.stats['por_evento']
+            por_evento[evento.nome] = por_evento.get(evento.nome, 0) + 1
+
+            assincronos = [i for i in alvos if i.assincrono]
+            if assincronos:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=ConfigEventos.WORKERS_ASSINCRONOS,
+                        thread_name_prefix='eventos'
+                    )
+                self._pendentes += len(assincronos)
+                for inscricao in assincronos:
+                    self._executor.submit(self._executar_assincrono, inscricao, evento)
+
+        for inscricao in alvos:
+            if not inscricao.assincrono:
+                self._executar(inscricao, evento)
+
+        return len(alvos)
+
+    def aguardar(self, timeout: float = 10.0) -> bool:
+        """Espera os handlers assíncronos pendentes (testes e desligamento)"""
+        limite = time.time() + timeout
+        while time.time() < limite:
+            with self._lock:
+                if self._pendentes == 0:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def obter_metricas(self) -> Dict[str, Any]:
+        """Eventos publicados, fila assíncrona e latência por handler"""
+        with self._lock:
+            return {
+                'publicados': self.stats['publicados'],
+                'por_evento': dict(self.stats['por_evento']),
+                'assincronos_pendentes': self._pendentes,
+                'handlers': [i.to_dict() for i in self._inscricoes],
+                'timestamp': datetime.now().isoformat()
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+barramento_eventos = BarramentoEventos()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando BarramentoEventos...")
+
+    barramento = BarramentoEventos()
+    recebidos = []
+
+    barramento.inscrever(MovimentacaoRegistrada, lambda e: recebidos.append(('sync', e.item)), nome='sync')
+    barramento.inscrever(Evento, lambda e: recebidos.append(('todos', e.nome)), nome='todos', assincrono=True)
+    barramento.inscrever(ItemCriado, lambda e: 1 / 0, nome='com_erro')
+
+    barramento.publicar(MovimentacaoRegistrada(
+        item='AMARELO 1234', tipo='saida', quantidade=30,
+        saldo_anterior=150, saldo_novo=120, data='13/02/2026 10:00:00'
+    ))
+    barramento.publicar(ItemCriado(item='NOVO', grupo='FIOS', saldo=10, data='13/02/2026'))
+    barramento.aguardar()
+
+    print(f"\n1. Recebidos: {recebidos}")
+    assert ('sync', 'AMARELO 1234') in recebidos
+    assert ('todos', 'MovimentacaoRegistrada') in recebidos and ('todos', 'ItemCriado') in recebidos
+
+    metricas = barramento.obter_metricas()
+    print(f"2. Publicados: {metricas['publicados']} {metricas['por_evento']}")
+    for h in metricas['handlers']:
+        print(f"   {h['nome']}: {h['chamadas']} chamadas, {h['erros']} erros, {h['latencia_media_ms']}ms")
+    assert [h['erros'] for h in metricas['handlers'] if h['nome'] == 'com_erro'] == [1]
+
+    print("\n✅ Todos os testes concluídos!")
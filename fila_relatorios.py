@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de Relatórios em Background - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Relatório completo + Excel + PDF gerados fora da thread da requisição:
+- 📨 POST cria o job e devolve o ID na hora (202)
+- 🧵 Pool limitado de workers (e limite de jobs na fila) gera o
+  RelatorioCompleto e os artefatos
+- 🔄 Status por polling (pendente → executando → concluido / erro)
+- 💾 Artefatos em disco por (parâmetros, versão dos dados): o mesmo pedido
+  sobre os mesmos dados é servido do cache, sem gerar de novo
+
+Versão dos dados = dia + linhas já incorporadas no cubo de consumo e nos
+agregados diários; chegou movimentação nova, a chave muda.
+
+Uso:
+    from fila_relatorios import fila_relatorios
+
+    job = fila_relatorios.enviar(periodo='mes', formatos=['json', 'excel'])
+    fila_relatorios.obter(job.id).status          # 'pendente', 'executando', 'concluido'...
+    fila_relatorios.caminho_artefato(job.id, 'excel')
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigFilaRelatorios:
+    """Configurações da fila de relatórios"""
+    MAX_WORKERS = int(os.getenv('RELATORIOS_WORKERS', 2))   # Relatórios gerados ao mesmo tempo
+    MAX_PENDENTES = 20                                       # Jobs aguardando; acima disso, recusa
+    MAX_JOBS_MEMORIA = 200                                   # Jobs lembrados para consulta de status
+    MAX_ARTEFATOS_DISCO = 50                                 # Conjuntos de artefatos mantidos em disco
+    DIRETORIO = os.getenv(
+        'RELATORIOS_CACHE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache_relatorios')
+    )
+
+    # formato → (arquivo, mimetype)
+    FORMATOS = {
+        'json': ('relatorio.json', 'application/json'),
+        'excel': ('relatorio.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+        'pdf': ('relatorio.pdf', 'application/pdf')
+    }
+
+
+class StatusJob(Enum):
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    ERRO = "erro"
+
+
+class FilaCheia(Exception):
+    """Limite de jobs pendentes atingido"""
+
+
+@dataclass
+class JobRelatorio:
+    """Pedido de relatório na fila"""
+    id: str
+    parametros: Dict[str, Any]
+    formatos: List[str]
+    chave: str
+    status: StatusJob = StatusJob.PENDENTE
+    do_cache: bool = False
+    erro: Optional[str] = None
+    criado_em: str = field(default_factory=lambda: datetime.now().isoformat())
+    iniciado_em: Optional[str] = None
+    concluido_em: Optional[str] = None
+    duracao_ms: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'parametros': self.parametros,
+            'formatos': self.formatos,
+            'status': self.status.value,
+            'do_cache': self.do_cache,
+            'erro': self.erro,
+            'criado_em': self.criado_em,
+            'iniciado_em': self.iniciado_em,
+            'concluido_em': self.concluido_em,
+            'duracao_ms': self.duracao_ms,
+            'downloads': {
+                formato: f"/api/relatorios/jobs/{self.id}/download/{formato}"
+                for formato in self.formatos
+            } if self.status == StatusJob.CONCLUIDO else {}
+        }
+
+
+def versao_dados() -> str:
+    """
+    Versão dos dados que alimentam os relatórios
+
+    Muda com linha nova ou editada na ESTOQUE (contagem + assinatura de
+    conteúdo do cubo e dos agregados) e com alteração de saldo no ÍNDICE.
+    """
+    partes = [datetime.now().strftime('%Y-%m-%d')]
+    try:
+        from cubo_consumo import cubo_consumo
+        partes.append(f"cubo:{cubo_consumo.n_linhas}:{cubo_consumo.assinatura:016x}")
+    except Exception:
+        pass
+    try:
+        from agregados_diarios import agregados_diarios
+        partes.append(f"agregados:{agregados_diarios.versao}")
+    except Exception:
+        pass
+    try:
+        from indice_otimizado import indice_otimizado
+        partes.append(f"indice:{indice_otimizado.versao}")
+    except Exception:
+        pass
+    return '|'.join(partes)
+
+
+# ========================================
+# FILA
+# ========================================
+
+class FilaRelatorios:
+    """
+    Jobs de relatório num pool de threads limitado, com artefatos em disco
+
+    Pedidos iguais (mesmos parâmetros e versão dos dados) compartilham o
+    mesmo diretório de artefatos: se ele já está completo o job nasce
+    concluído; se outro job igual está rodando, o pedido reaproveita esse job.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None, max_workers: Optional[int] = None, gerenciador=None):
+        self.diretorio = diretorio or ConfigFilaRelatorios.DIRETORIO
+        self._gerenciador = gerenciador
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or ConfigFilaRelatorios.MAX_WORKERS,
+            thread_name_prefix='relatorio'
+        )
+        self._jobs: "OrderedDict[str, JobRelatorio]" = OrderedDict()
+        self._ativos: Dict[str, str] = {}   # chave → id do job pendente/executando
+        self._lock = threading.RLock()
+        self._contador_id = 0
+        self.stats = {'enviados': 0, 'gerados': 0, 'do_cache': 0, 'reaproveitados': 0, 'erros': 0, 'recusados': 0}
+        logger.info(f"✅ FilaRelatorios inicializada ({self.diretorio})")
+
+    @property
+    def gerenciador(self):
+        if self._gerenciador is None:
+            from relatorios import gerenciador_relatorios
+            self._gerenciador = gerenciador_relatorios
+        return self._gerenciador
+
+    # ========================================
+    # CHAVE / DISCO
+    # ========================================
+
+    @staticmethod
+    def gerar_chave(parametros: Dict[str, Any], formatos: List[str], versao: str) -> str:
+        """SHA-256 de (parâmetros, formatos, versão dos dados)"""
+        conteudo = json.dumps(
+            {'parametros': parametros, 'formatos': sorted(formatos), 'versao': versao},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def _pasta(self, chave: str) -> str:
+        return os.path.join(self.diretorio, chave)
+
+    def _artefatos_prontos(self, chave: str, formatos: List[str]) -> bool:
+        pasta = self._pasta(chave)
+        return all(
+            os.path.exists(os.path.join(pasta, ConfigFilaRelatorios.FORMATOS[f][0]))
+            for f in formatos
+        )
+
+    def _limpar_disco(self):
+        """
+        Mantém só os MAX_ARTEFATOS_DISCO conjuntos mais recentes
+
+        Jobs concluídos que apontam para uma pasta removida saem junto da
+        memória, para não anunciarem downloads que não existem mais.
+        """
+        try:
+            nomes = [
+                nome for nome in os.listdir(self.diretorio)
+                if os.path.isdir(os.path.join(self.diretorio, nome))
+                and nome not in self._ativos and not nome.endswith('.tmp')
+            ]
+        except FileNotFoundError:
+            return
+        nomes.sort(key=lambda nome: os.path.getmtime(self._pasta(nome)), reverse=True)
+        removidas = set(nomes[ConfigFilaRelatorios.MAX_ARTEFATOS_DISCO:])
+        for nome in removidas:
+            shutil.rmtree(self._pasta(nome), ignore_errors=True)
+        if removidas:
+            for job_id in [i for i, j in self._jobs.items()
+                           if j.chave in removidas and j.status == StatusJob.CONCLUIDO]:
+                del self._jobs[job_id]
+
+    # ========================================
+    # ENVIO / EXECUÇÃO
+    # ========================================
+
+    def enviar(
+        self,
+        periodo: str = 'mes',
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None,
+        formatos: Optional[List[str]] = None,
+        movimentacoes: bool = False
+    ) -> JobRelatorio:
+        """
+        Cria um job de relatório
+
+        Args:
+            periodo: hoje/semana/mes/trimestre/personalizado
+            data_inicio, data_fim: Datas (DD/MM/YYYY) do personalizado
+            formatos: Subconjunto de json/excel/pdf (padrão: todos)
+            movimentacoes: Excel com a aba de todas as movimentações
+
+        Returns:
+            JobRelatorio (já concluído se os artefatos estavam em cache)
+
+        Raises:
+            ValueError: formato desconhecido
+            FilaCheia: MAX_PENDENTES jobs aguardando
+        """
+        formatos = list(dict.fromkeys(formatos or ConfigFilaRelatorios.FORMATOS.keys()))
+        invalidos = [f for f in formatos if f not in ConfigFilaRelatorios.FORMATOS]
+        if invalidos:
+            raise ValueError(f"Formato inválido: {', '.join(invalidos)}. Use: {', '.join(ConfigFilaRelatorios.FORMATOS)}")
+
+        data_inicio, data_fim = self.gerenciador.definir_periodo(periodo, data_inicio, data_fim)
+        parametros = {
+            'periodo': periodo,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+            'movimentacoes': bool(movimentacoes) and 'excel' in formatos
+        }
+        chave = self.gerar_chave(parametros, formatos, versao_dados())
+
+        with self._lock:
+            self.stats['enviados'] += 1
+
+            # Mesmo pedido já em andamento: acompanha o job existente
+            id_ativo = self._ativos.get(chave)
+            if id_ativo and id_ativo in self._jobs:
+                self.stats['reaproveitados'] += 1
+                return self._jobs[id_ativo]
+
+            self._contador_id += 1
+            job = JobRelatorio(
+                id=f"rel_{self._contador_id:06d}_{int(datetime.now().timestamp())}",
+                parametros=parametros,
+                formatos=formatos,
+                chave=chave
+            )
+
+            if self._artefatos_prontos(chave, formatos):
+                job.status = StatusJob.CONCLUIDO
+                job.do_cache = True
+                job.concluido_em = job.criado_em
+                os.utime(self._pasta(chave))
+                self.stats['do_cache'] += 1
+            else:
+                pendentes = sum(1 for j in self._jobs.values() if j.status == StatusJob.PENDENTE)
+                if pendentes >= ConfigFilaRelatorios.MAX_PENDENTES:
+                    self.stats['recusados'] += 1
+                    raise FilaCheia(f"{pendentes} relatórios aguardando; tente novamente em instantes")
+                self._ativos[chave] = job.id
+                self._executor.submit(self._executar, job)
+
+            self._jobs[job.id] = job
+            while len(self._jobs) > ConfigFilaRelatorios.MAX_JOBS_MEMORIA:
+                antigo_id, antigo = next(iter(self._jobs.items()))
+                if antigo.status in (StatusJob.PENDENTE, StatusJob.EXECUTANDO):
+                    break
+                del self._jobs[antigo_id]
+
+        logger.info(f"📨 Job {job.id} ({periodo}, {', '.join(formatos)}): {job.status.value}")
+        return job
+
+    def _executar(self, job: JobRelatorio):
+        """Gera relatório e artefatos numa pasta temporária e publica com rename"""
+        inicio = datetime.now()
+        job.status = StatusJob.EXECUTANDO
+        job.iniciado_em = inicio.isoformat()
+
+        pasta = self._pasta(job.chave)
+        temporaria = f"{pasta}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(temporaria, exist_ok=True)
+            p = job.parametros
+            relatorio = self.gerenciador.gerar_relatorio_completo(
+                periodo=p['periodo'], data_inicio=p['data_inicio'], data_fim=p['data_fim']
+            )
+
+            for formato in job.formatos:
+                caminho = os.path.join(temporaria, ConfigFilaRelatorios.FORMATOS[formato][0])
+                if formato == 'json':
+                    with open(caminho, 'w', encoding='utf-8') as f:
+                        json.dump(relatorio.to_dict(), f, ensure_ascii=False)
+                elif formato == 'excel':
+                    movimentacoes = None
+                    if p['movimentacoes']:
+                        movimentacoes = self.gerenciador.iterar_movimentacoes(p['data_inicio'], p['data_fim'])
+                    self.gerenciador.escrever_excel(relatorio, caminho, movimentacoes)
+                elif formato == 'pdf':
+                    with open(caminho, 'wb') as f:
+                        f.write(self.gerenciador.exportar_pdf(relatorio))
+
+            shutil.rmtree(pasta, ignore_errors=True)
+            os.replace(temporaria, pasta)
+
+            job.status = StatusJob.CONCLUIDO
+            with self._lock:
+                self.stats['gerados'] += 1
+
+        except Exception as e:
+            shutil.rmtree(temporaria, ignore_errors=True)
+            job.status = StatusJob.ERRO
+            job.erro = str(e) if not isinstance(e, ImportError) else f"Dependência não instalada: {e}"
+            with self._lock:
+                self.stats['erros'] += 1
+            logger.error(f"❌ Job {job.id} falhou: {e}")
+
+        finally:
+            fim = datetime.now()
+            job.concluido_em = fim.isoformat()
+            job.duracao_ms = round((fim - inicio).total_seconds() * 1000, 1)
+            with self._lock:
+                self._ativos.pop(job.chave, None)
+                self._limpar_disco()
+
+        if job.status == StatusJob.CONCLUIDO:
+            logger.info(f"✅ Job {job.id} concluído em {job.duracao_ms:.0f}ms")
+
+    # ========================================
+    # CONSULTA
+    # ========================================
+
+    def obter(self, job_id: str) -> Optional[JobRelatorio]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def listar(self, limite: int = 20) -> List[Dict[str, Any]]:
+        """Jobs mais recentes primeiro"""
+        with self._lock:
+            jobs = list(self._jobs.values())[-limite:]
+        return [j.to_dict() for j in reversed(jobs)]
+
+    def caminho_artefato(self, job_id: str, formato: str) -> Optional[str]:
+        """Arquivo do artefato de um job concluído (None se não existir)"""
+        job = self.obter(job_id)
+        if not job or job.status != StatusJob.CONCLUIDO or formato not in job.formatos:
+            return None
+        caminho = os.path.join(self._pasta(job.chave), ConfigFilaRelatorios.FORMATOS[formato][0])
+        return caminho if os.path.exists(caminho) else None
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado da fila"""
+        with self._lock:
+            por_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                por_status[job.status.value] = por_status.get(job.status.value, 0) + 1
+            return {
+                'diretorio': self.diretorio,
+                'max_workers': self._executor._max_workers,
+                'jobs': por_status,
+                'versao_dados': versao_dados(),
+                **self.stats
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+fila_relatorios = FilaRelatorios()
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    print("🧪 Testando FilaRelatorios...")
+
+    class RelatorioFalso:
+        def to_dict(self):
+            return {'periodo': 'mes', 'total_itens': 3}
+
+    class GerenciadorFalso:
+        chamadas = 0
+
+        def definir_periodo(self, periodo, data_inicio=None, data_fim=None):
+            return data_inicio or '01/02/2026', data_fim or '13/02/2026'
+
+        def gerar_relatorio_completo(self, **kwargs):
+            GerenciadorFalso.chamadas += 1
+            time.sleep(0.2)
+            return RelatorioFalso()
+
+        def exportar_pdf(self, relatorio):
+            return b'%PDF-1.4 teste'
+
+    fila = FilaRelatorios(tempfile.mkdtemp(), max_workers=1, gerenciador=GerenciadorFalso())
+
+    job = fila.enviar('mes', formatos=['json', 'pdf'])
+    repetido = fila.enviar('mes', formatos=['pdf', 'json'])
+    print(f"   Job: {job.id} ({job.status.value}) | pedido igual reaproveita: {repetido.id == job.id}")
+
+    while fila.obter(job.id).status in (StatusJob.PENDENTE, StatusJob.EXECUTANDO):
+        time.sleep(0.05)
+    print(f"   Status: {fila.obter(job.id).to_dict()}")
+
+    do_cache = fila.enviar('mes', formatos=['json', 'pdf'])
+    print(f"   Novo pedido igual: {do_cache.status.value}, do cache: {do_cache.do_cache}, "
+          f"relatórios gerados: {GerenciadorFalso.chamadas}")
+    print(f"   PDF: {fila.caminho_artefato(do_cache.id, 'pdf')}")
+    print(f"   Resumo: {fila.obter_resumo()}")
+
+    # Pasta podada do disco leva junto os jobs concluídos que apontavam para ela
+    ConfigFilaRelatorios.MAX_ARTEFATOS_DISCO = 1
+    outro = fila.enviar('semana', data_inicio='07/02/2026', data_fim='13/02/2026', formatos=['json'])
+    while fila.obter(outro.id).status in (StatusJob.PENDENTE, StatusJob.EXECUTANDO):
+        time.sleep(0.05)
+    print(f"   Após poda: job antigo na memória: {fila.obter(job.id) is not None}, "
+          f"novo: {fila.caminho_artefato(outro.id, 'json') is not None}")
+    assert fila.obter(job.id) is None and fila.obter(do_cache.id) is None
+    assert fila.caminho_artefato(outro.id, 'json') is not None
+
+    print("\n✅ Testes concluídos!")
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gateway de Chamadas à IA (Groq) - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Ponto único por onde passam as chamadas ao LLM:
+- 🚦 Semáforo: no máximo N chamadas simultâneas; espera na fila é limitada
+- ⏱️ Prazo por chamada: a thread do Flask nunca fica presa além do deadline
+- 🔌 Circuit breaker: após falhas seguidas, para de chamar por um tempo
+- 📊 Métricas: espera na fila e latência (também no monitor_perf)
+
+Quando o gateway recusa ou a chamada estoura o prazo, é levantada
+IAIndisponivel; cada chamador responde com sua alternativa por regras
+(classificar_por_regras, alertas locais, similares etc.).
+
+Uso:
+    from gateway_ia import gateway_ia, IAIndisponivel
+
+    try:
+        completion = gateway_ia.chamar(
+            lambda timeout: client.chat.completions.create(..., timeout=timeout),
+            prazo=8
+        )
+    except IAIndisponivel as e:
+        resposta = alternativa_por_regras()
+
+    # Streaming: pedaços repassados assim que chegam, vaga presa até o fim
+    for pedaco in gateway_ia.transmitir(
+        lambda timeout: client.chat.completions.create(..., stream=True, timeout=timeout),
+        prazo=15
+    ):
+        ...
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeout
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigGatewayIA:
+    """Configurações do gateway da IA"""
+    MAX_CONCORRENTES = int(os.getenv('IA_MAX_CONCORRENTES', 4))
+    ESPERA_MAX_FILA_S = 2.0       # Tempo máximo aguardando vaga no semáforo
+    PRAZO_PADRAO_S = 20.0         # Deadline padrão de uma chamada
+    PRAZO_MAX_STREAM_S = 120.0    # Duração máxima de uma resposta em streaming
+    FALHAS_PARA_ABRIR = 5         # Falhas seguidas que abrem o circuito
+    TEMPO_ABERTO_S = 30.0         # Tempo com circuito aberto antes de testar de novo
+    AMOSTRAS_METRICAS = 200       # Últimas N medições para médias/percentis
+
+
+class EstadoCircuito(Enum):
+    FECHADO = "fechado"           # Chamadas normais
+    ABERTO = "aberto"             # Recusa tudo até TEMPO_ABERTO_S
+    MEIO_ABERTO = "meio_aberto"   # Deixa passar uma chamada de teste
+
+
+class IAIndisponivel(Exception):
+    """A IA não respondeu (circuito aberto, fila cheia, prazo ou erro da API)"""
+
+    def __init__(self, motivo: str, detalhe: str = ''):
+        self.motivo = motivo
+        self.detalhe = detalhe
+        super().__init__(f"IA indisponível ({motivo}){': ' + detalhe if detalhe else ''}")
+
+
+# ========================================
+# CIRCUIT BREAKER
+# ========================================
+
+class CircuitBreaker:
+    """Abre após FALHAS_PARA_ABRIR falhas seguidas; testa 1 chamada após TEMPO_ABERTO_S"""
+
+    def __init__(self, falhas_para_abrir: int = None, tempo_aberto_s: float = None):
+        self.falhas_para_abrir = falhas_para_abrir or ConfigGatewayIA.FALHAS_PARA_ABRIR
+        self.tempo_aberto_s = tempo_aberto_s or ConfigGatewayIA.TEMPO_ABERTO_S
+        self.estado = EstadoCircuito.FECHADO
+        self.falhas_seguidas = 0
+        self.aberto_em: Optional[float] = None
+        self.aberturas = 0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """True se a chamada pode seguir"""
+        with self._lock:
+            if self.estado == EstadoCircuito.ABERTO:
+                if time.monotonic() - self.aberto_em < self.tempo_aberto_s:
+                    return False
+                self.estado = EstadoCircuito.MEIO_ABERTO
+                self._teste_em_andamento = False
+                logger.info("🔌 Circuito da IA meio-aberto: testando uma chamada")
+
+            if self.estado == EstadoCircuito.MEIO_ABERTO:
+                if self._teste_em_andamento:
+                    return False
+                self._teste_em_andamento = True
+
+            return True
+
+    def desistir(self):
+        """Chamada permitida não chegou a ir para a API (ex.: fila cheia)"""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self.estado != EstadoCircuito.FECHADO:
+                logger.info("✅ Circuito da IA fechado")
+            self.estado = EstadoCircuito.FECHADO
+            self.falhas_seguidas = 0
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas_seguidas += 1
+            self._teste_em_andamento = False
+            if (self.estado == EstadoCircuito.MEIO_ABERTO
+                    or self.falhas_seguidas >= self.falhas_para_abrir):
+                if self.estado != EstadoCircuito.ABERTO:
+                    self.aberturas += 1
+                    logger.warning(
+                        f"⚠️ Circuito da IA aberto após {self.falhas_seguidas} falhas "
+                        f"(pausa de {self.tempo_aberto_s:g}s)"
+                    )
+                self.estado = EstadoCircuito.ABERTO
+                self.aberto_em = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            restante = None
+            if self.estado == EstadoCircuito.ABERTO:
+                restante = max(0.0, self.tempo_aberto_s - (time.monotonic() - self.aberto_em))
+            return {
+                'estado': self.estado.value,
+                'falhas_seguidas': self.falhas_seguidas,
+                'aberturas': self.aberturas,
+                'reabre_em_s': round(restante, 1) if restante is not None else None
+            }
+
+
+# ========================================
+# LIMITADOR DE TAXA
+# ========================================
+
+class LimitadorTaxa:
+    """
+    Espaça chamadas para no máximo N por minuto (entre todas as threads)
+
+    Uso:
+        limitador = LimitadorTaxa(30)
+        limitador.aguardar()   # bloqueia até a próxima vaga
+    """
+
+    def __init__(self, por_minuto: float):
+        self.intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> float:
+        """Reserva a próxima vaga e dorme até ela; retorna o tempo esperado (s)"""
+        with self._lock:
+            agora = time.monotonic()
+            vaga = max(agora, self._proxima)
+            self._proxima = vaga + self.intervalo
+        espera = vaga - agora
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+
+# ========================================
+# GATEWAY
+# ========================================
+
+class GatewayIA:
+    """
+    Executa chamadas ao LLM com limite de concorrência, prazo e circuit breaker
+
+    A chamada roda num pool próprio; a thread do Flask espera no máximo o
+    prazo. Se estourar, a vaga do semáforo só é devolvida quando a chamada
+    de fato termina, então o limite de concorrência vale para a API real.
+    """
+
+    def __init__(self, max_concorrentes: int = None):
+        self.max_concorrentes = max_concorrentes or ConfigGatewayIA.MAX_CONCORRENTES
+        self._semaforo = threading.BoundedSemaphore(self.max_concorrentes)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concorrentes,
+            thread_name_prefix='gateway-ia'
+        )
+        self.circuito = CircuitBreaker()
+
+        self._lock = threading.Lock()
+        self._em_uso = 0
+        self._aguardando = 0
+        self._esperas_ms: deque = deque(maxlen=ConfigGatewayIA.AMOSTRAS_METRICAS)
+        self._latencias_ms: deque = deque(maxlen=ConfigGatewayIA.AMOSTRAS_METRICAS)
+        self._primeiros_ms: deque = deque(maxlen=ConfigGatewayIA.AMOSTRAS_METRICAS)
+        self.stats = {
+            'chamadas': 0,
+            'sucessos': 0,
+            'erros': 0,
+            'prazos_excedidos': 0,
+            'recusadas_circuito': 0,
+            'recusadas_fila': 0,
+            'streams_interrompidos': 0
+        }
+
+        logger.info(f"✅ GatewayIA inicializado - até {self.max_concorrentes} chamadas simultâneas")
+
+    def chamar(
+        self,
+        funcao: Callable[[float], Any],
+        prazo: float = None,
+        operacao: str = 'ia_chamada'
+    ) -> Any:
+        """
+        Executa funcao(timeout) respeitando semáforo, prazo e circuito
+
+        Args:
+            funcao: Recebe o tempo restante (s) para repassar ao cliente HTTP
+            prazo: Deadline total em segundos, incluindo a espera na fila
+            operacao: Nome para as métricas do monitor_perf
+
+        Returns:
+            O retorno de funcao
+
+        Raises:
+            IAIndisponivel: circuito aberto, fila cheia, prazo excedido ou erro da API
+        """
+        prazo = prazo or ConfigGatewayIA.PRAZO_PADRAO_S
+        self._contar('chamadas')
+
+        espera_ms = self._obter_vaga(prazo)
+        restante = max(0.1, prazo - espera_ms / 1000)
+        futuro = self._executor.submit(self._executar, funcao, restante, operacao)
+
+        try:
+            resultado = futuro.result(timeout=restante)
+        except FuturoTimeout:
+            self.circuito.registrar_falha()
+            self._contar('prazos_excedidos')
+            logger.warning(f"⏱️ {operacao}: prazo de {prazo:g}s excedido")
+            raise IAIndisponivel('prazo_excedido', f"{prazo:g}s")
+        except Exception as e:
+            self.circuito.registrar_falha()
+            self._contar('erros')
+            raise IAIndisponivel('erro_api', str(e)) from e
+
+        self.circuito.registrar_sucesso()
+        self._contar('sucessos')
+        return resultado
+
+    def _executar(self, funcao: Callable[[float], Any], timeout: float, operacao: str) -> Any:
+        """Roda no pool: mede latência e devolve a vaga ao terminar"""
+        inicio = time.monotonic()
+        sucesso = False
+        try:
+            resultado = funcao(timeout)
+            sucesso = True
+            return resultado
+        finally:
+            self._registrar_metrica(operacao, self._latencias_ms, (time.monotonic() - inicio) * 1000, sucesso)
+            self._liberar_vaga()
+
+    def transmitir(
+        self,
+        abrir: Callable[[float], Iterable[Any]],
+        prazo: float = None,
+        operacao: str = 'ia_stream'
+    ) -> Iterator[Any]:
+        """
+        Versão em streaming de chamar(): repassa cada pedaço assim que chega
+
+        Args:
+            abrir: Recebe o tempo restante (s) e devolve o iterável de pedaços
+                   (ex.: client.chat.completions.create(..., stream=True))
+            prazo: Deadline até o primeiro pedaço, incluindo a espera na fila
+                   (vira o timeout de leitura do cliente HTTP)
+            operacao: Nome para as métricas do monitor_perf
+
+        A vaga do semáforo fica presa até o fim da transmissão; a resposta
+        inteira é limitada a PRAZO_MAX_STREAM_S.
+
+        Raises:
+            IAIndisponivel: circuito aberto, fila cheia, prazo excedido ou erro da API
+        """
+        prazo = prazo or ConfigGatewayIA.PRAZO_PADRAO_S
+        self._contar('chamadas')
+
+        espera_ms = self._obter_vaga(prazo)
+        restante = max(0.1, prazo - espera_ms / 1000)
+        inicio = time.monotonic()
+        resultado = None          # 'sucesso' | 'falha' | None (consumidor desistiu)
+        stream = None
+
+        try:
+            stream = abrir(restante)
+            primeiro = True
+            for pedaco in stream:
+                decorrido = time.monotonic() - inicio
+                if primeiro:
+                    primeiro = False
+                    self._registrar_metrica('ia_primeiro_token', self._primeiros_ms, decorrido * 1000, True)
+                elif decorrido > ConfigGatewayIA.PRAZO_MAX_STREAM_S:
+                    raise IAIndisponivel('prazo_excedido', f"{ConfigGatewayIA.PRAZO_MAX_STREAM_S:g}s de streaming")
+                yield pedaco
+            resultado = 'sucesso'
+
+        except IAIndisponivel:
+            resultado = 'falha'
+            self.circuito.registrar_falha()
+            self._contar('prazos_excedidos')
+            raise
+        except Exception as e:
+            resultado = 'falha'
+            self.circuito.registrar_falha()
+            if 'timeout' in type(e).__name__.lower():
+                self._contar('prazos_excedidos')
+                logger.warning(f"⏱️ {operacao}: prazo de {prazo:g}s excedido")
+                raise IAIndisponivel('prazo_excedido', f"{prazo:g}s") from e
+            self._contar('erros')
+            raise IAIndisponivel('erro_api', str(e)) from e
+
+        finally:
+            if resultado == 'sucesso':
+                self.circuito.registrar_sucesso()
+                self._contar('sucessos')
+            elif resultado is None:
+                # Cliente desconectou no meio: não conta como falha da IA
+                self.circuito.desistir()
+                self._contar('streams_interrompidos')
+            fechar = getattr(stream, 'close', None)
+            if fechar is not None:
+                try:
+                    fechar()
+                except Exception:
+                    pass
+            self._registrar_metrica(operacao, self._latencias_ms, (time.monotonic() - inicio) * 1000,
+                                    resultado == 'sucesso')
+            self._liberar_vaga()
+
+    # ========================================
+    # VAGAS E MÉTRICAS
+    # ========================================
+
+    def _obter_vaga(self, prazo: float) -> float:
+        """Passa pelo circuito e pelo semáforo; devolve a espera na fila (ms)"""
+        if not self.circuito.permitir():
+            self._contar('recusadas_circuito')
+            raise IAIndisponivel('circuito_aberto')
+
+        # Espera vaga no semáforo (limitada)
+        inicio = time.monotonic()
+        with self._lock:
+            self._aguardando += 1
+        try:
+            obteve = self._semaforo.acquire(timeout=min(ConfigGatewayIA.ESPERA_MAX_FILA_S, prazo))
+        finally:
+            with self._lock:
+                self._aguardando -= 1
+        espera_ms = (time.monotonic() - inicio) * 1000
+        self._registrar_metrica('ia_espera_fila', self._esperas_ms, espera_ms, obteve)
+
+        if not obteve:
+            self.circuito.desistir()
+            self._contar('recusadas_fila')
+            raise IAIndisponivel('fila_cheia', f"{self.max_concorrentes} chamadas em andamento")
+
+        with self._lock:
+            self._em_uso += 1
+        return espera_ms
+
+    def _liberar_vaga(self):
+        with self._lock:
+            self._em_uso -= 1
+        self._semaforo.release()
+
+    def _contar(self, chave: str):
+        with self._lock:
+            self.stats[chave] += 1
+
+    def _registrar_metrica(self, operacao: str, amostras: deque, tempo_ms: float, sucesso: bool):
+        with self._lock:
+            amostras.append(tempo_ms)
+        try:
+            from otimizacoes import monitor_perf
+            monitor_perf.registrar_manual(operacao, tempo_ms, sucesso)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _resumir(amostras) -> Dict[str, Any]:
+        if not amostras:
+            return {'amostras': 0, 'media_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ordenadas = sorted(amostras)
+        return {
+            'amostras': len(ordenadas),
+            'media_ms': round(sum(ordenadas) / len(ordenadas), 1),
+            'p95_ms': round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))], 1),
+            'max_ms': round(ordenadas[-1], 1)
+        }
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do semáforo, circuito e métricas de espera/latência"""
+        with self._lock:
+            stats = dict(self.stats)
+            esperas = list(self._esperas_ms)
+            latencias = list(self._latencias_ms)
+            primeiros = list(self._primeiros_ms)
+            em_uso, aguardando = self._em_uso, self._aguardando
+
+        return {
+            **stats,
+            'max_concorrentes': self.max_concorrentes,
+            'em_uso': em_uso,
+            'aguardando': aguardando,
+            'circuito': self.circuito.to_dict(),
+            'espera_fila': self._resumir(esperas),
+            'latencia': self._resumir(latencias),
+            'primeiro_token': self._resumir(primeiros)
+        }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+gateway_ia = GatewayIA()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando GatewayIA...")
+
+    gw = GatewayIA(max_concorrentes=2)
+    gw.circuito = CircuitBreaker(falhas_para_abrir=2, tempo_aberto_s=0.5)
+
+    print(f"   Rápida: {gw.chamar(lambda t: 'ok', prazo=1)}")
+
+    for _ in range(2):
+        try:
+            gw.chamar(lambda t: time.sleep(0.5), prazo=0.1)
+        except IAIndisponivel as e:
+            print(f"   Lenta: {e}")
+
+    try:
+        gw.chamar(lambda t: 'não deveria chamar')
+    except IAIndisponivel as e:
+        print(f"   Com circuito aberto: {e}")
+
+    time.sleep(0.6)
+    print(f"   Após pausa (teste meio-aberto): {gw.chamar(lambda t: 'ok', prazo=1)}")
+    print(f"   Streaming: {list(gw.transmitir(lambda t: iter(['a', 'b', 'c']), prazo=1))}")
+    print(f"   Resumo: {gw.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
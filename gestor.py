@@ -1,11 +1,20 @@
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import io
 import re
+import sys
+import time
+import threading
 import warnings
 
+from duplicados_similares import encontrar_similares
+
 warnings.filterwarnings("ignore")
 
 # --- CONFIGURAÇÕES ---
@@ -20,6 +29,7 @@ DIAS_ATENCAO = 60
 DIAS_OBSOLETO = 90
 SIMILARIDADE_DUPLICADO = 0.85
 MESES_ANALISE_CONSUMO = 3  # Período para análise de consumo
+ANALISES_PARALELAS = 4  # Análises independentes rodando ao mesmo tempo
 
 # Configuração Google Sheets
 scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -56,21 +66,37 @@ def tabela_header(col1, col2, col3, largura=35):
 # FUNÇÕES AUXILIARES
 # ============================================================
 
+FORMATOS_DATA = ['%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y']
+
 def converter_data(valor):
     """Converte string para datetime"""
     if pd.isna(valor) or str(valor).strip() == '':
         return None
     
-    formatos = ['%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y']
     valor_str = str(valor).strip()
     
-    for fmt in formatos:
+    for fmt in FORMATOS_DATA:
         try:
             return datetime.strptime(valor_str.split()[0], fmt)
         except:
             continue
     return None
 
+def converter_datas(serie):
+    """
+    Versão vetorizada do converter_data para uma coluna inteira.
+    Cada formato é tentado só nas linhas que ainda não converteram (NaT).
+    """
+    texto = serie.astype(str).str.strip().str.split(n=1).str[0]
+    datas = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    
+    for fmt in FORMATOS_DATA:
+        faltando = datas.isna() & texto.notna()
+        if not faltando.any():
+            break
+        datas[faltando] = pd.to_datetime(texto[faltando], format=fmt, errors='coerce')
+    return datas
+
 def similaridade(a, b):
     """Calcula similaridade entre duas strings"""
     a_limpo = re.sub(r'\s+', ' ', str(a).lower().strip())
@@ -85,40 +111,27 @@ def normalizar_texto(texto):
     return texto
 
 # ============================================================
-# CALCULAR CONSUMO DOS ÚLTIMOS 3 MESES
+# PREPARAR HISTÓRICO (NÚMEROS E DATAS, UMA VEZ SÓ)
 # ============================================================
 
-def calcular_consumo_periodo(df_historico, meses=3):
-    """
-    Calcula o consumo (saídas) dos últimos X meses para cada item.
-    Retorna DataFrame com: Item, Consumo_Periodo, Media_Mensal
-    """
-    hoje = datetime.now()
-    data_inicio = hoje - timedelta(days=meses * 30)
-    
-    # Converter datas
-    df_historico['_data_mov'] = df_historico['Data'].apply(converter_data)
-    
-    # Filtrar movimentações do período
-    df_periodo = df_historico[
-        (df_historico['_data_mov'] >= data_inicio) & 
-        (df_historico['_data_mov'] <= hoje)
-    ].copy()
-    
-    # Somar saídas por item no período
-    consumo = df_periodo.groupby('Item').agg({
-        'Saída': 'sum',
-        'Entrada': 'sum',
-        '_data_mov': ['min', 'max', 'count']
-    }).reset_index()
-    
-    # Ajustar nomes das colunas
-    consumo.columns = ['Item', 'Consumo_3M', 'Entrada_3M', 'Primeira_Mov', 'Ultima_Mov', 'Qtd_Movs_3M']
-    
-    # Calcular média mensal
-    consumo['Media_Mensal'] = consumo['Consumo_3M'] / meses
-    
-    return consumo, data_inicio, hoje
+def limpar_numeros(df_historico):
+    """Converte as colunas numéricas do formato brasileiro (1.234,56)"""
+    cols_num = ['Saldo Anterior', 'Entrada', 'Saída', 'Saldo', 'Valor']
+    for col in cols_num:
+        if col in df_historico.columns:
+            df_historico[col] = df_historico[col].astype(str).str.replace('.', '', regex=False)
+            df_historico[col] = df_historico[col].str.replace(',', '.', regex=False).str.strip()
+            df_historico[col] = pd.to_numeric(df_historico[col], errors='coerce').fillna(0)
+
+
+def converter_datas_historico(df_historico):
+    """Adiciona _linha_original, _data_mov e _data_alt (datas convertidas uma vez só)"""
+    df_historico['_linha_original'] = range(len(df_historico))
+    df_historico['_data_mov'] = converter_datas(df_historico['Data'])
+    if 'Alterado Em' in df_historico.columns:
+        df_historico['_data_alt'] = converter_datas(df_historico['Alterado Em'])
+    else:
+        df_historico['_data_alt'] = None
 
 
 # ============================================================
@@ -130,6 +143,7 @@ def consolidar_estoque(df_historico):
     Consolida o histórico de movimentações em uma visão por item.
     Pega o ÚLTIMO lançamento de cada item para ter o saldo atual.
     Soma todas as entradas e saídas do período.
+    Todos os totais por item saem de um único groupby().agg.
     """
     secao("CONSOLIDANDO HISTÓRICO DE MOVIMENTAÇÕES", "🔄")
     
@@ -137,73 +151,77 @@ def consolidar_estoque(df_historico):
         print("    ❌ Coluna 'Item' não encontrada!")
         return pd.DataFrame(), pd.DataFrame()
     
-    # Adicionar índice de linha original
-    df_historico['_linha_original'] = range(len(df_historico))
-    
-    # Converter datas
-    df_historico['_data_mov'] = df_historico['Data'].apply(converter_data)
-    if 'Alterado Em' in df_historico.columns:
-        df_historico['_data_alt'] = df_historico['Alterado Em'].apply(converter_data)
-    else:
-        df_historico['_data_alt'] = None
+    # Datas convertidas uma vez só (rodar_gestao já faz isso na preparação)
+    if '_data_mov' not in df_historico.columns:
+        converter_datas_historico(df_historico)
     
-    # Contagem de movimentações por item
-    movimentacoes = df_historico.groupby('Item').size().reset_index(name='Qtd_Movimentacoes')
-    
-    # Para cada item, pegar o ÚLTIMO registro
-    idx_ultimo = df_historico.groupby('Item')['_linha_original'].idxmax()
-    df_ultimo = df_historico.loc[idx_ultimo].copy()
-    
-    # Para cada item, pegar o PRIMEIRO registro
-    idx_primeiro = df_historico.groupby('Item')['_linha_original'].idxmin()
-    df_primeiro = df_historico.loc[idx_primeiro][['Item', '_data_mov']].copy()
-    df_primeiro.columns = ['Item', '_primeira_mov']
+    hoje = datetime.now()
+    data_inicio = hoje - timedelta(days=MESES_ANALISE_CONSUMO * 30)
     
-    # Somar TODAS as entradas e saídas de cada item
-    totais = df_historico.groupby('Item').agg({
-        'Entrada': 'sum',
-        'Saída': 'sum'
-    }).reset_index()
-    totais.columns = ['Item', 'Total_Entradas', 'Total_Saidas']
+    # Movimentações dentro do período de consumo
+    datas = df_historico['_data_mov']
+    no_periodo = (datas >= data_inicio) & (datas <= hoje)
     
-    # Calcular consumo dos últimos 3 meses
     print(f"    ⏳ Calculando consumo dos últimos {MESES_ANALISE_CONSUMO} meses...")
-    consumo_3m, data_inicio, data_fim = calcular_consumo_periodo(df_historico, MESES_ANALISE_CONSUMO)
-    
-    # Juntar tudo
-    df_consolidado = df_ultimo.merge(movimentacoes, on='Item', how='left')
-    df_consolidado = df_consolidado.merge(totais, on='Item', how='left')
-    df_consolidado = df_consolidado.merge(df_primeiro, on='Item', how='left')
-    df_consolidado = df_consolidado.merge(consumo_3m, on='Item', how='left')
-    
-    # Preencher NaN com 0 para itens sem movimentação nos últimos 3 meses
-    df_consolidado['Consumo_3M'] = df_consolidado['Consumo_3M'].fillna(0)
-    df_consolidado['Entrada_3M'] = df_consolidado['Entrada_3M'].fillna(0)
-    df_consolidado['Media_Mensal'] = df_consolidado['Media_Mensal'].fillna(0)
-    df_consolidado['Qtd_Movs_3M'] = df_consolidado['Qtd_Movs_3M'].fillna(0)
-    
-    # Calcular cobertura de estoque (em meses)
-    df_consolidado['Cobertura_Meses'] = df_consolidado.apply(
-        lambda row: row['Saldo'] / row['Media_Mensal'] if row['Media_Mensal'] > 0 else 999,
-        axis=1
+    base = df_historico[['Item', 'Entrada', 'Saída', '_linha_original']].assign(
+        _saida_periodo=df_historico['Saída'].where(no_periodo, 0),
+        _entrada_periodo=df_historico['Entrada'].where(no_periodo, 0),
+        _data_periodo=datas.where(no_periodo)
     )
     
-    # Calcular dias desde última movimentação
-    hoje = datetime.now()
-    df_consolidado['Dias_Sem_Mov'] = df_consolidado['_data_mov'].apply(
-        lambda x: (hoje - x).days if x else 9999
+    # Um único groupby para contagem, primeiro/último registro, totais e consumo do período
+    agregados = base.groupby('Item').agg(
+        _idx_ultimo=('_linha_original', 'idxmax'),
+        _idx_primeiro=('_linha_original', 'idxmin'),
+        Qtd_Movimentacoes=('_linha_original', 'size'),
+        Total_Entradas=('Entrada', 'sum'),
+        Total_Saidas=('Saída', 'sum'),
+        Consumo_3M=('_saida_periodo', 'sum'),
+        Entrada_3M=('_entrada_periodo', 'sum'),
+        Primeira_Mov=('_data_periodo', 'min'),
+        Ultima_Mov=('_data_periodo', 'max'),
+        Qtd_Movs_3M=('_data_periodo', 'count')
     )
     
+    # Para cada item, o ÚLTIMO registro (saldo atual) + agregados
+    df_consolidado = df_historico.loc[agregados['_idx_ultimo']].reset_index(drop=True)
+    df_consolidado['Qtd_Movimentacoes'] = agregados['Qtd_Movimentacoes'].to_numpy()
+    df_consolidado['Total_Entradas'] = agregados['Total_Entradas'].to_numpy()
+    df_consolidado['Total_Saidas'] = agregados['Total_Saidas'].to_numpy()
+    df_consolidado['_primeira_mov'] = datas.loc[agregados['_idx_primeiro']].to_numpy()
+    for col in ['Consumo_3M', 'Entrada_3M', 'Primeira_Mov', 'Ultima_Mov', 'Qtd_Movs_3M']:
+        df_consolidado[col] = agregados[col].to_numpy()
+    df_consolidado['Media_Mensal'] = df_consolidado['Consumo_3M'] / MESES_ANALISE_CONSUMO
+    
+    # Cobertura de estoque (em meses) e dias desde a última movimentação - vetorizados
+    media = df_consolidado['Media_Mensal']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df_consolidado['Cobertura_Meses'] = np.where(media > 0, df_consolidado['Saldo'] / media, 999)
+    df_consolidado['Dias_Sem_Mov'] = (hoje - df_consolidado['_data_mov']).dt.days.fillna(9999)
+    
+    # Colunas derivadas usadas pelas análises (assim elas só leem o consolidado)
+    if 'Grupo' in df_consolidado.columns:
+        df_consolidado['Grupo'] = df_consolidado['Grupo'].astype(str).replace('', 'SEM GRUPO').replace('nan', 'SEM GRUPO')
+    if 'Saldo Anterior' in df_consolidado.columns:
+        df_consolidado['Calculado'] = df_consolidado['Saldo Anterior'] + df_consolidado['Entrada'] - df_consolidado['Saída']
+        df_consolidado['Diferenca'] = df_consolidado['Saldo'] - df_consolidado['Calculado']
+    
     # Limpar colunas auxiliares
     df_consolidado = df_consolidado.drop(columns=['_linha_original'], errors='ignore')
     
+    # Itens com movimentação no período (mesmo formato do antigo calcular_consumo_periodo)
+    consumo_3m = df_consolidado.loc[
+        df_consolidado['Qtd_Movs_3M'] > 0,
+        ['Item', 'Consumo_3M', 'Entrada_3M', 'Primeira_Mov', 'Ultima_Mov', 'Qtd_Movs_3M', 'Media_Mensal']
+    ].reset_index(drop=True)
+    
     total_itens = len(df_consolidado)
     total_movs = len(df_historico)
     
     print(f"    📦 {total_itens} itens únicos encontrados")
     print(f"    📝 {total_movs} movimentações no histórico")
     print(f"    📊 Média de {total_movs/total_itens:.1f} movimentações por item")
-    print(f"    📅 Período de consumo: {data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}")
+    print(f"    📅 Período de consumo: {data_inicio.strftime('%d/%m/%Y')} a {hoje.strftime('%d/%m/%Y')}")
     
     return df_consolidado, consumo_3m
 
@@ -384,34 +402,26 @@ def analisar_duplicados_indice(df_indice):
     # 2. SIMILARES
     subsecao("ITENS MUITO SIMILARES (possíveis duplicados)")
     similares = []
-    itens_unicos = list(set([i for i in itens_normalizados if i.strip() != '']))
-    
-    if len(itens_unicos) > 500:
-        print(f"    ⚠️  Muitos itens ({len(itens_unicos)}). Analisando primeiros 500...")
-        itens_unicos = itens_unicos[:500]
-    else:
-        print(f"    Comparando {len(itens_unicos)} itens únicos...")
-    
-    for i in range(len(itens_unicos)):
-        for j in range(i + 1, len(itens_unicos)):
-            if abs(len(itens_unicos[i]) - len(itens_unicos[j])) > 5:
-                continue
-            
-            sim = similaridade(itens_unicos[i], itens_unicos[j])
-            if sim >= SIMILARIDADE_DUPLICADO and sim < 1.0:
-                try:
-                    idx1 = itens_normalizados.index(itens_unicos[i])
-                    idx2 = itens_normalizados.index(itens_unicos[j])
-                    similares.append({
-                        'Item 1': itens[idx1],
-                        'Linha 1': idx1 + 2,
-                        'Item 2': itens[idx2],
-                        'Linha 2': idx2 + 2,
-                        'Similaridade': f"{sim*100:.0f}%",
-                        'Tipo': 'SIMILAR'
-                    })
-                except:
-                    pass
+    itens_unicos = list(dict.fromkeys(i for i in itens_normalizados if i.strip() != ''))
+    
+    # Primeira linha de cada nome normalizado (evita .index() dentro do laço)
+    primeira_linha = {}
+    for idx, normalizado in enumerate(itens_normalizados):
+        primeira_linha.setdefault(normalizado, idx)
+    
+    print(f"    Comparando {len(itens_unicos)} itens únicos (blocking + candidatos)...")
+    
+    for i, j, sim in encontrar_similares(itens_unicos, SIMILARIDADE_DUPLICADO, diferenca_max=5):
+        idx1 = primeira_linha[itens_unicos[i]]
+        idx2 = primeira_linha[itens_unicos[j]]
+        similares.append({
+            'Item 1': itens[idx1],
+            'Linha 1': idx1 + 2,
+            'Item 2': itens[idx2],
+            'Linha 2': idx2 + 2,
+            'Similaridade': f"{sim*100:.0f}%",
+            'Tipo': 'SIMILAR'
+        })
     
     if similares:
         similares.sort(key=lambda x: x['Similaridade'], reverse=True)
@@ -686,9 +696,9 @@ def analisar_por_grupo(df):
         print("    Coluna 'Grupo' não disponível")
         return
     
-    df['Grupo'] = df['Grupo'].astype(str).replace('', 'SEM GRUPO').replace('nan', 'SEM GRUPO')
+    grupo_item = df['Grupo'].astype(str).replace('', 'SEM GRUPO').replace('nan', 'SEM GRUPO')
     
-    grupos = df.groupby('Grupo').agg({
+    grupos = df.groupby(grupo_item).agg({
         'Item': 'count',
         'Saldo': 'sum',
         'Consumo_3M': 'sum'
@@ -704,10 +714,10 @@ def analisar_por_grupo(df):
     # Grupos com problemas
     subsecao("GRUPOS COM ITENS NEGATIVOS")
     tem_problema = False
-    for grupo in df['Grupo'].unique():
-        negativos_grupo = df[(df['Grupo'] == grupo) & (df['Saldo'] < 0)]
-        if not negativos_grupo.empty:
-            print(f"    {grupo}: {len(negativos_grupo)} itens negativos")
+    negativos_por_grupo = grupo_item[df['Saldo'] < 0].value_counts()
+    for grupo in grupo_item.unique():
+        if grupo in negativos_por_grupo.index:
+            print(f"    {grupo}: {negativos_por_grupo[grupo]} itens negativos")
             tem_problema = True
     
     if not tem_problema:
@@ -718,8 +728,10 @@ def analisar_divergencias(df):
     """Auditoria: divergências"""
     secao("AUDITORIA - DIVERGÊNCIAS MATEMÁTICAS", "🔍")
     
-    df['Calculado'] = df['Saldo Anterior'] + df['Entrada'] - df['Saída']
-    df['Diferenca'] = df['Saldo'] - df['Calculado']
+    # Calculado/Diferenca já vêm do consolidar_estoque
+    if 'Diferenca' not in df.columns:
+        df = df.assign(Calculado=df['Saldo Anterior'] + df['Entrada'] - df['Saída'])
+        df = df.assign(Diferenca=df['Saldo'] - df['Calculado'])
     
     furos = df[abs(df['Diferenca']) > 0.01].copy()
     
@@ -765,8 +777,8 @@ def analisar_curva_abc(df):
     df_abc['%'] = df_abc['Consumo_3M'] / total * 100
     df_abc['%_Acum'] = df_abc['%'].cumsum()
     
-    df_abc['Curva'] = df_abc['%_Acum'].apply(
-        lambda x: 'A' if x <= 80 else ('B' if x <= 95 else 'C')
+    df_abc['Curva'] = np.select(
+        [df_abc['%_Acum'] <= 80, df_abc['%_Acum'] <= 95], ['A', 'B'], default='C'
     )
     
     for curva in ['A', 'B', 'C']:
@@ -920,11 +932,92 @@ def exportar_relatorios(df, negativos, zerados, furos, parados, duplicados):
         print(f"    ❌ Erro: {e}")
 
 
+# ============================================================
+# PIPELINE: TEMPOS POR ETAPA E ANÁLISES EM PARALELO
+# ============================================================
+
+class SaidaPorThread(io.TextIOBase):
+    """stdout que manda o print de cada thread de análise para o buffer dela"""
+    
+    def __init__(self, original):
+        self.original = original
+        self._local = threading.local()
+    
+    def capturar(self, buffer):
+        self._local.buffer = buffer
+    
+    def write(self, texto):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self.original).write(texto)
+    
+    def flush(self):
+        self.original.flush()
+
+
+@contextmanager
+def medir(tempos, etapa):
+    """Acumula em tempos[etapa] o tempo gasto no bloco"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tempos[etapa] = tempos.get(etapa, 0) + time.perf_counter() - inicio
+
+
+def executar_analises(analises, tempos):
+    """
+    Roda análises independentes (só leem o consolidado) em paralelo.
+    O print de cada uma é capturado e mostrado na ordem original.
+    Retorna {nome: resultado}.
+    """
+    inicio = time.perf_counter()
+    saida = SaidaPorThread(sys.stdout)
+    buffers = {nome: io.StringIO() for nome, _, _ in analises}
+    tempos_analises = {}
+    
+    def executar(nome, funcao, args):
+        saida.capturar(buffers[nome])
+        try:
+            with medir(tempos_analises, f"  ↳ {nome}"):
+                return funcao(*args)
+        finally:
+            saida.capturar(None)
+    
+    sys.stdout = saida
+    try:
+        with ThreadPoolExecutor(max_workers=ANALISES_PARALELAS) as executor:
+            futuros = [(nome, executor.submit(executar, nome, funcao, args)) for nome, funcao, args in analises]
+    finally:
+        sys.stdout = saida.original
+    
+    tempos['Análises (em paralelo)'] = time.perf_counter() - inicio
+    for nome, _, _ in analises:
+        tempos[f"  ↳ {nome}"] = tempos_analises[f"  ↳ {nome}"]
+    
+    resultados = {}
+    for nome, futuro in futuros:
+        print(buffers[nome].getvalue(), end='')
+        resultados[nome] = futuro.result()  # Repassa o erro da análise, como no modo sequencial
+    return resultados
+
+
+def imprimir_tempos(tempos, total):
+    """Tabela de tempo por etapa do rodar_gestao"""
+    secao("TEMPO POR ETAPA", "⏱️")
+    tabela_header("Etapa", "Tempo", "% do total")
+    for etapa, segundos in tempos.items():
+        linha_item(etapa, f"{segundos:.2f}s", f"{100 * segundos / total:.1f}%" if total else "-")
+    separador()
+    linha_item("TOTAL", f"{total:.2f}s")
+
+
 # ============================================================
 # FUNÇÃO PRINCIPAL
 # ============================================================
 
 def rodar_gestao():
+    inicio_total = time.perf_counter()
+    tempos = {}
     try:
         titulo(f"ANÁLISE COMPLETA DE ESTOQUE - {datetime.now().strftime('%d/%m/%Y %H:%M')}")
         
@@ -961,16 +1054,16 @@ def rodar_gestao():
             df_indice = pd.DataFrame()
             print(f"⚠️  Aba ÍNDICE não encontrada: {e}")
         
-        # LIMPEZA NUMÉRICA
-        cols_num = ['Saldo Anterior', 'Entrada', 'Saída', 'Saldo', 'Valor']
-        for col in cols_num:
-            if col in df_historico.columns:
-                df_historico[col] = df_historico[col].astype(str).str.replace('.', '', regex=False)
-                df_historico[col] = df_historico[col].str.replace(',', '.', regex=False).str.strip()
-                df_historico[col] = pd.to_numeric(df_historico[col], errors='coerce').fillna(0)
+        tempos['Leitura do Sheets'] = time.perf_counter() - inicio_total
+        
+        # ========== PREPARAR (números e datas, uma vez só) ==========
+        with medir(tempos, 'Preparação (números e datas)'):
+            limpar_numeros(df_historico)
+            converter_datas_historico(df_historico)
         
         # ========== CONSOLIDAR ==========
-        df, consumo_3m = consolidar_estoque(df_historico)
+        with medir(tempos, 'Consolidação (groupby único)'):
+            df, consumo_3m = consolidar_estoque(df_historico)
         
         if df.empty:
             print("❌ Erro ao consolidar!")
@@ -978,43 +1071,36 @@ def rodar_gestao():
         
         # ========== ANÁLISES ==========
         
-        # 1. Duplicados
-        duplicados = analisar_duplicados_indice(df_indice)
-        
-        # 2. Comparar Estoque vs Índice
-        comparar_estoque_indice(df, df_indice)
-        
-        # 3. Níveis de Estoque
-        negativos, zerados, baixo = analisar_niveis_estoque(df)
-        
-        # 4. ⭐ ANÁLISE DE CONSUMO 3 MESES (NOVO!)
-        analisar_consumo_3_meses(df)
-        
-        # 5. Movimentação Temporal
-        parados, obsoletos = analisar_movimentacao_temporal(df)
-        
-        # 6. Padrões Entrada/Saída
-        analisar_movimentacao_entrada_saida(df)
-        
-        # 7. Por Grupo
-        analisar_por_grupo(df)
-        
-        # 8. Divergências
-        furos = analisar_divergencias(df)
-        
-        # 9. Curva ABC
-        analisar_curva_abc(df)
+        # 1. Duplicados (antes das threads: usa seu próprio pool de processos)
+        with medir(tempos, 'Duplicados no índice'):
+            duplicados = analisar_duplicados_indice(df_indice)
         
-        # 10. Giro
-        analisar_giro(df)
+        # 2 a 10. Análises que só leem o consolidado, em paralelo
+        resultados = executar_analises([
+            ('comparar_indice', comparar_estoque_indice, (df, df_indice)),
+            ('niveis', analisar_niveis_estoque, (df,)),
+            ('consumo_3_meses', analisar_consumo_3_meses, (df,)),  # ⭐ ANÁLISE DE CONSUMO 3 MESES
+            ('temporal', analisar_movimentacao_temporal, (df,)),
+            ('entrada_saida', analisar_movimentacao_entrada_saida, (df,)),
+            ('por_grupo', analisar_por_grupo, (df,)),
+            ('divergencias', analisar_divergencias, (df,)),
+            ('curva_abc', analisar_curva_abc, (df,)),
+            ('giro', analisar_giro, (df,)),
+        ], tempos)
+        negativos, zerados, baixo = resultados['niveis']
+        parados, obsoletos = resultados['temporal']
+        furos = resultados['divergencias']
         
         # RESUMO
-        gerar_resumo_executivo(df, negativos, zerados, baixo, furos, parados, duplicados)
+        with medir(tempos, 'Resumo executivo'):
+            gerar_resumo_executivo(df, negativos, zerados, baixo, furos, parados, duplicados)
         
         # EXPORTAR
-        exportar_relatorios(df, negativos, zerados, furos, parados, duplicados)
+        with medir(tempos, 'Exportação Excel'):
+            exportar_relatorios(df, negativos, zerados, furos, parados, duplicados)
         
         titulo("ANÁLISE CONCLUÍDA!")
+        imprimir_tempos(tempos, time.perf_counter() - inicio_total)
         
     except Exception as e:
         print(f"\n❌ ERRO: {e}")
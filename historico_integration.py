@@ -14,6 +14,7 @@ INSTRUÇÃO: Adicione ao app_final.py com:
 
 from flask import jsonify, request
 from historico_otimizado import gerenciador_historico, ConfigHistorico
+from agregados_diarios import agregados_diarios
 import logging
 
 logger = logging.getLogger(__name__)
@@ -357,6 +358,16 @@ def register_historico_routes(app):
                 observacao=data.get('observacao')
             )
 
+            # Registro manual não passa pelo barramento: soma nos agregados aqui
+            # (só com a linha, para o back-fill não somar de novo)
+            if registro.linha_planilha:
+                entrada = registro.quantidade if registro.tipo_movimentacao.upper() == 'ENTRADA' else 0.0
+                agregados_diarios.registrar(
+                    registro.item, registro.grupo, registro.data,
+                    entrada=entrada, saida=registro.quantidade - entrada,
+                    saldo=registro.saldo_novo, linha=int(registro.linha_planilha)
+                )
+
             return jsonify({
                 'success': True,
                 'registro': registro.to_dict()
@@ -462,7 +473,9 @@ def register_historico_routes(app):
           "registros_por_pagina": 20,
           "cache_ttl": 300,
           "usar_indice_memoria": true,
-          "thread_safe": true
+          "thread_safe": true,
+          "bootstrap_ao_iniciar": true,
+          "bootstrap_linhas": 2000
         }
         """
         try:
@@ -472,7 +485,9 @@ def register_historico_routes(app):
                 'registros_por_pagina': ConfigHistorico.REGISTROS_POR_PAGINA,
                 'cache_ttl': ConfigHistorico.CACHE_TTL,
                 'usar_indice_memoria': ConfigHistorico.USAR_INDICE_MEMORIA,
-                'thread_safe': ConfigHistorico.THREAD_SAFE
+                'thread_safe': ConfigHistorico.THREAD_SAFE,
+                'bootstrap_ao_iniciar': ConfigHistorico.BOOTSTRAP_AO_INICIAR,
+                'bootstrap_linhas': ConfigHistorico.BOOTSTRAP_LINHAS
             }
 
             return jsonify(config), 200
@@ -481,8 +496,78 @@ def register_historico_routes(app):
             logger.error(f"Erro ao obter configurações: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/historico/bootstrap', methods=['POST'])
+    def iniciar_bootstrap():
+        """
+        🚀 Pré-carrega o histórico com as últimas N linhas do ESTOQUE
+
+        POST /api/historico/bootstrap
+        Body (opcional):
+        {
+          "linhas": 2000
+        }
+
+        Roda em background; acompanhe em /api/historico/bootstrap/status
+
+        Response:
+        {
+          "success": true,
+          "iniciado": true,
+          "progresso": {...}
+        }
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            linhas = data.get('linhas')
+            linhas = int(linhas) if linhas else None
+
+            iniciado = gerenciador_historico.iniciar_bootstrap(linhas)
+
+            return jsonify({
+                'success': True,
+                'iniciado': iniciado,
+                'message': 'Bootstrap iniciado' if iniciado else 'Bootstrap já em execução',
+                'progresso': gerenciador_historico.obter_progresso_bootstrap()
+            }), 202
+
+        except Exception as e:
+            logger.error(f"Erro ao iniciar bootstrap: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/historico/bootstrap/status', methods=['GET'])
+    def status_bootstrap():
+        """
+        📥 Progresso do bootstrap do histórico
+
+        GET /api/historico/bootstrap/status
+
+        Response:
+        {
+          "status": "executando",
+          "em_execucao": true,
+          "linhas_total": 2000,
+          "linhas_lidas": 1000,
+          "registros_carregados": 980,
+          "linhas_ignoradas": 20,
+          "percentual": 50.0,
+          "inicio": "2026-02-13T08:00:00",
+          "fim": null,
+          "erro": null
+        }
+        """
+        try:
+            return jsonify(gerenciador_historico.obter_progresso_bootstrap()), 200
+
+        except Exception as e:
+            logger.error(f"Erro ao obter status do bootstrap: {e}")
+            return jsonify({'error': str(e)}), 500
+
     logger.info("✅ Endpoints de histórico registrados")
 
+    # Pré-carga do histórico a partir da planilha (não bloqueia o boot)
+    if ConfigHistorico.BOOTSTRAP_AO_INICIAR:
+        gerenciador_historico.iniciar_bootstrap()
+
 
 if __name__ == '__main__':
     print("📚 Este arquivo contém endpoints de histórico para Flask")
@@ -501,3 +586,5 @@ if __name__ == '__main__':
     print("  - POST /api/historico/limpar")
     print("  - POST /api/historico/carregar-redis")
     print("  - GET  /api/historico/configuracoes")
+    print("  - POST /api/historico/bootstrap")
+    print("  - GET  /api/historico/bootstrap/status")
@@ -11,6 +11,7 @@ Cache inteligente de histórico de movimentações:
 - 🔍 Filtros avançados (item, data, tipo, grupo)
 - 📊 Paginação eficiente
 - 🔄 Invalidação automática
+- 🚀 Pré-carga das últimas N linhas da aba ESTOQUE (bootstrap em background)
 
 Benefícios:
 - Zero tempo de carregamento
@@ -28,6 +29,9 @@ from enum import Enum
 import threading
 
 from cache_config import cache_marfim
+from config import converter_para_numero, ABA_ESTOQUE
+from estatisticas_itens import estatisticas_itens
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -133,6 +137,135 @@ class ConfigHistorico:
     USAR_INDICE_MEMORIA = True   # Índice em memória para busca rápida
     THREAD_SAFE = True           # Thread-safe para Flask
 
+    # Bootstrap (pré-carga a partir da aba ESTOQUE)
+    BOOTSTRAP_AO_INICIAR = True  # Dispara pré-carga ao registrar as rotas
+    BOOTSTRAP_LINHAS = 2000      # Últimas N linhas do ESTOQUE carregadas
+    BOOTSTRAP_BLOCO = 500        # Linhas por leitura (range A{ini}:Z{fim})
+
+
+# ========================================
+# LEITURA DA ABA ESTOQUE (BOOTSTRAP)
+# ========================================
+
+def _letra_coluna(numero: int) -> str:
+    """Converte número de coluna (1-based) em letra A1 (1 → A, 27 → AA)"""
+    letras = ''
+    while numero > 0:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _mapear_colunas_estoque(cabecalho: List[str]) -> Dict[str, int]:
+    """
+    Mapeia colunas da aba ESTOQUE pelo cabeçalho
+
+    Usa as mesmas regras de nome do lançamento em app_final.py; quando o
+    cabeçalho não traz a coluna, cai no layout padrão (A Grupo, B Item,
+    D Data, J Saldo).
+
+    Returns:
+        Dict chave lógica → índice (0-based)
+    """
+    colunas = {'grupo': 0, 'item': 1, 'data': 3, 'saldo': 9}
+    encontradas: Dict[str, int] = {}
+
+    for i, nome in enumerate(cabecalho):
+        col = str(nome).upper().strip()
+        if 'GRUPO' in col:
+            chave = 'grupo'
+        elif col == 'ITEM':
+            chave = 'item'
+        elif 'DATA' in col and 'ALT' not in col:
+            chave = 'data'
+        elif 'OBS' in col:
+            chave = 'obs'
+        elif 'S.ANT' in col or 'SALDO ANT' in col or col == 'S. ANT':
+            chave = 'saldo_anterior'
+        elif 'ENTRADA' in col:
+            chave = 'entrada'
+        elif 'SAÍDA' in col or 'SAIDA' in col:
+            chave = 'saida'
+        elif col == 'SALDO' or col == 'SALDO ATUAL':
+            chave = 'saldo'
+        elif 'ALTPOR' in col or 'ALT POR' in col or col == 'ALT.POR':
+            chave = 'usuario'
+        else:
+            continue
+
+        # Primeira ocorrência vence
+        encontradas.setdefault(chave, i)
+
+    colunas.update(encontradas)
+    return colunas
+
+
+def _linha_para_registro(
+    linha: List[str],
+    numero_linha: int,
+    colunas: Dict[str, int]
+) -> Optional[RegistroHistorico]:
+    """
+    Converte uma linha da aba ESTOQUE em RegistroHistorico
+
+    Tipo: ENTRADA se a coluna Entrada > 0, SAIDA se a coluna Saída > 0.
+    Linhas sem item ou sem quantidade (cabeçalhos repetidos, ajustes
+    de saldo) retornam None.
+    """
+    def valor(chave: str) -> str:
+        idx = colunas.get(chave)
+        if idx is None or idx >= len(linha):
+            return ''
+        return str(linha[idx]).strip()
+
+    item = valor('item')
+    if not item:
+        return None
+
+    entrada = converter_para_numero(valor('entrada'))
+    saida = converter_para_numero(valor('saida'))
+
+    if entrada > 0:
+        tipo, quantidade = 'ENTRADA', entrada
+    elif saida > 0:
+        tipo, quantidade = 'SAIDA', saida
+    else:
+        return None
+
+    saldo_novo = converter_para_numero(valor('saldo'))
+    if valor('saldo_anterior'):
+        saldo_anterior = converter_para_numero(valor('saldo_anterior'))
+    else:
+        saldo_anterior = saldo_novo - entrada + saida
+
+    # Data da planilha: "DD/MM/YYYY HH:MM:SS" ou só "DD/MM/YYYY"
+    data_bruta = valor('data')
+    data, hora, timestamp = data_bruta.split(' ')[0], '', ''
+    for formato in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
+        try:
+            dt = datetime.strptime(data_bruta, formato)
+            data = dt.strftime('%d/%m/%Y')
+            hora = dt.strftime('%H:%M:%S')
+            timestamp = dt.isoformat()
+            break
+        except ValueError:
+            continue
+
+    return RegistroHistorico(
+        item=item,
+        grupo=valor('grupo'),
+        tipo_movimentacao=tipo,
+        quantidade=quantidade,
+        saldo_anterior=saldo_anterior,
+        saldo_novo=saldo_novo,
+        data=data,
+        hora=hora,
+        linha_planilha=numero_linha,
+        usuario=valor('usuario') or None,
+        observacao=valor('obs') or None,
+        timestamp=timestamp
+    )
+
 
 # ========================================
 # CLASSE PRINCIPAL
@@ -176,9 +309,12 @@ class GerenciadorHistorico:
         # Cache em memória (deque para performance)
         self._cache: deque = deque(maxlen=self.tamanho_cache)
 
-        # Índices para busca rápida
-        self._indice_por_item: Dict[str, List[int]] = {}  # item -> [indices no cache]
-        self._indice_por_grupo: Dict[str, List[int]] = {}
+        # Índices para busca rápida: chave -> posições absolutas (seq) em ordem.
+        # O registro de seq s está em self._cache[s - self._base]; quando o
+        # mais antigo sai do deque, só ele é retirado dos índices.
+        self._indice_por_item: Dict[str, deque] = {}
+        self._indice_por_grupo: Dict[str, deque] = {}
+        self._base = 0
 
         # Lock para thread-safety
         self._lock = threading.RLock() if ConfigHistorico.THREAD_SAFE else None
@@ -191,6 +327,20 @@ class GerenciadorHistorico:
             'cache_misses': 0
         }
 
+        # Progresso do bootstrap (pré-carga da aba ESTOQUE)
+        self._bootstrap_thread: Optional[threading.Thread] = None
+        self._bootstrap = {
+            'status': 'ocioso',          # ocioso | executando | concluido | erro
+            'linhas_total': 0,
+            'linhas_lidas': 0,
+            'registros_carregados': 0,
+            'linhas_ignoradas': 0,
+            'percentual': 0.0,
+            'inicio': None,
+            'fim': None,
+            'erro': None
+        }
+
         logger.info(f"✅ GerenciadorHistorico inicializado (cache: {self.tamanho_cache})")
 
     def _lock_context(self):
@@ -250,18 +400,15 @@ class GerenciadorHistorico:
                 observacao=observacao
             )
 
-            # Adiciona ao cache
-            self._cache.append(registro)
-
-            # Atualiza índices
-            idx = len(self._cache) - 1
-            self._adicionar_ao_indice(item, idx, self._indice_por_item)
-            if grupo:
-                self._adicionar_ao_indice(grupo, idx, self._indice_por_grupo)
+            # Adiciona ao cache e aos índices (O(1), mesmo com o cache cheio)
+            self._anexar(registro)
 
             # Atualiza stats
             self._stats['total_adicionado'] += 1
 
+            # Estatísticas incrementais do item (média/desvio/EWMA em O(1))
+            estatisticas_itens.registrar(item, tipo_movimentacao, quantidade, registro.data)
+
             # Salva no Redis (se disponível)
             self._salvar_no_redis()
 
@@ -269,16 +416,49 @@ class GerenciadorHistorico:
 
             return registro
 
-    def _adicionar_ao_indice(self, chave: str, idx: int, indice: Dict):
+    def _anexar(self, registro: RegistroHistorico):
+        """Acrescenta no fim do cache; se cheio, o mais antigo sai dos índices"""
+        if len(self._cache) == self._cache.maxlen:
+            antigo = self._cache.popleft()
+            self._retirar_do_indice(antigo.item, self._base, self._indice_por_item)
+            if antigo.grupo:
+                self._retirar_do_indice(antigo.grupo, self._base, self._indice_por_grupo)
+            self._base += 1
+
+        seq = self._base + len(self._cache)
+        self._cache.append(registro)
+        self._adicionar_ao_indice(registro.item, seq, self._indice_por_item)
+        if registro.grupo:
+            self._adicionar_ao_indice(registro.grupo, seq, self._indice_por_grupo)
+
+    def _adicionar_ao_indice(self, chave: str, seq: int, indice: Dict):
         """Adiciona índice para busca rápida"""
         chave_upper = chave.upper()
         if chave_upper not in indice:
-            indice[chave_upper] = []
-        indice[chave_upper].append(idx)
+            indice[chave_upper] = deque()
+        indice[chave_upper].append(seq)
 
-        # Limita tamanho do índice (evita crescimento infinito)
-        if len(indice[chave_upper]) > self.tamanho_cache:
-            indice[chave_upper] = indice[chave_upper][-self.tamanho_cache:]
+    def _retirar_do_indice(self, chave: str, seq: int, indice: Dict):
+        """Retira o registro mais antigo (sempre o primeiro da chave)"""
+        chave_upper = chave.upper()
+        posicoes = indice.get(chave_upper)
+        if posicoes and posicoes[0] == seq:
+            posicoes.popleft()
+            if not posicoes:
+                del indice[chave_upper]
+
+    def _registros(self, posicoes) -> List[RegistroHistorico]:
+        """Registros das posições absolutas de um índice"""
+        return [self._cache[seq - self._base] for seq in posicoes]
+
+    def _reconstruir_indices(self):
+        """Reconstrói índices item/grupo a partir das posições atuais do cache"""
+        self._indice_por_item.clear()
+        self._indice_por_grupo.clear()
+        for idx, registro in enumerate(self._cache):
+            self._adicionar_ao_indice(registro.item, self._base + idx, self._indice_por_item)
+            if registro.grupo:
+                self._adicionar_ao_indice(registro.grupo, self._base + idx, self._indice_por_grupo)
 
     def obter_ultimos(self, limite: int = 20) -> List[RegistroHistorico]:
         """
@@ -323,8 +503,7 @@ class GerenciadorHistorico:
 
             # Tenta busca pelo índice primeiro (exato)
             if item_upper in self._indice_por_item:
-                indices = self._indice_por_item[item_upper]
-                registros = [self._cache[i] for i in indices if i < len(self._cache)]
+                registros = self._registros(self._indice_por_item[item_upper])
                 self._stats['cache_hits'] += 1
             else:
                 # Busca parcial (mais lenta)
@@ -356,8 +535,7 @@ class GerenciadorHistorico:
 
             # Tenta índice
             if grupo_upper in self._indice_por_grupo:
-                indices = self._indice_por_grupo[grupo_upper]
-                registros = [self._cache[i] for i in indices if i < len(self._cache)]
+                registros = self._registros(self._indice_por_grupo[grupo_upper])
                 self._stats['cache_hits'] += 1
             else:
                 # Busca linear
@@ -519,6 +697,7 @@ class GerenciadorHistorico:
             self._cache.clear()
             self._indice_por_item.clear()
             self._indice_por_grupo.clear()
+            self._base = 0
             logger.info("🗑️ Cache de histórico limpo")
 
     def obter_estatisticas(self) -> Dict[str, Any]:
@@ -539,7 +718,8 @@ class GerenciadorHistorico:
                 'indices': {
                     'itens': len(self._indice_por_item),
                     'grupos': len(self._indice_por_grupo)
-                }
+                },
+                'bootstrap': self._bootstrap['status']
             }
 
     def _salvar_no_redis(self):
@@ -569,14 +749,7 @@ class GerenciadorHistorico:
             if registros_dict:
                 with self._lock_context():
                     for r_dict in registros_dict:
-                        registro = RegistroHistorico(**r_dict)
-                        self._cache.append(registro)
-
-                        # Reconstrói índices
-                        idx = len(self._cache) - 1
-                        self._adicionar_ao_indice(registro.item, idx, self._indice_por_item)
-                        if registro.grupo:
-                            self._adicionar_ao_indice(registro.grupo, idx, self._indice_por_grupo)
+                        self._anexar(RegistroHistorico(**r_dict))
 
                 logger.info(f"✅ {len(registros_dict)} registros carregados do Redis")
                 return len(registros_dict)
@@ -587,6 +760,169 @@ class GerenciadorHistorico:
             logger.warning(f"Erro ao carregar do Redis: {e}")
             return 0
 
+    # ========================================
+    # BOOTSTRAP A PARTIR DA PLANILHA
+    # ========================================
+
+    def _atualizar_bootstrap(self, **campos):
+        """Atualiza progresso do bootstrap (thread-safe)"""
+        with self._lock_context():
+            self._bootstrap.update(campos)
+
+    def obter_progresso_bootstrap(self) -> Dict[str, Any]:
+        """Retorna progresso do bootstrap"""
+        with self._lock_context():
+            progresso = dict(self._bootstrap)
+            progresso['em_execucao'] = bool(
+                self._bootstrap_thread and self._bootstrap_thread.is_alive()
+            )
+            return progresso
+
+    def iniciar_bootstrap(self, linhas: Optional[int] = None, planilha=None) -> bool:
+        """
+        Dispara o bootstrap em thread de background
+
+        Args:
+            linhas: Últimas N linhas do ESTOQUE (padrão: ConfigHistorico.BOOTSTRAP_LINHAS)
+            planilha: Planilha gspread já aberta (padrão: get_conexao_sheets())
+
+        Returns:
+            True se iniciou, False se já havia um bootstrap em execução
+        """
+        with self._lock_context():
+            if self._bootstrap_thread and self._bootstrap_thread.is_alive():
+                return False
+
+            self._bootstrap_thread = threading.Thread(
+                target=self.bootstrap_da_planilha,
+                args=(linhas, planilha),
+                name='historico-bootstrap',
+                daemon=True
+            )
+            self._bootstrap_thread.start()
+
+        logger.info("🚀 Bootstrap do histórico iniciado em background")
+        return True
+
+    def bootstrap_da_planilha(self, linhas: Optional[int] = None, planilha=None) -> Dict[str, Any]:
+        """
+        Carrega as últimas N linhas da aba ESTOQUE no cache
+
+        Lê em blocos com range (A{ini}:Z{fim}) em vez de get_all_values,
+        publicando o progresso a cada bloco. Registros já presentes no
+        cache (mesma linha_planilha) são mantidos.
+
+        Returns:
+            Progresso final (ver obter_progresso_bootstrap)
+        """
+        linhas = linhas or ConfigHistorico.BOOTSTRAP_LINHAS
+        bloco = ConfigHistorico.BOOTSTRAP_BLOCO
+
+        self._atualizar_bootstrap(
+            status='executando',
+            linhas_total=0,
+            linhas_lidas=0,
+            registros_carregados=0,
+            linhas_ignoradas=0,
+            percentual=0.0,
+            inicio=datetime.now().isoformat(),
+            fim=None,
+            erro=None
+        )
+
+        try:
+            if planilha is None:
+                from config import get_conexao_sheets
+                planilha = get_conexao_sheets()
+
+            aba = planilha.worksheet(ABA_ESTOQUE)
+            cabecalho = aba.row_values(1)
+            colunas = _mapear_colunas_estoque(cabecalho)
+
+            if 'entrada' not in colunas or 'saida' not in colunas:
+                raise ValueError("Colunas Entrada/Saída não encontradas no cabeçalho do ESTOQUE")
+
+            # Nº de linhas: lê só a coluna do item (evita baixar a aba inteira)
+            ultima_linha = len(aba.col_values(colunas['item'] + 1))
+            primeira_linha = max(2, ultima_linha - linhas + 1)
+            total = max(0, ultima_linha - primeira_linha + 1)
+            letra_final = _letra_coluna(max(len(cabecalho), max(colunas.values()) + 1))
+
+            self._atualizar_bootstrap(linhas_total=total)
+            logger.info(f"📥 Bootstrap: linhas {primeira_linha}..{ultima_linha} do {ABA_ESTOQUE}")
+
+            registros: List[RegistroHistorico] = []
+            lidas = ignoradas = 0
+
+            for ini in range(primeira_linha, ultima_linha + 1, bloco):
+                fim = min(ini + bloco - 1, ultima_linha)
+                valores = aba.get(f"A{ini}:{letra_final}{fim}")
+
+                for offset, linha in enumerate(valores):
+                    registro = _linha_para_registro(linha, ini + offset, colunas)
+                    if registro:
+                        registros.append(registro)
+                    else:
+                        ignoradas += 1
+
+                lidas += fim - ini + 1
+                self._atualizar_bootstrap(
+                    linhas_lidas=lidas,
+                    registros_carregados=len(registros),
+                    linhas_ignoradas=ignoradas,
+                    percentual=round(lidas / total * 100, 1) if total else 100.0
+                )
+
+            carregados = self._mesclar_registros(registros, capacidade=linhas)
+
+            self._atualizar_bootstrap(
+                status='concluido',
+                registros_carregados=carregados,
+                percentual=100.0,
+                fim=datetime.now().isoformat()
+            )
+            logger.info(f"✅ Bootstrap do histórico: {carregados} registros ({ignoradas} linhas ignoradas)")
+
+        except Exception as e:
+            self._atualizar_bootstrap(
+                status='erro',
+                erro=str(e),
+                fim=datetime.now().isoformat()
+            )
+            logger.error(f"❌ Erro no bootstrap do histórico: {e}")
+
+        return self.obter_progresso_bootstrap()
+
+    def _mesclar_registros(self, registros: List[RegistroHistorico], capacidade: int) -> int:
+        """
+        Insere registros da planilha ANTES dos já presentes no cache
+
+        Movimentações feitas durante o bootstrap continuam sendo as mais
+        recentes. O cache cresce até `capacidade` se necessário.
+
+        Returns:
+            Número de registros da planilha inseridos
+        """
+        with self._lock_context():
+            atuais = list(self._cache)
+            linhas_atuais = {r.linha_planilha for r in atuais if r.linha_planilha}
+            novos = [r for r in registros if r.linha_planilha not in linhas_atuais]
+
+            self.tamanho_cache = max(self.tamanho_cache, capacidade)
+            self._cache = deque(novos + atuais, maxlen=self.tamanho_cache)
+            self._reconstruir_indices()
+            self._stats['total_adicionado'] += len(novos)
+
+            # Registros da planilha são mais antigos: refaz estatísticas em ordem
+            estatisticas_itens.reconstruir(
+                (r.item, r.tipo_movimentacao, r.quantidade, r.data)
+                for r in self._cache
+            )
+
+            self._salvar_no_redis()
+
+        return len(novos)
+
 
 # ========================================
 # SINGLETON GLOBAL
@@ -594,6 +930,32 @@ class GerenciadorHistorico:
 gerenciador_historico = GerenciadorHistorico()
 
 
+# ========================================
+# EVENTOS
+# ========================================
+
+def _ao_registrar_movimentacao(evento: MovimentacaoRegistrada):
+    """Registro novo no histórico em memória (e estatísticas do item)"""
+    data, _, hora = evento.data.partition(' ')
+    gerenciador_historico.adicionar_registro(
+        item=evento.item,
+        tipo_movimentacao=evento.tipo.upper(),
+        quantidade=evento.quantidade,
+        saldo_anterior=evento.saldo_anterior,
+        saldo_novo=evento.saldo_novo,
+        grupo=evento.grupo,
+        data=data or None,
+        hora=hora or None,
+        linha_planilha=evento.linha,
+        usuario=evento.origem or None,
+        observacao=evento.obs or None
+    )
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_movimentacao,
+                             nome='historico', assincrono=True)
+
+
 # ========================================
 # FUNÇÕES AUXILIARES
 # ========================================
@@ -662,4 +1024,15 @@ if __name__ == '__main__':
     stats = gerenciador_historico.obter_estatisticas()
     print(f"✅ Stats: {stats['total_buscas']} buscas, hit rate: {stats['hit_rate']}")
 
+    # Cache cheio: índices continuam apontando para os registros certos
+    pequeno = GerenciadorHistorico(tamanho_cache=5)
+    for i in range(12):
+        pequeno.adicionar_registro(item=f'ITEM_{i % 3}', tipo_movimentacao='SAIDA', quantidade=i,
+                                   saldo_anterior=0, saldo_novo=0, grupo=f'GRUPO_{i % 2}')
+    for chave in ('ITEM_0', 'ITEM_1', 'ITEM_2'):
+        esperado = sorted(r.quantidade for r in pequeno._cache if r.item == chave)
+        assert sorted(r.quantidade for r in pequeno.buscar_por_item(chave)) == esperado
+    assert sorted(r.quantidade for r in pequeno.buscar_por_grupo('GRUPO_0')) == [8, 10]
+    print(f"✅ Cache cheio: índices consistentes ({len(pequeno._cache)} registros, base {pequeno._base})")
+
     print("\n✅ Testes concluídos!")
@@ -11,6 +11,7 @@ Sistema inteligente com:
 - 📊 Análise de padrões e anomalias
 - 💡 Recomendações automáticas
 - 🎯 Sistema de scoring/confiança
+- 📐 Estatísticas incrementais por item (sem reler histórico a cada chamada)
 
 Benefícios:
 - Detecta erros antes de acontecer
@@ -26,6 +27,10 @@ from dataclasses import dataclass, field
 from enum import Enum
 import statistics
 
+import numpy as np
+
+from estatisticas_itens import estatisticas_itens
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -97,6 +102,7 @@ class PredicaoSaldo:
     tendencia: str  # crescente, decrescente, estavel
     media_diaria: float
     recomendacao: str
+    modelo: Optional[Dict[str, Any]] = None  # Suavização exponencial usada (tipo, parâmetros, métricas)
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
 
     def to_dict(self) -> Dict[str, Any]:
@@ -109,6 +115,7 @@ class PredicaoSaldo:
             'tendencia': self.tendencia,
             'media_diaria': self.media_diaria,
             'recomendacao': self.recomendacao,
+            'modelo': self.modelo,
             'timestamp': self.timestamp
         }
 
@@ -241,7 +248,8 @@ class SistemaIA:
             quantidade: Quantidade
             saldo_atual: Saldo atual
             grupo: Grupo do item
-            historico: Histórico do item (opcional)
+            historico: Histórico do item (opcional; se None, usa as
+                estatísticas incrementais do item)
 
         Returns:
             ResultadoValidacao
@@ -320,6 +328,38 @@ class SistemaIA:
                 sugestoes.append("💡 Verifique se não esqueceu de registrar entradas anteriores")
                 confianca -= 10
 
+        # ========================================
+        # REGRA 3b: Estatísticas incrementais (sem histórico explícito)
+        # ========================================
+        elif historico is None:
+            stats = estatisticas_itens.obter(item)
+
+            if stats and stats.n >= ConfigIA.QUANTIDADE_MIN_HISTORICO:
+                media = stats.media
+                desvio = stats.desvio
+
+                if desvio > 0:
+                    z_score = abs(quantidade - media) / desvio
+
+                    if z_score > ConfigIA.DESVIO_PADRAO_MAX:
+                        avisos.append(
+                            f"⚠️ Quantidade {quantidade:.1f} está muito acima da média ({media:.1f})"
+                        )
+                        sugestoes.append(
+                            f"💡 Normalmente você movimenta ~{media:.0f}. Confirme se {quantidade:.0f} está correto."
+                        )
+                        score -= 15
+                        confianca -= 20
+
+                tipos_historico = stats.ultimos_tipos(5)
+                entradas = tipos_historico.count('ENTRADA')
+                saidas = tipos_historico.count('SAIDA')
+
+                if 'ENTRADA' in tipo_upper and saidas > entradas * 2:
+                    avisos.append("ℹ️ Item tem mais SAÍDAS que ENTRADAS recentemente")
+                    sugestoes.append("💡 Verifique se não esqueceu de registrar entradas anteriores")
+                    confianca -= 10
+
         # ========================================
         # REGRA 4: Validação de padrões comuns
         # ========================================
@@ -379,6 +419,142 @@ class SistemaIA:
             score=score
         )
 
+    def validar_lote(
+        self,
+        itens: List[str],
+        tipos: List[str],
+        quantidades: List[float],
+        saldos: List[float]
+    ) -> List[ResultadoValidacao]:
+        """
+        Valida N movimentações de uma vez (mesmas regras de validar_movimentacao)
+
+        As estatísticas incrementais são buscadas uma vez por item distinto e
+        as regras 1–5 viram máscaras NumPy sobre o lote; só a montagem das
+        mensagens percorre as linhas.
+
+        Args:
+            itens, tipos, quantidades, saldos: Listas alinhadas (uma posição por movimentação)
+
+        Returns:
+            Lista de ResultadoValidacao na mesma ordem
+        """
+        n = len(itens)
+        if n == 0:
+            return []
+
+        qtd = np.asarray(quantidades, dtype=float)
+        saldo = np.asarray(saldos, dtype=float)
+        tipos_upper = [str(t).upper() for t in tipos]
+        saida = np.array([('SAIDA' in t or 'SAÍDA' in t) for t in tipos_upper], dtype=bool)
+        entrada = np.array(['ENTRADA' in t for t in tipos_upper], dtype=bool)
+
+        # Junta com as estatísticas de cada item distinto
+        chaves = [str(i).strip().upper() for i in itens]
+        distintos = {c: None for c in chaves}
+        for chave in distintos:
+            stats = estatisticas_itens.obter(chave)
+            if stats and stats.n >= ConfigIA.QUANTIDADE_MIN_HISTORICO:
+                tipos_recentes = stats.ultimos_tipos(5)
+                distintos[chave] = (stats.media, stats.desvio,
+                                    tipos_recentes.count('ENTRADA'), tipos_recentes.count('SAIDA'))
+        sem_stats = (np.nan, 0.0, 0, 0)
+        tabela = np.array([distintos[c] or sem_stats for c in chaves], dtype=float)
+        media, desvio, ent_recentes, sai_recentes = tabela.T
+        com_stats = ~np.isnan(media)
+
+        # REGRA 1: quantidade
+        r1_zero = qtd <= 0
+        r1_alta = qtd > 10000
+
+        # REGRA 2: saldo para SAÍDA
+        r2_insuficiente = saida & (qtd > saldo)
+        r2_negativo = saida & (saldo - qtd < 0)
+
+        # REGRA 3b: z-score e padrão de tipos das estatísticas incrementais
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = np.abs(qtd - media) / desvio
+        r3_zscore = com_stats & (desvio > 0) & (z_score > ConfigIA.DESVIO_PADRAO_MAX)
+        r3_tipos = com_stats & entrada & (sai_recentes > ent_recentes * 2)
+
+        # REGRA 4: entrada com saldo alto
+        r4_saldo_alto = entrada & (saldo > 1000)
+
+        # REGRA 5: horário
+        hora_atual = datetime.now().hour
+        r5_horario = hora_atual < 6 or hora_atual > 22
+
+        score = (100.0 - 50 * r1_zero - 10 * r1_alta - 30 * r2_insuficiente
+                 - 20 * r2_negativo - 15 * r3_zscore - 5 * r5_horario)
+        confianca = np.full(n, 100.0) - 15 * r1_alta
+        confianca = np.where(r2_insuficiente, 95.0, confianca)
+        confianca = confianca - 20 * r3_zscore - 10 * r3_tipos - 5 * r4_saldo_alto - 10 * r5_horario
+
+        score = np.clip(score, 0, 100)
+        confianca = np.clip(confianca, 0, 100)
+        tem_problema = r1_zero | r2_insuficiente | r2_negativo
+        valido = (score >= ConfigIA.SCORE_MINIMO_VALIDO) & ~tem_problema
+        nivel = np.select(
+            [confianca >= 90, confianca >= 70, confianca >= 50],
+            [0, 1, 2], default=3
+        )
+        niveis = [NivelConfianca.MUITO_ALTA, NivelConfianca.ALTA, NivelConfianca.MEDIA, NivelConfianca.BAIXA]
+
+        # Mensagens (mesmos textos e ordem de validar_movimentacao).
+        # Máscaras viram listas: indexar arrays NumPy elemento a elemento é lento.
+        timestamp = datetime.now().isoformat()
+        media_l = media.tolist()
+        flags = zip(
+            r1_zero.tolist(), r1_alta.tolist(), r2_insuficiente.tolist(), r2_negativo.tolist(),
+            r3_zscore.tolist(), r3_tipos.tolist(), r4_saldo_alto.tolist()
+        )
+        finais = zip(valido.tolist(), score.astype(int).tolist(), confianca.astype(int).tolist(), nivel.tolist())
+
+        resultados = []
+        for i, (flag, (ok, sc, conf, nv)) in enumerate(zip(flags, finais)):
+            zero, alta, insuficiente, negativo, zscore, tipos_ruins, saldo_alto = flag
+            problemas, avisos, sugestoes = [], [], []
+
+            if zero:
+                problemas.append("❌ Quantidade deve ser maior que zero")
+            if alta:
+                avisos.append("⚠️ Quantidade muito alta (>10000). Verifique se está correto.")
+                sugestoes.append("💡 Confirme se não é um erro de digitação (ex: 100 ao invés de 10000)")
+            if insuficiente:
+                problemas.append(f"❌ SAÍDA de {quantidades[i]} com saldo de apenas {saldos[i]}")
+                sugestoes.append("💡 Verifique se deveria ser ENTRADA ao invés de SAÍDA")
+            if negativo:
+                problemas.append("❌ Saldo ficará NEGATIVO")
+            if zscore:
+                avisos.append(f"⚠️ Quantidade {quantidades[i]:.1f} está muito acima da média ({media_l[i]:.1f})")
+                sugestoes.append(
+                    f"💡 Normalmente você movimenta ~{media_l[i]:.0f}. Confirme se {quantidades[i]:.0f} está correto."
+                )
+            if tipos_ruins:
+                avisos.append("ℹ️ Item tem mais SAÍDAS que ENTRADAS recentemente")
+                sugestoes.append("💡 Verifique se não esqueceu de registrar entradas anteriores")
+            if saldo_alto:
+                avisos.append(f"ℹ️ Item já tem saldo alto ({saldos[i]}). Entrada necessária?")
+            if r5_horario:
+                avisos.append(f"⏰ Movimentação em horário incomum ({hora_atual:02d}h)")
+                sugestoes.append("💡 Confirme se a data/hora está correta")
+
+            if not ok and not problemas:
+                problemas.append(f"⚠️ Score de validação baixo ({sc:.0f}/100)")
+
+            resultados.append(ResultadoValidacao(
+                valido=ok,
+                confianca=conf,
+                nivel_confianca=niveis[nv],
+                problemas=problemas,
+                avisos=avisos,
+                sugestoes=sugestoes,
+                score=sc,
+                timestamp=timestamp
+            ))
+
+        return resultados
+
     def prever_saldo_futuro(
         self,
         item: str,
@@ -393,7 +569,9 @@ class SistemaIA:
             item: Nome do item
             dias: Dias no futuro
             saldo_atual: Saldo atual (se None, busca)
-            historico: Histórico do item
+            historico: Histórico do item (se None, usa o modelo de suavização
+                exponencial; sem modelo, as estatísticas incrementais; sem
+                estatísticas, busca no histórico)
 
         Returns:
             PredicaoSaldo
@@ -407,7 +585,55 @@ class SistemaIA:
             except:
                 saldo_atual = 0.0
 
-        # Busca histórico se não fornecido
+        # Calcula média diária
+        media_diaria = 0.0
+        confianca = 50.0
+        tendencia = "estavel"
+
+        # Modelo de suavização exponencial ajustado no snapshot da planilha
+        modelo = None
+        if historico is None:
+            try:
+                from suavizacao_exponencial import motor_suavizacao
+                modelo = motor_suavizacao.prever(item, dias)
+            except Exception as e:
+                logger.debug(f"Suavização indisponível: {e}")
+
+        # Estatísticas incrementais: taxa EWMA + buffer das últimas saídas
+        stats = estatisticas_itens.obter(item) if historico is None and modelo is None else None
+
+        if modelo:
+            media_diaria = modelo['media_diaria']
+            tendencia = modelo['tendencia']
+            wape = modelo['metricas']['wape']
+            # Erro relativo menor → confiança maior (30% a 90%)
+            confianca = 50.0 if wape is None else max(30.0, min(90.0, 100 - wape * 50))
+            historico = []
+
+        elif stats and stats.n >= 3:
+            saidas_recentes = stats.saidas_recentes()  # ordem cronológica
+            taxa = stats.taxa_diaria()
+
+            if taxa is not None:
+                media_diaria = taxa
+                confianca = min(90, 50 + stats.dias_fechados * 2)
+            elif saidas_recentes:
+                media_diaria = sum(saidas_recentes) / len(saidas_recentes)
+                confianca = min(90, 50 + len(saidas_recentes) * 5)
+
+            if len(saidas_recentes) >= 5:
+                meio = len(saidas_recentes) // 2
+                antigas = sum(saidas_recentes[:meio]) / meio
+                recentes = sum(saidas_recentes[meio:]) / (len(saidas_recentes) - meio)
+
+                if recentes > antigas * 1.2:
+                    tendencia = "crescente"
+                elif recentes < antigas * 0.8:
+                    tendencia = "decrescente"
+
+            historico = []
+
+        # Busca histórico se não fornecido (item sem estatísticas)
         if historico is None:
             try:
                 from historico_otimizado import gerenciador_historico
@@ -416,11 +642,6 @@ class SistemaIA:
             except:
                 historico = []
 
-        # Calcula média diária
-        media_diaria = 0.0
-        confianca = 50.0
-        tendencia = "estavel"
-
         if historico and len(historico) >= 3:
             try:
                 # Filtra saídas dos últimos N dias
@@ -448,7 +669,8 @@ class SistemaIA:
                 logger.debug(f"Erro ao calcular média: {e}")
 
         # Prevê saldo futuro
-        saldo_previsto = saldo_atual - (media_diaria * dias)
+        consumo_previsto = modelo['consumo_previsto'] if modelo else media_diaria * dias
+        saldo_previsto = saldo_atual - consumo_previsto
 
         # Calcula dias para zerar
         dias_para_zerar = None
@@ -468,7 +690,12 @@ class SistemaIA:
             confianca=confianca,
             tendencia=tendencia,
             media_diaria=media_diaria,
-            recomendacao=recomendacao
+            recomendacao=recomendacao,
+            modelo={
+                'tipo': modelo['modelo'],
+                'parametros': modelo['parametros'],
+                'metricas': modelo['metricas']
+            } if modelo else None
         )
 
     def _gerar_recomendacao_predicao(
@@ -514,25 +741,33 @@ class SistemaIA:
             item: Nome do item
             quantidade: Quantidade
             tipo_movimentacao: ENTRADA/SAIDA
-            historico: Histórico do item
+            historico: Histórico do item (se None, usa as estatísticas
+                incrementais do item)
 
         Returns:
             Lista de AnomaliaDetectada
         """
         anomalias = []
 
-        if not historico or len(historico) < ConfigIA.QUANTIDADE_MIN_HISTORICO:
-            return anomalias
-
         try:
-            # Extrai quantidades do histórico
-            quantidades = [abs(float(h.get('quantidade', 0))) for h in historico]
+            if historico is None:
+                stats = estatisticas_itens.obter(item)
+                if not stats or stats.n < ConfigIA.QUANTIDADE_MIN_HISTORICO:
+                    return anomalias
+                media = stats.media
+                desvio = stats.desvio
+                ultimos_tipos = stats.ultimos_tipos(3)
+            else:
+                if len(historico) < ConfigIA.QUANTIDADE_MIN_HISTORICO:
+                    return anomalias
+
+                # Extrai quantidades do histórico
+                quantidades = [abs(float(h.get('quantidade', 0))) for h in historico]
 
-            if not quantidades:
-                return anomalias
+                media = statistics.mean(quantidades)
+                desvio = statistics.stdev(quantidades) if len(quantidades) > 1 else 0
+                ultimos_tipos = [h.get('tipo_movimentacao', '').upper() for h in historico[:3]]
 
-            media = statistics.mean(quantidades)
-            desvio = statistics.stdev(quantidades) if len(quantidades) > 1 else 0
 
             # ANOMALIA 1: Quantidade muito acima da média
             if desvio > 0:
@@ -550,9 +785,8 @@ class SistemaIA:
                     ))
 
             # ANOMALIA 2: Frequência anormal (muitas movimentações seguidas)
-            if len(historico) >= 3:
+            if len(ultimos_tipos) >= 3:
                 # Verifica se as últimas 3 foram do mesmo tipo
-                ultimos_tipos = [h.get('tipo_movimentacao', '').upper() for h in historico[:3]]
                 if all('SAIDA' in t or 'SAÍDA' in t for t in ultimos_tipos):
                     if 'SAIDA' in tipo_movimentacao.upper():
                         anomalias.append(AnomaliaDetectada(
@@ -632,9 +866,15 @@ class SistemaIA:
             dados = indice_otimizado.buscar_item(item)
             saldo_atual = float(dados.get('saldo', 0)) if dados else 0.0
 
-            # Histórico
-            registros = gerenciador_historico.buscar_por_item(item, limite=30)
-            historico = [r.to_dict() for r in registros]
+            # Histórico: estatísticas incrementais quando o item já foi movimentado
+            stats = estatisticas_itens.obter(item)
+            if stats:
+                historico = None
+                total_movimentacoes = stats.n
+            else:
+                registros = gerenciador_historico.buscar_por_item(item, limite=30)
+                historico = [r.to_dict() for r in registros]
+                total_movimentacoes = len(historico)
 
             # Predição
             predicao = self.prever_saldo_futuro(item, dias=7, saldo_atual=saldo_atual, historico=historico)
@@ -647,7 +887,7 @@ class SistemaIA:
                 'saldo_atual': saldo_atual,
                 'predicao': predicao.to_dict(),
                 'alerta': alerta.to_dict() if alerta else None,
-                'total_movimentacoes': len(historico),
+                'total_movimentacoes': total_movimentacoes,
                 'analise_ia': {
                     'status': '🔴 CRÍTICO' if predicao.dias_para_zerar and predicao.dias_para_zerar <= 3
                               else '⚠️ ATENÇÃO' if predicao.dias_para_zerar and predicao.dias_para_zerar <= 7
@@ -14,6 +14,7 @@ INSTRUÇÃO: Adicione ao app_final.py com:
 
 from flask import jsonify, request
 from ia_avancada import sistema_ia, ConfigIA
+from gateway_ia import gateway_ia
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,15 +68,8 @@ def register_ia_routes(app):
                     'error': f'Campos obrigatórios: {", ".join(required)}'
                 }), 400
 
-            # Busca histórico se não fornecido
-            historico = data.get('historico')
-            if not historico:
-                try:
-                    from historico_otimizado import gerenciador_historico
-                    registros = gerenciador_historico.buscar_por_item(data['item'], limite=20)
-                    historico = [r.to_dict() for r in registros]
-                except:
-                    historico = []
+            # Sem histórico no body, a IA usa as estatísticas incrementais do item
+            historico = data.get('historico') or None
 
             # Valida com IA
             validacao = sistema_ia.validar_movimentacao(
@@ -121,7 +115,8 @@ def register_ia_routes(app):
             "confianca": 75.0,
             "tendencia": "decrescente",
             "media_diaria": 10.0,
-            "recomendacao": "✅ Saldo previsto OK"
+            "recomendacao": "✅ Saldo previsto OK",
+            "modelo": {"tipo": "holt_winters", "parametros": {...}, "metricas": {...}}
           }
         }
         """
@@ -133,16 +128,9 @@ def register_ia_routes(app):
 
             dias = data.get('dias', 7)
             saldo_atual = data.get('saldo_atual')
-            historico = data.get('historico')
-
-            # Busca histórico se não fornecido
-            if not historico:
-                try:
-                    from historico_otimizado import gerenciador_historico
-                    registros = gerenciador_historico.buscar_por_item(data['item'], limite=30)
-                    historico = [r.to_dict() for r in registros]
-                except:
-                    historico = []
+            # Sem histórico no body, a IA usa o modelo de suavização exponencial
+            # do item (ou as estatísticas incrementais)
+            historico = data.get('historico') or None
 
             # Prevê saldo
             predicao = sistema_ia.prever_saldo_futuro(
@@ -199,15 +187,8 @@ def register_ia_routes(app):
                     'error': f'Campos obrigatórios: {", ".join(required)}'
                 }), 400
 
-            # Busca histórico
-            historico = data.get('historico')
-            if not historico:
-                try:
-                    from historico_otimizado import gerenciador_historico
-                    registros = gerenciador_historico.buscar_por_item(data['item'], limite=20)
-                    historico = [r.to_dict() for r in registros]
-                except:
-                    historico = []
+            # Sem histórico no body, a IA usa as estatísticas incrementais do item
+            historico = data.get('historico') or None
 
             # Detecta anomalias
             anomalias = sistema_ia.detectar_anomalias(
@@ -324,24 +305,30 @@ def register_ia_routes(app):
             if 'movimentacoes' not in data:
                 return jsonify({'error': 'Campo obrigatório: movimentacoes'}), 400
 
-            validacoes = []
+            # Converte as linhas; as inválidas são descartadas (com log)
+            itens, tipos, quantidades, saldos = [], [], [], []
 
             for mov in data['movimentacoes']:
                 try:
-                    validacao = sistema_ia.validar_movimentacao(
-                        item=mov['item'],
-                        tipo_movimentacao=mov['tipo_movimentacao'],
-                        quantidade=float(mov['quantidade']),
-                        saldo_atual=float(mov['saldo_atual']),
-                        grupo=mov.get('grupo')
-                    )
-                    validacoes.append({
-                        'item': mov['item'],
-                        'validacao': validacao.to_dict()
-                    })
+                    item = mov['item']
+                    tipo = mov['tipo_movimentacao']
+                    quantidade = float(mov['quantidade'])
+                    saldo = float(mov['saldo_atual'])
                 except Exception as e:
                     logger.error(f"Erro ao validar {mov.get('item')}: {e}")
                     continue
+                itens.append(item)
+                tipos.append(tipo)
+                quantidades.append(quantidade)
+                saldos.append(saldo)
+
+            # Todas as regras de uma vez sobre o lote (vetorizado)
+            validacoes = [
+                {'item': item, 'validacao': validacao.to_dict()}
+                for item, validacao in zip(
+                    itens, sistema_ia.validar_lote(itens, tipos, quantidades, saldos)
+                )
+            ]
 
             validos = sum(1 for v in validacoes if v['validacao']['valido'])
             invalidos = len(validacoes) - validos
@@ -439,6 +426,31 @@ def register_ia_routes(app):
             logger.error(f"Erro ao obter configurações: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/ia/gateway', methods=['GET'])
+    def obter_status_gateway():
+        """
+        🚦 Estado do gateway de chamadas ao LLM
+
+        GET /api/ia/gateway
+
+        Response:
+        {
+          "max_concorrentes": 4,
+          "em_uso": 1,
+          "aguardando": 0,
+          "circuito": {"estado": "fechado", "falhas_seguidas": 0, "aberturas": 0, "reabre_em_s": null},
+          "espera_fila": {"amostras": 120, "media_ms": 3.2, "p95_ms": 15.0, "max_ms": 410.0},
+          "latencia": {"amostras": 118, "media_ms": 1850.4, "p95_ms": 4200.0, "max_ms": 7900.0},
+          "chamadas": 130, "sucessos": 118, "erros": 2, "prazos_excedidos": 4,
+          "recusadas_circuito": 5, "recusadas_fila": 1
+        }
+        """
+        try:
+            return jsonify(gateway_ia.obter_resumo()), 200
+        except Exception as e:
+            logger.error(f"Erro ao obter status do gateway: {e}")
+            return jsonify({'error': str(e)}), 500
+
     logger.info("✅ Endpoints de IA registrados")
 
 
@@ -455,3 +467,4 @@ if __name__ == '__main__':
     print("  - POST /api/ia/validar-lote")
     print("  - GET  /api/ia/dashboard")
     print("  - GET  /api/ia/configuracoes")
+    print("  - GET  /api/ia/gateway")
@@ -21,6 +21,7 @@ from datetime import datetime
 from typing import Dict, Optional, List, Any
 from config import obter_planilha
 from cache_config import cache_marfim, cached
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +61,7 @@ class IndiceOtimizado:
     def __init__(self):
         """Inicializa o gerenciador de índice"""
         self.planilha = obter_planilha()
+        self.versao = 0   # incrementa a cada alteração do índice feita por este processo
         logger.info("✅ IndiceOtimizado inicializado")
 
     def reconstruir_indice_completo(self) -> Dict[str, Any]:
@@ -111,6 +113,7 @@ class IndiceOtimizado:
 
             # Salva em cache
             cache_marfim.set('indice_completo', indice, 'index_full')
+            self.versao += 1
             logger.info("💾 Índice salvo no cache (TTL: 1 hora)")
 
             # Calcula duração
@@ -301,6 +304,7 @@ class IndiceOtimizado:
 
             # Salva cache atualizado
             cache_marfim.set('indice_completo', indice, 'index_full')
+            self.versao += 1
 
             # Atualiza na planilha ÍNDICE_ITENS (async seria ideal, mas fazemos sync)
             self._atualizar_item_na_planilha(nome_item, saldo, data, grupo, linha_estoque)
@@ -312,6 +316,39 @@ class IndiceOtimizado:
             logger.error(f"❌ Erro ao atualizar item no índice: {e}")
             return False
 
+    def aplicar_movimentacao(
+        self,
+        nome_item: str,
+        saldo: float,
+        data: str,
+        grupo: str = '',
+        linha_estoque: Optional[int] = None
+    ) -> bool:
+        """
+        Atualiza UM item só no índice em memória
+
+        Para quando a ÍNDICE_ITENS já foi gravada por quem lançou: não lê nem
+        escreve na planilha, e não faz nada se o índice ainda não está em cache.
+        Só a entrada do item é alterada (sem regravar o índice inteiro nem
+        renovar o TTL).
+
+        Returns:
+            True se o cache foi atualizado
+        """
+        mudancas = {'saldo': saldo, 'data': data, 'ultima_atualizacao': datetime.now().isoformat()}
+        if grupo:
+            mudancas['grupo'] = grupo
+        if linha_estoque:
+            mudancas['linha_estoque'] = linha_estoque
+
+        atualizado = cache_marfim.update_entry(
+            'indice_completo', nome_item.strip().upper(), mudancas, 'index_full',
+            defaults={'item_original': nome_item, 'grupo': '', 'linha_estoque': 0}
+        )
+        if atualizado:
+            self.versao += 1
+        return atualizado
+
     def _atualizar_item_na_planilha(
         self,
         nome_item: str,
@@ -442,6 +479,7 @@ class IndiceOtimizado:
     def invalidar_cache(self):
         """Invalida cache do índice (força reload na próxima busca)"""
         cache_marfim.invalidate('indice_completo')
+        self.versao += 1
         logger.info("🗑️ Cache do índice invalidado")
 
 
@@ -451,6 +489,20 @@ class IndiceOtimizado:
 indice_otimizado = IndiceOtimizado()
 
 
+# ========================================
+# EVENTOS
+# ========================================
+
+def _ao_registrar_movimentacao(evento: MovimentacaoRegistrada):
+    """Saldo, data e linha do item no índice em memória"""
+    indice_otimizado.aplicar_movimentacao(
+        evento.item, evento.saldo_novo, evento.data, evento.grupo, evento.linha
+    )
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_movimentacao, nome='indice_otimizado')
+
+
 if __name__ == '__main__':
     # Testes básicos
     print("🧪 Testando IndiceOtimizado...")
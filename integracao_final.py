@@ -93,13 +93,13 @@ def registrar_tudo(app: Flask) -> ResultadoRegistro:
 
     fases = [
         # (nome_exibição, função, módulo, nº endpoints)
-        ("FASE 1 — Cache Multinível",      "register_cache_routes",       "app_cache_integration",   8),
+        ("FASE 1 — Cache Multinível",      "register_cache_routes",       "app_cache_integration",  10),
         ("FASE 2 — Alertas Automáticos",   "register_alertas_routes",     "alertas_integration",    10),
         ("FASE 3 — Preview de Saldos",     "register_preview_routes",     "preview_integration",     5),
-        ("FASE 4 — Histórico Otimizado",   "register_historico_routes",   "historico_integration",  12),
-        ("FASE 5 — IA Avançada",           "register_ia_routes",          "ia_integration",          8),
-        ("FASE 6 — Relatórios",            "register_relatorios_routes",  "relatorios_integration",  8),
-        ("FASE 7 — Otimizações",           "register_otimizacoes_routes", "otimizacoes_integration", 14),
+        ("FASE 4 — Histórico Otimizado",   "register_historico_routes",   "historico_integration",  14),
+        ("FASE 5 — IA Avançada",           "register_ia_routes",          "ia_integration",          9),
+        ("FASE 6 — Relatórios",            "register_relatorios_routes",  "relatorios_integration", 12),
+        ("FASE 7 — Otimizações",           "register_otimizacoes_routes", "otimizacoes_integration", 15),
     ]
 
     for nome, fn, modulo, n_ep in fases:
@@ -207,10 +207,12 @@ def _registrar_endpoint_status(app: Flask, resultado: ResultadoRegistro):
 def imprimir_mapa_rotas():
     """Imprime mapa completo de todos os endpoints novos."""
     mapa = {
-        "FASE 1 — Cache Multinível (8)": [
+        "FASE 1 — Cache Multinível (10)": [
             "GET  /api/cache/stats",
             "POST /api/cache/invalidate",
             "GET  /api/cache/health",
+            "GET  /api/cache/ia",
+            "POST /api/cache/ia/limpar",
             "POST /api/indice/reconstruir",
             "GET  /api/indice/item/<nome>",
             "GET  /api/indice/saldo/<nome>",
@@ -236,7 +238,7 @@ def imprimir_mapa_rotas():
             "GET  /api/preview/saldo/<item>",
             "GET  /api/preview/configuracoes",
         ],
-        "FASE 4 — Histórico Otimizado (12)": [
+        "FASE 4 — Histórico Otimizado (14)": [
             "GET  /api/historico/ultimos",
             "GET  /api/historico/item/<nome>",
             "GET  /api/historico/grupo/<nome>",
@@ -249,8 +251,10 @@ def imprimir_mapa_rotas():
             "POST /api/historico/limpar",
             "POST /api/historico/carregar-redis",
             "GET  /api/historico/configuracoes",
+            "POST /api/historico/bootstrap",
+            "GET  /api/historico/bootstrap/status",
         ],
-        "FASE 5 — IA Avançada (8)": [
+        "FASE 5 — IA Avançada (9)": [
             "POST /api/ia/validar",
             "POST /api/ia/prever-saldo",
             "POST /api/ia/detectar-anomalias",
@@ -259,8 +263,9 @@ def imprimir_mapa_rotas():
             "POST /api/ia/validar-lote",
             "GET  /api/ia/dashboard",
             "GET  /api/ia/configuracoes",
+            "GET  /api/ia/gateway",
         ],
-        "FASE 6 — Relatórios (8)": [
+        "FASE 6 — Relatórios (12)": [
             "GET  /api/relatorios/completo",
             "GET  /api/relatorios/curva-abc",
             "GET  /api/relatorios/grupos",
@@ -269,8 +274,12 @@ def imprimir_mapa_rotas():
             "GET  /api/relatorios/exportar/pdf",
             "GET  /api/relatorios/graficos",
             "GET  /api/relatorios/configuracoes",
+            "POST /api/relatorios/jobs",
+            "GET  /api/relatorios/jobs",
+            "GET  /api/relatorios/jobs/<id>",
+            "GET  /api/relatorios/jobs/<id>/download/<formato>",
         ],
-        "FASE 7 — Otimizações (14)": [
+        "FASE 7 — Otimizações (15)": [
             "POST /api/otimizacoes/batch/adicionar",
             "POST /api/otimizacoes/batch/flush",
             "GET  /api/otimizacoes/batch/status",
@@ -284,6 +293,7 @@ def imprimir_mapa_rotas():
             "GET  /api/otimizacoes/monitor/resumo",
             "GET  /api/otimizacoes/monitor/operacao/<nome>",
             "POST /api/otimizacoes/validar-lote",
+            "GET  /api/otimizacoes/eventos",
             "GET  /api/otimizacoes/dashboard",
         ],
         "FASE 8 — Sistema (1)": [
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KPIs Incrementais do Dashboard - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Mantém os números do /api/dashboard prontos entre uma carga e outra:
+- 🔢 Contadores (itens, críticos, zerados, negativos, consumo e estoque
+  totais, distribuição de cobertura) ajustados item a item
+- 🏆 Top consumo e mais críticos em heaps com remoção preguiçosa: uma
+  movimentação custa O(log n), ler o top-k custa O(k log n)
+- 🔄 Recálculo completo só quando o snapshot do ÍNDICE é trocado (hash
+  das colunas, como no contexto do chat)
+
+Cada movimentação lançada muda o saldo (e, se for saída, o consumo de 30
+dias) de um item só; o dashboard é servido sem varrer o catálogo.
+
+Uso:
+    from kpis_dashboard import kpis_dashboard
+
+    kpis_dashboard.atualizar(df_idx)                       # no-op se o snapshot não mudou
+    kpis_dashboard.aplicar_movimentacao('AMARELO 1234', novo_saldo=120, saida=30)
+    kpis_dashboard.obter_dashboard()
+"""
+
+import heapq
+import time
+import logging
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from eventos_estoque import barramento_eventos, MovimentacaoRegistrada
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigKPIs:
+    """Configurações dos KPIs do dashboard (mesmas faixas do /api/dashboard)"""
+    VALIDADE_SNAPSHOT_S = 60       # /api/dashboard reaproveita o snapshot por até N segundos
+    TOP_N = 10
+    DIAS_JANELA_CONSUMO = 30
+    SEM_CONSUMO = 999              # Dias_Cobertura de item sem consumo
+    LIMITE_CRITICO = 15            # itens_criticos: cobertura < 15 dias
+    FAIXAS_COBERTURA = [           # (nome, mínimo inclusivo, máximo exclusivo)
+        ('critico', None, 7),
+        ('urgente', 7, 15),
+        ('atencao', 15, 30),
+        ('normal', 30, 999),
+    ]
+    COLUNAS_VERSAO = ['Item', 'Saldo', 'Consumo_30d', 'Dias_Cobertura']
+
+
+# ========================================
+# RANKING INCREMENTAL (TOP-K)
+# ========================================
+
+class RankingIncremental:
+    """
+    Top-k por valor com heap e remoção preguiçosa
+
+    Cada chave tem no máximo uma entrada válida; atualizar só empilha a
+    entrada nova e a antiga vira lixo, descartado quando aparece no topo
+    (ou numa compactação, quando o lixo passa do dobro das chaves vivas).
+    Empates seguem a ordem (posição) informada - igual ao nlargest/nsmallest
+    do pandas com keep='first'.
+    """
+
+    def __init__(self, maior_primeiro: bool = True):
+        self.maior_primeiro = maior_primeiro
+        self._heap: List[Tuple[float, int, int, Hashable]] = []
+        self._atual: Dict[Hashable, Tuple[float, int, int]] = {}
+        self._versao = 0
+
+    def __len__(self) -> int:
+        return len(self._atual)
+
+    def _prioridade(self, valor: float) -> float:
+        return -valor if self.maior_primeiro else valor
+
+    def reconstruir(self, entradas: Iterable[Tuple[Hashable, float, int]]):
+        """Recarrega tudo de uma vez (heapify O(n)) a partir de (chave, valor, posição)"""
+        self._versao += 1
+        self._atual = {chave: (self._prioridade(valor), posicao, self._versao) for chave, valor, posicao in entradas}
+        self._heap = [(p, pos, v, chave) for chave, (p, pos, v) in self._atual.items()]
+        heapq.heapify(self._heap)
+
+    def definir(self, chave: Hashable, valor: Optional[float], posicao: int):
+        """Atualiza o valor de uma chave (None tira a chave do ranking)"""
+        if valor is None:
+            self._atual.pop(chave, None)
+        else:
+            self._versao += 1
+            entrada = (self._prioridade(valor), posicao, self._versao)
+            self._atual[chave] = entrada
+            heapq.heappush(self._heap, entrada + (chave,))
+
+        if len(self._heap) > 2 * len(self._atual) + 64:
+            self._heap = [(p, pos, v, c) for c, (p, pos, v) in self._atual.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, k: int) -> List[Hashable]:
+        """As k primeiras chaves (sem alterar o ranking)"""
+        escolhidas, validas = [], []
+        while self._heap and len(escolhidas) < k:
+            p, pos, v, chave = heapq.heappop(self._heap)
+            if self._atual.get(chave) == (p, pos, v):
+                escolhidas.append(chave)
+                validas.append((p, pos, v, chave))
+        for entrada in validas:
+            heapq.heappush(self._heap, entrada)
+        return escolhidas
+
+
+# ========================================
+# AGREGADOR
+# ========================================
+
+def _faixa_cobertura(dias: float) -> Optional[str]:
+    for nome, minimo, maximo in ConfigKPIs.FAIXAS_COBERTURA:
+        if (minimo is None or dias >= minimo) and dias < maximo:
+            return nome
+    return None
+
+
+def calcular_cobertura(saldo: float, consumo_30d: float) -> float:
+    """Mesma regra do app: saldo / média diária, 999 sem consumo"""
+    media = consumo_30d / ConfigKPIs.DIAS_JANELA_CONSUMO
+    return round(saldo / media, 1) if media > 0 else ConfigKPIs.SEM_CONSUMO
+
+
+class AgregadorKPIs:
+    """
+    KPIs do dashboard mantidos por item
+
+    Os itens são identificados pela posição na planilha ÍNDICE (itens
+    repetidos continuam contando duas vezes, como no DataFrame); o nome
+    normalizado aponta para a primeira posição, que é a que o lançamento
+    atualiza.
+    """
+
+    def __init__(self):
+        self.versao: Optional[int] = None
+        self.atualizado_em: float = 0.0
+        self._lock = threading.RLock()
+        self._limpar()
+        self.stats = {'recalculos': 0, 'reaproveitados': 0, 'movimentacoes': 0, 'leituras': 0}
+
+    def _limpar(self):
+        self._linhas: List[Dict[str, Any]] = []
+        self._posicao: Dict[str, int] = {}
+        self._contadores = {'itens_criticos': 0, 'itens_zerados': 0, 'itens_negativos': 0}
+        self._faixas = {nome: 0 for nome, _, _ in ConfigKPIs.FAIXAS_COBERTURA}
+        self._consumo_total = 0.0
+        self._estoque_total = 0.0
+        self._top_consumo = RankingIncremental(maior_primeiro=True)
+        self._mais_criticos = RankingIncremental(maior_primeiro=False)
+        self._dashboard: Optional[Dict[str, Any]] = None
+
+    # ========================================
+    # SNAPSHOT (recálculo completo)
+    # ========================================
+
+    def atualizar(self, df_idx: pd.DataFrame) -> bool:
+        """
+        Sincroniza com o DataFrame do ÍNDICE (com Saldo, Consumo_30d e Dias_Cobertura)
+
+        Returns:
+            True se recalculou, False se o snapshot era o mesmo
+        """
+        colunas = [c for c in ConfigKPIs.COLUNAS_VERSAO if c in df_idx.columns]
+        versao = int(pd.util.hash_pandas_object(df_idx[colunas], index=False).sum()) ^ len(df_idx)
+
+        with self._lock:
+            self.atualizado_em = time.time()
+            if versao == self.versao:
+                self.stats['reaproveitados'] += 1
+                return False
+
+            t0 = time.time()
+            self._recalcular(df_idx)
+            self.versao = versao
+            self.stats['recalculos'] += 1
+
+        logger.info(f"📊 KPIs do dashboard recalculados: {len(df_idx)} itens em {(time.time() - t0) * 1000:.0f}ms")
+        return True
+
+    def _recalcular(self, df: pd.DataFrame):
+        self._limpar()
+
+        itens = df['Item'].astype(str).tolist()
+        saldos = df['Saldo'].astype(float).to_numpy()
+        consumos = df['Consumo_30d'].astype(float).to_numpy()
+        coberturas = df['Dias_Cobertura'].astype(float).to_numpy()
+
+        self._linhas = [
+            {'Item': item, 'Saldo': float(s), 'Consumo_30d': float(c), 'Dias_Cobertura': float(d)}
+            for item, s, c, d in zip(itens, saldos, consumos, coberturas)
+        ]
+        for pos, item in enumerate(itens):
+            self._posicao.setdefault(item.strip().upper(), pos)
+
+        # Contadores vetorizados (uma vez por snapshot)
+        self._contadores['itens_criticos'] = int((coberturas < ConfigKPIs.LIMITE_CRITICO).sum())
+        self._contadores['itens_zerados'] = int((saldos == 0).sum())
+        self._contadores['itens_negativos'] = int((saldos < 0).sum())
+        for nome, minimo, maximo in ConfigKPIs.FAIXAS_COBERTURA:
+            na_faixa = coberturas < maximo
+            if minimo is not None:
+                na_faixa &= coberturas >= minimo
+            self._faixas[nome] = int(na_faixa.sum())
+        self._consumo_total = float(consumos.sum())
+        self._estoque_total = float(saldos.sum())
+
+        posicoes = range(len(itens))
+        self._top_consumo.reconstruir(zip(posicoes, consumos.tolist(), posicoes))
+        com_consumo = np.flatnonzero(coberturas < ConfigKPIs.SEM_CONSUMO).tolist()
+        self._mais_criticos.reconstruir((p, coberturas[p], p) for p in com_consumo)
+
+    def snapshot_recente(self) -> bool:
+        """True se há snapshot carregado há menos de VALIDADE_SNAPSHOT_S"""
+        return (self.versao is not None
+                and time.time() - self.atualizado_em < ConfigKPIs.VALIDADE_SNAPSHOT_S)
+
+    # ========================================
+    # MOVIMENTAÇÕES (ajuste de um item)
+    # ========================================
+
+    def _contribuir(self, linha: Dict[str, Any], sinal: int):
+        """Soma (sinal=1) ou retira (sinal=-1) a contribuição de um item nos contadores"""
+        saldo, cobertura = linha['Saldo'], linha['Dias_Cobertura']
+        self._contadores['itens_criticos'] += sinal * (cobertura < ConfigKPIs.LIMITE_CRITICO)
+        self._contadores['itens_zerados'] += sinal * (saldo == 0)
+        self._contadores['itens_negativos'] += sinal * (saldo < 0)
+        faixa = _faixa_cobertura(cobertura)
+        if faixa:
+            self._faixas[faixa] += sinal
+        self._consumo_total += sinal * linha['Consumo_30d']
+        self._estoque_total += sinal * saldo
+
+    def aplicar_movimentacao(self, item: str, novo_saldo: float, saida: float = 0.0) -> bool:
+        """
+        Ajusta os KPIs depois de um lançamento
+
+        Args:
+            item: Nome do item (item novo entra no fim do catálogo)
+            novo_saldo: Saldo após a movimentação
+            saida: Quantidade de saída (entra no consumo de 30 dias)
+
+        Returns:
+            False se ainda não há snapshot carregado
+        """
+        with self._lock:
+            if self.versao is None:
+                return False
+
+            chave = str(item).strip().upper()
+            pos = self._posicao.get(chave)
+            if pos is None:
+                pos = len(self._linhas)
+                self._posicao[chave] = pos
+                self._linhas.append({'Item': str(item), 'Saldo': 0.0, 'Consumo_30d': 0.0,
+                                     'Dias_Cobertura': float(ConfigKPIs.SEM_CONSUMO)})
+            else:
+                self._contribuir(self._linhas[pos], -1)
+
+            linha = self._linhas[pos]
+            linha['Saldo'] = float(novo_saldo)
+            linha['Consumo_30d'] += max(float(saida or 0), 0.0)
+            linha['Dias_Cobertura'] = float(calcular_cobertura(linha['Saldo'], linha['Consumo_30d']))
+            self._contribuir(linha, 1)
+
+            self._top_consumo.definir(pos, linha['Consumo_30d'], pos)
+            cobertura = linha['Dias_Cobertura']
+            self._mais_criticos.definir(pos, cobertura if cobertura < ConfigKPIs.SEM_CONSUMO else None, pos)
+
+            self._dashboard = None
+            self.stats['movimentacoes'] += 1
+        return True
+
+    # ========================================
+    # LEITURA
+    # ========================================
+
+    def obter_dashboard(self) -> Dict[str, Any]:
+        """Mesmo formato de /api/dashboard (kpis, top_consumo, criticos, distribuicao)"""
+        with self._lock:
+            self.stats['leituras'] += 1
+            if self._dashboard is None:
+                n = ConfigKPIs.TOP_N
+                self._dashboard = {
+                    'kpis': {
+                        'total_itens': len(self._linhas),
+                        **self._contadores,
+                        'consumo_30d': round(self._consumo_total, 0),
+                        'estoque_total': round(self._estoque_total, 0)
+                    },
+                    'top_consumo': [dict(self._linhas[p]) for p in self._top_consumo.top(n)],
+                    'criticos': [dict(self._linhas[p]) for p in self._mais_criticos.top(n)],
+                    'distribuicao': dict(self._faixas)
+                }
+            return self._dashboard
+
+    def obter_kpis(self) -> Optional[Dict[str, Any]]:
+        """Só os contadores e a distribuição (sem os rankings); None sem snapshot"""
+        with self._lock:
+            if self.versao is None:
+                return None
+            return {
+                'total_itens': len(self._linhas),
+                **self._contadores,
+                'consumo_30d': round(self._consumo_total, 0),
+                'estoque_total': round(self._estoque_total, 0),
+                'distribuicao': dict(self._faixas)
+            }
+
+    def nomes_itens(self, chaves: Iterable[str]) -> Dict[str, str]:
+        """Nome como está no ÍNDICE para cada chave normalizada (as desconhecidas ficam de fora)"""
+        with self._lock:
+            return {chave: self._linhas[self._posicao[chave]]['Item']
+                    for chave in chaves if chave in self._posicao}
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Estado do agregador"""
+        with self._lock:
+            return {
+                'versao': self.versao,
+                'itens': len(self._linhas),
+                'snapshot_recente': self.snapshot_recente(),
+                **self.stats
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+kpis_dashboard = AgregadorKPIs()
+
+
+# ========================================
+# EVENTOS
+# ========================================
+
+def _ao_registrar_movimentacao(evento: MovimentacaoRegistrada):
+    """Só o item movimentado muda (saldo e, na saída, consumo)"""
+    kpis_dashboard.aplicar_movimentacao(evento.item, evento.saldo_novo, evento.saida)
+
+
+barramento_eventos.inscrever(MovimentacaoRegistrada, _ao_registrar_movimentacao, nome='kpis_dashboard')
+
+
+if __name__ == '__main__':
+    print("🧪 Testando AgregadorKPIs...")
+
+    rnd = np.random.default_rng(5)
+    n = 5000
+    df = pd.DataFrame({
+        'Item': [f'ITEM {i:05d}' for i in range(n)],
+        'Saldo': rnd.integers(-5, 400, n).astype(float),
+        'Consumo_30d': np.where(rnd.random(n) < 0.6, rnd.integers(0, 300, n), 0).astype(float)
+    })
+    df['Dias_Cobertura'] = [calcular_cobertura(s, c) for s, c in zip(df['Saldo'], df['Consumo_30d'])]
+
+    def dashboard_completo(df):
+        """Cálculo original do /api/dashboard"""
+        colunas = ['Item', 'Saldo', 'Consumo_30d', 'Dias_Cobertura']
+        return {
+            'kpis': {
+                'total_itens': len(df),
+                'itens_criticos': len(df[df['Dias_Cobertura'] < 15]),
+                'itens_zerados': len(df[df['Saldo'] == 0]),
+                'itens_negativos': len(df[df['Saldo'] < 0]),
+                'consumo_30d': round(df['Consumo_30d'].sum(), 0),
+                'estoque_total': round(df['Saldo'].sum(), 0)
+            },
+            'top_consumo': df.nlargest(10, 'Consumo_30d')[colunas].to_dict('records'),
+            'criticos': df[df['Dias_Cobertura'] < 999].nsmallest(10, 'Dias_Cobertura')[colunas].to_dict('records'),
+            'distribuicao': {
+                'critico': len(df[df['Dias_Cobertura'] < 7]),
+                'urgente': len(df[(df['Dias_Cobertura'] >= 7) & (df['Dias_Cobertura'] < 15)]),
+                'atencao': len(df[(df['Dias_Cobertura'] >= 15) & (df['Dias_Cobertura'] < 30)]),
+                'normal': len(df[(df['Dias_Cobertura'] >= 30) & (df['Dias_Cobertura'] < 999)]),
+            }
+        }
+
+    agregador = AgregadorKPIs()
+    agregador.atualizar(df)
+    print(f"   {'✅' if agregador.obter_dashboard() == dashboard_completo(df) else '❌'} Snapshot igual ao cálculo completo")
+
+    # 2000 lançamentos aleatórios (inclui itens novos), conferidos contra o recálculo
+    t_mov = 0.0
+    for k in range(2000):
+        i = int(rnd.integers(0, n + 20))
+        nome = f'ITEM {i:05d}'
+        saida = float(rnd.integers(0, 50)) if rnd.random() < 0.7 else 0.0
+        saldo = float(rnd.integers(-10, 500))
+        t0 = time.perf_counter()
+        agregador.aplicar_movimentacao(nome, saldo, saida)
+        t_mov += time.perf_counter() - t0
+
+        if nome not in set(df['Item']):
+            df.loc[len(df)] = [nome, 0.0, 0.0, 999.0]
+        linha = df.index[df['Item'] == nome][0]
+        df.loc[linha, 'Saldo'] = saldo
+        df.loc[linha, 'Consumo_30d'] += saida
+        df.loc[linha, 'Dias_Cobertura'] = calcular_cobertura(saldo, df.loc[linha, 'Consumo_30d'])
+    t_mov /= 2000
+
+    t0 = time.perf_counter()
+    incremental = agregador.obter_dashboard()
+    t_leitura = time.perf_counter() - t0
+    print(f"   {'✅' if incremental == dashboard_completo(df) else '❌'} Após 2000 lançamentos: igual ao recálculo")
+    print(f"   Lançamento + leitura: {t_mov * 1e6:.0f}µs + {t_leitura * 1000:.2f}ms | Resumo: {agregador.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")
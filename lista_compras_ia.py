@@ -5,6 +5,7 @@ Cria sugestões de compra baseadas em previsão de demanda e níveis de estoque
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from groq import Groq
 from config import (
@@ -12,6 +13,8 @@ from config import (
     MODELO_GROQ, MARGEM_SEGURANCA, COBERTURA_IDEAL_DIAS,
     converter_para_numero, formatar_numero_br
 )
+from cubo_consumo import cubo_consumo, converter_datas
+from cache_ia import cache_ia
 
 class GeradorListaCompras:
     """Gera listas de compras inteligentes baseadas em análise preditiva"""
@@ -50,9 +53,7 @@ class GeradorListaCompras:
         for col in ['Entrada', 'Saída', 'Saldo']:
             self.df_historico[col] = self.df_historico[col].apply(converter_para_numero)
 
-        self.df_historico['Data'] = pd.to_datetime(
-            self.df_historico['Data'], format='%d/%m/%Y', errors='coerce'
-        )
+        self.df_historico['Data'] = converter_datas(self.df_historico['Data'])
 
         # Mapear Unidade de cada item a partir do histórico (último registro)
         if 'Unidade' in self.df_historico.columns:
@@ -66,17 +67,21 @@ class GeradorListaCompras:
         return self.df_estoque
 
     def _calcular_metricas(self):
-        """Calcula métricas de consumo para cada item"""
+        """Calcula métricas de consumo para cada item (fatias do cubo item × dia)"""
         hoje = datetime.now()
+        cubo = cubo_consumo.sincronizar(self.df_historico)
+        ids = cubo.indices(self.df_estoque['Item'])
+        conhecido = ids >= 0
+        ids_validos = ids[conhecido]
+
+        def por_item(valores, padrao=0.0):
+            serie = np.full(len(ids), padrao, dtype=valores.dtype)
+            serie[conhecido] = valores[ids_validos]
+            return serie
 
         # Consumo por período
         for dias, nome in [(30, '30d'), (60, '60d'), (90, '90d')]:
-            data_inicio = hoje - timedelta(days=dias)
-            consumo = self.df_historico[
-                self.df_historico['Data'] >= data_inicio
-            ].groupby('Item')['Saída'].sum()
-
-            self.df_estoque[f'Consumo_{nome}'] = self.df_estoque['Item'].map(consumo).fillna(0)
+            self.df_estoque[f'Consumo_{nome}'] = por_item(cubo.soma_janela(dias, hoje=hoje))
             self.df_estoque[f'Media_Diaria_{nome}'] = self.df_estoque[f'Consumo_{nome}'] / dias
 
         # Média ponderada (mais peso para dados recentes)
@@ -87,22 +92,21 @@ class GeradorListaCompras:
         )
 
         # Dias de cobertura
-        self.df_estoque['Dias_Cobertura'] = self.df_estoque.apply(
-            lambda r: r['Saldo'] / r['Media_Diaria'] if r['Media_Diaria'] > 0 else 999,
-            axis=1
-        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.df_estoque['Dias_Cobertura'] = np.where(
+                self.df_estoque['Media_Diaria'] > 0,
+                self.df_estoque['Saldo'] / self.df_estoque['Media_Diaria'],
+                999
+            )
 
         # Última entrada
-        ultima_entrada = self.df_historico[
-            self.df_historico['Entrada'] > 0
-        ].groupby('Item')['Data'].max()
-        self.df_estoque['Ultima_Entrada'] = self.df_estoque['Item'].map(ultima_entrada)
+        self.df_estoque['Ultima_Entrada'] = por_item(cubo.ultima_data('entradas'), padrao=np.datetime64('NaT'))
 
         # Quantidade média de compra
-        media_compra = self.df_historico[
-            self.df_historico['Entrada'] > 0
-        ].groupby('Item')['Entrada'].mean()
-        self.df_estoque['Media_Compra'] = self.df_estoque['Item'].map(media_compra).fillna(0)
+        n_entradas = cubo.contagem_linhas('entradas')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media_compra = np.where(n_entradas > 0, cubo.total('entradas') / n_entradas, 0.0)
+        self.df_estoque['Media_Compra'] = por_item(media_compra)
 
     def calcular_quantidade_compra(self, row, dias_cobertura_alvo=None):
         """Calcula quantidade ideal de compra para um item"""
@@ -250,15 +254,15 @@ Seja objetivo e use português brasileiro.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            return cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você é um gerente de compras experiente em indústria têxtil."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperatura=0.3
             )
-            return completion.choices[0].message.content
         except Exception as e:
             return f"Erro ao consultar IA: {e}"
 
@@ -10,7 +10,7 @@ Otimizações de alto impacto:
 - 🔄 Fila de Retry    : garante processamento mesmo com falhas de rede
 - 🗜️ Compressor Cache : reduz uso de memória no Redis
 - 📊 Monitor Perf     : métricas em tempo real (latência, throughput, erros)
-- ⚡ Batch Validator  : valida múltiplas movimentações em paralelo
+- ⚡ Batch Validator  : valida lotes de movimentações (estatísticas O(1) por item)
 """
 
 import logging
@@ -670,15 +670,17 @@ class MonitorPerformance:
 
 
 # ========================================
-# 5. BATCH VALIDATOR (paralelo)
+# 5. BATCH VALIDATOR
 # ========================================
 
 class BatchValidator:
     """
-    Valida múltiplas movimentações em paralelo.
+    Valida múltiplas movimentações em lote.
 
-    Em vez de validar 1 por 1 (serial), usa threads para validar todas
-    ao mesmo tempo → N vezes mais rápido para lotes grandes.
+    A validação da FASE 5 lê média/desvio/últimos tipos já calculados
+    (estatisticas_itens), sem reler histórico, e roda vetorizada sobre o
+    lote inteiro (sistema_ia.validar_lote): as regras viram máscaras NumPy.
+    Como é trabalho só de CPU, não há threads: só disputariam o GIL.
 
     Uso:
         validator = BatchValidator()
@@ -689,8 +691,8 @@ class BatchValidator:
     """
 
     def __init__(self, max_workers: int = 4):
-        self._max_workers = max_workers
-        logger.info(f"✅ BatchValidator inicializado ({max_workers} workers)")
+        self._max_workers = max_workers  # mantido por compatibilidade
+        logger.info("✅ BatchValidator inicializado")
 
     def validar_lote(
         self,
@@ -698,7 +700,7 @@ class BatchValidator:
         usar_ia: bool = True
     ) -> List[Dict[str, Any]]:
         """
-        Valida lista de movimentações em paralelo.
+        Valida lista de movimentações.
 
         Args:
             movimentacoes: Lista de dicts com item, tipo, quantidade, saldo_atual
@@ -707,67 +709,78 @@ class BatchValidator:
         Returns:
             Lista de resultados com {item, valido, motivo, score}
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        if usar_ia:
+            return self._validar_lote_ia(movimentacoes)
 
-        resultados = [None] * len(movimentacoes)
-
-        def _validar_um(idx: int, mov: Dict) -> Tuple[int, Dict]:
+        def _validar_um(mov: Dict) -> Dict:
             try:
-                if usar_ia:
-                    from ia_avancada import sistema_ia
-                    validacao = sistema_ia.validar_movimentacao(
-                        item=mov.get('item', ''),
-                        tipo_movimentacao=mov.get('tipo_movimentacao', mov.get('tipo', '')),
-                        quantidade=float(mov.get('quantidade', 0)),
-                        saldo_atual=float(mov.get('saldo_atual', 0))
-                    )
-                    return idx, {
-                        'item': mov.get('item'),
-                        'valido': validacao.valido,
-                        'score': validacao.score,
-                        'confianca': validacao.confianca,
-                        'problemas': validacao.problemas,
-                        'avisos': validacao.avisos,
-                        'sugestoes': validacao.sugestoes
-                    }
-                else:
-                    # Validação simples (sem IA)
-                    qtd = float(mov.get('quantidade', 0))
-                    saldo = float(mov.get('saldo_atual', 0))
-                    tipo = mov.get('tipo_movimentacao', mov.get('tipo', '')).upper()
-
-                    problemas = []
-                    if qtd <= 0:
-                        problemas.append("Quantidade deve ser maior que zero")
-                    if 'SAIDA' in tipo and qtd > saldo:
-                        problemas.append(f"Saldo insuficiente: {saldo} < {qtd}")
-
-                    return idx, {
-                        'item': mov.get('item'),
-                        'valido': len(problemas) == 0,
-                        'score': 100.0 if not problemas else 30.0,
-                        'problemas': problemas,
-                        'avisos': [],
-                        'sugestoes': []
-                    }
+                # Validação simples (sem IA)
+                qtd = float(mov.get('quantidade', 0))
+                saldo = float(mov.get('saldo_atual', 0))
+                tipo = mov.get('tipo_movimentacao', mov.get('tipo', '')).upper()
+
+                problemas = []
+                if qtd <= 0:
+                    problemas.append("Quantidade deve ser maior que zero")
+                if 'SAIDA' in tipo and qtd > saldo:
+                    problemas.append(f"Saldo insuficiente: {saldo} < {qtd}")
+
+                return {
+                    'item': mov.get('item'),
+                    'valido': len(problemas) == 0,
+                    'score': 100.0 if not problemas else 30.0,
+                    'problemas': problemas,
+                    'avisos': [],
+                    'sugestoes': []
+                }
 
             except Exception as e:
-                return idx, {
+                return {
                     'item': mov.get('item', '?'),
                     'valido': False,
                     'score': 0.0,
                     'erro': str(e)
                 }
 
-        workers = min(self._max_workers, len(movimentacoes))
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = {
-                executor.submit(_validar_um, i, mov): i
-                for i, mov in enumerate(movimentacoes)
+        return [_validar_um(mov) for mov in movimentacoes]
+
+    def _validar_lote_ia(self, movimentacoes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validação FASE 5 vetorizada; linhas que não convertem viram erro na mesma posição"""
+        from ia_avancada import sistema_ia
+
+        resultados: List[Optional[Dict[str, Any]]] = [None] * len(movimentacoes)
+        posicoes, itens, tipos, quantidades, saldos = [], [], [], [], []
+
+        for i, mov in enumerate(movimentacoes):
+            try:
+                quantidade = float(mov.get('quantidade', 0))
+                saldo = float(mov.get('saldo_atual', 0))
+            except Exception as e:
+                resultados[i] = {
+                    'item': mov.get('item', '?'),
+                    'valido': False,
+                    'score': 0.0,
+                    'erro': str(e)
+                }
+                continue
+            posicoes.append(i)
+            itens.append(mov.get('item', ''))
+            tipos.append(mov.get('tipo_movimentacao', mov.get('tipo', '')))
+            quantidades.append(quantidade)
+            saldos.append(saldo)
+
+        validacoes = sistema_ia.validar_lote(itens, tipos, quantidades, saldos)
+
+        for i, validacao in zip(posicoes, validacoes):
+            resultados[i] = {
+                'item': movimentacoes[i].get('item'),
+                'valido': validacao.valido,
+                'score': validacao.score,
+                'confianca': validacao.confianca,
+                'problemas': validacao.problemas,
+                'avisos': validacao.avisos,
+                'sugestoes': validacao.sugestoes
             }
-            for future in as_completed(futures):
-                idx, resultado = future.result()
-                resultados[idx] = resultado
 
         return resultados
 
@@ -17,6 +17,8 @@ from otimizacoes import (
     batch_inserter, fila_retry, compressor_cache,
     monitor_perf, batch_validator, ConfigOtimizacoes
 )
+from eventos_estoque import barramento_eventos
+from canal_eventos import canal_eventos
 import logging
 
 logger = logging.getLogger(__name__)
@@ -390,7 +392,7 @@ def register_otimizacoes_routes(app):
     @app.route('/api/otimizacoes/validar-lote', methods=['POST'])
     def validar_lote_paralelo():
         """
-        ✅ Valida múltiplas movimentações em paralelo (RÁPIDO!)
+        ✅ Valida múltiplas movimentações em lote (RÁPIDO!)
 
         POST /api/otimizacoes/validar-lote
         Body:
@@ -436,6 +438,34 @@ def register_otimizacoes_routes(app):
             logger.error(f"Erro ao validar lote: {e}")
             return jsonify({'error': str(e)}), 500
 
+    # ============================
+    # BARRAMENTO DE EVENTOS
+    # ============================
+
+    @app.route('/api/otimizacoes/eventos', methods=['GET'])
+    def metricas_eventos():
+        """
+        📮 Eventos publicados e latência de cada handler inscrito
+
+        GET /api/otimizacoes/eventos
+
+        Response:
+        {
+          "publicados": 120,
+          "por_evento": {"MovimentacaoRegistrada": 100, "NivelAlertaAlterado": 20},
+          "assincronos_pendentes": 0,
+          "handlers": [
+            {"nome": "kpis_dashboard", "evento": "MovimentacaoRegistrada", "assincrono": false,
+             "chamadas": 100, "erros": 0, "latencia_media_ms": 0.05, "latencia_max_ms": 0.4}
+          ],
+          "canal_sse": {"ultimo_id": "18d9f0c2a1b-340", "no_buffer": 340, "clientes": 3, ...}
+        }
+        """
+        try:
+            return jsonify({**barramento_eventos.obter_metricas(), 'canal_sse': canal_eventos.obter_resumo()}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     # ============================
     # DASHBOARD GERAL
     # ============================
@@ -455,6 +485,7 @@ def register_otimizacoes_routes(app):
                 'fila': fila_retry.obter_status(),
                 'compressor': compressor_cache.obter_stats(),
                 'monitor': monitor_perf.obter_resumo(),
+                'eventos': barramento_eventos.obter_metricas(),
                 'configuracoes': {
                     'batch_tamanho_maximo': ConfigOtimizacoes.BATCH_TAMANHO_MAXIMO,
                     'fila_max_tentativas': ConfigOtimizacoes.FILA_MAX_TENTATIVAS,
@@ -488,4 +519,5 @@ if __name__ == '__main__':
     print("  GET  /api/otimizacoes/monitor/resumo")
     print("  GET  /api/otimizacoes/monitor/operacao/<nome>")
     print("  POST /api/otimizacoes/validar-lote")
+    print("  GET  /api/otimizacoes/eventos")
     print("  GET  /api/otimizacoes/dashboard")
@@ -13,6 +13,8 @@ from config import (
     MODELO_GROQ, TEMPERATURA_ANALISE, DIAS_PREVISAO,
     converter_para_numero, formatar_numero_br
 )
+from cubo_consumo import cubo_consumo, converter_datas
+from cache_ia import cache_ia
 
 class PrevisaoDemanda:
     """Motor de previsão de demanda inteligente"""
@@ -21,6 +23,7 @@ class PrevisaoDemanda:
         self.client_groq = Groq(api_key=CHAVE_GROQ) if CHAVE_GROQ else None
         self.df_historico = None
         self.df_previsoes = None
+        self._cache_todos = {}
 
     def conectar(self):
         """Conecta ao Google Sheets"""
@@ -43,15 +46,15 @@ class PrevisaoDemanda:
             self.df_historico[col] = self.df_historico[col].apply(converter_para_numero)
 
         # Converter datas
-        self.df_historico['_data'] = pd.to_datetime(
-            self.df_historico['Data'],
-            format='%d/%m/%Y',
-            errors='coerce'
-        )
+        self.df_historico['_data'] = converter_datas(self.df_historico['Data'])
 
         print(f"✅ {len(self.df_historico)} movimentações carregadas")
         return self.df_historico
 
+    def _cubo(self):
+        """Cubo item × dia do snapshot atual (reconstruído/estendido se mudou)"""
+        return cubo_consumo.sincronizar(self.df_historico, col_data='_data')
+
     def calcular_estatisticas_item(self, item_nome):
         """Calcula estatísticas de consumo de um item"""
         df_item = self.df_historico[
@@ -62,7 +65,7 @@ class PrevisaoDemanda:
             return None
 
         # Ordenar por data
-        df_item = df_item.sort_values('_data')
+        df_item = df_item.sort_values('_data', kind='mergesort')
 
         # Obter unidade de medida do último registro
         unidade = df_item['Unidade'].iloc[-1] if 'Unidade' in df_item.columns else 'UN'
@@ -95,14 +98,12 @@ class PrevisaoDemanda:
         else:
             stats['frequencia_dias'] = 30  # Default: mensal
 
-        # Consumo por período
+        # Consumo por período (fatias da linha do item no cubo)
         hoje = datetime.now()
+        cubo = self._cubo()
+        idx = cubo.indice(item_nome)
         for dias in [30, 60, 90]:
-            data_inicio = hoje - timedelta(days=dias)
-            consumo = df_item[
-                (df_item['_data'] >= data_inicio) &
-                (df_item['Saída'] > 0)
-            ]['Saída'].sum()
+            consumo = cubo.saidas[idx, cubo.coluna_inicio(dias, hoje):].sum() if idx is not None else 0.0
             stats[f'consumo_{dias}d'] = consumo
             stats[f'media_diaria_{dias}d'] = consumo / dias
 
@@ -110,18 +111,18 @@ class PrevisaoDemanda:
 
     def detectar_sazonalidade(self, item_nome):
         """Detecta padrões sazonais no consumo"""
-        df_item = self.df_historico[
-            self.df_historico['Item'].str.upper() == item_nome.upper()
-        ].copy()
+        cubo = self._cubo()
+        idx = cubo.indice(item_nome)
 
-        if df_item.empty or len(df_item) < 12:
+        if idx is None or cubo.contagem_linhas()[idx] < 12:
             return None
 
-        df_item['mes'] = df_item['_data'].dt.month
-        df_item['dia_semana'] = df_item['_data'].dt.dayofweek
-
-        # Consumo por mês
-        consumo_mensal = df_item.groupby('mes')['Saída'].sum()
+        # Consumo por mês do ano (só meses em que o item teve movimentação)
+        meses, soma = cubo.agregar_mensal('saidas')
+        _, linhas = cubo.agregar_mensal('movimentos')
+        presentes = linhas[idx] > 0
+        mes_do_ano = np.array([m for _, m in meses], dtype=int)
+        consumo_mensal = pd.Series(soma[idx][presentes]).groupby(mes_do_ano[presentes]).sum()
 
         # Identificar meses de pico
         media_mensal = consumo_mensal.mean()
@@ -204,14 +205,126 @@ class PrevisaoDemanda:
 
         return previsao
 
+    def prever_todos(self, horizontes=None):
+        """
+        Prevê consumo de todos os itens para todos os horizontes de uma vez
+
+        Mesmas regras de prever_consumo: média ponderada 30/60/90 dias (fatias
+        do cubo), fator sazonal do mês atual (um único pivô mensal) e margem
+        de erro pelas saídas do item. Cacheado por versão do cubo e dia.
+
+        Args:
+            horizontes: Dias de previsão (padrão: DIAS_PREVISAO)
+
+        Returns:
+            DataFrame com uma linha por (item, horizonte), as colunas de
+            prever_consumo e 'chave' (nome canônico em maiúsculas)
+        """
+        if self.df_historico is None:
+            self.carregar_historico()
+
+        horizontes = tuple(horizontes or DIAS_PREVISAO)
+        hoje = datetime.now()
+        cubo = self._cubo()
+        chave_cache = (cubo.versao, hoje.date(), horizontes)
+        if chave_cache in self._cache_todos:
+            return self._cache_todos[chave_cache]
+
+        df = self.df_historico
+        chave = df['Item'].astype(str).str.strip().str.upper()
+        itens = cubo.itens
+
+        # Nome exibido e saldo do último registro (ordem cronológica, sem data por último)
+        ordenado = df.assign(_chave=chave).sort_values('_data', kind='mergesort', na_position='last')
+        ultimos = ordenado.groupby('_chave', sort=False).tail(1).set_index('_chave')
+        nomes = df['Item'].groupby(chave, sort=False).first().reindex(itens).to_numpy()
+        saldo = ultimos['Saldo'].reindex(itens).to_numpy(dtype=float)
+
+        # Estatísticas das saídas
+        mask = df['Saída'] > 0
+        saidas = df.loc[mask, 'Saída'].groupby(chave[mask])
+        qtd = saidas.size().reindex(itens, fill_value=0).to_numpy()
+        media_saida = saidas.mean().reindex(itens).fillna(0).to_numpy()
+        desvio = saidas.std().reindex(itens).fillna(0).to_numpy()
+        desvio = np.where(qtd > 1, desvio, 0.0)
+
+        # Média diária ponderada (últimos 30 dias pesam mais)
+        media_ponderada = (
+            cubo.soma_janela(30, hoje=hoje) / 30 * 0.5 +
+            cubo.soma_janela(60, hoje=hoje) / 60 * 0.3 +
+            cubo.soma_janela(90, hoje=hoje) / 90 * 0.2
+        )
+
+        # Fator sazonal: consumo do mês atual vs média mensal (itens com 12+ movimentações)
+        meses, soma = cubo.agregar_mensal('saidas')
+        do_mes = np.array([m == hoje.month for _, m in meses], dtype=bool)
+        consumo_mes_atual = soma[:, do_mes].sum(axis=1)
+        media_geral = soma.sum(axis=1) / 12
+        com_sazonalidade = (cubo.contagem_linhas() >= 12) & (media_geral > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fator = np.where(com_sazonalidade, np.clip(consumo_mes_atual / media_geral, 0.5, 2.0), 1.0)
+
+        # Intervalo de confiança
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margem_erro = np.where(qtd > 0, desvio * 1.96 / np.sqrt(qtd), media_saida * 0.2)
+            dias_cobertura = np.where(
+                media_ponderada > 0, np.round(saldo / (media_ponderada * fator), 1), 999
+            )
+        confianca = np.select([qtd > 20, qtd > 5], ['alta', 'media'], default='baixa')
+
+        # Matriz item × horizonte
+        dias = np.array(horizontes, dtype=float)[None, :]
+        consumo_previsto = (media_ponderada * fator)[:, None] * dias
+        saldo_previsto = np.round(saldo[:, None] - consumo_previsto, 2)
+        cobertura = np.broadcast_to(dias_cobertura[:, None], consumo_previsto.shape)
+
+        alerta = np.select(
+            [saldo_previsto < 0, cobertura < 15, cobertura < 30],
+            ['CRITICO', 'URGENTE', 'ATENCAO'],
+            default='NORMAL'
+        )
+
+        n_h = len(horizontes)
+        previsoes = pd.DataFrame({
+            'item': np.repeat(nomes, n_h),
+            'dias_previsao': np.tile(np.array(horizontes), len(itens)),
+            'consumo_previsto': np.round(consumo_previsto, 2).ravel(),
+            'consumo_minimo': np.round(np.maximum(0, consumo_previsto - margem_erro[:, None] * dias), 2).ravel(),
+            'consumo_maximo': np.round(consumo_previsto + margem_erro[:, None] * dias, 2).ravel(),
+            'media_diaria': np.repeat(np.round(media_ponderada * fator, 2), n_h),
+            'saldo_atual': np.repeat(saldo, n_h),
+            'saldo_previsto': saldo_previsto.ravel(),
+            'dias_cobertura': cobertura.ravel(),
+            'fator_sazonal': np.repeat(np.round(fator, 2), n_h),
+            'confianca': np.repeat(confianca, n_h),
+            'alerta': alerta.ravel(),
+        })
+
+        # Recomendação de reposição (texto por alerta)
+        textos = {
+            'URGENTE': "Programar compra em até 7 dias",
+            'ATENCAO': "Incluir na próxima lista de compras",
+        }
+        previsoes['recomendacao'] = [
+            f"Repor URGENTE! Estoque zerado em ~{c:.0f} dias" if a == 'CRITICO'
+            else textos.get(a) or f"Estoque adequado para {c:.0f} dias"
+            for a, c in zip(previsoes['alerta'], previsoes['dias_cobertura'])
+        ]
+        previsoes['chave'] = np.repeat(np.array(itens, dtype=object), n_h)
+
+        # Mantém só o cache do snapshot/dia corrente (um por conjunto de horizontes)
+        self._cache_todos = {k: v for k, v in self._cache_todos.items() if k[:2] == chave_cache[:2]}
+        self._cache_todos[chave_cache] = previsoes
+        return previsoes
+
     def prever_multiplos_periodos(self, item_nome):
         """Gera previsões para múltiplos períodos"""
-        previsoes = []
-        for dias in DIAS_PREVISAO:
-            prev = self.prever_consumo(item_nome, dias)
-            if prev:
-                previsoes.append(prev)
-        return previsoes
+        previsoes = self.prever_todos()
+        linhas = previsoes[previsoes['chave'] == item_nome.strip().upper()]
+        registros = linhas.drop(columns='chave').to_dict('records')
+        for p in registros:
+            p['item'] = item_nome
+        return registros
 
     def gerar_relatorio_ia(self, item_nome):
         """Gera análise detalhada usando IA"""
@@ -258,20 +371,21 @@ Seja direto, técnico e use português do Brasil.
 """
 
         try:
-            completion = self.client_groq.chat.completions.create(
-                model=MODELO_GROQ,
-                messages=[
+            resposta = cache_ia.completar(
+                self.client_groq,
+                modelo=MODELO_GROQ,
+                mensagens=[
                     {"role": "system", "content": "Você é um analista de supply chain especializado em previsão de demanda para indústria têxtil."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=TEMPERATURA_ANALISE
+                temperatura=TEMPERATURA_ANALISE
             )
             return {
                 'item': item_nome,
                 'estatisticas': stats,
                 'previsoes': previsoes,
                 'sazonalidade': sazonalidade,
-                'analise_ia': completion.choices[0].message.content
+                'analise_ia': resposta
             }
         except Exception as e:
             return {
@@ -289,16 +403,12 @@ Seja direto, técnico e use português do Brasil.
 
         print(f"\n🔮 Analisando previsões para itens com cobertura < {limite_dias} dias...")
 
-        itens_unicos = self.df_historico['Item'].unique()
-        itens_criticos = []
-
-        for item in itens_unicos:
-            prev = self.prever_consumo(item, 30)
-            if prev and prev['dias_cobertura'] < limite_dias:
-                itens_criticos.append(prev)
+        previsoes = self.prever_todos([30])
+        criticos = previsoes[previsoes['dias_cobertura'] < limite_dias]
 
         # Ordenar por urgência
-        itens_criticos.sort(key=lambda x: x['dias_cobertura'])
+        criticos = criticos.sort_values('dias_cobertura', kind='mergesort')
+        itens_criticos = criticos.drop(columns='chave').to_dict('records')
 
         self.df_previsoes = pd.DataFrame(itens_criticos)
         return itens_criticos
@@ -11,13 +11,13 @@ Relatórios completos com:
 - 📉 Itens parados / sem movimento
 - 💰 Resumo financeiro por grupo
 - 📅 Relatório diário/semanal/mensal
-- 📄 Export Excel (openpyxl)
+- 📄 Export Excel (openpyxl write_only, com aba de todas as movimentações)
 - 📋 Export PDF (fpdf2)
 """
 
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Iterator
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import defaultdict
@@ -59,9 +59,11 @@ class ItemCurvaABC:
     percentual_volume: float
     percentual_acumulado: float
     classe: ClasseABC
+    classe_xyz: Optional[str] = None  # X/Y/Z (só quando pedido ao motor_abc)
+    cv: Optional[float] = None        # Coeficiente de variação semanal
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        dados = {
             'item': self.item,
             'grupo': self.grupo,
             'saldo': self.saldo,
@@ -73,6 +75,10 @@ class ItemCurvaABC:
             'percentual_acumulado': round(self.percentual_acumulado, 2),
             'classe': self.classe.value
         }
+        if self.classe_xyz is not None:
+            dados['classe_xyz'] = self.classe_xyz
+            dados['cv'] = round(self.cv, 3) if self.cv is not None and self.cv != float('inf') else None
+        return dados
 
 
 @dataclass
@@ -159,12 +165,26 @@ class ConfigRelatorios:
     LIMITE_CLASSE_B = 95.0   # % acumulado para classe B (B = 95-80)
     # C = tudo acima de 95%
 
+    # Janela da Curva ABC pelo cubo de consumo (motor_abc) em cada período
+    DIAS_POR_PERIODO = {'hoje': 1, 'semana': 7, 'mes': 30, 'trimestre': 90}
+
     # Parado
     DIAS_SEM_MOVIMENTO_PARADO = 30  # Dias sem movimento = parado
 
     # Top
     TOP_N_MOVIMENTADOS = 10
 
+    # Excel (workbook write_only com estilos nomeados)
+    EXCEL_CORES_CABECALHO = {
+        'cabecalho': '4472C4',
+        'cabecalho_grupos': '2E7D32',
+        'cabecalho_parados': 'C62828',
+        'cabecalho_top': '1565C0',
+        'cabecalho_movimentacoes': '455A64'
+    }
+    EXCEL_CORES_CLASSE = {'A': 'E8F5E9', 'B': 'FFF3E0', 'C': 'FFEBEE'}
+    EXCEL_BLOCO_MOVIMENTACOES = 5000  # Linhas da ESTOQUE por leitura na aba de movimentações
+
 
 # ========================================
 # CLASSE PRINCIPAL
@@ -193,6 +213,43 @@ class GerenciadorRelatorios:
             logger.warning(f"Índice indisponível: {e}")
             return []
 
+    def _obter_indice_completo(self) -> Dict[str, Dict]:
+        """Índice {ITEM_MAIÚSCULO: dados} lido uma vez (cache do indice_otimizado)"""
+        try:
+            from indice_otimizado import indice_otimizado
+            return indice_otimizado.obter_indice() or {}
+        except Exception as e:
+            logger.warning(f"Índice indisponível: {e}")
+            return {}
+
+    @staticmethod
+    def _saldo_indice(dados: Optional[Dict]) -> Optional[float]:
+        """Saldo de uma entrada do índice (None se não houver)"""
+        if not dados:
+            return None
+        try:
+            return float(dados.get('saldo', 0))
+        except (ValueError, TypeError):
+            return 0.0
+
+    def _motor_abc(self):
+        """Motor único da Curva ABC (None se o cubo ainda não foi sincronizado)"""
+        try:
+            from curva_abc import motor_abc
+            return None if motor_abc.cubo.vazio else motor_abc
+        except Exception as e:
+            logger.warning(f"Motor ABC indisponível: {e}")
+            return None
+
+    def _armazem_agregados(self):
+        """Agregados diários persistidos (None se ainda não houve back-fill)"""
+        try:
+            from agregados_diarios import agregados_diarios
+            return None if agregados_diarios.vazio else agregados_diarios
+        except Exception as e:
+            logger.warning(f"Agregados diários indisponíveis: {e}")
+            return None
+
     def _obter_historico_periodo(
         self,
         data_inicio: Optional[str] = None,
@@ -217,7 +274,9 @@ class GerenciadorRelatorios:
 
     def calcular_curva_abc(
         self,
-        historico: Optional[List[Dict]] = None
+        historico: Optional[List[Dict]] = None,
+        dias: Optional[int] = None,
+        xyz: bool = False
     ) -> Dict[str, List[ItemCurvaABC]]:
         """
         Calcula Curva ABC baseada em volume de movimentações
@@ -227,111 +286,128 @@ class GerenciadorRelatorios:
         - B: itens que representam 15% adicionais → prioridade média
         - C: restantes 5% → prioridade baixa
 
+        Sem historico, usa o motor único (curva_abc.motor_abc) sobre o
+        histórico inteiro do cubo de consumo - com cache por janela e versão.
+
         Args:
-            historico: Lista de movimentações (se None, busca)
+            historico: Lista de movimentações (se None, usa o cubo ou busca)
+            dias: Janela em dias no cubo (None = histórico inteiro)
+            xyz: Inclui classe XYZ (variabilidade semanal) - só pelo cubo
 
         Returns:
             Dict com {'A': [...], 'B': [...], 'C': [...]}
         """
         if historico is None:
+            motor = self._motor_abc()
+            if motor is not None:
+                curva = motor.calcular(dias=dias, metrica='volume', xyz=xyz)
+                return self._montar_curva(curva, grupos={})
             historico = self._obter_historico_periodo(limite=500)
 
-        # Agrega volume por item
-        volume_por_item: Dict[str, Dict] = defaultdict(lambda: {
-            'entradas': 0.0,
-            'saidas': 0.0,
-            'movimentacoes': 0,
-            'grupo': ''
-        })
-
-        for reg in historico:
-            item = reg.get('item', '')
-            qtd = abs(float(reg.get('quantidade', 0)))
-            tipo = reg.get('tipo_movimentacao', '').upper()
-            grupo = reg.get('grupo', '')
-
-            volume_por_item[item]['movimentacoes'] += 1
-            volume_por_item[item]['grupo'] = grupo
-
-            if 'ENTRADA' in tipo:
-                volume_por_item[item]['entradas'] += qtd
-            else:
-                volume_por_item[item]['saidas'] += qtd
-
-        if not volume_por_item:
+        if not historico:
             return {'A': [], 'B': [], 'C': []}
 
-        # Busca saldos do índice
-        saldos = {}
-        try:
-            from indice_otimizado import indice_otimizado
-            for item_nome in volume_por_item:
-                dados = indice_otimizado.buscar_item(item_nome)
-                if dados:
-                    saldos[item_nome] = float(dados.get('saldo', 0))
-        except:
-            pass
+        # Agrega volume por item (ordem de primeira aparição, grupo do último registro)
+        import pandas as pd
+        from curva_abc import classificar_abc
+
+        registros = pd.DataFrame(historico)
+        qtd = pd.to_numeric(registros.get('quantidade', 0), errors='coerce')
+        qtd = pd.Series(qtd, index=registros.index).fillna(0).abs()
+        tipo = registros.get('tipo_movimentacao', pd.Series('', index=registros.index))
+        eh_entrada = tipo.fillna('').astype(str).str.upper().str.contains('ENTRADA', regex=False)
+
+        volume = pd.DataFrame({
+            'Item': registros.get('item', pd.Series('', index=registros.index)).fillna(''),
+            'Grupo': registros.get('grupo', pd.Series('', index=registros.index)).fillna(''),
+            'Entradas': qtd.where(eh_entrada, 0.0),
+            'Saidas': qtd.where(~eh_entrada, 0.0)
+        }).groupby('Item', sort=False).agg(
+            Grupo=('Grupo', 'last'),
+            Entradas=('Entradas', 'sum'),
+            Saidas=('Saidas', 'sum'),
+            Movimentacoes=('Entradas', 'size')
+        ).reset_index()
+        volume['Valor'] = volume['Entradas'] + volume['Saidas']
+
+        if volume['Valor'].sum() == 0:
+            return {'A': [], 'B': [], 'C': []}
 
-        # Calcula volume total por item (entradas + saídas)
-        volumes = []
-        for item_nome, dados in volume_por_item.items():
-            vol = dados['entradas'] + dados['saidas']
-            volumes.append((item_nome, vol, dados))
+        # Ordena por volume + soma acumulada (núcleo vetorizado do curva_abc)
+        ordem, percentual, acumulado, classes = classificar_abc(
+            volume['Valor'].to_numpy(),
+            ConfigRelatorios.LIMITE_CLASSE_A,
+            ConfigRelatorios.LIMITE_CLASSE_B
+        )
+        curva = volume.iloc[ordem].reset_index(drop=True)
+        curva['Percentual'] = percentual
+        curva['Acumulado'] = acumulado
+        curva['Classe'] = classes
 
-        # Ordena por volume (maior primeiro)
-        volumes.sort(key=lambda x: x[1], reverse=True)
+        return self._montar_curva(curva, grupos=dict(zip(curva['Item'], curva['Grupo'])))
 
-        # Calcula total geral
-        total_volume = sum(v[1] for v in volumes)
+    def _montar_curva(self, curva, grupos: Dict[str, str]) -> Dict[str, List[ItemCurvaABC]]:
+        """
+        Converte o DataFrame da curva em {'A': [...], 'B': [...], 'C': [...]}
 
-        if total_volume == 0:
-            return {'A': [], 'B': [], 'C': []}
+        Saldo (e grupo/nome, quando não vêm do histórico) saem do índice,
+        lido uma vez só.
+        """
+        indice = self._obter_indice_completo()
+        tem_xyz = 'Classe_XYZ' in curva.columns
 
-        # Classifica ABC
         resultado = {'A': [], 'B': [], 'C': []}
-        acumulado = 0.0
-
-        for item_nome, vol, dados in volumes:
-            percentual = (vol / total_volume) * 100
-            acumulado += percentual
+        for linha in curva.itertuples(index=False):
+            nome = str(linha.Item)
+            dados = indice.get(nome.strip().upper()) if nome else None
+            saldo = self._saldo_indice(dados)
 
-            if acumulado <= ConfigRelatorios.LIMITE_CLASSE_A:
-                classe = ClasseABC.A
-            elif acumulado <= ConfigRelatorios.LIMITE_CLASSE_B:
-                classe = ClasseABC.B
+            if nome in grupos:
+                grupo = grupos[nome]
             else:
-                classe = ClasseABC.C
+                grupo = dados.get('grupo', '') if dados else ''
+                nome = dados.get('item_original', nome) if dados else nome
 
             item_abc = ItemCurvaABC(
-                item=item_nome,
-                grupo=dados['grupo'],
-                saldo=saldos.get(item_nome, 0.0),
-                total_movimentacoes=dados['movimentacoes'],
-                total_entradas=dados['entradas'],
-                total_saidas=dados['saidas'],
-                volume_total=vol,
-                percentual_volume=percentual,
-                percentual_acumulado=acumulado,
-                classe=classe
+                item=nome,
+                grupo=grupo,
+                saldo=saldo if saldo is not None else 0.0,
+                total_movimentacoes=int(linha.Movimentacoes),
+                total_entradas=float(linha.Entradas),
+                total_saidas=float(linha.Saidas),
+                volume_total=float(linha.Valor),
+                percentual_volume=float(linha.Percentual),
+                percentual_acumulado=float(linha.Acumulado),
+                classe=ClasseABC(linha.Classe),
+                classe_xyz=linha.Classe_XYZ if tem_xyz else None,
+                cv=float(linha.CV) if tem_xyz and linha.Classe_XYZ is not None else None
             )
 
-            resultado[classe.value].append(item_abc)
+            resultado[item_abc.classe.value].append(item_abc)
 
         return resultado
 
     def calcular_resumo_grupos(
         self,
-        historico: Optional[List[Dict]] = None
+        historico: Optional[List[Dict]] = None,
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None,
+        curva: Optional[Dict[str, List[ItemCurvaABC]]] = None
     ) -> List[ResumoGrupo]:
         """
         Calcula resumo por grupo de itens
 
+        Sem historico e com período, os totais vêm dos agregados diários
+        (uma consulta por faixa de datas no SQLite).
+
+        Args:
+            historico: Lista de movimentações
+            data_inicio, data_fim: Período (DD/MM/YYYY) para os agregados
+            curva: Curva ABC já calculada (evita recalcular)
+
         Returns:
             Lista de ResumoGrupo ordenada por volume
         """
-        if historico is None:
-            historico = self._obter_historico_periodo(limite=500)
-
         grupos: Dict[str, Dict] = defaultdict(lambda: {
             'itens': set(),
             'movimentacoes': 0,
@@ -339,38 +415,52 @@ class GerenciadorRelatorios:
             'saidas': 0.0
         })
 
-        for reg in historico:
-            grupo = reg.get('grupo', 'SEM_GRUPO') or 'SEM_GRUPO'
-            item = reg.get('item', '')
-            qtd = abs(float(reg.get('quantidade', 0)))
-            tipo = reg.get('tipo_movimentacao', '').upper()
-
-            grupos[grupo]['itens'].add(item)
-            grupos[grupo]['movimentacoes'] += 1
-
-            if 'ENTRADA' in tipo:
-                grupos[grupo]['entradas'] += qtd
-            else:
-                grupos[grupo]['saidas'] += qtd
+        agregados = self._armazem_agregados() if historico is None and data_inicio and data_fim else None
+        if agregados is not None:
+            por_item = agregados.totais_por_item(data_inicio, data_fim)
+            for linha in por_item.to_dict('records'):
+                grupo = linha['grupo'] or 'SEM_GRUPO'
+                grupos[grupo]['itens'].add(linha['item'])
+                grupos[grupo]['movimentacoes'] += int(linha['n_movs'])
+                grupos[grupo]['entradas'] += float(linha['entradas'])
+                grupos[grupo]['saidas'] += float(linha['saidas'])
+        else:
+            if historico is None:
+                historico = self._obter_historico_periodo(data_inicio, data_fim, limite=500)
+
+            for reg in historico:
+                grupo = reg.get('grupo', 'SEM_GRUPO') or 'SEM_GRUPO'
+                item = reg.get('item', '')
+                qtd = abs(float(reg.get('quantidade', 0)))
+                tipo = reg.get('tipo_movimentacao', '').upper()
+
+                grupos[grupo]['itens'].add(item)
+                grupos[grupo]['movimentacoes'] += 1
+
+                if 'ENTRADA' in tipo:
+                    grupos[grupo]['entradas'] += qtd
+                else:
+                    grupos[grupo]['saidas'] += qtd
 
         # Calcula curva ABC para classificação
-        curva = self.calcular_curva_abc(historico)
+        if curva is None:
+            curva = self.calcular_curva_abc(historico)
 
         # Mapa item → classe
         mapa_classe = {}
         for classe, itens in curva.items():
             for item_abc in itens:
-                mapa_classe[item_abc.item] = classe
+                mapa_classe[item_abc.item.strip().upper()] = classe
 
         # Busca saldos
         saldos_por_grupo: Dict[str, float] = defaultdict(float)
         zerados_por_grupo: Dict[str, int] = defaultdict(int)
         criticos_por_grupo: Dict[str, int] = defaultdict(int)
 
+        indice = self._obter_indice_completo()
         try:
-            from indice_otimizado import indice_otimizado
             for item_nome in set(i for g in grupos.values() for i in g['itens']):
-                dados = indice_otimizado.buscar_item(item_nome)
+                dados = indice.get(item_nome.strip().upper()) if item_nome else None
                 if dados:
                     saldo = float(dados.get('saldo', 0))
                     grupo = dados.get('grupo', 'SEM_GRUPO') or 'SEM_GRUPO'
@@ -386,7 +476,7 @@ class GerenciadorRelatorios:
         resumos = []
         for grupo_nome, dados in grupos.items():
             # Classe predominante
-            classes_grupo = [mapa_classe.get(i, 'C') for i in dados['itens']]
+            classes_grupo = [mapa_classe.get(i.strip().upper(), 'C') for i in dados['itens']]
             classe_pred = max(set(classes_grupo), key=classes_grupo.count) if classes_grupo else 'C'
 
             resumos.append(ResumoGrupo(
@@ -488,23 +578,37 @@ class GerenciadorRelatorios:
 
     def _gerar_dados_grafico_movimentacoes(
         self,
-        historico: List[Dict]
+        historico: List[Dict],
+        data_fim: Optional[str] = None
     ) -> Dict[str, Any]:
         """Gera dados para gráfico de linha (movimentações por dia)"""
         por_dia: Dict[str, Dict] = defaultdict(lambda: {'entradas': 0.0, 'saidas': 0.0})
 
-        for reg in historico:
-            data = reg.get('data', '')
-            qtd = abs(float(reg.get('quantidade', 0)))
-            tipo = reg.get('tipo_movimentacao', '').upper()
-
-            if 'ENTRADA' in tipo:
-                por_dia[data]['entradas'] += qtd
-            else:
-                por_dia[data]['saidas'] += qtd
-
-        # Ordena por data
-        datas_ord = sorted(por_dia.keys())[-14:]  # Últimos 14 dias
+        agregados = self._armazem_agregados()
+        if agregados is not None:
+            # Últimos 14 dias até o fim do período direto dos agregados diários
+            fim = datetime.strptime(data_fim, '%d/%m/%Y') if data_fim else datetime.now()
+            for linha in agregados.totais_por_dia(fim - timedelta(days=13), fim).to_dict('records'):
+                dia = datetime.strptime(linha['dia'], '%Y-%m-%d')
+                por_dia[dia]['entradas'] = float(linha['entradas'])
+                por_dia[dia]['saidas'] = float(linha['saidas'])
+        else:
+            for reg in historico:
+                try:
+                    dia = datetime.strptime(reg.get('data', ''), '%d/%m/%Y')
+                except ValueError:
+                    continue
+                qtd = abs(float(reg.get('quantidade', 0)))
+                tipo = reg.get('tipo_movimentacao', '').upper()
+
+                if 'ENTRADA' in tipo:
+                    por_dia[dia]['entradas'] += qtd
+                else:
+                    por_dia[dia]['saidas'] += qtd
+
+        # Ordena por data (cronológica, não pelo texto DD/MM/YYYY)
+        dias_ord = sorted(por_dia.keys())[-14:]  # Últimos 14 dias
+        datas_ord = [d.strftime('%d/%m/%Y') for d in dias_ord]
 
         return {
             'type': 'line',
@@ -512,17 +616,40 @@ class GerenciadorRelatorios:
             'datasets': [
                 {
                     'label': 'Entradas',
-                    'data': [por_dia[d]['entradas'] for d in datas_ord],
+                    'data': [por_dia[d]['entradas'] for d in dias_ord],
                     'color': '#4CAF50'
                 },
                 {
                     'label': 'Saídas',
-                    'data': [por_dia[d]['saidas'] for d in datas_ord],
+                    'data': [por_dia[d]['saidas'] for d in dias_ord],
                     'color': '#F44336'
                 }
             ]
         }
 
+    @staticmethod
+    def definir_periodo(
+        periodo: str,
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None,
+        hoje: Optional[datetime] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """(data_inicio, data_fim) em DD/MM/YYYY do período (personalizado: as datas informadas)"""
+        hoje = hoje or datetime.now()
+        if periodo == 'hoje':
+            data_inicio = hoje.strftime('%d/%m/%Y')
+            data_fim = data_inicio
+        elif periodo == 'semana':
+            data_inicio = (hoje - timedelta(days=7)).strftime('%d/%m/%Y')
+            data_fim = hoje.strftime('%d/%m/%Y')
+        elif periodo == 'mes':
+            data_inicio = (hoje - timedelta(days=30)).strftime('%d/%m/%Y')
+            data_fim = hoje.strftime('%d/%m/%Y')
+        elif periodo == 'trimestre':
+            data_inicio = (hoje - timedelta(days=90)).strftime('%d/%m/%Y')
+            data_fim = hoje.strftime('%d/%m/%Y')
+        return data_inicio, data_fim
+
     def gerar_relatorio_completo(
         self,
         periodo: str = 'mes',
@@ -542,43 +669,45 @@ class GerenciadorRelatorios:
         """
         # Define período
         hoje = datetime.now()
-        if periodo == 'hoje':
-            data_inicio = hoje.strftime('%d/%m/%Y')
-            data_fim = data_inicio
-        elif periodo == 'semana':
-            data_inicio = (hoje - timedelta(days=7)).strftime('%d/%m/%Y')
-            data_fim = hoje.strftime('%d/%m/%Y')
-        elif periodo == 'mes':
-            data_inicio = (hoje - timedelta(days=30)).strftime('%d/%m/%Y')
-            data_fim = hoje.strftime('%d/%m/%Y')
-        elif periodo == 'trimestre':
-            data_inicio = (hoje - timedelta(days=90)).strftime('%d/%m/%Y')
-            data_fim = hoje.strftime('%d/%m/%Y')
+        data_inicio, data_fim = self.definir_periodo(periodo, data_inicio, data_fim, hoje)
 
         # Busca histórico do período
         historico = self._obter_historico_periodo(data_inicio, data_fim, limite=1000)
 
-        # Calcula Curva ABC
-        curva = self.calcular_curva_abc(historico)
-
-        # Resumo por grupos
-        resumos_grupos = self.calcular_resumo_grupos(historico)
+        # Calcula Curva ABC: histórico inteiro do cubo na janela do período
+        # (registros do período só no personalizado ou sem cubo)
+        dias_periodo = ConfigRelatorios.DIAS_POR_PERIODO.get(periodo)
+        if dias_periodo and self._motor_abc() is not None:
+            curva = self.calcular_curva_abc(dias=dias_periodo)
+        else:
+            curva = self.calcular_curva_abc(historico)
+
+        # Resumo por grupos e estatísticas gerais: agregados diários do período
+        # (todas as movimentações, não só as últimas 1000 do histórico)
+        agregados = self._armazem_agregados() if data_inicio and data_fim else None
+        if agregados is not None:
+            resumos_grupos = self.calcular_resumo_grupos(data_inicio=data_inicio, data_fim=data_fim, curva=curva)
+            totais = agregados.totais_por_dia(data_inicio, data_fim)
+            total_entradas = float(totais['entradas'].sum())
+            total_saidas = float(totais['saidas'].sum())
+            total_movimentacoes = int(totais['n_movs'].sum())
+        else:
+            resumos_grupos = self.calcular_resumo_grupos(historico)
+            total_entradas = sum(
+                abs(float(r.get('quantidade', 0)))
+                for r in historico
+                if 'ENTRADA' in r.get('tipo_movimentacao', '').upper()
+            )
+            total_saidas = sum(
+                abs(float(r.get('quantidade', 0)))
+                for r in historico
+                if 'SAIDA' in r.get('tipo_movimentacao', '').upper()
+            )
+            total_movimentacoes = len(historico)
 
         # Itens parados
         itens_parados = self.obter_itens_parados()
 
-        # Estatísticas gerais
-        total_entradas = sum(
-            abs(float(r.get('quantidade', 0)))
-            for r in historico
-            if 'ENTRADA' in r.get('tipo_movimentacao', '').upper()
-        )
-        total_saidas = sum(
-            abs(float(r.get('quantidade', 0)))
-            for r in historico
-            if 'SAIDA' in r.get('tipo_movimentacao', '').upper()
-        )
-
         # Top movimentados
         todos_itens_abc = (
             curva.get('A', []) + curva.get('B', []) + curva.get('C', [])
@@ -596,7 +725,7 @@ class GerenciadorRelatorios:
         # Gráficos
         grafico_abc = self._gerar_dados_grafico_abc(curva)
         grafico_grupos = self._gerar_dados_grafico_grupos(resumos_grupos)
-        grafico_mov = self._gerar_dados_grafico_movimentacoes(historico)
+        grafico_mov = self._gerar_dados_grafico_movimentacoes(historico, data_fim)
 
         return RelatorioCompleto(
             periodo=periodo,
@@ -604,7 +733,7 @@ class GerenciadorRelatorios:
             total_itens=len(todos_itens_abc),
             total_grupos=len(resumos_grupos),
             saldo_geral=saldo_geral,
-            total_movimentacoes=len(historico),
+            total_movimentacoes=total_movimentacoes,
             total_entradas=total_entradas,
             total_saidas=total_saidas,
             itens_zerados=itens_zerados,
@@ -629,187 +758,272 @@ class GerenciadorRelatorios:
         Returns:
             Bytes do arquivo Excel
         """
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-            from openpyxl.utils import get_column_letter
-            import io
-
-            wb = openpyxl.Workbook()
-
-            # ========== ABA 1: Resumo ==========
-            ws = wb.active
-            ws.title = "📊 Resumo"
-            self._excel_aba_resumo(ws, relatorio)
+        import io
 
-            # ========== ABA 2: Curva ABC ==========
-            ws_abc = wb.create_sheet("🔤 Curva ABC")
-            self._excel_aba_abc(ws_abc, relatorio)
+        buffer = io.BytesIO()
+        self.escrever_excel(relatorio, buffer)
+        return buffer.getvalue()
 
-            # ========== ABA 3: Por Grupos ==========
-            ws_grupos = wb.create_sheet("📦 Por Grupos")
-            self._excel_aba_grupos(ws_grupos, relatorio)
-
-            # ========== ABA 4: Itens Parados ==========
-            ws_parados = wb.create_sheet("⏸️ Itens Parados")
-            self._excel_aba_parados(ws_parados, relatorio)
+    def escrever_excel(
+        self,
+        relatorio: RelatorioCompleto,
+        destino,
+        movimentacoes: Optional[Iterable[List[Any]]] = None
+    ) -> int:
+        """
+        Escreve o relatório num workbook write_only do openpyxl
 
-            # ========== ABA 5: Top Movimentados ==========
-            ws_top = wb.create_sheet("🏆 Top Movimentados")
-            self._excel_aba_top(ws_top, relatorio)
+        As linhas vão direto para o arquivo conforme são geradas (memória
+        constante) e as células usam estilos nomeados registrados uma vez
+        no workbook, em vez de um Font/PatternFill por célula.
 
-            # Salva em bytes
-            buffer = io.BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-            return buffer.read()
+        Args:
+            relatorio: Relatório gerado
+            destino: Caminho ou arquivo binário (ex.: arquivo temporário)
+            movimentacoes: Linhas da aba de movimentações (ex.:
+                iterar_movimentacoes()); None = sem essa aba
 
+        Returns:
+            Nº de movimentações escritas
+        """
+        try:
+            import openpyxl
         except ImportError:
             logger.error("openpyxl não instalado. Execute: pip install openpyxl")
             raise
+
+        try:
+            wb = openpyxl.Workbook(write_only=True)
+            self._excel_registrar_estilos(wb)
+
+            self._excel_aba_resumo(wb.create_sheet("📊 Resumo"), relatorio)
+            self._excel_aba_abc(wb.create_sheet("🔤 Curva ABC"), relatorio)
+            self._excel_aba_grupos(wb.create_sheet("📦 Por Grupos"), relatorio)
+            self._excel_aba_parados(wb.create_sheet("⏸️ Itens Parados"), relatorio)
+            self._excel_aba_top(wb.create_sheet("🏆 Top Movimentados"), relatorio)
+
+            total = 0
+            if movimentacoes is not None:
+                total = self._excel_aba_movimentacoes(wb.create_sheet("📋 Movimentações"), movimentacoes)
+
+            wb.save(destino)
+            return total
+
         except Exception as e:
             logger.error(f"Erro ao gerar Excel: {e}")
             raise
 
-    def _excel_estilo_header(self, ws, row, cols, texto_lista, cor_fundo='4472C4'):
-        """Aplica estilo de cabeçalho"""
-        try:
-            from openpyxl.styles import Font, PatternFill, Alignment
-            fill = PatternFill("solid", fgColor=cor_fundo)
-            font = Font(bold=True, color="FFFFFF")
-            align = Alignment(horizontal="center", vertical="center")
-
-            for col, texto in zip(cols, texto_lista):
-                cell = ws.cell(row=row, column=col, value=texto)
-                cell.fill = fill
-                cell.font = font
-                cell.alignment = align
-        except Exception as e:
-            logger.debug(f"Erro ao aplicar estilo: {e}")
+    def iterar_movimentacoes(
+        self,
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None,
+        planilha=None
+    ) -> Iterator[List[Any]]:
+        """
+        Linhas da aba ESTOQUE do período, lidas em blocos
 
-    def _excel_aba_resumo(self, ws, relatorio: RelatorioCompleto):
-        """Preenche aba de resumo"""
-        try:
-            from openpyxl.styles import Font, PatternFill, Alignment
+        Só um bloco (ConfigRelatorios.EXCEL_BLOCO_MOVIMENTACOES linhas) fica
+        em memória por vez - serve de fonte para a aba de movimentações.
+
+        Args:
+            data_inicio, data_fim: Período (DD/MM/YYYY); None = sem limite
+            planilha: Planilha gspread já aberta (padrão: get_conexao_sheets())
 
-            ws.column_dimensions['A'].width = 30
-            ws.column_dimensions['B'].width = 20
+        Com período, a data da linha é lida nos mesmos formatos dos agregados
+        diários (DD/MM/YYYY, ISO, DD/MM/YY...); linhas com data ilegível ficam
+        de fora e são contadas no log.
 
-            # Título
-            ws['A1'] = '📊 RELATÓRIO DE ESTOQUE - MARFIM'
-            ws['A1'].font = Font(bold=True, size=16)
-            ws['A2'] = f'Gerado em: {relatorio.data_geracao}'
-            ws['A3'] = f'Período: {relatorio.periodo.upper()}'
-
-            ws['A5'] = 'INDICADOR'
-            ws['B5'] = 'VALOR'
-            self._excel_estilo_header(ws, 5, [1, 2], ['INDICADOR', 'VALOR'])
-
-            dados = [
-                ('Total de Itens', relatorio.total_itens),
-                ('Total de Grupos', relatorio.total_grupos),
-                ('Saldo Geral', f'{relatorio.saldo_geral:.2f}'),
-                ('Total Movimentações', relatorio.total_movimentacoes),
-                ('Total Entradas', f'{relatorio.total_entradas:.2f}'),
-                ('Total Saídas', f'{relatorio.total_saidas:.2f}'),
-                ('Itens Zerados', relatorio.itens_zerados),
-                ('Itens Parados (30+ dias)', relatorio.itens_sem_movimento),
-                ('Itens Classe A', len(relatorio.curva_abc.get('A', []))),
-                ('Itens Classe B', len(relatorio.curva_abc.get('B', []))),
-                ('Itens Classe C', len(relatorio.curva_abc.get('C', []))),
-            ]
+        Yields:
+            [linha, data, grupo, item, entrada, saída, saldo, usuário, observação]
+        """
+        from config import ABA_ESTOQUE, converter_para_numero, get_conexao_sheets
+        from historico_otimizado import _letra_coluna, _mapear_colunas_estoque
+        from agregados_diarios import _dia_iso
+
+        # Comparação em 'YYYY-MM-DD' (ordem de texto = ordem de data)
+        inicio = datetime.strptime(data_inicio, '%d/%m/%Y').strftime('%Y-%m-%d') if data_inicio else None
+        fim = datetime.strptime(data_fim, '%d/%m/%Y').strftime('%Y-%m-%d') if data_fim else None
+        ilegiveis: List[int] = []
+
+        aba = (planilha or get_conexao_sheets()).worksheet(ABA_ESTOQUE)
+        cabecalho = aba.row_values(1)
+        colunas = _mapear_colunas_estoque(cabecalho)
+        ultima_linha = len(aba.col_values(colunas['item'] + 1))
+        letra_final = _letra_coluna(max(len(cabecalho), max(colunas.values()) + 1))
+        bloco = ConfigRelatorios.EXCEL_BLOCO_MOVIMENTACOES
+
+        def campo(valores, chave):
+            idx = colunas.get(chave)
+            return valores[idx] if idx is not None and idx < len(valores) else ''
+
+        for ini in range(2, ultima_linha + 1, bloco):
+            for n, valores in enumerate(aba.get(f"A{ini}:{letra_final}{min(ini + bloco - 1, ultima_linha)}")):
+                item = str(campo(valores, 'item')).strip()
+                if not item:
+                    continue
+
+                data = str(campo(valores, 'data')).strip()
+                if inicio or fim:
+                    dia = _dia_iso(data)
+                    if dia is None:
+                        ilegiveis.append(ini + n)
+                        continue
+                    if (inicio and dia < inicio) or (fim and dia > fim):
+                        continue
+
+                yield [
+                    ini + n, data, campo(valores, 'grupo'), item,
+                    converter_para_numero(campo(valores, 'entrada')),
+                    converter_para_numero(campo(valores, 'saida')),
+                    converter_para_numero(campo(valores, 'saldo')),
+                    campo(valores, 'usuario'), campo(valores, 'obs')
+                ]
 
-            for i, (indicador, valor) in enumerate(dados, start=6):
-                ws.cell(row=i, column=1, value=indicador)
-                ws.cell(row=i, column=2, value=valor)
-        except Exception as e:
-            logger.debug(f"Erro resumo excel: {e}")
+        if ilegiveis:
+            exemplos = ', '.join(map(str, ilegiveis[:10])) + ('...' if len(ilegiveis) > 10 else '')
+            logger.warning(f"⚠️ {len(ilegiveis)} movimentações fora da aba por data ilegível (linhas {exemplos})")
+
+    def _excel_registrar_estilos(self, wb):
+        """Registra os estilos nomeados do relatório no workbook"""
+        from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment
+
+        def registrar(nome, **atributos):
+            estilo = NamedStyle(name=nome)
+            for atributo, valor in atributos.items():
+                setattr(estilo, atributo, valor)
+            wb.add_named_style(estilo)
+
+        for nome, cor in ConfigRelatorios.EXCEL_CORES_CABECALHO.items():
+            registrar(nome, fill=PatternFill("solid", fgColor=cor), font=Font(bold=True, color="FFFFFF"),
+                      alignment=Alignment(horizontal="center", vertical="center"))
+        for classe, cor in ConfigRelatorios.EXCEL_CORES_CLASSE.items():
+            registrar(f'classe_{classe}', fill=PatternFill("solid", fgColor=cor))
+        registrar('titulo', font=Font(bold=True, size=16))
+
+    @staticmethod
+    def _excel_celulas(ws, valores, estilo: str) -> List:
+        """Linha de células write_only com o mesmo estilo nomeado"""
+        from openpyxl.cell import WriteOnlyCell
+
+        celulas = []
+        for valor in valores:
+            cell = WriteOnlyCell(ws, value=valor)
+            cell.style = estilo
+            celulas.append(cell)
+        return celulas
+
+    def _excel_estilo_header(self, ws, texto_lista, estilo='cabecalho', largura=18,
+                             larguras: Optional[Dict[str, float]] = None):
+        """
+        Larguras das colunas + linha de cabeçalho (antes de qualquer outra linha)
+
+        Em workbook write_only as larguras só valem se definidas antes do
+        primeiro append; 'larguras' sobrescreve colunas específicas ({'D': 40}).
+        """
+        from openpyxl.utils import get_column_letter
+
+        for col in range(1, len(texto_lista) + 1):
+            letra = get_column_letter(col)
+            ws.column_dimensions[letra].width = (larguras or {}).get(letra, largura)
+        ws.append(self._excel_celulas(ws, texto_lista, estilo))
+
+    def _excel_aba_resumo(self, ws, relatorio: RelatorioCompleto):
+        """Preenche aba de resumo"""
+        ws.column_dimensions['A'].width = 30
+        ws.column_dimensions['B'].width = 20
+
+        # Título
+        ws.append(self._excel_celulas(ws, ['📊 RELATÓRIO DE ESTOQUE - MARFIM'], 'titulo'))
+        ws.append([f'Gerado em: {relatorio.data_geracao}'])
+        ws.append([f'Período: {relatorio.periodo.upper()}'])
+        ws.append([])
+        ws.append(self._excel_celulas(ws, ['INDICADOR', 'VALOR'], 'cabecalho'))
+
+        dados = [
+            ('Total de Itens', relatorio.total_itens),
+            ('Total de Grupos', relatorio.total_grupos),
+            ('Saldo Geral', f'{relatorio.saldo_geral:.2f}'),
+            ('Total Movimentações', relatorio.total_movimentacoes),
+            ('Total Entradas', f'{relatorio.total_entradas:.2f}'),
+            ('Total Saídas', f'{relatorio.total_saidas:.2f}'),
+            ('Itens Zerados', relatorio.itens_zerados),
+            ('Itens Parados (30+ dias)', relatorio.itens_sem_movimento),
+            ('Itens Classe A', len(relatorio.curva_abc.get('A', []))),
+            ('Itens Classe B', len(relatorio.curva_abc.get('B', []))),
+            ('Itens Classe C', len(relatorio.curva_abc.get('C', []))),
+        ]
+
+        for indicador, valor in dados:
+            ws.append([indicador, valor])
 
     def _excel_aba_abc(self, ws, relatorio: RelatorioCompleto):
         """Preenche aba Curva ABC"""
-        try:
-            from openpyxl.styles import PatternFill
-
-            headers = ['Item', 'Grupo', 'Classe', 'Volume Total',
-                       'Entradas', 'Saídas', 'Saldo', '% Volume', '% Acumulado']
-            for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
-                ws.column_dimensions[col].width = 18
-
-            self._excel_estilo_header(ws, 1, range(1, 10), headers)
-
-            row = 2
-            cores = {'A': 'E8F5E9', 'B': 'FFF3E0', 'C': 'FFEBEE'}
-            for classe in ['A', 'B', 'C']:
-                for item in relatorio.curva_abc.get(classe, []):
-                    d = item.to_dict()
-                    fill = PatternFill("solid", fgColor=cores[classe])
-                    vals = [
-                        d['item'], d['grupo'], d['classe'],
-                        d['volume_total'], d['total_entradas'], d['total_saidas'],
-                        d['saldo'], d['percentual_volume'], d['percentual_acumulado']
-                    ]
-                    for col, val in enumerate(vals, start=1):
-                        cell = ws.cell(row=row, column=col, value=val)
-                        cell.fill = fill
-                    row += 1
-        except Exception as e:
-            logger.debug(f"Erro abc excel: {e}")
+        headers = ['Item', 'Grupo', 'Classe', 'Volume Total',
+                   'Entradas', 'Saídas', 'Saldo', '% Volume', '% Acumulado']
+        self._excel_estilo_header(ws, headers)
+
+        for classe in ['A', 'B', 'C']:
+            for item in relatorio.curva_abc.get(classe, []):
+                d = item.to_dict()
+                vals = [
+                    d['item'], d['grupo'], d['classe'],
+                    d['volume_total'], d['total_entradas'], d['total_saidas'],
+                    d['saldo'], d['percentual_volume'], d['percentual_acumulado']
+                ]
+                ws.append(self._excel_celulas(ws, vals, f'classe_{classe}'))
 
     def _excel_aba_grupos(self, ws, relatorio: RelatorioCompleto):
         """Preenche aba de grupos"""
         headers = ['Grupo', 'Total Itens', 'Saldo Total', 'Movimentações',
                    'Entradas', 'Saídas', 'Itens Zerados', 'Itens Críticos', 'Classe']
-        for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
-            ws.column_dimensions[col].width = 18
+        self._excel_estilo_header(ws, headers, 'cabecalho_grupos')
 
-        self._excel_estilo_header(ws, 1, range(1, 10), headers, cor_fundo='2E7D32')
-
-        for row, grupo in enumerate(relatorio.resumo_grupos, start=2):
+        for grupo in relatorio.resumo_grupos:
             d = grupo.to_dict()
-            vals = [
+            ws.append([
                 d['grupo'], d['total_itens'], d['saldo_total'],
                 d['total_movimentacoes'], d['total_entradas'], d['total_saidas'],
                 d['itens_zerados'], d['itens_criticos'], d['classe_predominante']
-            ]
-            for col, val in enumerate(vals, start=1):
-                ws.cell(row=row, column=col, value=val)
+            ])
 
     def _excel_aba_parados(self, ws, relatorio: RelatorioCompleto):
         """Preenche aba de itens parados"""
         headers = ['Item', 'Grupo', 'Saldo', 'Dias Sem Movimento',
                    'Última Movimentação', 'Status']
-        for col in ['A', 'B', 'C', 'D', 'E', 'F']:
-            ws.column_dimensions[col].width = 22
+        self._excel_estilo_header(ws, headers, 'cabecalho_parados', largura=22)
 
-        self._excel_estilo_header(ws, 1, range(1, 7), headers, cor_fundo='C62828')
-
-        for row, item in enumerate(relatorio.itens_parados, start=2):
-            vals = [
+        for item in relatorio.itens_parados:
+            ws.append([
                 item.get('item', ''), item.get('grupo', ''), item.get('saldo', 0),
                 item.get('dias_sem_movimento', 0), item.get('ultima_movimentacao', ''),
                 item.get('status', '')
-            ]
-            for col, val in enumerate(vals, start=1):
-                ws.cell(row=row, column=col, value=val)
+            ])
 
     def _excel_aba_top(self, ws, relatorio: RelatorioCompleto):
         """Preenche aba de top movimentados"""
         headers = ['#', 'Item', 'Grupo', 'Volume Total', 'Entradas', 'Saídas',
                    'Movimentações', 'Saldo', 'Classe']
-        for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
-            ws.column_dimensions[col].width = 18
+        self._excel_estilo_header(ws, headers, 'cabecalho_top')
 
-        self._excel_estilo_header(ws, 1, range(1, 10), headers, cor_fundo='1565C0')
-
-        for row, item in enumerate(relatorio.top_movimentados, start=2):
-            vals = [
-                row - 1, item.get('item', ''), item.get('grupo', ''),
+        for posicao, item in enumerate(relatorio.top_movimentados, start=1):
+            ws.append([
+                posicao, item.get('item', ''), item.get('grupo', ''),
                 item.get('volume_total', 0), item.get('total_entradas', 0),
                 item.get('total_saidas', 0), item.get('total_movimentacoes', 0),
                 item.get('saldo', 0), item.get('classe', '')
-            ]
-            for col, val in enumerate(vals, start=1):
-                ws.cell(row=row, column=col, value=val)
+            ])
+
+    def _excel_aba_movimentacoes(self, ws, movimentacoes: Iterable[List[Any]]) -> int:
+        """Preenche aba com todas as movimentações (linha a linha, sem acumular)"""
+        headers = ['Linha', 'Data', 'Grupo', 'Item', 'Entrada', 'Saída',
+                   'Saldo', 'Alterado Por', 'Observação']
+        self._excel_estilo_header(ws, headers, 'cabecalho_movimentacoes', larguras={'D': 40})
+
+        total = 0
+        for linha in movimentacoes:
+            ws.append(linha)
+            total += 1
+        return total
 
     def exportar_pdf(self, relatorio: RelatorioCompleto) -> bytes:
         """
@@ -14,12 +14,25 @@ INSTRUÇÃO: Adicione ao app_final.py com:
 
 from flask import jsonify, request, send_file
 from relatorios import gerenciador_relatorios, ConfigRelatorios
+from agregados_diarios import agregados_diarios, ConfigAgregados
+from fila_relatorios import fila_relatorios, ConfigFilaRelatorios, FilaCheia
 import logging
 import io
+import os
+import tempfile
 
 logger = logging.getLogger(__name__)
 
 
+def _remover_arquivo(caminho):
+    """Apaga o arquivo temporário de uma exportação (se existir)"""
+    if caminho and os.path.exists(caminho):
+        try:
+            os.remove(caminho)
+        except OSError as e:
+            logger.warning(f"Não foi possível apagar {caminho}: {e}")
+
+
 def register_relatorios_routes(app):
     """
     Registra endpoints de relatórios na aplicação Flask
@@ -91,10 +104,12 @@ def register_relatorios_routes(app):
         """
         📊 Obtém Curva ABC do estoque
 
-        GET /api/relatorios/curva-abc?classe=A
+        GET /api/relatorios/curva-abc?classe=A&dias=90&xyz=1
 
         Query Params:
         - classe: A | B | C | todas (padrão: todas)
+        - dias: janela em dias no histórico inteiro (padrão: todo o histórico)
+        - xyz: 1 para incluir classe_xyz e cv (variabilidade semanal)
 
         Response:
         {
@@ -122,8 +137,10 @@ def register_relatorios_routes(app):
         """
         try:
             classe_filtro = request.args.get('classe', 'todas').upper()
+            dias = request.args.get('dias', type=int)
+            com_xyz = request.args.get('xyz', '').lower() in ('1', 'true', 'sim')
 
-            curva = gerenciador_relatorios.calcular_curva_abc()
+            curva = gerenciador_relatorios.calcular_curva_abc(dias=dias, xyz=com_xyz)
 
             if classe_filtro in ('A', 'B', 'C'):
                 resultado = {classe_filtro: [i.to_dict() for i in curva.get(classe_filtro, [])]}
@@ -152,7 +169,11 @@ def register_relatorios_routes(app):
         """
         📦 Obtém resumo por grupos
 
-        GET /api/relatorios/grupos
+        GET /api/relatorios/grupos?data_inicio=01/02/2026&data_fim=13/02/2026
+
+        Query Params:
+        - data_inicio, data_fim: DD/MM/YYYY (opcional; período somado
+          pelos agregados diários)
 
         Response:
         {
@@ -173,7 +194,10 @@ def register_relatorios_routes(app):
         }
         """
         try:
-            resumos = gerenciador_relatorios.calcular_resumo_grupos()
+            resumos = gerenciador_relatorios.calcular_resumo_grupos(
+                data_inicio=request.args.get('data_inicio'),
+                data_fim=request.args.get('data_fim')
+            )
 
             return jsonify({
                 'grupos': [r.to_dict() for r in resumos],
@@ -230,18 +254,25 @@ def register_relatorios_routes(app):
         """
         📥 Exporta relatório em Excel (.xlsx)
 
-        GET /api/relatorios/exportar/excel?periodo=mes
+        GET /api/relatorios/exportar/excel?periodo=mes&movimentacoes=1
 
         Query Params:
         - periodo: hoje | semana | mes | trimestre (padrão: mes)
         - data_inicio, data_fim: se personalizado
+        - movimentacoes: 1 = inclui a aba com todas as movimentações do
+          período (lidas da ESTOQUE em blocos)
+
+        O workbook é escrito em modo write_only num arquivo temporário e
+        enviado em partes (send_file); o arquivo é apagado ao fim da resposta.
 
         Response: arquivo .xlsx para download
         """
+        caminho = None
         try:
             periodo = request.args.get('periodo', 'mes')
             data_inicio = request.args.get('data_inicio')
             data_fim = request.args.get('data_fim')
+            com_movimentacoes = request.args.get('movimentacoes', '0').lower() in ('1', 'true', 'sim')
 
             relatorio = gerenciador_relatorios.gerar_relatorio_completo(
                 periodo=periodo,
@@ -249,23 +280,35 @@ def register_relatorios_routes(app):
                 data_fim=data_fim
             )
 
-            excel_bytes = gerenciador_relatorios.exportar_excel(relatorio)
+            movimentacoes = None
+            if com_movimentacoes:
+                movimentacoes = gerenciador_relatorios.iterar_movimentacoes(
+                    *gerenciador_relatorios.definir_periodo(periodo, data_inicio, data_fim)
+                )
+
+            descritor, caminho = tempfile.mkstemp(prefix='relatorio_marfim_', suffix='.xlsx')
+            os.close(descritor)
+            gerenciador_relatorios.escrever_excel(relatorio, caminho, movimentacoes)
 
             nome_arquivo = f"relatorio_marfim_{periodo}_{relatorio.data_geracao[:10].replace('/', '-')}.xlsx"
 
-            return send_file(
-                io.BytesIO(excel_bytes),
+            resposta = send_file(
+                caminho,
                 mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 as_attachment=True,
                 download_name=nome_arquivo
             )
+            resposta.call_on_close(lambda: _remover_arquivo(caminho))
+            return resposta
 
         except ImportError:
+            _remover_arquivo(caminho)
             return jsonify({
                 'error': 'openpyxl não instalado',
                 'instrucao': 'Execute: pip install openpyxl'
             }), 500
         except Exception as e:
+            _remover_arquivo(caminho)
             logger.error(f"Erro ao exportar Excel: {e}")
             return jsonify({'error': str(e)}), 500
 
@@ -351,6 +394,103 @@ def register_relatorios_routes(app):
             logger.error(f"Erro ao obter gráficos: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/relatorios/jobs', methods=['POST'])
+    def criar_job_relatorio():
+        """
+        📨 Gera relatório + artefatos em background
+
+        POST /api/relatorios/jobs
+        Body:
+        {
+          "periodo": "mes",
+          "data_inicio": "01/02/2026",   // se personalizado
+          "data_fim": "13/02/2026",
+          "formatos": ["json", "excel", "pdf"],   // padrão: todos
+          "movimentacoes": false                  // Excel com todas as movimentações
+        }
+
+        Response (202; 200 se já estava em cache):
+        {
+          "job": {"id": "rel_000001_...", "status": "pendente", ...},
+          "status_url": "/api/relatorios/jobs/rel_000001_..."
+        }
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            job = fila_relatorios.enviar(
+                periodo=data.get('periodo', 'mes'),
+                data_inicio=data.get('data_inicio'),
+                data_fim=data.get('data_fim'),
+                formatos=data.get('formatos'),
+                movimentacoes=bool(data.get('movimentacoes', False))
+            )
+
+            return jsonify({
+                'job': job.to_dict(),
+                'status_url': f"/api/relatorios/jobs/{job.id}"
+            }), 200 if job.do_cache else 202
+
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except FilaCheia as e:
+            return jsonify({'error': str(e)}), 429
+        except Exception as e:
+            logger.error(f"Erro ao criar job de relatório: {e}")
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/relatorios/jobs', methods=['GET'])
+    def listar_jobs_relatorio():
+        """
+        📋 Jobs recentes e estado da fila
+
+        GET /api/relatorios/jobs?limite=20
+        """
+        try:
+            limite = int(request.args.get('limite', 20))
+            return jsonify({
+                'jobs': fila_relatorios.listar(limite),
+                'fila': fila_relatorios.obter_resumo()
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/relatorios/jobs/<job_id>', methods=['GET'])
+    def status_job_relatorio(job_id):
+        """
+        🔄 Status de um job (polling)
+
+        GET /api/relatorios/jobs/<job_id>
+
+        Response: {"id", "status": "pendente|executando|concluido|erro", "downloads": {...}, ...}
+        """
+        job = fila_relatorios.obter(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        return jsonify(job.to_dict()), 200
+
+    @app.route('/api/relatorios/jobs/<job_id>/download/<formato>', methods=['GET'])
+    def download_job_relatorio(job_id, formato):
+        """
+        📥 Artefato de um job concluído (json | excel | pdf), servido do disco
+
+        GET /api/relatorios/jobs/<job_id>/download/excel
+        """
+        caminho = fila_relatorios.caminho_artefato(job_id, formato)
+        if not caminho:
+            job = fila_relatorios.obter(job_id)
+            status = job.status.value if job else None
+            return jsonify({'error': 'Artefato indisponível', 'status': status}), 404 if not job else 409
+
+        arquivo, mimetype = ConfigFilaRelatorios.FORMATOS[formato]
+        job = fila_relatorios.obter(job_id)
+        extensao = arquivo.rsplit('.', 1)[1]
+        return send_file(
+            caminho,
+            mimetype=mimetype,
+            as_attachment=formato != 'json',
+            download_name=f"relatorio_marfim_{job.parametros['periodo']}_{job.id}.{extensao}"
+        )
+
     @app.route('/api/relatorios/configuracoes', methods=['GET'])
     def obter_configuracoes():
         """
@@ -370,6 +510,10 @@ def register_relatorios_routes(app):
 
     logger.info("✅ Endpoints de relatórios registrados")
 
+    # Back-fill dos agregados diários a partir da ESTOQUE (não bloqueia o boot)
+    if ConfigAgregados.SINCRONIZAR_AO_INICIAR:
+        agregados_diarios.iniciar_sincronizacao()
+
 
 if __name__ == '__main__':
     print("📊 Endpoints de relatórios para Flask")
@@ -384,3 +528,7 @@ if __name__ == '__main__':
     print("  - GET /api/relatorios/exportar/pdf")
     print("  - GET /api/relatorios/graficos")
     print("  - GET /api/relatorios/configuracoes")
+    print("  - POST /api/relatorios/jobs")
+    print("  - GET /api/relatorios/jobs")
+    print("  - GET /api/relatorios/jobs/<job_id>")
+    print("  - GET /api/relatorios/jobs/<job_id>/download/<formato>")
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suavização Exponencial em Lote - Marfim Estoque Ceará
+Autor: Johnny
+Data: 2026-02-13
+
+Previsão de consumo diário de todos os itens de uma vez:
+- 📈 Simples, Holt (tendência amortecida) e Holt-Winters aditivo (semanal)
+- 🔍 Busca em grade dos parâmetros por item (menor erro um passo à frente)
+- 📏 Métricas por item: MAE, RMSE e WAPE
+- ⚡ Recorrências NumPy no eixo dos itens, cacheadas por versão do cubo
+
+A série de cada item vem do cubo_consumo (saídas por dia). Quem usa:
+- app_final: GET /api/previsao/<item>
+- ia_avancada.prever_saldo_futuro (POST /api/ia/prever-saldo)
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from itertools import product
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+import pandas as pd
+
+from cubo_consumo import cubo_consumo
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# CONFIGURAÇÕES
+# ========================================
+
+class ConfigSuavizacao:
+    """Configurações do motor de suavização exponencial"""
+    JANELA_DIAS = 180            # Dias de histórico usados no ajuste
+    PERIODO_SAZONAL = 7          # Sazonalidade semanal
+    AMORTECIMENTO = 0.98         # φ da tendência amortecida
+    MIN_DIAS_COM_SAIDA = 5       # Abaixo disso o item não é ajustado
+
+    ALFAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+    BETAS = (0.01, 0.05, 0.1)
+    GAMAS = (0.05, 0.1, 0.3)
+
+    # Parâmetros livres por modelo (critério AIC na escolha do modelo)
+    PARAMETROS_MODELO = {'simples': 2, 'holt': 4, 'holt_winters': 4 + PERIODO_SAZONAL}
+
+
+# ========================================
+# RECORRÊNCIAS VETORIZADAS
+# ========================================
+
+def _ajustar_grade(y: np.ndarray, alfas: np.ndarray, betas: Optional[np.ndarray],
+                   gamas: Optional[np.ndarray], periodo: int, phi: float) -> Dict[str, np.ndarray]:
+    """
+    Roda a recorrência para todos os itens × combinações da grade
+
+    Args:
+        y: Matriz item × dia (T >= 2 períodos)
+        alfas/betas/gamas: Parâmetros por combinação (betas/gamas None = sem
+            tendência/sazonalidade)
+
+    Returns:
+        sse/sae por (item, combinação) e estado final (nível, tendência, sazonais)
+    """
+    n, t_total = y.shape
+    c = len(alfas)
+    a = alfas[None, :]
+    b = betas[None, :] if betas is not None else None
+    g = gamas[None, :] if gamas is not None else None
+
+    # Estado inicial a partir dos dois primeiros períodos
+    media1 = y[:, :periodo].mean(axis=1)
+    nivel = np.repeat(media1[:, None], c, axis=1)
+    tendencia = np.zeros((n, c))
+    if b is not None:
+        media2 = y[:, periodo:2 * periodo].mean(axis=1)
+        tendencia += ((media2 - media1) / periodo)[:, None]
+    sazonal = np.zeros((n, c, periodo))
+    if g is not None:
+        sazonal += (y[:, :periodo] - media1[:, None])[:, None, :]
+
+    sse = np.zeros((n, c))
+    sae = np.zeros((n, c))
+    for t in range(periodo, t_total):
+        obs = y[:, t][:, None]
+        j = t % periodo
+        s = sazonal[:, :, j]
+        amortecida = phi * tendencia
+        erro = obs - (nivel + amortecida + s)
+        sse += erro * erro
+        sae += np.abs(erro)
+
+        novo_nivel = a * (obs - s) + (1 - a) * (nivel + amortecida)
+        if b is not None:
+            tendencia = b * (novo_nivel - nivel) + (1 - b) * amortecida
+        if g is not None:
+            sazonal[:, :, j] = g * (obs - novo_nivel) + (1 - g) * s
+        nivel = novo_nivel
+
+    return {'sse': sse, 'sae': sae, 'nivel': nivel, 'tendencia': tendencia, 'sazonal': sazonal}
+
+
+# ========================================
+# MOTOR
+# ========================================
+
+class MotorSuavizacao:
+    """
+    Ajusta e guarda os modelos de todos os itens do cubo
+
+    Uso:
+        motor_suavizacao.ajustar()                       # usa cubo_consumo
+        prev = motor_suavizacao.prever('AMARELO 1234', 30)
+        prev['consumo_previsto'], prev['modelo'], prev['metricas']
+    """
+
+    MODELOS = ('simples', 'holt', 'holt_winters')
+
+    def __init__(self, cubo=None):
+        self.cubo = cubo or cubo_consumo
+        self._lock = threading.RLock()
+        self._chave_cache = None
+        self._ids: Dict[str, int] = {}
+        self._resultado: Optional[Dict[str, np.ndarray]] = None
+        self._tempo_ajuste_ms = 0.0
+        logger.info("✅ MotorSuavizacao inicializado")
+
+    # ========================================
+    # AJUSTE
+    # ========================================
+
+    def ajustar(self, hoje: Optional[datetime] = None, forcar: bool = False) -> bool:
+        """
+        Ajusta os modelos se o cubo mudou desde o último ajuste
+
+        Returns:
+            True se há modelos disponíveis
+        """
+        hoje = hoje or datetime.now()
+        with self._lock:
+            chave = (self.cubo.versao, hoje.date())
+            if not forcar and chave == self._chave_cache:
+                return self._resultado is not None
+            if self.cubo.vazio:
+                return False
+
+            inicio = time.time()
+            self._resultado = self._ajustar_todos(hoje)
+            self._chave_cache = chave
+            self._tempo_ajuste_ms = (time.time() - inicio) * 1000
+
+            modelos = pd.Series(self._resultado['modelo']).value_counts().to_dict()
+            logger.info(f"📈 Suavização ajustada: {len(self._ids)} itens {modelos} "
+                        f"em {self._tempo_ajuste_ms:.0f}ms (cubo v{self.cubo.versao})")
+            return True
+
+    def _serie_janela(self, hoje: datetime) -> np.ndarray:
+        """Saídas diárias dos últimos JANELA_DIAS dias até hoje (zeros onde o cubo não cobre)"""
+        janela = ConfigSuavizacao.JANELA_DIAS
+        cubo = self.cubo
+        y = np.zeros((cubo.n_itens, janela))
+
+        if cubo.n_dias == 0:
+            return y
+
+        # Interseção entre [hoje - janela + 1, hoje] e as colunas do cubo
+        ultimo_dia = np.datetime64(hoje.date(), 'D')
+        primeiro_dia = ultimo_dia - np.timedelta64(janela - 1, 'D')
+        dia0 = np.datetime64(cubo.dia(0).date(), 'D')
+        inicio = max(int((primeiro_dia - dia0).astype(int)), 0)
+        fim = min(int((ultimo_dia - dia0).astype(int)) + 1, cubo.n_dias)
+        if fim > inicio:
+            deslocamento = int((dia0 - primeiro_dia).astype(int)) + inicio
+            y[:, deslocamento:deslocamento + fim - inicio] = cubo.saidas[:, inicio:fim]
+        return y
+
+    def _ajustar_todos(self, hoje: datetime) -> Dict[str, np.ndarray]:
+        """Grade de parâmetros por modelo e escolha do melhor modelo por item (AIC)"""
+        cfg = ConfigSuavizacao
+        m = cfg.PERIODO_SAZONAL
+        phi = cfg.AMORTECIMENTO
+
+        with self.cubo._lock:
+            itens = self.cubo.itens
+            y_total = self._serie_janela(hoje)
+
+        ativos = np.flatnonzero((y_total > 0).sum(axis=1) >= cfg.MIN_DIAS_COM_SAIDA)
+        self._ids = {item: i for i, item in enumerate(itens)}
+
+        n = len(itens)
+        resultado = {
+            'modelo': np.full(n, 'sem_dados', dtype=object),
+            'alfa': np.full(n, np.nan), 'beta': np.full(n, np.nan), 'gama': np.full(n, np.nan),
+            'nivel': np.zeros(n), 'tendencia': np.zeros(n), 'sazonal': np.zeros((n, m)),
+            'mae': np.full(n, np.nan), 'rmse': np.full(n, np.nan), 'wape': np.full(n, np.nan),
+            'n_obs': np.zeros(n, dtype=int), 'media_diaria': y_total.mean(axis=1),
+            'dia_final': y_total.shape[1],
+        }
+        if len(ativos) == 0:
+            return resultado
+
+        y = y_total[ativos]
+        n_obs = y.shape[1] - m
+        grades = {
+            'simples': (np.array(cfg.ALFAS), None, None),
+            'holt': tuple(np.array(v) for v in zip(*product(cfg.ALFAS, cfg.BETAS))) + (None,),
+            'holt_winters': tuple(np.array(v) for v in zip(*product(cfg.ALFAS, cfg.BETAS, cfg.GAMAS))),
+        }
+
+        melhores = {}
+        for modelo, (alfas, betas, gamas) in grades.items():
+            ajuste = _ajustar_grade(y, alfas, betas, gamas, m, phi if betas is not None else 1.0)
+            k = np.argmin(ajuste['sse'], axis=1)
+            linhas = np.arange(len(ativos))
+            sse = ajuste['sse'][linhas, k]
+            melhores[modelo] = {
+                'sse': sse,
+                'sae': ajuste['sae'][linhas, k],
+                'aic': n_obs * np.log(sse / n_obs + 1e-9) + 2 * cfg.PARAMETROS_MODELO[modelo],
+                'alfa': alfas[k],
+                'beta': betas[k] if betas is not None else np.full(len(k), np.nan),
+                'gama': gamas[k] if gamas is not None else np.full(len(k), np.nan),
+                'nivel': ajuste['nivel'][linhas, k],
+                'tendencia': ajuste['tendencia'][linhas, k],
+                'sazonal': ajuste['sazonal'][linhas, k, :],
+            }
+
+        # Melhor modelo por item
+        aic = np.stack([melhores[mod]['aic'] for mod in self.MODELOS])
+        escolha = np.argmin(aic, axis=0)
+        soma_real = y[:, m:].sum(axis=1)
+
+        for i, modelo in enumerate(self.MODELOS):
+            sel = escolha == i
+            destino = ativos[sel]
+            melhor = melhores[modelo]
+            resultado['modelo'][destino] = modelo
+            for campo in ('alfa', 'beta', 'gama', 'nivel', 'tendencia', 'sazonal'):
+                resultado[campo][destino] = melhor[campo][sel]
+            resultado['mae'][destino] = melhor['sae'][sel] / n_obs
+            resultado['rmse'][destino] = np.sqrt(melhor['sse'][sel] / n_obs)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                resultado['wape'][destino] = np.where(
+                    soma_real[sel] > 0, melhor['sae'][sel] / soma_real[sel], np.nan
+                )
+        resultado['n_obs'][ativos] = n_obs
+        return resultado
+
+    # ========================================
+    # PREVISÃO
+    # ========================================
+
+    def _projetar(self, linhas: np.ndarray, dias: int) -> np.ndarray:
+        """Previsão diária (item × dia) para os próximos `dias` dias, nunca negativa"""
+        r = self._resultado
+        m = ConfigSuavizacao.PERIODO_SAZONAL
+        phi = ConfigSuavizacao.AMORTECIMENTO
+
+        h = np.arange(1, dias + 1)
+        amortecimento = np.cumsum(phi ** h)
+        sazonal = r['sazonal'][linhas][:, (r['dia_final'] + h - 1) % m]
+        previsao = r['nivel'][linhas, None] + amortecimento[None, :] * r['tendencia'][linhas, None] + sazonal
+        return np.maximum(previsao, 0.0)
+
+    def prever(self, item: str, dias: int = 30) -> Optional[Dict[str, Any]]:
+        """
+        Consumo previsto do item para os próximos `dias` dias
+
+        Returns:
+            Dict com consumo_previsto, media_diaria, previsao_diaria, modelo,
+            parametros e metricas; None se o item não tem modelo ajustado
+        """
+        dias = max(1, int(dias))
+        with self._lock:
+            if not self.ajustar():
+                return None
+            idx = self._ids.get(str(item).strip().upper())
+            if idx is None or self._resultado['modelo'][idx] == 'sem_dados':
+                return None
+
+            r = self._resultado
+            diaria = self._projetar(np.array([idx]), dias)[0]
+            consumo = float(diaria.sum())
+            nivel, tendencia = float(r['nivel'][idx]), float(r['tendencia'][idx])
+
+            # Tendência: variação projetada em 30 dias vs nível atual
+            variacao = tendencia * 30
+            if nivel > 0 and variacao > 0.2 * nivel:
+                sentido = 'crescente'
+            elif nivel > 0 and variacao < -0.2 * nivel:
+                sentido = 'decrescente'
+            else:
+                sentido = 'estavel'
+
+            return {
+                'item': self.cubo.itens[idx],
+                'dias': dias,
+                'consumo_previsto': round(consumo, 2),
+                'media_diaria': round(consumo / dias, 4),
+                'previsao_diaria': [round(float(v), 4) for v in diaria],
+                'tendencia': sentido,
+                'modelo': r['modelo'][idx],
+                'parametros': {
+                    campo: (None if np.isnan(r[campo][idx]) else float(r[campo][idx]))
+                    for campo in ('alfa', 'beta', 'gama')
+                },
+                'metricas': {
+                    'mae': round(float(r['mae'][idx]), 4),
+                    'rmse': round(float(r['rmse'][idx]), 4),
+                    'wape': None if np.isnan(r['wape'][idx]) else round(float(r['wape'][idx]), 4),
+                    'n_obs': int(r['n_obs'][idx]),
+                },
+                'versao_cubo': self._chave_cache[0]
+            }
+
+    def prever_todos(self, dias: int = 30) -> pd.DataFrame:
+        """Consumo previsto e métricas de todos os itens ajustados"""
+        with self._lock:
+            if not self.ajustar():
+                return pd.DataFrame()
+            r = self._resultado
+            linhas = np.flatnonzero(r['modelo'] != 'sem_dados')
+            consumo = self._projetar(linhas, dias).sum(axis=1)
+            itens = self.cubo.itens
+            return pd.DataFrame({
+                'item': [itens[i] for i in linhas],
+                'modelo': r['modelo'][linhas],
+                'consumo_previsto': np.round(consumo, 2),
+                'media_diaria': np.round(consumo / dias, 4),
+                'mae': np.round(r['mae'][linhas], 4),
+                'rmse': np.round(r['rmse'][linhas], 4),
+                'wape': np.round(r['wape'][linhas], 4),
+            })
+
+    def obter_resumo(self) -> Dict[str, Any]:
+        """Resumo do último ajuste"""
+        with self._lock:
+            if self._resultado is None:
+                return {'ajustado': False}
+            r = self._resultado
+            ajustados = r['modelo'] != 'sem_dados'
+            return {
+                'ajustado': True,
+                'versao_cubo': self._chave_cache[0],
+                'data_ajuste': self._chave_cache[1].strftime('%d/%m/%Y'),
+                'itens': len(r['modelo']),
+                'itens_ajustados': int(ajustados.sum()),
+                'por_modelo': pd.Series(r['modelo']).value_counts().to_dict(),
+                'wape_mediano': round(float(np.nanmedian(r['wape'][ajustados])), 4) if ajustados.any() else None,
+                'tempo_ajuste_ms': round(self._tempo_ajuste_ms, 1),
+                'janela_dias': ConfigSuavizacao.JANELA_DIAS
+            }
+
+
+# ========================================
+# SINGLETON GLOBAL
+# ========================================
+motor_suavizacao = MotorSuavizacao()
+
+
+if __name__ == '__main__':
+    print("🧪 Testando MotorSuavizacao...")
+
+    rng = np.random.default_rng(0)
+    hoje = pd.Timestamp(datetime.now().date())
+    dias = pd.date_range(hoje - pd.Timedelta(days=199), hoje)
+    df = pd.DataFrame({
+        'Item': ['TESTE'] * len(dias) + ['SEMANAL'] * len(dias),
+        'Data': list(dias) * 2,
+        'Entrada': 0.0,
+        'Saída': np.r_[rng.poisson(10, len(dias)), np.where(dias.dayofweek < 5, 20, 2)],
+    })
+    cubo_consumo.sincronizar(df)
+
+    for item in ('TESTE', 'SEMANAL'):
+        prev = motor_suavizacao.prever(item, 30)
+        print(f"   {item}: {prev['consumo_previsto']:.0f} em 30 dias | "
+              f"modelo {prev['modelo']} | WAPE {prev['metricas']['wape']}")
+    print(f"   Resumo: {motor_suavizacao.obter_resumo()}")
+
+    print("\n✅ Testes concluídos!")